@@ -4,18 +4,22 @@ Phase 8: Multi-Provider AI Management
 """
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List, Literal
+import json
 import logging
 
 try:
     from services.ai_service import get_unified_ai_service, AIProvider, AIServiceError
+    from services.groq_service import get_groq_service
 except ImportError:
     from app.services.ai_service import (
         get_unified_ai_service,
         AIProvider,
         AIServiceError,
     )
+    from app.services.groq_service import get_groq_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -31,6 +35,21 @@ class ChatRequest(BaseModel):
     provider: Optional[str] = Field(None, description="Specific AI provider to use")
 
 
+class StreamChatRequest(BaseModel):
+    """Request model for streaming chat completion (Groq)"""
+
+    message: str = Field(..., description="Input message")
+    model: Optional[str] = Field(None, description="Specific model to use")
+    max_tokens: int = Field(1000, description="Maximum tokens to generate")
+    temperature: float = Field(0.7, description="Sampling temperature")
+    max_sentences: Optional[int] = Field(
+        None, ge=1, description="Stop generation after this many sentences"
+    )
+    max_chars: Optional[int] = Field(
+        None, ge=1, description="Stop generation after this many characters"
+    )
+
+
 class SalesAnalysisRequest(BaseModel):
     """Request model for sales analysis"""
 
@@ -43,6 +62,7 @@ class SalesAnalysisRequest(BaseModel):
     )
     sales_stage: str = Field("prospecting", description="Current sales stage")
     provider: Optional[str] = Field(None, description="Specific AI provider to use")
+    use_cache: bool = Field(True, description="Use the cached response if available")
 
 
 class ProviderSwitchRequest(BaseModel):
@@ -98,6 +118,49 @@ async def chat_completion(request: ChatRequest) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Chat completion failed: {str(e)}")
 
 
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_completion_stream(request: StreamChatRequest):
+    """
+    Streaming chat completion as server-sent events (Groq)
+
+    Emits `delta` events as tokens arrive and a final `done` event.
+    When max_sentences / max_chars is reached the upstream request is
+    closed, so no further tokens are generated or billed.
+    """
+    try:
+        groq_service = get_groq_service()
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def event_stream():
+        text = ""
+        try:
+            async for delta in groq_service.stream_chat_completion(
+                request.message,
+                model=request.model,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                max_sentences=request.max_sentences,
+                max_chars=request.max_chars,
+            ):
+                text += delta
+                yield _sse("delta", {"content": delta})
+            yield _sse("done", {"text": text, "chars": len(text)})
+        except Exception as e:
+            logger.error(f"Streaming chat completion failed: {str(e)}")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/sales-analysis")
 async def sales_analysis(request: SalesAnalysisRequest) -> Dict[str, Any]:
     """
@@ -130,6 +193,7 @@ async def sales_analysis(request: SalesAnalysisRequest) -> Dict[str, Any]:
             customer_profile=request.customer_profile,
             sales_stage=request.sales_stage,
             provider=provider,
+            use_cache=request.use_cache,
         )
 
         return {"success": True, "analysis": result}
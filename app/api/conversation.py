@@ -17,12 +17,14 @@ try:
         ConversationServiceError,
     )
     from services.usage_limit_service import get_usage_limit_service
+    from services.speech_executor import SpeechQueueFullError
 except ImportError:
     from app.services.conversation_service import (
         get_conversation_service,
         ConversationServiceError,
     )
     from app.services.usage_limit_service import get_usage_limit_service
+    from app.services.speech_executor import SpeechQueueFullError
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -106,6 +108,7 @@ async def voice_conversation_file(
             session_id=None,
             customer_info=None,
             speaker_preferences={"speaker_id": speaker_id} if speaker_id else None,
+            user_id=user_id,
         )
 
         # Add usage information to result
@@ -116,6 +119,9 @@ async def voice_conversation_file(
 
         return VoiceConversationResponse(**result)
 
+    except SpeechQueueFullError as e:
+        logger.warning(f"Speech queue full: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e))
     except ConversationServiceError as e:
         logger.error(f"Conversation service error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -170,6 +176,9 @@ async def voice_conversation_base64(
 
         return VoiceConversationResponse(**result)
 
+    except SpeechQueueFullError as e:
+        logger.warning(f"Speech queue full: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e))
     except ConversationServiceError as e:
         logger.error(f"Conversation service error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -328,6 +337,7 @@ async def handle_objection(
     session_id: str,
     objection_text: str,
     objection_type: str = "general",
+    user_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Handle customer objections with specialized analysis
@@ -336,6 +346,7 @@ async def handle_objection(
         session_id: Conversation session ID
         objection_text: Customer's objection text
         objection_type: Type of objection (price, timing, authority, need)
+        user_id: User ID (scopes the response cache)
 
     Returns:
         Objection handling response with audio
@@ -355,6 +366,7 @@ async def handle_objection(
             session_id=session_id,
             objection_text=objection_text,
             objection_type=objection_type,
+            user_id=user_id,
         )
 
         return result
@@ -333,10 +333,10 @@ async def test_prompt_quality(
 
         # Groq APIでテスト実行
         try:
-            from services.groq_service import GroqService
+            from services.groq_service import get_groq_service
         except ImportError:
-            from app.services.groq_service import GroqService
-        groq_service = GroqService()
+            from app.services.groq_service import get_groq_service
+        groq_service = get_groq_service()
 
         result = await groq_service.chat_completion(
             full_prompt,
@@ -6,6 +6,7 @@ Cursor ↔ Obsidian 双方向連携システム
 import os
 import io
 import json
+import asyncio
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional, Dict, Any
@@ -69,8 +70,10 @@ except ImportError:
 
 try:
     from config import config
+    from services.upload_spool import spool_upload
 except ImportError:
     from app.config import config
+    from app.services.upload_spool import spool_upload
 
 router = APIRouter(prefix="/file-upload", tags=["file-upload"])
 
@@ -180,9 +183,8 @@ async def upload_image(file: UploadFile = File(...)):
     if not file.filename.lower().endswith((".jpg", ".jpeg", ".png", ".gif", ".bmp")):
         raise HTTPException(status_code=400, detail="サポートされていない画像形式です")
 
-    # 基本的な画像情報
-    content = await file.read()
-    image_size = len(content)
+    # 基本的な画像情報（サイズは受信時に記録済みのため内容は読まない）
+    image_size = file.size
 
     analysis = "画像ファイルがアップロードされました。詳細な分析機能を使用するには、GPT-4 Vision APIキーが必要です。"
 
@@ -229,11 +231,17 @@ async def upload_document(file: UploadFile = File(...)):
     file_ext = Path(file.filename).suffix.lower()
 
     if file_ext == ".txt":
-        content = await file.read()
-        doc_text = content.decode("utf-8")
+        # 表示するのは先頭1000文字だけなので、それ以上は保持しない
+        upload = await spool_upload(file)
+        try:
+            doc_text, _, total_chars = await asyncio.to_thread(upload.read_text, 1000)
+        finally:
+            await asyncio.to_thread(upload.close)
+        doc_truncated = total_chars > len(doc_text)
         doc_type = "テキスト文書"
     else:
         doc_text = "文書ファイルがアップロードされました。PDFやDOCX処理には追加ライブラリが必要です。"
+        doc_truncated = False
         doc_type = f"{file_ext.upper()}文書"
 
     # Obsidian形式でマークダウン生成
@@ -252,7 +260,7 @@ async def upload_document(file: UploadFile = File(...)):
 
 ## 📄 文書内容
 ```
-{doc_text[:1000]}{'...' if len(doc_text) > 1000 else ''}
+{doc_text[:1000]}{'...' if doc_truncated else ''}
 ```
 
 ## 🏷️ タグ
@@ -271,7 +279,11 @@ async def upload_document(file: UploadFile = File(...)):
             "status": "success",
             "message": f"{doc_type}が正常に処理されObsidianに保存されました",
             "file_path": saved_path,
-            "text_preview": doc_text[:500] + "..." if len(doc_text) > 500 else doc_text,
+            "text_preview": (
+                doc_text[:500] + "..."
+                if doc_truncated or len(doc_text) > 500
+                else doc_text
+            ),
         }
     )
 
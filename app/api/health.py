@@ -2,15 +2,58 @@
 Health check endpoints
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
 router = APIRouter()
 
 
+def _voice_health(request: Request):
+    """Voice service metrics (speaker registry, TTS cache) without touching VOICEVOX"""
+    voice_service = getattr(request.app.state, "voice_service", None)
+    if voice_service is None:
+        return {"status": "unavailable"}
+    return {
+        "status": "healthy",
+        "speaker_registry": voice_service.get_speaker_registry_metrics(),
+        "tts_cache": voice_service.get_audio_cache_metrics(),
+    }
+
+
+def _llm_client_health():
+    """Groq connection pool metrics"""
+    try:
+        from services.groq_client import get_groq_client_pool
+    except ImportError:
+        from app.services.groq_client import get_groq_client_pool
+    return get_groq_client_pool().get_metrics()
+
+
+def _sales_cache_health():
+    """sales_analysis response cache metrics"""
+    try:
+        from services.groq_service import get_groq_service
+    except ImportError:
+        from app.services.groq_service import get_groq_service
+    try:
+        return get_groq_service().get_response_cache_metrics()
+    except ValueError:
+        # GROQ_API_KEY 未設定
+        return {"enabled": False}
+
+
+def _document_cache_health():
+    """Processed-document cache metrics (hits, size, time saved)"""
+    try:
+        from services.document_processor import get_document_processor
+    except ImportError:
+        from app.services.document_processor import get_document_processor
+    return get_document_processor().get_cache_metrics()
+
+
 @router.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Basic health check endpoint - same as detailed for compatibility"""
-    return await detailed_health_check()
+    return await detailed_health_check(request)
 
 
 @router.get("/health/basic")
@@ -20,7 +63,7 @@ async def basic_health_check():
 
 
 @router.get("/health/detailed")
-async def detailed_health_check():
+async def detailed_health_check(request: Request):
     """Detailed health check with AI service status"""
     try:
         try:
@@ -46,6 +89,10 @@ async def detailed_health_check():
                 "primary_provider": ai_service.primary_provider,
                 "available_providers": available_providers,
                 "providers": providers_info,
+                "voice": _voice_health(request),
+                "llm_client": _llm_client_health(),
+                "sales_cache": _sales_cache_health(),
+                "document_cache": _document_cache_health(),
             },
         }
     except ImportError as e:
@@ -64,6 +111,6 @@ async def detailed_health_check():
 
 # 元の詳細ヘルスチェックを /api/health のデフォルトに設定
 @router.get("")
-async def complete_health_check():
+async def complete_health_check(request: Request):
     """Complete health check with AI service status - default health endpoint"""
-    return await detailed_health_check()
+    return await detailed_health_check(request)
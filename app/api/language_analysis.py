@@ -1,5 +1,8 @@
 from fastapi import APIRouter, HTTPException, Form
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional, List
+import json
 import logging
 
 try:
@@ -9,6 +12,10 @@ try:
         LanguageIssueType,
     )
     from services.friendliness_analyzer import friendliness_analyzer, FriendlinessLevel
+    from services.language_batch_service import (
+        BatchAggregate,
+        get_language_batch_analyzer,
+    )
 except ImportError:
     from app.services.language_analysis_service import (
         language_analysis_service,
@@ -19,6 +26,10 @@ except ImportError:
         friendliness_analyzer,
         FriendlinessLevel,
     )
+    from app.services.language_batch_service import (
+        BatchAggregate,
+        get_language_batch_analyzer,
+    )
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +92,76 @@ async def analyze_language_quality(
         )
 
 
+class ConversationTurn(BaseModel):
+    text: str
+    speaker: Optional[str] = None
+
+
+class BatchAnalysisRequest(BaseModel):
+    turns: List[ConversationTurn] = Field(..., min_length=1)
+    context: str = "sales"
+    customer_level: str = "business"
+    include_details: bool = True
+
+
+@router.post("/language/analyze-batch")
+async def analyze_language_batch(request: BatchAnalysisRequest) -> StreamingResponse:
+    """
+    会話全体（複数ターン）の言葉遣いを一括分析
+
+    ターンはワーカープロセスに分散して分析され、完了した順に1行ずつ返す。
+    最終行は丁寧度・親しみやすさの分布などの集計。
+
+    Returns:
+        NDJSON: {"type": "turn", ...} × ターン数 → {"type": "summary", ...}
+    """
+    if any(not turn.text.strip() for turn in request.turns):
+        raise HTTPException(status_code=400, detail="分析対象のテキストが空です")
+
+    analyzer = get_language_batch_analyzer()
+    texts = [turn.text for turn in request.turns]
+
+    async def lines():
+        aggregate = BatchAggregate()
+        results = analyzer.iter_results(
+            texts, request.context, request.customer_level
+        )
+        try:
+            async for index, result in results:
+                aggregate.add(result)
+                line: Dict[str, Any] = {
+                    "type": "turn",
+                    "index": index,
+                    "speaker": request.turns[index].speaker,
+                }
+                if "error" in result:
+                    line["error"] = result["error"]
+                elif request.include_details:
+                    line["result"] = result
+                else:
+                    line["summary"] = {
+                        "overall_score": result["overall_score"],
+                        "politeness_level": result["politeness_analysis"]["level"],
+                        "friendliness_level": result["friendliness_analysis"][
+                            "level"
+                        ],
+                        "issues_count": len(result["detected_issues"]),
+                    }
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Batch language analysis error: {e}")
+            error = {"type": "error", "detail": str(e)}
+            yield json.dumps(error, ensure_ascii=False) + "\n"
+            return
+        finally:
+            await results.aclose()
+
+        summary = {"type": "summary", **aggregate.to_dict()}
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/language/check-politeness")
 async def check_politeness_level(text: str = Form(...)):
     """
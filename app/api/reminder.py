@@ -3,11 +3,14 @@ Reminder API for Voice Roleplay System
 営業ロールプレイリマインダーAPI
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Form, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Form, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
 from typing import Dict, Any, Optional, List
+import json
 import logging
 import uuid
+from dataclasses import asdict
 from datetime import datetime
 
 try:
@@ -725,6 +728,40 @@ async def get_scheduler_status(
         raise HTTPException(status_code=500, detail=f"状態取得エラー: {str(e)}")
 
 
+@router.get("/scheduler/logs")
+async def query_reminder_logs(
+    user_id: Optional[str] = Query(None),
+    reminder_type: Optional[str] = Query(None),
+    since: Optional[str] = Query(None, description="ISO日時または日付（以降）"),
+    until: Optional[str] = Query(None, description="ISO日時または日付（まで）"),
+    success: Optional[bool] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    usage_service: UsageLimitService = Depends(get_usage_limit_service),
+    email_service: EmailService = Depends(get_email_service),
+) -> StreamingResponse:
+    """
+    リマインダー送信ログを検索（NDJSONでストリーミング）
+
+    Returns:
+        1行1件のJSON（古い順）
+    """
+    scheduler = get_reminder_scheduler_service(usage_service, email_service)
+    # 期間はストリーミング開始前に検証する（タイムゾーン付きはローカル時刻に変換）
+    try:
+        logs = scheduler.query_logs(
+            user_id=user_id,
+            reminder_type=reminder_type,
+            since=since,
+            until=until,
+            success=success,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lines = (json.dumps(asdict(log), ensure_ascii=False) + "\n" for log in logs)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
 @router.post("/scheduler/send")
 async def manual_send_reminders(
     reminder_type: Optional[str] = Form(None),
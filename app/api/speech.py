@@ -11,9 +11,11 @@ import logging
 
 try:
     from services.speech_service import get_speech_service, SpeechServiceError
+    from services.speech_executor import SpeechQueueFullError
     from config import config
 except ImportError:
     from app.services.speech_service import get_speech_service, SpeechServiceError
+    from app.services.speech_executor import SpeechQueueFullError
     from app.config import config
 
 logger = logging.getLogger(__name__)
@@ -124,6 +126,9 @@ async def transcribe_audio_file(
             has_diarization=result.get("has_diarization", False),
         )
 
+    except SpeechQueueFullError as e:
+        logger.warning(f"Speech queue full: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e))
     except SpeechServiceError as e:
         logger.error(f"Speech service error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -189,6 +194,9 @@ async def transcribe_base64_audio(
             has_diarization=result.get("has_diarization", False),
         )
 
+    except SpeechQueueFullError as e:
+        logger.warning(f"Speech queue full: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e))
     except SpeechServiceError as e:
         logger.error(f"Speech service error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -255,6 +263,9 @@ async def openai_compatible_transcription(
         else:  # json (default)
             return {"text": result["text"]}
 
+    except SpeechQueueFullError as e:
+        logger.warning(f"Speech queue full: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e))
     except SpeechServiceError as e:
         logger.error(f"Speech service error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
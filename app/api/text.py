@@ -3,12 +3,14 @@
 Llama 3.1 Swallow 8Bモデルを使用したテキスト分析機能
 """
 
+import asyncio
+import json
 import logging
 import tempfile
 import os
 from typing import Dict, Any, Optional, List
 from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 try:
     from services.swallow_text_service import (
@@ -16,12 +18,14 @@ try:
         SwallowTextService,
         TextAnalysisResult,
     )
+    from services.upload_spool import UploadTooLargeError, spool_upload
 except ImportError:
     from app.services.swallow_text_service import (
         get_swallow_service,
         SwallowTextService,
         TextAnalysisResult,
     )
+    from app.services.upload_spool import UploadTooLargeError, spool_upload
 
 logger = logging.getLogger(__name__)
 
@@ -287,42 +291,48 @@ async def upload_and_analyze_file(
             )
 
         # ファイルサイズの検証（200MBまで拡張）
-        file_content = await file.read()
-        file_size_mb = len(file_content) / (1024 * 1024)
+        # チャンク単位で受け取り、上限を超えた時点で打ち切る
+        upload = await _spool_or_413(file, MAX_FILE_SIZE_MB)
+        file_size_mb = upload.size_mb
 
-        if file_size_mb > MAX_FILE_SIZE_MB:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File size ({file_size_mb:.1f}MB) exceeds maximum of {MAX_FILE_SIZE_MB}MB",
+        try:
+            logger.info(
+                f"Processing large file: {file.filename} ({file_size_mb:.1f}MB)"
             )
 
-        logger.info(f"Processing large file: {file.filename} ({file_size_mb:.1f}MB)")
+            # ファイル内容の読み取り
+            if upload.size == 0:
+                raise HTTPException(status_code=400, detail="Uploaded file is empty")
 
-        # ファイル内容の読み取り
-        if len(file_content) == 0:
-            raise HTTPException(status_code=400, detail="Uploaded file is empty")
-
-        # 拡張されたドキュメントプロセッサを使用
-        try:
-            from services.document_processor import get_document_processor
-        except ImportError:
-            from app.services.document_processor import get_document_processor
-        document_processor = get_document_processor()
-
-        # インテリジェントチャンク処理を使用
-        if INTELLIGENT_CHUNKING and file_size_mb > 10:  # 10MB以上でチャンク処理
-            logger.info("Using intelligent chunking for large file")
-            processed_result = await document_processor.process_document_with_chunking(
-                file_content,
-                file.filename or "unknown",
-                content_type,
-                target_provider="groq",  # デフォルトプロバイダー
-            )
-        else:
-            # 通常処理
-            processed_result = await document_processor.process_document(
-                file_content, file.filename or "unknown", content_type
-            )
+            # 拡張されたドキュメントプロセッサを使用
+            try:
+                from services.document_processor import get_document_processor
+            except ImportError:
+                from app.services.document_processor import get_document_processor
+            document_processor = get_document_processor()
+
+            # インテリジェントチャンク処理を使用
+            if INTELLIGENT_CHUNKING and file_size_mb > 10:  # 10MB以上でチャンク処理
+                logger.info("Using intelligent chunking for large file")
+                processed_result = (
+                    await document_processor.process_document_with_chunking(
+                        upload,
+                        file.filename or "unknown",
+                        content_type,
+                        target_provider="groq",  # デフォルトプロバイダー
+                        max_text_chars=MAX_TEXT_LENGTH,
+                    )
+                )
+            else:
+                # 通常処理
+                processed_result = await document_processor.process_document(
+                    upload,
+                    file.filename or "unknown",
+                    content_type,
+                    max_text_chars=MAX_TEXT_LENGTH,
+                )
+        finally:
+            await asyncio.to_thread(upload.close)
 
         # テキスト長の検証（拡張）
         extracted_text = processed_result.get("text", "")
@@ -437,6 +447,70 @@ async def upload_and_analyze_file(
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
+async def _spool_or_413(file: UploadFile, max_size_mb: int):
+    """アップロードをチャンク単位で受け取る（上限超過は413）"""
+    try:
+        return await spool_upload(file, max_bytes=max_size_mb * 1024 * 1024)
+    except UploadTooLargeError:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File size exceeds maximum of {max_size_mb}MB",
+        )
+
+
+@router.post("/text/upload/extract/stream")
+async def extract_file_with_progress(file: UploadFile = File(...)) -> StreamingResponse:
+    """
+    ファイルのテキスト抽出（進捗をNDJSONでストリーミング）
+
+    大きなPDFはページ範囲ごとにワーカープロセスで並列抽出され、
+    抽出済みページ数が逐次通知される。
+
+    Returns:
+        {"type": "progress", "stage": ..., ...} を0行以上、最後に
+        {"type": "result", ...} または {"type": "error", "detail": ...}
+    """
+    content_type = file.content_type
+    if content_type not in SUPPORTED_FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported file type: {content_type}",
+        )
+
+    upload = await _spool_or_413(file, MAX_FILE_SIZE_MB)
+    if upload.size == 0:
+        await asyncio.to_thread(upload.close)
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+    try:
+        from services.document_processor import get_document_processor
+    except ImportError:
+        from app.services.document_processor import get_document_processor
+    document_processor = get_document_processor()
+
+    async def lines():
+        events = document_processor.stream_process_document(
+            upload,
+            file.filename or "unknown",
+            content_type,
+            max_text_chars=MAX_TEXT_LENGTH,
+        )
+        try:
+            async for event in events:
+                if event["type"] == "result":
+                    text_length = len(event.get("text", ""))
+                    if text_length > MAX_TEXT_LENGTH:
+                        event["text"] = event["text"][:MAX_TEXT_LENGTH]
+                        event["truncated"] = True
+                        event["original_length"] = text_length
+                yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        finally:
+            await events.aclose()
+            await asyncio.to_thread(upload.close)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/text/batch/analyze")
 async def batch_analyze_files(
     files: List[UploadFile] = File(...),
@@ -463,23 +537,9 @@ async def batch_analyze_files(
                 detail=f"Too many files: {len(files)}. Maximum allowed: {MAX_BATCH_FILES}",
             )
 
-        # 総ファイルサイズの検証
-        total_size_mb = 0
-        file_info_list = []
-
-        for file in files:
-            content = await file.read()
-            size_mb = len(content) / (1024 * 1024)
-            total_size_mb += size_mb
-
-            file_info_list.append(
-                {
-                    "filename": file.filename,
-                    "size_mb": size_mb,
-                    "content": content,
-                    "content_type": file.content_type,
-                }
-            )
+        # 総ファイルサイズの検証（マルチパート解析時に記録されたサイズを使い、
+        # 内容はファイルごとに処理する直前にチャンク単位で読み込む）
+        total_size_mb = sum(file.size or 0 for file in files) / (1024 * 1024)
 
         if total_size_mb > MAX_TOTAL_SIZE_MB:
             raise HTTPException(
@@ -494,8 +554,19 @@ async def batch_analyze_files(
         # バッチ処理実行
         batch_results = []
         documents_for_training = []
+        remaining_bytes = MAX_TOTAL_SIZE_MB * 1024 * 1024
+
+        for i, file in enumerate(files):
+            try:
+                upload = await spool_upload(file, max_bytes=remaining_bytes)
+            except UploadTooLargeError:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Total size exceeds limit ({MAX_TOTAL_SIZE_MB}MB)",
+                )
+            remaining_bytes -= upload.size
+            size_mb = upload.size_mb
 
-        for i, file_info in enumerate(file_info_list):
             try:
                 # 個別ファイル処理
                 try:
@@ -504,27 +575,29 @@ async def batch_analyze_files(
                     from app.services.document_processor import get_document_processor
                 document_processor = get_document_processor()
 
-                if file_info["size_mb"] > 10:  # 大ファイルはチャンク処理
+                if size_mb > 10:  # 大ファイルはチャンク処理
                     processed_result = (
                         await document_processor.process_document_with_chunking(
-                            file_info["content"],
-                            file_info["filename"] or f"file_{i+1}",
-                            file_info["content_type"],
+                            upload,
+                            file.filename or f"file_{i+1}",
+                            file.content_type,
                             target_provider="groq",
+                            max_text_chars=MAX_TEXT_LENGTH,
                         )
                     )
                 else:
                     processed_result = await document_processor.process_document(
-                        file_info["content"],
-                        file_info["filename"] or f"file_{i+1}",
-                        file_info["content_type"],
+                        upload,
+                        file.filename or f"file_{i+1}",
+                        file.content_type,
+                        max_text_chars=MAX_TEXT_LENGTH,
                     )
 
                 # 分析結果を追加
                 file_result = {
                     "file_index": i + 1,
-                    "filename": file_info["filename"],
-                    "size_mb": file_info["size_mb"],
+                    "filename": file.filename,
+                    "size_mb": size_mb,
                     "processing_status": "success",
                     "document_analysis": processed_result,
                 }
@@ -536,23 +609,25 @@ async def batch_analyze_files(
                             "content": processed_result.get("text", ""),
                             "type": document_type,
                             "priority": 3,  # デフォルト優先度
-                            "filename": file_info["filename"],
+                            "filename": file.filename,
                         }
                     )
 
                 batch_results.append(file_result)
 
             except Exception as e:
-                logger.error(f"File {file_info['filename']} processing failed: {e}")
+                logger.error(f"File {file.filename} processing failed: {e}")
                 batch_results.append(
                     {
                         "file_index": i + 1,
-                        "filename": file_info["filename"],
-                        "size_mb": file_info["size_mb"],
+                        "filename": file.filename,
+                        "size_mb": size_mb,
                         "processing_status": "error",
                         "error": str(e),
                     }
                 )
+            finally:
+                await asyncio.to_thread(upload.close)
 
         # 高品質統合分析（有効な場合）
         integrated_analysis = None
@@ -13,11 +13,13 @@ import asyncio
 
 try:
     from services.usage_limit_service import get_usage_limit_service, UsageLimitService
+    from services.upload_spool import UploadTooLargeError, spool_upload
 except ImportError:
     from app.services.usage_limit_service import (
         get_usage_limit_service,
         UsageLimitService,
     )
+    from app.services.upload_spool import UploadTooLargeError, spool_upload
 
 logger = logging.getLogger(__name__)
 
@@ -131,78 +133,91 @@ async def upload_and_analyze_video(
                 status_code=415, detail=f"Unsupported video format: {file.content_type}"
             )
 
-        # Read file content
-        file_content = await file.read()
-        file_size_mb = len(file_content) / (1024 * 1024)
-
-        # Check file size
-        if file_size_mb > MAX_VIDEO_SIZE_MB:
+        # Read file content in chunks (spooled to a temp file, not held in memory)
+        # and check file size while reading
+        try:
+            upload = await spool_upload(file, max_bytes=MAX_VIDEO_SIZE_MB * 1024 * 1024)
+        except UploadTooLargeError:
             raise HTTPException(
                 status_code=413,
-                detail=f"File size ({file_size_mb:.1f}MB) exceeds maximum of {MAX_VIDEO_SIZE_MB}MB",
+                detail=f"File size exceeds maximum of {MAX_VIDEO_SIZE_MB}MB",
             )
-
-        # Estimate video duration (placeholder - would need actual video analysis)
-        # For now, we'll use a simple estimation based on file size
-        estimated_duration_minutes = max(1, int(file_size_mb / 10))  # Rough estimate
-
-        # Check if duration exceeds max allowed
-        if estimated_duration_minutes > MAX_VIDEO_DURATION_MINUTES:
-            raise HTTPException(
-                status_code=413,
-                detail=f"Estimated video duration ({estimated_duration_minutes}min) exceeds maximum of {MAX_VIDEO_DURATION_MINUTES}min",
+        file_size_mb = upload.size_mb
+
+        try:
+            # Estimate video duration (placeholder - would need actual video analysis)
+            # For now, we'll use a simple estimation based on file size
+            estimated_duration_minutes = max(
+                1, int(file_size_mb / 10)
+            )  # Rough estimate
+
+            # Check if duration exceeds max allowed
+            if estimated_duration_minutes > MAX_VIDEO_DURATION_MINUTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Estimated video duration ({estimated_duration_minutes}min) exceeds maximum of {MAX_VIDEO_DURATION_MINUTES}min",
+                )
+
+            # Check usage limits
+            can_process_result = await usage_service.can_process_video(
+                user_id, estimated_duration_minutes
+            )
+            if not can_process_result["can_process"]:
+                raise HTTPException(
+                    status_code=429, detail=can_process_result["message"]
+                )
+
+            # Consume usage quota
+            consumption_result = await usage_service.consume_video_processing(
+                user_id, estimated_duration_minutes
+            )
+            if not consumption_result["success"]:
+                raise HTTPException(
+                    status_code=429, detail=consumption_result["message"]
+                )
+
+            # Process video (placeholder implementation)
+            # In real implementation, this would:
+            # 1. Upload to Hetzner Cloud
+            # 2. Extract audio from video
+            # 3. Process with WhisperX
+            # 4. Return transcription and analysis
+
+            # 動画は一時ファイルに退避済みなのでパスで渡す
+            video_path = await asyncio.to_thread(upload.path)
+            processing_result = await _process_video_placeholder(
+                video_path,
+                file.filename or "video",
+                estimated_duration_minutes,
+                processing_quality,
             )
 
-        # Check usage limits
-        can_process_result = await usage_service.can_process_video(
-            user_id, estimated_duration_minutes
-        )
-        if not can_process_result["can_process"]:
-            raise HTTPException(status_code=429, detail=can_process_result["message"])
-
-        # Consume usage quota
-        consumption_result = await usage_service.consume_video_processing(
-            user_id, estimated_duration_minutes
-        )
-        if not consumption_result["success"]:
-            raise HTTPException(status_code=429, detail=consumption_result["message"])
-
-        # Process video (placeholder implementation)
-        # In real implementation, this would:
-        # 1. Upload to Hetzner Cloud
-        # 2. Extract audio from video
-        # 3. Process with WhisperX
-        # 4. Return transcription and analysis
-
-        processing_result = await _process_video_placeholder(
-            file_content,
-            file.filename or "video",
-            estimated_duration_minutes,
-            processing_quality,
-        )
-
-        return {
-            "success": True,
-            "video_info": {
-                "filename": file.filename,
-                "size_mb": file_size_mb,
-                "estimated_duration_minutes": estimated_duration_minutes,
-                "processing_quality": processing_quality,
-            },
-            "usage_info": {
-                "video_minutes_consumed": consumption_result["video_minutes_consumed"],
-                "roleplay_sessions_consumed": consumption_result[
-                    "roleplay_sessions_consumed"
-                ],
-                "remaining_video_minutes": consumption_result[
-                    "remaining_video_minutes"
-                ],
-                "remaining_roleplay_sessions": consumption_result[
-                    "remaining_roleplay_sessions"
-                ],
-            },
-            "processing_results": processing_result,
-        }
+            return {
+                "success": True,
+                "video_info": {
+                    "filename": file.filename,
+                    "size_mb": file_size_mb,
+                    "estimated_duration_minutes": estimated_duration_minutes,
+                    "processing_quality": processing_quality,
+                },
+                "usage_info": {
+                    "video_minutes_consumed": consumption_result[
+                        "video_minutes_consumed"
+                    ],
+                    "roleplay_sessions_consumed": consumption_result[
+                        "roleplay_sessions_consumed"
+                    ],
+                    "remaining_video_minutes": consumption_result[
+                        "remaining_video_minutes"
+                    ],
+                    "remaining_roleplay_sessions": consumption_result[
+                        "remaining_roleplay_sessions"
+                    ],
+                },
+                "processing_results": processing_result,
+            }
+        finally:
+            await asyncio.to_thread(upload.close)
 
     except HTTPException:
         raise
@@ -214,7 +229,7 @@ async def upload_and_analyze_video(
 
 
 async def _process_video_placeholder(
-    file_content: bytes, filename: str, duration_minutes: int, quality: str
+    video_path: str, filename: str, duration_minutes: int, quality: str
 ) -> Dict[str, Any]:
     """
     Placeholder for actual video processing
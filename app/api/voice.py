@@ -163,6 +163,56 @@ async def text_to_speech(request: Request, req: TextToSpeechRequest) -> Response
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 
+@router.post("/text-to-speech/stream")
+async def text_to_speech_stream(
+    request: Request, req: TextToSpeechRequest
+) -> StreamingResponse:
+    """テキストを文単位でパイプライン合成し、WAVストリームとして返す"""
+    try:
+        # 感情パラメータの設定
+        emotion_params = None
+        if req.emotion:
+            emotion_map = {
+                "happy": EmotionParams.happy(),
+                "sad": EmotionParams.sad(),
+                "angry": EmotionParams.angry(),
+                "surprised": EmotionParams.surprised(),
+            }
+            emotion_params = emotion_map.get(req.emotion.lower())
+
+        # Check if voice service is available
+        if (
+            not hasattr(request.app.state, "voice_service")
+            or request.app.state.voice_service is None
+        ):
+            raise HTTPException(
+                status_code=503,
+                detail="Voice service not available. Please check VOICEVOX server connection.",
+            )
+
+        # 話者の検証はストリーム開始前に行う（開始後はステータスを変更できない）
+        audio_stream = await request.app.state.voice_service.stream_voice(
+            text=req.text, speaker_id=req.speaker_id, emotion=emotion_params
+        )
+
+        return StreamingResponse(
+            audio_stream,
+            media_type="audio/wav",
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    except SpeakerNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except VoiceServiceError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except VoicevoxConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
 @router.post("/audio/speech")
 async def openai_compatible_tts(request: Request, req: OpenAITTSRequest) -> Response:
     """OpenAI互換のTTSエンドポイント"""
@@ -0,0 +1,260 @@
+"""
+Content-addressed TTS audio cache
+合成済み音声の2段キャッシュ（メモリLRU + ディスク）
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .voicevox import EmotionParams
+
+logger = logging.getLogger(__name__)
+
+# キャッシュキーの書式を変更した場合はインクリメントする
+CACHE_KEY_VERSION = 2
+
+
+@dataclass
+class AudioCacheStats:
+    """音声キャッシュの統計情報"""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    bytes_saved: int = 0
+    memory_evictions: int = 0
+    disk_evictions: int = 0
+
+
+class AudioCache:
+    """(正規化テキスト, 話者ID, 感情パラメータ, 疑問文の抑揚) をキーとする音声キャッシュ
+
+    1段目はバイト上限付きのメモリLRU、2段目は cache_dir 配下のファイルで、
+    ディスク側は合計サイズの上限を超えると最も古く使われたものから削除する。
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        memory_budget_bytes: int = 32 * 1024 * 1024,
+        disk_budget_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_budget_bytes = disk_budget_bytes
+        self.stats = AudioCacheStats()
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        if self.disk_budget_bytes > 0:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._scan_disk()
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """キャッシュキー用にテキストを正規化（NFKC・空白の統一）"""
+        text = unicodedata.normalize("NFKC", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    @classmethod
+    def make_key(
+        cls,
+        text: str,
+        speaker_id: int,
+        emotion: Optional[EmotionParams] = None,
+        upspeak: bool = False,
+    ) -> str:
+        """キャッシュキー（SHA-256）を生成
+
+        upspeak は疑問文の語尾を上げて合成したかどうか（同じ文でも音声が異なる）。
+        """
+        payload = json.dumps(
+            [
+                CACHE_KEY_VERSION,
+                cls.normalize_text(text),
+                speaker_id,
+                asdict(emotion) if emotion is not None else None,
+                bool(upspeak),
+            ],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.wav"
+
+    def _scan_disk(self) -> None:
+        """既存のディスクキャッシュを最終アクセス順に読み込む"""
+        entries = []
+        for path in self.cache_dir.glob("*/*.wav"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+        logger.info(
+            f"TTS audio cache loaded {len(self._disk)} entries "
+            f"({self._disk_bytes} bytes) from {self.cache_dir}"
+        )
+
+    def _remember(self, key: str, data: bytes) -> None:
+        """メモリLRUに格納し、バイト上限を超えた分を追い出す"""
+        if len(data) > self.memory_budget_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_budget_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats.memory_evictions += 1
+
+    def _evict_disk(self) -> None:
+        while self._disk_bytes > self.disk_budget_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self.stats.disk_evictions += 1
+            try:
+                self._path_for(key).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to evict cached audio {key}: {e}")
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._path_for(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.parent / f"{key}.{os.getpid()}.tmp"
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """キャッシュから音声を取得（メモリ → ディスクの順）"""
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.stats.memory_hits += 1
+            self.stats.bytes_saved += len(data)
+            return data
+
+        if key in self._disk:
+            data = await asyncio.to_thread(self._read_disk, key)
+            if data is not None:
+                self._disk.move_to_end(key)
+                self._remember(key, data)
+                self.stats.disk_hits += 1
+                self.stats.bytes_saved += len(data)
+                return data
+            # ファイルが外部から削除された
+            self._disk_bytes -= self._disk.pop(key, 0)
+
+        self.stats.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes) -> None:
+        """音声をメモリとディスクの両方に格納"""
+        if not data:
+            return
+        self._remember(key, data)
+        self.stats.stores += 1
+
+        if self.disk_budget_bytes <= 0 or len(data) > self.disk_budget_bytes:
+            return
+        try:
+            await asyncio.to_thread(self._write_disk, key, data)
+        except OSError as e:
+            logger.warning(f"Failed to write cached audio {key}: {e}")
+            return
+        self._disk_bytes -= self._disk.pop(key, 0)
+        self._disk[key] = len(data)
+        self._disk_bytes += len(data)
+        self._evict_disk()
+
+    async def get_or_render(
+        self,
+        text: str,
+        speaker_id: int,
+        emotion: Optional[EmotionParams],
+        render: Callable[[], Awaitable[bytes]],
+        upspeak: bool = False,
+    ) -> bytes:
+        """キャッシュにあれば返し、なければ render() で合成して格納する
+
+        同一キーの合成が進行中の場合は、その結果を待って共有する。
+        呼び出し元がキャンセルされても共有中の合成は中断しない。
+        upspeak は render() が疑問文の抑揚を付けて合成するかどうか。
+        """
+        key = self.make_key(text, speaker_id, emotion, upspeak)
+        data = await self.get(key)
+        if data is not None:
+            return data
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            # 合成は独立したタスクで行う。呼び出し元（切断されたストリームなど）が
+            # キャンセルされても合成は続き、相乗りした待機者には結果が渡る
+            inflight = asyncio.get_running_loop().create_task(
+                self._render_and_put(key, render)
+            )
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda task: self._render_done(key, task))
+        return await asyncio.shield(inflight)
+
+    async def _render_and_put(
+        self, key: str, render: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        data = await render()
+        await self.put(key, data)
+        return data
+
+    def _render_done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 待機者がいない場合の "exception was never retrieved" を防ぐ
+        if not task.cancelled():
+            task.exception()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """ヒット率・削減バイト数などのメトリクスを返す"""
+        hits = self.stats.memory_hits + self.stats.disk_hits
+        lookups = hits + self.stats.misses
+        return {
+            **asdict(self.stats),
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "disk_budget_bytes": self.disk_budget_bytes,
+        }
@@ -0,0 +1,664 @@
+"""
+TTL + LRU cache
+エントリごとの TTL・件数上限・バイト上限を持つ汎用キャッシュ（任意で共有ディスク層）
+
+- get / set / delete は O(1)（OrderedDict による LRU）
+- 期限切れは参照時に加え、期限を1秒単位のバケットにまとめたタイミングホイールから
+  掃除する。掃除のコストは期限切れ1件あたり O(1) で、全件の走査やソートはしない
+- 値のサイズ（バイト）を見積もって合計を上限内に保つ（超えたら LRU 順に追い出す）
+- get_or_load(): 同じキーの読み込みが並行した場合は1回だけ実行して結果を共有する
+  （single-flight）
+- DiskCacheTier（SQLite, WAL）を渡すと、プロセス間で共有する2段目として使う。
+  ディスクに保存するのは bytes と、JSON で往復しても型が変わらない値のみ
+  （pickle は使わない。tuple や str 以外のキーを持つ dict はメモリにだけ置く）
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 期限切れを掃除する単位（秒）
+EXPIRY_RESOLUTION = 1.0
+
+_MISSING = object()
+
+
+_FLAT_TYPES = frozenset((str, int, float, bool, type(None)))
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """値のおおよそのメモリサイズ（bytes 系は長さ、コンテナは中身も含めて数える）"""
+    cls = type(value)
+    if cls is bytes or cls is bytearray:
+        return len(value)
+    size = sys.getsizeof(value)
+    if cls in _FLAT_TYPES or _depth >= 8:
+        return size
+    if isinstance(value, memoryview):
+        return value.nbytes
+    if isinstance(value, dict):
+        size += sum(
+            estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+            for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+@dataclass
+class CacheStats:
+    """キャッシュの統計情報（このプロセス分）"""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    # 1件でバイト上限を超えるため保存しなかった件数
+    oversized: int = 0
+    disk_hits: int = 0
+    disk_errors: int = 0
+    loads: int = 0
+    load_errors: int = 0
+    # 進行中の読み込みに相乗りした件数（single-flight）
+    coalesced: int = 0
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Any, size: int, expires_at: Optional[float]):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def _json_stable(value: Any) -> bool:
+    """JSON で往復しても同じ型・同じ値に戻るか（tuple→list、int キー→str などを除く）"""
+    if type(value) in _JSON_SCALARS:
+        return True
+    if type(value) is list:
+        return all(_json_stable(item) for item in value)
+    if type(value) is dict:
+        return all(
+            type(key) is str and _json_stable(item) for key, item in value.items()
+        )
+    return False
+
+
+class DiskCacheTier:
+    """TTLCache の共有ディスク層（SQLite, WAL）
+
+    namespace ごとに同じファイルを複数のキャッシュ・プロセスで共有できる。
+    max_bytes はファイル全体（全 namespace の合計）の上限。合計サイズは
+    書き込みのたびに見積もりで判定し、上限を超えたときだけ実際の合計を数えて
+    最終アクセスの古い順に削除する。キャッシュの障害で呼び出し元が
+    失敗しないよう、読み書きの例外はログに残して無視する。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS ttl_cache (
+            namespace TEXT NOT NULL,
+            cache_key TEXT NOT NULL,
+            payload BLOB NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            expires_at REAL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (namespace, cache_key)
+        );
+        CREATE INDEX IF NOT EXISTS ttl_cache_lru ON ttl_cache (last_access);
+        CREATE INDEX IF NOT EXISTS ttl_cache_expiry ON ttl_cache (expires_at);
+    """
+
+    # 他プロセスの書き込みを反映するため、この回数ごとに実際の合計を数え直す
+    RESYNC_WRITES = 100
+
+    def __init__(
+        self,
+        path: Path,
+        namespace: str = "default",
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.path = Path(path)
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        # 1件で上限の1/4を超えるものは保存しない（他のエントリを追い出し尽くすため）
+        self.max_entry_bytes = max_bytes // 4
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self.SCHEMA)
+        self._writes = 0
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM ttl_cache WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),),
+            )
+            self._estimated_bytes = self._total_bytes()
+
+    @staticmethod
+    def encode(value: Any) -> Optional[bytes]:
+        """保存形式（先頭1バイトが種別）。読み戻すと型が変わる値は None"""
+        if type(value) is bytes:
+            return b"b" + value
+        if not _json_stable(value):
+            return None
+        return b"j" + json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+    @staticmethod
+    def decode(payload: bytes) -> Any:
+        if payload[:1] == b"b":
+            return payload[1:]
+        return json.loads(payload[1:].decode("utf-8"))
+
+    def _total_bytes(self) -> int:
+        """ロック内で呼ぶ"""
+        return self._conn.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM ttl_cache"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Tuple[Any, Optional[float]]:
+        """(値, 期限) を返す（なければ (_MISSING, None)。ブロッキング）"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM ttl_cache "
+                "WHERE namespace = ? AND cache_key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return _MISSING, None
+            if row[1] is not None and row[1] <= now:
+                self._conn.execute(
+                    "DELETE FROM ttl_cache WHERE namespace = ? AND cache_key = ?",
+                    (self.namespace, key),
+                )
+                return _MISSING, None
+            self._conn.execute(
+                "UPDATE ttl_cache SET last_access = ? "
+                "WHERE namespace = ? AND cache_key = ?",
+                (now, self.namespace, key),
+            )
+        return self.decode(row[0]), row[1]
+
+    def put(self, key: str, value: Any, expires_at: Optional[float]) -> bool:
+        """保存し、上限を超えていれば古い順に削除する（ブロッキング）"""
+        payload = self.encode(value)
+        if payload is None or len(payload) > self.max_entry_bytes:
+            return False
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ttl_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.namespace,
+                    key,
+                    payload,
+                    len(payload),
+                    expires_at,
+                    time.time(),
+                ),
+            )
+            self._estimated_bytes += len(payload)
+            self._writes += 1
+            if (
+                self._estimated_bytes > self.max_bytes
+                or self._writes % self.RESYNC_WRITES == 0
+            ):
+                self._evict()
+        return True
+
+    def _evict(self) -> int:
+        """ロック内で呼ぶ。期限切れと上限超過分を削除する"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = self._conn.execute(
+                "DELETE FROM ttl_cache WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),),
+            ).rowcount
+            total = self._total_bytes()
+            victims = []
+            if total > self.max_bytes:
+                for namespace, key, size in self._conn.execute(
+                    "SELECT namespace, cache_key, size_bytes FROM ttl_cache "
+                    "ORDER BY last_access"
+                ):
+                    if total <= self.max_bytes:
+                        break
+                    victims.append((namespace, key))
+                    total -= size
+                self._conn.executemany(
+                    "DELETE FROM ttl_cache WHERE namespace = ? AND cache_key = ?",
+                    victims,
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._estimated_bytes = total
+        return deleted + len(victims)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM ttl_cache WHERE namespace = ? AND cache_key = ?",
+                (self.namespace, key),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM ttl_cache WHERE namespace = ?", (self.namespace,)
+            )
+            self._estimated_bytes = self._total_bytes()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM ttl_cache "
+                "WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+        return {
+            "path": str(self.path),
+            "namespace": self.namespace,
+            "entries": entries,
+            "size_bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TTLCache:
+    """エントリごとの TTL を持つ LRU キャッシュ（スレッドセーフ）
+
+    Args:
+        max_entries: 保持する最大件数
+        max_bytes: 値の見積もりサイズの合計上限
+        default_ttl: ttl 未指定時の有効期間（秒）。None は無期限
+        sizeof: 値のサイズを返す関数（既定は estimate_size）
+        disk: 2段目のディスク層（文字列キーのみ保存する）
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        default_ttl: Optional[float] = 3600.0,
+        sizeof: Callable[[Any], int] = estimate_size,
+        disk: Optional[DiskCacheTier] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sizeof = sizeof
+        self.disk = disk
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        # 期限のバケット番号 -> キー（バケットが丸ごと過去になったら掃除する）
+        self._expiry_buckets: Dict[int, set] = {}
+        self._swept_bucket = int(time.time() // EXPIRY_RESOLUTION)
+        # この時刻を過ぎたら次のバケットが丸ごと過去になる（読み書きの度の判定用）
+        self._next_sweep = (self._swept_bucket + 1) * EXPIRY_RESOLUTION
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults) -> "TTLCache":
+        """
+        環境変数（{prefix}_MAX_ENTRIES / _MAX_MB / _TTL_SECONDS / _DISK_PATH /
+        _DISK_MAX_MB）から作成。_DISK_PATH が空ならディスク層なし
+        """
+
+        def setting(name: str, default: Any) -> Any:
+            return os.getenv(f"{prefix}_{name}", defaults.get(name.lower(), default))
+
+        ttl = setting("TTL_SECONDS", 3600)
+        disk_path = setting("DISK_PATH", "")
+        disk = None
+        if disk_path:
+            disk = DiskCacheTier(
+                Path(disk_path),
+                namespace=prefix.lower(),
+                max_bytes=int(setting("DISK_MAX_MB", 256)) * 1024 * 1024,
+            )
+        return cls(
+            max_entries=int(setting("MAX_ENTRIES", 1024)),
+            max_bytes=int(setting("MAX_MB", 64)) * 1024 * 1024,
+            default_ttl=float(ttl) if ttl not in ("", None) else None,
+            disk=disk,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """メモリ層に有効なエントリがあるか（統計・LRU 順は変えない）"""
+        entry = self._entries.get(key)
+        return entry is not None and (
+            entry.expires_at is None or entry.expires_at > time.time()
+        )
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    # ------------------------------------------------------------------
+    # 読み書き
+    # ------------------------------------------------------------------
+
+    def get(self, key: Hashable, default: Any = None, use_disk: bool = True) -> Any:
+        """値を返す（期限切れ・未登録なら default）。ディスク層の参照はブロッキング"""
+        value = self._get_memory(key)
+        if value is _MISSING and use_disk and self._disk_key(key):
+            value = self._disk_get(key)
+        if value is _MISSING:
+            self.stats.misses += 1
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = _MISSING) -> bool:
+        """
+        値を格納する（ttl 省略時は default_ttl、None は無期限）
+
+        1件でバイト上限を超える値は保存せず False を返す。
+        ディスク層には bytes と JSON で型が変わらない値（str / int / float / bool /
+        None と、それらの list・str キーの dict）だけを書く。それ以外（tuple、
+        str 以外のキーの dict、bytearray など）はこのプロセスのメモリにだけ置く。
+        """
+        expires_at = self._expires_at(ttl)
+        if not self._store(key, value, expires_at):
+            # 古い値がディスク層から読まれないようにする
+            if self._disk_key(key):
+                self.delete(key)
+            return False
+        if self._disk_key(key):
+            self._disk_put(key, value, expires_at)
+        return True
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            found = self._remove(key)
+        if self._disk_key(key):
+            try:
+                self.disk.delete(key)
+            except sqlite3.Error as e:
+                self._disk_failed("delete", e)
+        return found
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._expiry_buckets.clear()
+            self._bytes = 0
+        if self.disk is not None:
+            try:
+                self.disk.clear()
+            except sqlite3.Error as e:
+                self._disk_failed("clear", e)
+
+    def purge_expired(self) -> int:
+        """期限切れを掃除して件数を返す（通常は読み書きのたびに自動で行われる）"""
+        with self._lock:
+            before = self.stats.expirations
+            self._sweep(time.time())
+            return self.stats.expirations - before
+
+    def trim(self, max_entries: int) -> int:
+        """件数が max_entries 以下になるまで LRU 順に追い出し、追い出した件数を返す"""
+        with self._lock:
+            removed = 0
+            while len(self._entries) > max(0, max_entries):
+                self._evict_oldest()
+                removed += 1
+            return removed
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = _MISSING,
+    ) -> Any:
+        """
+        キャッシュにあれば返し、なければ loader() の結果を格納して返す
+
+        同じキーの読み込みが進行中の場合は、その結果を待って共有する。
+        呼び出し元がキャンセルされても共有中の読み込みは中断しない。
+        ディスク層の読み書きはスレッドで行い、イベントループを止めない。
+        """
+        value = self._get_memory(key)
+        if value is not _MISSING:
+            return value
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight.get_loop() is loop:
+            self.stats.coalesced += 1
+        else:
+            # 読み込みは独立したタスクで行う。呼び出し元がキャンセルされても
+            # 読み込みは続き、相乗りした待機者には結果が渡る
+            inflight = loop.create_task(self._load(key, loader, ttl))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda task: self._load_done(key, task))
+        return await asyncio.shield(inflight)
+
+    async def _load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float],
+    ) -> Any:
+        value = _MISSING
+        if self._disk_key(key):
+            value = await asyncio.to_thread(self._disk_get, key)
+        if value is _MISSING:
+            self.stats.misses += 1
+            self.stats.loads += 1
+            try:
+                value = await loader()
+            except Exception:
+                self.stats.load_errors += 1
+                raise
+            expires_at = self._expires_at(ttl)
+            if self._store(key, value, expires_at) and self._disk_key(key):
+                await asyncio.to_thread(self._disk_put, key, value, expires_at)
+        return value
+
+    def _load_done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 待機者がいない場合の "exception was never retrieved" を防ぐ
+        if not task.cancelled():
+            task.exception()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """ヒット率・使用量などのメトリクスを返す"""
+        hits = self.stats.hits + self.stats.disk_hits
+        lookups = hits + self.stats.misses
+        metrics = {
+            **asdict(self.stats),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "size_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "default_ttl": self.default_ttl,
+            "inflight": len(self._inflight),
+        }
+        if self.disk is not None:
+            try:
+                metrics["disk"] = self.disk.get_metrics()
+            except sqlite3.Error as e:
+                self._disk_failed("metrics", e)
+        return metrics
+
+    # ------------------------------------------------------------------
+    # 内部処理
+    # ------------------------------------------------------------------
+
+    def _get_memory(self, key: Hashable) -> Any:
+        """メモリ層の値（なければ _MISSING。ミスは数えない）"""
+        now = time.time()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            if entry.expires_at is not None and entry.expires_at <= now:
+                self._remove(key)
+                self.stats.expirations += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry.value
+
+    def _expires_at(self, ttl: Optional[float]) -> Optional[float]:
+        if ttl is _MISSING:
+            ttl = self.default_ttl
+        return time.time() + ttl if ttl is not None else None
+
+    def _store(self, key: Hashable, value: Any, expires_at: Optional[float]) -> bool:
+        size = self.sizeof(value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            self.stats.oversized += 1
+            with self._lock:
+                self._remove(key)
+            return False
+        with self._lock:
+            now = time.time()
+            if now >= self._next_sweep:
+                self._sweep(now)
+            if key in self._entries:
+                self._remove(key)
+            if expires_at is not None and expires_at <= now:
+                return True
+            self._entries[key] = _Entry(value, size, expires_at)
+            self._bytes += size
+            if expires_at is not None:
+                bucket = int(expires_at // EXPIRY_RESOLUTION)
+                keys = self._expiry_buckets.get(bucket)
+                if keys is None:
+                    self._expiry_buckets[bucket] = {key}
+                else:
+                    keys.add(key)
+            self.stats.stores += 1
+            while (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._evict_oldest()
+        return True
+
+    def _remove(self, key: Hashable) -> bool:
+        """ロック内で呼ぶ"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        if entry.expires_at is not None:
+            bucket = int(entry.expires_at // EXPIRY_RESOLUTION)
+            keys = self._expiry_buckets.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._expiry_buckets[bucket]
+        return True
+
+    def _evict_oldest(self) -> None:
+        """ロック内で呼ぶ"""
+        key = next(iter(self._entries))
+        self._remove(key)
+        self.stats.evictions += 1
+
+    def _sweep(self, now: float) -> None:
+        """ロック内で呼ぶ。丸ごと過去になったバケットのエントリを削除する"""
+        current = int(now // EXPIRY_RESOLUTION)
+        if current <= self._swept_bucket:
+            return
+        if current - self._swept_bucket > len(self._expiry_buckets):
+            # 長く空いた場合は空のバケットを順にたどらず、存在するものだけ見る
+            due = [b for b in self._expiry_buckets if b < current]
+        else:
+            due = range(self._swept_bucket, current)
+        for bucket in due:
+            keys = self._expiry_buckets.pop(bucket, None)
+            if not keys:
+                continue
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry.size
+                    self.stats.expirations += 1
+        self._swept_bucket = current
+        self._next_sweep = (current + 1) * EXPIRY_RESOLUTION
+
+    def _disk_key(self, key: Hashable) -> bool:
+        return self.disk is not None and isinstance(key, str)
+
+    def _disk_get(self, key: str) -> Any:
+        try:
+            value, expires_at = self.disk.get(key)
+        except (sqlite3.Error, ValueError) as e:
+            self._disk_failed("read", e)
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+        self.stats.disk_hits += 1
+        # メモリ層に戻す（ディスク層への書き戻しはしない）
+        self._store(key, value, expires_at)
+        return value
+
+    def _disk_put(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        try:
+            if not self.disk.put(key, value, expires_at):
+                # ディスクに置けない値。古い値が他のプロセスから読まれないようにする
+                self.disk.delete(key)
+        except sqlite3.Error as e:
+            self._disk_failed("write", e)
+
+    def _disk_failed(self, operation: str, error: Exception) -> None:
+        logger.warning(f"TTL cache disk {operation} failed: {error}")
+        self.stats.disk_errors += 1
+
+
+_caches: Dict[str, TTLCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(prefix: str, **defaults) -> TTLCache:
+    """
+    プロセス共通の名前付きキャッシュ（初回のみ TTLCache.from_env(prefix) で作成）
+
+        llm_cache = get_cache("LLM_CACHE", ttl_seconds=600)
+    """
+    cache = _caches.get(prefix)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(prefix)
+            if cache is None:
+                cache = TTLCache.from_env(prefix, **defaults)
+                _caches[prefix] = cache
+    return cache
@@ -1,10 +1,23 @@
-from typing import Optional, Dict, Any, List, cast
+from typing import (
+    Optional,
+    Dict,
+    Any,
+    List,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Tuple,
+    cast,
+)
 import aiohttp
 import asyncio
+import struct
+from collections import deque
 from pathlib import Path
 import logging
-from .speakers import get_voicevox_params, get_all_speakers
+from .speakers import get_voicevox_params, get_all_speakers, VOICEVOX_SPEAKER_MAPPING
 import re
+import time
 import weakref
 from dataclasses import dataclass
 
@@ -63,6 +76,196 @@ class VoicevoxConnectionError(Exception):
     pass
 
 
+# ストリーミング時はデータ長が未確定のため最大値を入れる
+WAV_STREAMING_SIZE = 0xFFFFFFFF
+
+
+def split_wav(wav_data: bytes) -> Tuple[bytes, bytes]:
+    """WAVデータを fmt チャンク本体とPCMデータに分割する"""
+    if wav_data[:4] != b"RIFF" or wav_data[8:12] != b"WAVE":
+        raise VoicevoxConnectionError("Invalid WAV data from VOICEVOX")
+
+    fmt_chunk = None
+    offset = 12
+    while offset + 8 <= len(wav_data):
+        chunk_id = wav_data[offset : offset + 4]
+        (chunk_size,) = struct.unpack("<I", wav_data[offset + 4 : offset + 8])
+        body_start = offset + 8
+        if chunk_id == b"fmt ":
+            fmt_chunk = wav_data[body_start : body_start + chunk_size]
+        elif chunk_id == b"data":
+            if fmt_chunk is None:
+                break
+            return fmt_chunk, wav_data[body_start : body_start + chunk_size]
+        # チャンクは2バイト境界に揃えられる
+        offset = body_start + chunk_size + (chunk_size & 1)
+
+    raise VoicevoxConnectionError("WAV data has no fmt/data chunk")
+
+
+def build_wav_header(fmt_chunk: bytes, data_size: int = WAV_STREAMING_SIZE) -> bytes:
+    """fmt チャンクとPCMデータ長からWAVヘッダーを組み立てる"""
+    if data_size == WAV_STREAMING_SIZE:
+        riff_size = WAV_STREAMING_SIZE
+    else:
+        riff_size = 4 + (8 + len(fmt_chunk)) + (8 + data_size)
+    return (
+        b"RIFF"
+        + struct.pack("<I", riff_size)
+        + b"WAVE"
+        + b"fmt "
+        + struct.pack("<I", len(fmt_chunk))
+        + fmt_chunk
+        + b"data"
+        + struct.pack("<I", data_size)
+    )
+
+
+@dataclass
+class SpeakerRegistryStats:
+    """話者レジストリの統計情報"""
+
+    hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    refresh_failures: int = 0
+    last_refresh_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+class SpeakerRegistry:
+    """VOICEVOX話者のキャッシュ付きレジストリ
+
+    起動時に一度だけ /speakers を取得し、話者ID（VOICEVOXのスタイルIDと
+    ビジネス話者ID）から合成用スタイルIDへのO(1)インデックスを保持する。
+    以降はバックグラウンドでTTLごとに再取得し、ホットパスではHTTP通信を行わない。
+    """
+
+    def __init__(
+        self,
+        client: "VoicevoxClient",
+        mapping: Optional[Dict[int, Dict[str, int]]] = None,
+        ttl_seconds: float = 300.0,
+    ):
+        self.client = client
+        self.mapping = VOICEVOX_SPEAKER_MAPPING if mapping is None else mapping
+        self.ttl_seconds = ttl_seconds
+        self.stats = SpeakerRegistryStats()
+        self._speakers: Dict[int, Speaker] = {}
+        self._index: Dict[int, int] = {}
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.stats.last_refresh_at is not None
+
+    def age_seconds(self) -> Optional[float]:
+        """最終更新からの経過秒数"""
+        if self.stats.last_refresh_at is None:
+            return None
+        return time.monotonic() - self.stats.last_refresh_at
+
+    def is_stale(self) -> bool:
+        age = self.age_seconds()
+        return age is None or age > self.ttl_seconds
+
+    def _build_index(self, speakers: List[Speaker]) -> Dict[int, int]:
+        """話者IDから合成用スタイルIDへのインデックスを構築"""
+        index = {speaker.id: speaker.id for speaker in speakers}
+        # ビジネス話者IDはVOICEVOXのIDより優先する
+        for business_id, voicevox_params in self.mapping.items():
+            voicevox_id = voicevox_params["speaker"]
+            if voicevox_id in index:
+                index[business_id] = voicevox_id
+        return index
+
+    async def load(self) -> bool:
+        """VOICEVOXから話者一覧を取得してインデックスを差し替える"""
+        async with self._lock:
+            try:
+                speakers = await self.client.get_speakers()
+            except Exception as e:
+                self.stats.refresh_failures += 1
+                self.stats.last_error = str(e)
+                logger.warning(f"Speaker registry refresh failed: {e}")
+                return False
+
+            self._speakers = {speaker.id: speaker for speaker in speakers}
+            self._index = self._build_index(speakers)
+            self.stats.refreshes += 1
+            self.stats.last_refresh_at = time.monotonic()
+            self.stats.last_error = None
+            logger.info(f"Speaker registry loaded: {len(self._speakers)} styles")
+            return True
+
+    async def ensure_loaded(self) -> bool:
+        """未ロードの場合のみ取得を試みる"""
+        if self.is_loaded:
+            return True
+        return await self.load()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl_seconds)
+            await self.load()
+
+    async def start(self) -> None:
+        """初回ロードとバックグラウンド更新を開始"""
+        await self.load()
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """バックグラウンド更新を停止"""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        self._refresh_task = None
+
+    def resolve(self, speaker_id: int) -> Optional[int]:
+        """話者IDを合成用スタイルIDに解決する（見つからない場合はNone）"""
+        voicevox_id = self._index.get(speaker_id)
+        if voicevox_id is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return voicevox_id
+
+    def as_speaker_dict(self) -> Dict[str, Dict[str, Any]]:
+        """VoiceService.get_speakers() 形式の辞書を返す"""
+        speaker_dict = {}
+        for speaker_id, voicevox_id in self._index.items():
+            speaker = self._speakers[voicevox_id]
+            speaker_dict[str(speaker_id)] = {
+                "id": speaker_id,
+                "name": speaker.name,
+                "description": f"VOICEVOX Speaker {voicevox_id}",
+            }
+        return speaker_dict
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """ヒット率と鮮度のメトリクスを返す"""
+        lookups = self.stats.hits + self.stats.misses
+        age = self.age_seconds()
+        return {
+            "loaded": self.is_loaded,
+            "speaker_count": len(self._index),
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "hit_rate": self.stats.hits / lookups if lookups else 0.0,
+            "refreshes": self.stats.refreshes,
+            "refresh_failures": self.stats.refresh_failures,
+            "age_seconds": round(age, 3) if age is not None else None,
+            "ttl_seconds": self.ttl_seconds,
+            "stale": self.is_stale(),
+            "last_error": self.stats.last_error,
+        }
+
+
 class VoicevoxClient:
     _instances = weakref.WeakValueDictionary()
 
@@ -125,7 +328,9 @@ class VoicevoxClient:
                             name=f"{speaker_data['name']} ({style['name']})",
                         )
                         speakers.append(speaker)
-                        logger.info(f"Found speaker: {speaker.name} (ID: {speaker.id})")
+                        logger.debug(
+                            f"Found speaker: {speaker.name} (ID: {speaker.id})"
+                        )
                 return speakers
         except Exception as e:
             logger.error(f"Error getting speakers: {e}")
@@ -200,6 +405,97 @@ class VoicevoxClient:
         sentences = re.split(r"([。、．，!?！？]。)", text)
         return [s for s in sentences if s.strip()]
 
+    def _split_sentences(self, text: str) -> List[str]:
+        """ストリーミング用に文単位へ分割（句読点のみの断片は直前の文に結合）"""
+        sentences: List[str] = []
+        for part in self._process_text_with_pauses(text):
+            if sentences and re.fullmatch(r"[。、．，!?！？]+", part.strip()):
+                sentences[-1] += part
+            else:
+                sentences.append(part)
+        return sentences
+
+    async def synthesize_part(
+        self,
+        text: str,
+        speaker_id: int,
+        emotion: Optional[EmotionParams] = None,
+        enable_interrogative_upspeak: bool = True,
+    ) -> bytes:
+        """テキスト断片1つを audio_query → synthesis で合成する"""
+        # 音声合成用のクエリを作成
+        audio_query = await self.create_audio_query(text, speaker_id)
+
+        # 感情パラメータを適用
+        audio_query = self._apply_emotion_params(audio_query, emotion)
+
+        # 疑問文の自動調整
+        if (
+            enable_interrogative_upspeak
+            and text.strip().rstrip("。").endswith(("?", "？"))
+            and audio_query.get("accent_phrases")
+        ):
+            audio_query["accent_phrases"][-1]["pitch"] = 1.5
+
+        # 音声を合成
+        return await self.synthesis(audio_query, speaker_id)
+
+    async def stream_text_to_speech(
+        self,
+        text: str,
+        speaker_id: int,
+        emotion: Optional[EmotionParams] = None,
+        enable_interrogative_upspeak: bool = True,
+        max_concurrency: int = 2,
+        render: Optional[Callable[[str], Awaitable[bytes]]] = None,
+    ) -> AsyncIterator[bytes]:
+        """文単位でパイプライン合成し、単一のWAVストリームとして順に返す
+
+        先頭でWAVヘッダーを1回だけ送り、以降は各文のPCMデータのみを送る。
+        文Nの送出中に最大 max_concurrency 文先までの合成を並行して進めるため、
+        最初の音声が届くまでの時間は最初の文の合成時間だけで決まる。
+
+        Args:
+            render: 文を合成する関数（キャッシュ経由にする場合に指定）
+        """
+        if render is None:
+
+            async def render(part: str) -> bytes:
+                return await self.synthesize_part(
+                    part, speaker_id, emotion, enable_interrogative_upspeak
+                )
+
+        sentences = iter(self._split_sentences(text))
+        pending: deque = deque()
+
+        def schedule_next() -> None:
+            part = next(sentences, None)
+            if part is not None:
+                pending.append(asyncio.create_task(render(part)))
+
+        try:
+            for _ in range(max(1, max_concurrency)):
+                schedule_next()
+
+            fmt_chunk = None
+            while pending:
+                wav_data = await pending.popleft()
+                schedule_next()
+
+                part_fmt, pcm = split_wav(wav_data)
+                if fmt_chunk is None:
+                    fmt_chunk = part_fmt
+                    yield build_wav_header(fmt_chunk)
+                elif part_fmt != fmt_chunk:
+                    raise VoicevoxConnectionError(
+                        "Inconsistent WAV format between parts"
+                    )
+                yield pcm
+        finally:
+            # クライアント切断やエラー時は先行合成をキャンセル
+            for task in pending:
+                task.cancel()
+
     async def text_to_speech(
         self,
         text: str,
@@ -212,22 +508,16 @@ class VoicevoxClient:
         try:
             # テキストをポーズ制御付きで処理
             text_parts = self._process_text_with_pauses(text)
-            all_wav_data = []
+            fmt_chunk = None
+            pcm_parts = []
 
             for part in text_parts:
-                # 音声合成用のクエリを作成
-                audio_query = await self.create_audio_query(part, speaker_id)
-
-                # 感情パラメータを適用
-                audio_query = self._apply_emotion_params(audio_query, emotion)
-
-                # 疑問文の自動調整
-                if enable_interrogative_upspeak and part.strip().endswith(("?", "？")):
-                    audio_query["accent_phrases"][-1]["pitch"] = 1.5
-
-                # 音声を合成
-                wav_data = await self.synthesis(audio_query, speaker_id)
-                all_wav_data.append(wav_data)
+                wav_data = await self.synthesize_part(
+                    part, speaker_id, emotion, enable_interrogative_upspeak
+                )
+                part_fmt, pcm = split_wav(wav_data)
+                fmt_chunk = fmt_chunk or part_fmt
+                pcm_parts.append(pcm)
 
             # 出力パスが指定されていない場合は一時ファイルを作成
             if output_path is None:
@@ -236,10 +526,13 @@ class VoicevoxClient:
             # 出力ディレクトリが存在しない場合は作成
             output_path.parent.mkdir(parents=True, exist_ok=True)
 
-            # 音声データをファイルに保存
+            # 各パートのPCMを連結し、ヘッダーは1つだけ書き込む
             with open(output_path, "wb") as f:
-                for wav_data in all_wav_data:
-                    f.write(wav_data)
+                if fmt_chunk is not None:
+                    data_size = sum(len(pcm) for pcm in pcm_parts)
+                    f.write(build_wav_header(fmt_chunk, data_size))
+                for pcm in pcm_parts:
+                    f.write(pcm)
 
             return output_path
 
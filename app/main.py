@@ -7,7 +7,7 @@ import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 import os
 from pathlib import Path
@@ -56,6 +56,14 @@ try:
 except ImportError:
     from app.config import config
 
+try:
+    from services.request_metrics import RequestTimingMiddleware, get_request_metrics
+except ImportError:
+    from app.services.request_metrics import (
+        RequestTimingMiddleware,
+        get_request_metrics,
+    )
+
 # Configure logging
 logging.basicConfig(
     level=getattr(logging, config.LOG_LEVEL),
@@ -78,7 +86,8 @@ async def lifespan(app: FastAPI):
         except ImportError:
             from app.services.voice_service import VoiceService
         voice_service = VoiceService()
-        # VoiceServiceは__init__で初期化されるため、awaitは不要
+        # 話者レジストリを起動時に一度だけ読み込み、以降はTTLで自動更新
+        await voice_service.start()
         app.state.voice_service = voice_service
         logger.info("🎤 Voice service initialized successfully")
     except Exception as e:
@@ -115,6 +124,69 @@ async def lifespan(app: FastAPI):
         await app.state.voice_service.cleanup()
         logger.info("🎤 Voice service cleaned up")
 
+    # Close pooled Groq connections
+    try:
+        try:
+            from services.groq_client import shutdown_groq_client_pool
+        except ImportError:
+            from app.services.groq_client import shutdown_groq_client_pool
+        await shutdown_groq_client_pool()
+        logger.info("🔌 Groq client pool closed")
+    except Exception as e:
+        logger.warning(f"⚠️  Could not close Groq client pool: {e}")
+
+    # Stop speech inference workers
+    try:
+        try:
+            from services.speech_service import shutdown_speech_service
+        except ImportError:
+            from app.services.speech_service import shutdown_speech_service
+        shutdown_speech_service()
+        logger.info("🗣️ Speech inference workers stopped")
+    except Exception as e:
+        logger.warning(f"⚠️  Could not stop speech inference workers: {e}")
+
+    # Close pooled SMTP connections
+    try:
+        try:
+            from services.email_service import shutdown_email_service
+        except ImportError:
+            from app.services.email_service import shutdown_email_service
+        shutdown_email_service()
+        logger.info("📧 SMTP connection pool closed")
+    except Exception as e:
+        logger.warning(f"⚠️  Could not close SMTP connection pool: {e}")
+
+    # Stop batch language analysis workers
+    try:
+        try:
+            from services.language_batch_service import (
+                shutdown_language_batch_analyzer,
+            )
+        except ImportError:
+            from app.services.language_batch_service import (
+                shutdown_language_batch_analyzer,
+            )
+        shutdown_language_batch_analyzer()
+        logger.info("📝 Language batch analysis workers stopped")
+    except Exception as e:
+        logger.warning(f"⚠️  Could not stop language batch workers: {e}")
+
+    # Stop document extraction workers
+    try:
+        try:
+            from services.document_extraction import (
+                shutdown_document_extraction_executor,
+            )
+        except ImportError:
+            from app.services.document_extraction import (
+                shutdown_document_extraction_executor,
+            )
+        shutdown_document_extraction_executor()
+        logger.info("📄 Document extraction workers stopped")
+    except Exception as e:
+        logger.warning(f"⚠️  Could not stop document extraction workers: {e}")
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -135,6 +207,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request timing (route template / pipeline stage latency histograms on /metrics)
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "true").lower() == "true"
+if REQUEST_METRICS_ENABLED:
+    app.add_middleware(RequestTimingMiddleware, metrics=get_request_metrics())
+
 # Include API routers
 app.include_router(health.router, prefix="/api")
 app.include_router(voice.router, prefix="/api")
@@ -167,6 +244,13 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics (request and pipeline stage latency)"""
+    body, content_type = get_request_metrics().render()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -122,16 +122,25 @@ class GroqAIService(BaseAIService):
         conversation_history: List[Dict[str, Any]],
         customer_profile: Dict[str, Any],
         sales_stage: str,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         if not self.api_key:
             raise AIServiceError("Groq API key not configured")
 
         try:
-            from services.groq_service import GroqService
+            from services.groq_service import get_groq_service
+            from services.response_cache import cache_scope_for
         except ImportError:
-            from app.services.groq_service import GroqService
-        groq_service = GroqService(self.api_key)
-        result = await groq_service.sales_analysis(user_input)
+            from app.services.groq_service import get_groq_service
+            from app.services.response_cache import cache_scope_for
+        # 共有インスタンスを使い、応答キャッシュを呼び出し間で再利用する
+        groq_service = get_groq_service()
+        # 応答キャッシュはテナント/ユーザー単位で分ける
+        result = await groq_service.sales_analysis(
+            user_input,
+            use_cache=use_cache,
+            cache_scope=cache_scope_for(customer_profile),
+        )
         result["provider"] = self.provider.value
         return result
 
@@ -636,6 +645,7 @@ class UnifiedAIService:
         customer_profile: Dict[str, Any],
         sales_stage: str,
         provider: Optional[AIProvider] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """Sales analysis with automatic fallback"""
 
@@ -643,9 +653,17 @@ class UnifiedAIService:
         target_provider = provider or self.primary_provider
 
         if target_provider and target_provider in self.providers:
+            # 応答キャッシュは Groq のみ対応
+            options = {}
+            if target_provider == AIProvider.GROQ:
+                options["use_cache"] = use_cache
             try:
                 result = await self.providers[target_provider].sales_analysis(
-                    user_input, conversation_history, customer_profile, sales_stage
+                    user_input,
+                    conversation_history,
+                    customer_profile,
+                    sales_stage,
+                    **options,
                 )
                 return result
             except Exception as e:
@@ -4,24 +4,30 @@ Voice Conversation Service with Privacy-Aware Context Understanding
 """
 
 import logging
+import os
 import time
 import asyncio
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
 try:
-    from services.groq_service import GroqService
+    from services.groq_service import get_groq_service
     from services.speech_service import get_speech_service
+    from services.speech_executor import SpeechQueueFullError
     from services.voice_service import VoiceService
     from services.conversation_history_service import get_conversation_history_service
     from services.privacy_aware_context_service import (
         get_privacy_aware_context_service,
         PrivacyMode,
     )
+    from services.request_metrics import observe_stage
+    from services.response_cache import cache_scope_for
     from core.speakers import FEMALE_SALES, MALE_SALES
+    from core.voicevox import build_wav_header, split_wav
 except ImportError:
-    from app.services.groq_service import GroqService
+    from app.services.groq_service import get_groq_service
     from app.services.speech_service import get_speech_service
+    from app.services.speech_executor import SpeechQueueFullError
     from app.services.voice_service import VoiceService
     from app.services.conversation_history_service import (
         get_conversation_history_service,
@@ -30,10 +36,22 @@ except ImportError:
         get_privacy_aware_context_service,
         PrivacyMode,
     )
+    from app.services.request_metrics import observe_stage
+    from app.services.response_cache import cache_scope_for
     from app.core.speakers import FEMALE_SALES, MALE_SALES
+    from app.core.voicevox import build_wav_header, split_wav
 
 logger = logging.getLogger(__name__)
 
+# 文脈分析を待つ上限。間に合わなければ文脈なしのプロンプトで LLM を呼ぶ
+CONTEXT_BUDGET_SECONDS = (
+    float(os.getenv("CONVERSATION_CONTEXT_BUDGET_MS", "150")) / 1000
+)
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
 
 class ConversationServiceError(Exception):
     """Conversation service error"""
@@ -46,7 +64,7 @@ class ConversationService:
 
     def __init__(self):
         """Initialize conversation service"""
-        self.groq_service = GroqService()
+        self.groq_service = get_groq_service()
         self.voice_service = None
         self.history_service = get_conversation_history_service()
 
@@ -63,6 +81,7 @@ class ConversationService:
         session_id: Optional[str] = None,
         customer_info: Optional[Dict[str, Any]] = None,
         speaker_preferences: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Process voice conversation with privacy-protected context understanding
@@ -73,6 +92,7 @@ class ConversationService:
             session_id: セッションID
             customer_info: 顧客情報（匿名化される）
             speaker_preferences: 話者設定
+            user_id: 利用者ID（応答キャッシュのスコープに使う）
 
         Returns:
             処理結果
@@ -89,8 +109,12 @@ class ConversationService:
                 await self.context_service.initialize_session_context(session_id)
                 logger.info(f"Created new conversation session: {session_id}")
 
+            # 各ステージのレイテンシ（ミリ秒）
+            stages: Dict[str, float] = {}
+
             # Step 1: Speech-to-Text (WhisperX) - REAL-TIME MODE
             logger.info("Step 1: Converting speech to text (REAL-TIME)...")
+            stage_start = time.perf_counter()
             speech_service = get_speech_service(
                 model_size="medium"
             )  # High accuracy model for better recognition
@@ -101,18 +125,33 @@ class ConversationService:
                 min_speakers=1,
                 max_speakers=2,
             )
+            stages["stt_ms"] = _elapsed_ms(stage_start)
 
             input_text = transcription_result["text"]
             logger.info(f"Transcribed: {input_text[:100]}...")
 
-            # Step 2: Privacy-Aware Context Analysis
-            logger.info("Step 2: Privacy-aware context analysis...")
-            context_suggestions = await self.context_service.get_contextual_suggestions(
-                session_id=session_id, current_input=input_text
-            )
+            if not self.voice_service:
+                raise ConversationServiceError("Voice service not initialized")
+            recommended_speaker = FEMALE_SALES
 
-            # Step 3: AI Processing (Groq-based, Ultra Fast) with Context
-            logger.info("Step 3: Groq AI processing with contextual understanding...")
+            # Step 2: Privacy-Aware Context Analysis (LLMと並行実行)
+            # 予算内に終われば文脈をプロンプトに加え、間に合わなければ待たない
+            logger.info("Step 2: Privacy-aware context analysis (concurrent)...")
+            context_task = asyncio.create_task(
+                self._timed(
+                    stages,
+                    "context_ms",
+                    self.context_service.get_contextual_suggestions(
+                        session_id=session_id, current_input=input_text
+                    ),
+                )
+            )
+            await asyncio.wait({context_task}, timeout=CONTEXT_BUDGET_SECONDS)
+            context_suggestions: Dict[str, Any] = {}
+            if context_task.done() and not context_task.exception():
+                context_suggestions = context_task.result()
+            elif not context_task.done():
+                logger.info("Context analysis missed its budget; using bare prompt")
 
             # 文脈情報をAI分析に追加
             enhanced_prompt = input_text
@@ -125,26 +164,89 @@ class ConversationService:
                 )
                 enhanced_prompt += context_info
 
-            ai_response = await self.groq_service.sales_analysis(enhanced_prompt)
+            # Step 3: AI Processing (Groq streaming)
+            # 最初の1文が届いた時点で音声合成を開始する
+            logger.info("Step 3: Groq AI processing (streaming)...")
+            llm_start = time.perf_counter()
+            early_tts: Dict[str, Any] = {}
+
+            def start_tts(sentence: str) -> None:
+                # STT/LLM/TTS/文脈は各サービス側でステージ別ヒストグラムに記録される
+                observe_stage("llm_first_sentence", time.perf_counter() - llm_start)
+                stages["llm_first_sentence_ms"] = _elapsed_ms(llm_start)
+                early_tts["text"] = sentence
+                early_tts["task"] = asyncio.create_task(
+                    self._timed(
+                        stages,
+                        "tts_ms",
+                        self.voice_service.synthesize_voice(
+                            text=sentence, speaker_id=recommended_speaker
+                        ),
+                    )
+                )
+
+            try:
+                ai_response = await self.groq_service.stream_sales_analysis(
+                    enhanced_prompt,
+                    on_first_sentence=start_tts,
+                    cache_scope=cache_scope_for(customer_info, user_id),
+                )
+            except BaseException:
+                if "task" in early_tts:
+                    early_tts["task"].cancel()
+                context_task.cancel()
+                raise
+            stages["llm_ms"] = _elapsed_ms(llm_start)
 
             response_text = ai_response.get(
                 "response", "申し訳ございません、もう一度お話しください。"
             )
-            recommended_speaker = FEMALE_SALES
 
             logger.info(f"AI response: {response_text[:100]}...")
 
             # Step 4: Text-to-Speech (VOICEVOX) - EXTREME SPEED
-            logger.info("Step 4: Converting text to speech (EXTREME SPEED)...")
-            if not self.voice_service:
-                raise ConversationServiceError("Voice service not initialized")
-
-            # EXTREME SPEED: Start TTS immediately, skip all history updates
-            import asyncio
+            # 先行合成した1文が最終応答の冒頭と一致すればその音声を使い、
+            # 残りの文を合成して後ろに連結する
+            tts_task = early_tts.get("task")
+            if tts_task is not None and not response_text.startswith(
+                early_tts["text"]
+            ):
+                tts_task.cancel()
+                tts_task = None
+            audio_result = None
+            if tts_task is not None:
+                remainder = response_text[len(early_tts["text"]) :].strip()
+                if remainder:
+                    remainder_audio = await self._timed(
+                        stages,
+                        "tts_remainder_ms",
+                        self.voice_service.synthesize_voice(
+                            text=remainder, speaker_id=recommended_speaker
+                        ),
+                    )
+                    audio_result = self._concat_wav(
+                        await tts_task, remainder_audio
+                    )
+                else:
+                    audio_result = await tts_task
+                if audio_result is None:
+                    tts_task = None
+            if tts_task is None:
+                logger.info("Step 4: Converting text to speech (EXTREME SPEED)...")
+                audio_result = await self._timed(
+                    stages,
+                    "tts_ms",
+                    self.voice_service.synthesize_voice(
+                        text=response_text, speaker_id=recommended_speaker
+                    ),
+                )
 
-            audio_result = await self.voice_service.synthesize_voice(
-                text=response_text, speaker_id=recommended_speaker
-            )
+            # 予算に間に合わなかった文脈も、応答の提案情報としては返す
+            if not context_suggestions:
+                try:
+                    context_suggestions = await context_task
+                except Exception as e:
+                    logger.warning(f"Context analysis failed: {e}")
 
             # Step 5: Update Privacy-Aware Context (Async, Non-blocking)
             logger.info("Step 5: Updating privacy-aware context...")
@@ -206,6 +308,9 @@ class ConversationService:
                     "speed_mode": "EXTREME",
                     "processing_time_ms": round(processing_time * 1000, 2),
                     "privacy_mode": "STRICT",
+                    "stt_timing": transcription_result.get("timing"),
+                    "stages": stages,
+                    "tts_started_early": tts_task is not None,
                 },
             }
 
@@ -214,6 +319,9 @@ class ConversationService:
             )
             return result
 
+        except SpeechQueueFullError:
+            # STTが混雑している場合はAPI層で429を返す
+            raise
         except Exception as e:
             logger.error(f"Voice conversation processing error: {e}")
             raise ConversationServiceError(f"Failed to process voice conversation: {e}")
@@ -231,9 +339,37 @@ class ConversationService:
 
     async def initialize(self, voice_service: VoiceService):
         """Initialize with existing voice service instance"""
+        if self.voice_service is voice_service:
+            return
         self.voice_service = voice_service
         logger.info("Voice service initialized with existing instance")
 
+    @staticmethod
+    def _concat_wav(first: bytes, rest: bytes) -> Optional[bytes]:
+        """2つのWAVをヘッダー1つのWAVに連結する（連結できなければ None）"""
+        if not first or not rest:
+            return None
+        try:
+            first_fmt, first_pcm = split_wav(first)
+            rest_fmt, rest_pcm = split_wav(rest)
+        except Exception as e:
+            logger.warning(f"Cannot concatenate early TTS audio: {e}")
+            return None
+        if first_fmt != rest_fmt:
+            logger.warning("Cannot concatenate early TTS audio: format mismatch")
+            return None
+        pcm = first_pcm + rest_pcm
+        return build_wav_header(first_fmt, len(pcm)) + pcm
+
+    @staticmethod
+    async def _timed(stages: Dict[str, float], name: str, awaitable):
+        """awaitable の所要時間を stages[name] に記録する"""
+        stage_start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            stages[name] = _elapsed_ms(stage_start)
+
     async def get_session_context(self, session_id: str) -> Dict[str, Any]:
         """
         Get session context with privacy protection
@@ -354,7 +490,11 @@ class ConversationService:
         }
 
     async def handle_objection(
-        self, session_id: str, objection_text: str, objection_type: str = "general"
+        self,
+        session_id: str,
+        objection_text: str,
+        objection_type: str = "general",
+        user_id: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Handle customer objections using privacy-aware context
@@ -376,7 +516,9 @@ class ConversationService:
                 )
 
             # AI分析
-            ai_response = await self.groq_service.sales_analysis(enhanced_prompt)
+            ai_response = await self.groq_service.sales_analysis(
+                enhanced_prompt, cache_scope=cache_scope_for(user_id=user_id)
+            )
             response_text = ai_response.get(
                 "response", "ご懸念をお聞かせいただき、ありがとうございます。"
             )
@@ -0,0 +1,264 @@
+"""
+Content-addressed cache for processed documents
+同じ資料の再アップロード時に抽出・チャンク分割をやり直さないための永続キャッシュ
+
+- キーは内容の SHA-256 + プロセッサのバージョン + 拡張子 + 抽出条件（文字数上限・
+  チャンクサイズ）。ファイル名や Content-Type は含めない
+- 値は JSON を zlib 圧縮して SQLite (WAL) に保存する。抽出結果のエントリはテキスト、
+  チャンク分割のエントリは各チャンクの位置とトークン数のみ（本文は抽出結果から切り出す）
+- 合計サイズ（圧縮後）が上限を超えたら最終アクセスの古い順に削除する
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def content_sha256(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+@dataclass
+class DocumentCacheStats:
+    """文書キャッシュの統計情報（このプロセス分）"""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    skipped: int = 0
+    evictions: int = 0
+    errors: int = 0
+    # ヒットにより省略できた抽出・チャンク分割の時間（保存時の実測値の合計）
+    seconds_saved: float = 0.0
+    total_lookup_time: float = 0.0
+
+
+class DocumentCache:
+    """SQLite (WAL) に保存する LRU (サイズ上限) キャッシュ
+
+    複数ワーカープロセスから同じファイルを共有できる。キャッシュの障害で
+    文書処理が失敗しないよう、読み書きの例外はログに残して無視する。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS document_cache (
+            cache_key TEXT PRIMARY KEY,
+            content_sha256 TEXT NOT NULL,
+            processor_version TEXT NOT NULL,
+            payload BLOB NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            raw_bytes INTEGER NOT NULL,
+            compute_seconds REAL NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS document_cache_lru
+            ON document_cache (last_access);
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        processor_version: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        compression_level: int = 6,
+    ):
+        self.path = Path(path)
+        self.processor_version = processor_version
+        self.max_bytes = max_bytes
+        # 1件で上限の1/4を超えるものは保存しない（他のエントリを追い出し尽くすため）
+        self.max_entry_bytes = max_bytes // 4
+        self.compression_level = compression_level
+        self.stats = DocumentCacheStats()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self.SCHEMA)
+        self._purge_stale_versions()
+
+    @classmethod
+    def from_env(cls, processor_version: str) -> "DocumentCache":
+        """環境変数（DOCUMENT_CACHE_PATH / _MAX_MB / _COMPRESSION_LEVEL）から作成"""
+        return cls(
+            path=Path(
+                os.getenv("DOCUMENT_CACHE_PATH", "data/document_cache.sqlite3")
+            ),
+            processor_version=processor_version,
+            max_bytes=int(os.getenv("DOCUMENT_CACHE_MAX_MB", "256")) * 1024 * 1024,
+            compression_level=int(os.getenv("DOCUMENT_CACHE_COMPRESSION_LEVEL", "6")),
+        )
+
+    def _purge_stale_versions(self) -> None:
+        """旧バージョンのプロセッサで作ったエントリは二度とヒットしないので削除"""
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM document_cache WHERE processor_version != ?",
+                (self.processor_version,),
+            ).rowcount
+        if deleted:
+            logger.info(f"Document cache: purged {deleted} stale entries")
+
+    def make_key(
+        self,
+        sha256: str,
+        file_extension: str,
+        max_text_chars: Optional[int] = None,
+        chunking: Optional[str] = None,
+    ) -> str:
+        """
+        キャッシュキー
+
+        chunking はチャンク分割の条件（サイズ・オーバーラップ・トークナイザー）。
+        None は抽出結果のみのエントリ。
+        """
+        return ":".join(
+            (
+                sha256,
+                self.processor_version,
+                file_extension,
+                str(max_text_chars) if max_text_chars is not None else "all",
+                chunking if chunking is not None else "none",
+            )
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """保存済みの値を返す（なければ None。ブロッキング）"""
+        started = time.perf_counter()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT payload, compute_seconds FROM document_cache "
+                    "WHERE cache_key = ?",
+                    (key,),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE document_cache SET last_access = ?, hits = hits + 1 "
+                        "WHERE cache_key = ?",
+                        (time.time(), key),
+                    )
+            value = (
+                json.loads(zlib.decompress(row[0]).decode("utf-8"))
+                if row is not None
+                else None
+            )
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning(f"Document cache read failed: {e}")
+            self.stats.errors += 1
+            value = None
+        self.stats.total_lookup_time += time.perf_counter() - started
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self.stats.seconds_saved += row[1]
+        return value
+
+    def put(
+        self, key: str, value: Dict[str, Any], compute_seconds: float = 0.0
+    ) -> bool:
+        """値を圧縮して保存し、上限を超えた分を古い順に削除する（ブロッキング）"""
+        try:
+            raw = json.dumps(value, ensure_ascii=False).encode("utf-8")
+            payload = zlib.compress(raw, self.compression_level)
+            if len(payload) > self.max_entry_bytes:
+                self.stats.skipped += 1
+                return False
+            now = time.time()
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO document_cache VALUES "
+                        "(?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                        (
+                            key,
+                            key.split(":", 1)[0],
+                            self.processor_version,
+                            payload,
+                            len(payload),
+                            len(raw),
+                            compute_seconds,
+                            now,
+                            now,
+                        ),
+                    )
+                    evicted = self._evict()
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Document cache write failed: {e}")
+            self.stats.errors += 1
+            return False
+        self.stats.stores += 1
+        self.stats.evictions += evicted
+        return True
+
+    def _evict(self) -> int:
+        """ロック・トランザクション内で呼ぶ"""
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM document_cache"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        victims = []
+        for key, size in self._conn.execute(
+            "SELECT cache_key, size_bytes FROM document_cache ORDER BY last_access"
+        ):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany(
+            "DELETE FROM document_cache WHERE cache_key = ?", victims
+        )
+        return len(victims)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM document_cache")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size_bytes, raw_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0), "
+                "COALESCE(SUM(raw_bytes), 0) FROM document_cache"
+            ).fetchone()
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            "enabled": True,
+            "processor_version": self.processor_version,
+            "entries": entries,
+            "size_bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+            "compression_ratio": round(raw_bytes / size_bytes, 2) if size_bytes else 0,
+            **asdict(self.stats),
+            "hit_rate": round(self.stats.hits / lookups, 4) if lookups else 0.0,
+            "avg_lookup_ms": (
+                round(self.stats.total_lookup_time / lookups * 1000, 3)
+                if lookups
+                else 0.0
+            ),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,439 @@
+"""
+Document extraction workers
+PDF/Office文書のテキスト抽出をイベントループ外のプロセスプールで実行する
+
+- pdfplumber / openpyxl / python-docx / python-pptx は CPU バウンドかつ同期処理のため、
+  ワーカープロセスで実行してイベントループ（他のエンドポイント）を止めない
+- PDF はページ範囲ごとにタスクを分割し、複数ワーカーで並列に抽出する
+- ワーカーごとにメモリ上限（RLIMIT_AS）を設定し、タイムアウトしたタスクは
+  ワーカーごと停止する。ワーカーは spawn で起動する（fork すると親プロセスの
+  アドレス空間を引き継ぐため、上限に達して抽出が MemoryError になる）
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, asdict
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentExtractionError(Exception):
+    """ワーカーの異常終了（メモリ上限超過など）"""
+
+    pass
+
+
+def _init_worker(memory_limit_bytes: int) -> None:
+    """ワーカー起動時にアドレス空間の上限を設定する"""
+    if resource is None or memory_limit_bytes <= 0:
+        return
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            memory_limit_bytes = min(memory_limit_bytes, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, hard))
+    except (ValueError, OSError) as e:
+        logger.warning(f"Could not set extraction worker memory limit: {e}")
+
+
+# ----------------------------------------------------------------------
+# ワーカー内で実行する抽出関数（ライブラリはワーカー内で import する）
+# source はファイル内容（bytes）または一時ファイルのパス
+# ----------------------------------------------------------------------
+
+Source = Union[bytes, str]
+
+
+def _open_source(source: Source) -> Union[io.BytesIO, str]:
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def pdf_page_count(path: str, method: str) -> int:
+    """PDFのページ数"""
+    if method == "pdfplumber":
+        import pdfplumber  # type: ignore
+
+        with pdfplumber.open(path) as pdf:
+            return len(pdf.pages)
+
+    import PyPDF2  # type: ignore
+
+    return len(PyPDF2.PdfReader(path).pages)
+
+
+def extract_pdf_pages(path: str, start: int, end: int, method: str) -> List[str]:
+    """PDFの [start, end) ページのテキストを抽出する"""
+    texts = []
+    if method == "pdfplumber":
+        import pdfplumber  # type: ignore
+
+        with pdfplumber.open(path, pages=list(range(start + 1, end + 1))) as pdf:
+            for page in pdf.pages:
+                texts.append(page.extract_text() or "")
+                # 解析済みオブジェクトを解放してページ数に比例したメモリ増加を防ぐ
+                page.close()
+        return texts
+
+    import PyPDF2  # type: ignore
+
+    reader = PyPDF2.PdfReader(path)
+    for index in range(start, end):
+        texts.append(reader.pages[index].extract_text() or "")
+    return texts
+
+
+def extract_docx(source: Source) -> Dict[str, Any]:
+    """Word document (.docx)"""
+    from docx import Document as DocxDocument  # type: ignore
+
+    doc = DocxDocument(_open_source(source))
+
+    # Extract text from paragraphs
+    text_content = []
+    for paragraph in doc.paragraphs:
+        if paragraph.text.strip():
+            text_content.append(paragraph.text)
+
+    # Extract text from tables
+    tables_content = []
+    for table in doc.tables:
+        for row in table.rows:
+            row_text = []
+            for cell in row.cells:
+                if cell.text.strip():
+                    row_text.append(cell.text.strip())
+            if row_text:
+                tables_content.append(" | ".join(row_text))
+
+    full_text = "\n".join(text_content)
+    if tables_content:
+        full_text += "\n\nTables:\n" + "\n".join(tables_content)
+
+    return {
+        "text": full_text,
+        "paragraphs": len(doc.paragraphs),
+        "tables": len(doc.tables),
+        "word_count": len(full_text.split()),
+        "document_type": "word_document",
+    }
+
+
+def extract_xlsx(source: Source) -> Dict[str, Any]:
+    """Excel file (.xlsx)"""
+    import openpyxl  # type: ignore
+
+    workbook = openpyxl.load_workbook(_open_source(source), read_only=True)
+    sheets_content = []
+
+    for sheet_name in workbook.sheetnames:
+        sheet = workbook[sheet_name]
+        sheet_data = []
+
+        for row in sheet.iter_rows(values_only=True):
+            row_data = [str(cell) if cell is not None else "" for cell in row]
+            if any(cell.strip() for cell in row_data):  # Skip empty rows
+                sheet_data.append(" | ".join(row_data))
+
+        if sheet_data:
+            sheets_content.append(f"Sheet: {sheet_name}\n" + "\n".join(sheet_data))
+
+    full_text = "\n\n".join(sheets_content)
+
+    return {
+        "text": full_text,
+        "sheets": len(workbook.sheetnames),
+        "sheet_names": workbook.sheetnames,
+        "word_count": len(full_text.split()),
+        "document_type": "excel_document",
+    }
+
+
+def extract_xls(source: Source) -> Dict[str, Any]:
+    """Legacy Excel file (.xls)"""
+    import xlrd  # type: ignore
+
+    if isinstance(source, bytes):
+        workbook = xlrd.open_workbook(file_contents=source)
+    else:
+        workbook = xlrd.open_workbook(source)
+    sheets_content = []
+
+    for sheet_index in range(workbook.nsheets):
+        sheet = workbook.sheet_by_index(sheet_index)
+        sheet_name = workbook.sheet_names()[sheet_index]
+        sheet_data = []
+
+        for row_idx in range(sheet.nrows):
+            row_data = []
+            for col_idx in range(sheet.ncols):
+                cell_value = sheet.cell_value(row_idx, col_idx)
+                row_data.append(str(cell_value) if cell_value else "")
+
+            if any(cell.strip() for cell in row_data):
+                sheet_data.append(" | ".join(row_data))
+
+        if sheet_data:
+            sheets_content.append(f"Sheet: {sheet_name}\n" + "\n".join(sheet_data))
+
+    full_text = "\n\n".join(sheets_content)
+
+    return {
+        "text": full_text,
+        "sheets": workbook.nsheets,
+        "sheet_names": workbook.sheet_names(),
+        "word_count": len(full_text.split()),
+        "document_type": "excel_legacy_document",
+    }
+
+
+def extract_pptx(source: Source) -> Dict[str, Any]:
+    """PowerPoint presentation (.pptx)"""
+    from pptx import Presentation  # type: ignore
+
+    prs = Presentation(_open_source(source))
+    slides_content = []
+
+    for slide_idx, slide in enumerate(prs.slides, 1):
+        slide_text = []
+
+        # Extract text from shapes
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                slide_text.append(shape.text)
+
+        if slide_text:
+            slides_content.append(f"Slide {slide_idx}:\n" + "\n".join(slide_text))
+
+    full_text = "\n\n".join(slides_content)
+
+    return {
+        "text": full_text,
+        "slides": len(prs.slides),
+        "word_count": len(full_text.split()),
+        "document_type": "powerpoint_document",
+    }
+
+
+# ----------------------------------------------------------------------
+# プロセスプール
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class DocumentExtractionStats:
+    """抽出エグゼキューターの統計情報"""
+
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    timeouts: int = 0
+    pool_restarts: int = 0
+    total_compute: float = 0.0
+
+
+def _timed_call(func: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[Any, float]:
+    started = time.perf_counter()
+    return func(*args), time.perf_counter() - started
+
+
+class DocumentExtractionExecutor:
+    """文書抽出用の有界プロセスプール
+
+    呼び出し側のタイムアウト（asyncio.timeout など）でキャンセルされた場合、
+    未実行のタスクは取り消し、実行中のタスクはワーカーごと停止してプールを作り直す。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 0,
+        memory_limit_mb: int = 2048,
+        pages_per_task: int = 8,
+    ):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.memory_limit_mb = memory_limit_mb
+        self.pages_per_task = max(pages_per_task, 1)
+        self.stats = DocumentExtractionStats()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # プールを作り直すたびに増える（他のリクエストが起こした停止との区別に使う）
+        self._generation = 0
+
+    @classmethod
+    def from_env(cls) -> "DocumentExtractionExecutor":
+        """環境変数（DOCUMENT_EXTRACT_WORKERS / _MEMORY_MB / _PAGES_PER_TASK）から作成"""
+        return cls(
+            max_workers=int(os.getenv("DOCUMENT_EXTRACT_WORKERS", "0")),
+            memory_limit_mb=int(os.getenv("DOCUMENT_EXTRACT_MEMORY_MB", "2048")),
+            pages_per_task=int(os.getenv("DOCUMENT_EXTRACT_PAGES_PER_TASK", "8")),
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.memory_limit_mb * 1024 * 1024,),
+            )
+            self._generation += 1
+            logger.info(
+                f"Document extraction pool started: workers={self.max_workers}, "
+                f"memory_limit={self.memory_limit_mb}MB"
+            )
+        return self._executor
+
+    def _restart(self, generation: int) -> None:
+        """ワーカーを強制停止してプールを破棄する（次の投入時に作り直す）"""
+        if generation != self._generation or self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+        terminate = getattr(executor, "terminate_workers", None)
+        if terminate is not None:
+            terminate()
+        else:
+            # Python 3.14 未満には公開APIがないため、ワーカープロセスを直接停止する
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.stats.pool_restarts += 1
+        logger.warning("Document extraction pool restarted")
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """関数をワーカープロセスで実行する"""
+        results = self.run_many([(func, args)])
+        try:
+            async for _, result in results:
+                return result
+        finally:
+            await results.aclose()
+
+    async def run_many(
+        self, calls: Sequence[Tuple[Callable[..., Any], Tuple[Any, ...]]]
+    ) -> AsyncIterator[Tuple[int, Any]]:
+        """
+        複数の呼び出しを並列実行し、完了した順に (番号, 結果) を返す
+
+        実行中のタスクはワーカー数の2倍までに抑える。タスクの例外はそのまま送出し、
+        ワーカーの異常終了は DocumentExtractionError として送出する。
+        """
+        loop = asyncio.get_running_loop()
+        window = self.max_workers * 2
+        pending: Dict[asyncio.Future, Tuple[int, int, Future]] = {}
+        next_call = 0
+        retried: set = set()
+
+        def submit(index: int) -> None:
+            func, args = calls[index]
+            executor = self._get_executor()
+            future = executor.submit(_timed_call, func, args)
+            pending[asyncio.wrap_future(future, loop=loop)] = (
+                index,
+                self._generation,
+                future,
+            )
+            self.stats.submitted += 1
+
+        try:
+            while next_call < len(calls) or pending:
+                while next_call < len(calls) and len(pending) < window:
+                    submit(next_call)
+                    next_call += 1
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    index, generation, _ = pending.pop(task)
+                    try:
+                        result, compute = task.result()
+                    except BrokenProcessPool:
+                        if generation != self._generation and index not in retried:
+                            # 他のリクエストのタイムアウトでプールが作り直された
+                            retried.add(index)
+                            submit(index)
+                            continue
+                        self.stats.failed += 1
+                        self._restart(generation)
+                        raise DocumentExtractionError(
+                            "Extraction worker terminated unexpectedly "
+                            f"(memory limit {self.memory_limit_mb}MB exceeded?)"
+                        )
+                    except Exception:
+                        self.stats.failed += 1
+                        raise
+                    self.stats.completed += 1
+                    self.stats.total_compute += compute
+                    yield index, result
+        except asyncio.CancelledError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            running = False
+            generation = self._generation
+            for task, (_, task_generation, future) in pending.items():
+                task.cancel()
+                if not future.cancel() and not future.done():
+                    running = True
+                    generation = task_generation
+            if running:
+                # 実行中の抽出は中断できないのでワーカーごと停止する
+                self._restart(generation)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        completed = self.stats.completed
+        return {
+            "workers": self.max_workers,
+            "memory_limit_mb": self.memory_limit_mb,
+            "pages_per_task": self.pages_per_task,
+            "started": self._executor is not None,
+            **asdict(self.stats),
+            "avg_task_compute_ms": (
+                round(self.stats.total_compute / completed * 1000, 3)
+                if completed
+                else 0.0
+            ),
+        }
+
+    def shutdown(self) -> None:
+        """ワーカープールを停止"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global extraction executor
+_extraction_executor: Optional[DocumentExtractionExecutor] = None
+
+
+def get_document_extraction_executor() -> DocumentExtractionExecutor:
+    """Get or create the extraction executor (workers start on first use)"""
+    global _extraction_executor
+    if _extraction_executor is None:
+        _extraction_executor = DocumentExtractionExecutor.from_env()
+    return _extraction_executor
+
+
+def shutdown_document_extraction_executor() -> None:
+    """Stop extraction workers (called from the application lifespan)"""
+    if _extraction_executor is not None:
+        _extraction_executor.shutdown()
@@ -11,33 +11,44 @@ Supports:
 - Source code files: .py, .js, .html, .css, .java, .cpp, .php, .rb, .go, .rs, .ts
 """
 
+import asyncio
 import logging
 import io
+import os
 import re
 import json
 import csv
-from typing import Dict, Any, Optional, List, Union
+import tempfile
+import time
+from typing import AsyncIterator, BinaryIO, Callable, Dict, Any, Optional, List, Union
 from pathlib import Path
-import chardet
 
-# Microsoft Office processing
+# Microsoft Office processing (each format is optional on its own)
 try:
     from docx import Document as DocxDocument  # type: ignore
-    import openpyxl  # type: ignore
-    from pptx import Presentation  # type: ignore
-    import xlrd  # type: ignore
 except ImportError:
     DocxDocument = None  # type: ignore
+try:
+    import openpyxl  # type: ignore
+except ImportError:
     openpyxl = None  # type: ignore
+try:
+    from pptx import Presentation  # type: ignore
+except ImportError:
     Presentation = None  # type: ignore
+try:
+    import xlrd  # type: ignore
+except ImportError:
     xlrd = None  # type: ignore
 
-# PDF processing
+# PDF processing (either library is enough)
 try:
     import PyPDF2  # type: ignore
-    import pdfplumber  # type: ignore
 except ImportError:
     PyPDF2 = None  # type: ignore
+try:
+    import pdfplumber  # type: ignore
+except ImportError:
     pdfplumber = None  # type: ignore
 
 # Rich Text and other formats
@@ -64,8 +75,66 @@ except ImportError:
     Request = None  # type: ignore
     InstalledAppFlow = None  # type: ignore
 
+try:
+    from services.document_extraction import (
+        DocumentExtractionExecutor,
+        extract_docx,
+        extract_pdf_pages,
+        extract_pptx,
+        extract_xls,
+        extract_xlsx,
+        get_document_extraction_executor,
+        pdf_page_count,
+    )
+    from services.upload_spool import (
+        ENCODING_SNIFF_BYTES,
+        SpooledUpload,
+        sniff_encoding,
+    )
+    from services.document_cache import DocumentCache, content_sha256
+    from services.text_chunker import TextChunk, TextChunker, Tokenizer, get_tokenizer
+except ImportError:
+    from app.services.document_extraction import (
+        DocumentExtractionExecutor,
+        extract_docx,
+        extract_pdf_pages,
+        extract_pptx,
+        extract_xls,
+        extract_xlsx,
+        get_document_extraction_executor,
+        pdf_page_count,
+    )
+    from app.services.upload_spool import (
+        ENCODING_SNIFF_BYTES,
+        SpooledUpload,
+        sniff_encoding,
+    )
+    from app.services.document_cache import DocumentCache, content_sha256
+    from app.services.text_chunker import (
+        TextChunk,
+        TextChunker,
+        Tokenizer,
+        get_tokenizer,
+    )
+
 logger = logging.getLogger(__name__)
 
+# 進捗通知（{"stage": ..., ...} を受け取る）
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+# ファイル内容（bytes）またはチャンク単位で受け取ったアップロード
+DocumentContent = Union[bytes, SpooledUpload]
+
+# ストリーミング処理時にテキストを読み進める単位（文字数）
+_TEXT_READ_CHARS = 1024 * 1024
+
+# 抽出・チャンク分割の結果やキャッシュの保存形式が変わる修正をしたら上げる
+# （文書キャッシュのキーに含む）
+PROCESSOR_VERSION = "3"
+
+# これより大きい bytes のハッシュ計算はイベントループ外で行う
+_INLINE_HASH_BYTES = 1024 * 1024
+
 
 class DocumentProcessorError(Exception):
     """Document processing related errors"""
@@ -119,267 +188,399 @@ class DocumentProcessor:
 
         # チャンク化設定
         self.chunk_size = 4000  # 4,000文字単位
-        self.chunk_overlap = 200  # 200文字のオーバーラップ
+        # 隣接チャンク間のオーバーラップ（トークン数）
+        self.chunk_overlap = int(os.getenv("DOCUMENT_CHUNK_OVERLAP_TOKENS", "200"))
         self.max_chunks_per_file = 50  # 1ファイル最大50チャンク
 
+        # 抽出処理の上限（1リクエストあたり）
+        self.extraction_timeout = float(
+            os.getenv("DOCUMENT_EXTRACT_TIMEOUT_SECONDS", "120")
+        )
+        # JSON/YAML/XML などまとめて解析する形式の上限（超えたらテキストとして扱う）
+        self.structured_parse_max_bytes = int(
+            os.getenv("DOCUMENT_STRUCTURED_PARSE_MAX_BYTES", str(16 * 1024 * 1024))
+        )
+        # Office/PDF はワーカーで抽出する（ファイルパスのまま渡せる）
+        self.worker_formats = {".docx", ".pdf", ".xlsx", ".xls", ".pptx"}
+
+        # 抽出結果・チャンクの永続キャッシュ（内容の SHA-256 で引く）
+        self.cache: Optional[DocumentCache] = None
+        if os.getenv("DOCUMENT_CACHE_ENABLED", "true").lower() == "true":
+            try:
+                self.cache = DocumentCache.from_env(PROCESSOR_VERSION)
+            except Exception as e:
+                logger.warning(f"Document cache disabled: {e}")
+
+    @property
+    def extraction_executor(self) -> DocumentExtractionExecutor:
+        return get_document_extraction_executor()
+
     async def process_document(
-        self, file_content: bytes, filename: str, content_type: Optional[str] = None
+        self,
+        file_content: DocumentContent,
+        filename: str,
+        content_type: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        max_text_chars: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Process document and extract text content
 
         Args:
-            file_content: Raw file content as bytes
+            file_content: Raw file content as bytes, or a SpooledUpload (processed
+                from its temp file / buffer without loading it as a whole)
             filename: Original filename
             content_type: MIME content type
+            progress: Called with progress events (PDF pages extracted so far)
+            max_text_chars: Keep at most this many characters of text
+                (SpooledUpload only; plain text and CSV are then streamed)
 
         Returns:
             Processed document information
         """
         try:
-            file_path = Path(filename)
-            file_extension = file_path.suffix.lower()
+            return await self._process_document(
+                file_content, filename, content_type, progress, max_text_chars
+            )
+        except Exception as e:
+            logger.error(f"Failed to process document {filename}: {str(e)}")
+            raise DocumentProcessorError(f"Document processing failed: {str(e)}")
 
-            if file_extension not in self.supported_formats:
-                raise DocumentProcessorError(
-                    f"Unsupported file format: {file_extension}"
+    async def _process_document(
+        self,
+        file_content: DocumentContent,
+        filename: str,
+        content_type: Optional[str],
+        progress: Optional[ProgressCallback],
+        max_text_chars: Optional[int],
+        cache_sha256: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        file_extension = Path(filename).suffix.lower()
+
+        if file_extension not in self.supported_formats:
+            raise DocumentProcessorError(f"Unsupported file format: {file_extension}")
+
+        file_size = (
+            file_content.size
+            if isinstance(file_content, SpooledUpload)
+            else len(file_content)
+        )
+        self._report_progress(
+            progress, "started", filename=filename, file_size=file_size
+        )
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(
+                cache_sha256 or await self._content_sha256(file_content),
+                file_extension,
+                self._effective_text_cap(file_content, file_extension, max_text_chars),
+            )
+            result = await asyncio.to_thread(self.cache.get, cache_key)
+            if result is not None:
+                self._report_progress(progress, "cached")
+                return self._add_metadata(
+                    result, filename, file_extension, content_type, file_size, True
+                )
+
+        # Process the document
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.extraction_timeout):
+                result = await self._process_content(
+                    file_content, filename, file_extension, progress, max_text_chars
                 )
+        except TimeoutError:
+            raise DocumentProcessorError(
+                f"Extraction timed out after {self.extraction_timeout:g}s"
+            )
+        if cache_key is not None:
+            await asyncio.to_thread(
+                self.cache.put, cache_key, result, time.perf_counter() - started
+            )
 
-            # Process the document
-            processor_func = self.supported_formats[file_extension]
-            result = await processor_func(file_content, filename)
+        logger.info(f"Successfully processed {filename} ({file_extension})")
+        return self._add_metadata(
+            result, filename, file_extension, content_type, file_size, False
+        )
 
-            # Add metadata
-            result.update(
-                {
-                    "filename": filename,
-                    "file_extension": file_extension,
-                    "content_type": content_type,
-                    "file_size": len(file_content),
-                    "processing_status": "success",
-                }
+    @staticmethod
+    def _add_metadata(
+        result: Dict[str, Any],
+        filename: str,
+        file_extension: str,
+        content_type: Optional[str],
+        file_size: int,
+        cache_hit: bool,
+    ) -> Dict[str, Any]:
+        result.update(
+            {
+                "filename": filename,
+                "file_extension": file_extension,
+                "content_type": content_type,
+                "file_size": file_size,
+                "processing_status": "success",
+                "cache_hit": cache_hit,
+            }
+        )
+        return result
+
+    @staticmethod
+    async def _content_sha256(content: DocumentContent) -> str:
+        if isinstance(content, SpooledUpload):
+            # 受け取りながら計算済み
+            return content.sha256
+        if len(content) > _INLINE_HASH_BYTES:
+            return await asyncio.to_thread(content_sha256, content)
+        return content_sha256(content)
+
+    def _effective_text_cap(
+        self,
+        content: DocumentContent,
+        file_extension: str,
+        max_text_chars: Optional[int],
+    ) -> Optional[int]:
+        """結果に影響する文字数上限（bytes とワーカー抽出では使われない）"""
+        if not isinstance(content, SpooledUpload):
+            return None
+        if file_extension in self.worker_formats:
+            return None
+        return max_text_chars
+
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        if self.cache is None:
+            return {"enabled": False}
+        return self.cache.get_metrics()
+
+    async def _process_content(
+        self,
+        content: DocumentContent,
+        filename: str,
+        file_extension: str,
+        progress: Optional[ProgressCallback],
+        max_text_chars: Optional[int],
+    ) -> Dict[str, Any]:
+        processor_func = self.supported_formats[file_extension]
+        if not isinstance(content, SpooledUpload):
+            if file_extension == ".pdf":
+                return await self._process_pdf(content, filename, progress)
+            return await processor_func(content, filename)
+
+        # チャンク単位で受け取ったアップロードは全体をメモリに載せずに処理する
+        if file_extension in self.worker_formats:
+            # ワーカーには一時ファイルのパスを渡す
+            path = await asyncio.to_thread(content.path)
+            if file_extension == ".pdf":
+                return await self._process_pdf(path, filename, progress)
+            return await processor_func(path, filename)
+        if file_extension in (".csv", ".tsv"):
+            return await asyncio.to_thread(
+                self._process_csv_stream, content, filename, max_text_chars
             )
+        if (
+            processor_func == self._process_text
+            or content.size > self.structured_parse_max_bytes
+        ):
+            return await asyncio.to_thread(
+                self._process_text_stream, content, filename, max_text_chars
+            )
+        data = await asyncio.to_thread(content.read_bytes)
+        return await processor_func(data, filename)
 
-            logger.info(f"Successfully processed {filename} ({file_extension})")
-            return result
+    async def stream_process_document(
+        self,
+        file_content: DocumentContent,
+        filename: str,
+        content_type: Optional[str] = None,
+        max_text_chars: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        文書を処理しながら進捗イベントを返す
 
-        except Exception as e:
-            logger.error(f"Failed to process document {filename}: {str(e)}")
-            raise DocumentProcessorError(f"Document processing failed: {str(e)}")
+        Yields:
+            {"type": "progress", ...} を0回以上、最後に {"type": "result", ...}
+            または {"type": "error", "detail": ...}
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(
+            self.process_document(
+                file_content,
+                filename,
+                content_type,
+                progress=events.put_nowait,
+                max_text_chars=max_text_chars,
+            )
+        )
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield {"type": "progress", **event}
+            try:
+                result = task.result()
+            except DocumentProcessorError as e:
+                yield {"type": "error", "detail": str(e)}
+                return
+            yield {"type": "result", **result}
+        finally:
+            # クライアント切断時は抽出も中止する
+            if not task.done():
+                task.cancel()
+
+    @staticmethod
+    def _report_progress(
+        progress: Optional[ProgressCallback], stage: str, **fields: Any
+    ) -> None:
+        if progress is not None:
+            progress({"stage": stage, **fields})
+
+    async def _extract(
+        self,
+        func: Callable[[Union[bytes, str]], Dict[str, Any]],
+        source: Union[bytes, str],
+    ) -> Dict[str, Any]:
+        """抽出関数をワーカープロセスで実行する（source は内容またはファイルパス）"""
+        return await self.extraction_executor.run(func, source)
 
     def _detect_encoding(self, content: bytes) -> str:
-        """Detect text encoding"""
-        try:
-            detection = chardet.detect(content)
-            encoding = detection.get("encoding", "utf-8") if detection else "utf-8"
-            return encoding or "utf-8"
-        except Exception:
-            return "utf-8"
-
-    async def _process_docx(self, content: bytes, filename: str) -> Dict[str, Any]:
-        """Process Word document (.docx)"""
+        """Detect text encoding (from a bounded prefix)"""
+        return sniff_encoding(bytes(content[:ENCODING_SNIFF_BYTES]))
+
+    async def _process_docx(
+        self, content: Union[bytes, str], filename: str
+    ) -> Dict[str, Any]:
+        """Process Word document (.docx) from bytes or a file path"""
         if DocxDocument is None:
             raise DocumentProcessorError("python-docx not installed")
 
         try:
-            doc = DocxDocument(io.BytesIO(content))
-
-            # Extract text from paragraphs
-            text_content = []
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text_content.append(paragraph.text)
-
-            # Extract text from tables
-            tables_content = []
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
-                    if row_text:
-                        tables_content.append(" | ".join(row_text))
-
-            full_text = "\n".join(text_content)
-            if tables_content:
-                full_text += "\n\nTables:\n" + "\n".join(tables_content)
-
-            return {
-                "text": full_text,
-                "paragraphs": len(doc.paragraphs),
-                "tables": len(doc.tables),
-                "word_count": len(full_text.split()),
-                "document_type": "word_document",
-            }
+            return await self._extract(extract_docx, content)
 
         except Exception as e:
             raise DocumentProcessorError(f"Failed to process Word document: {str(e)}")
 
-    async def _process_pdf(self, content: bytes, filename: str) -> Dict[str, Any]:
-        """Process PDF document"""
-        text_content = ""
-        page_count = 0
-
-        # Try pdfplumber first (better for complex layouts)
-        if pdfplumber:
-            try:
-                with pdfplumber.open(io.BytesIO(content)) as pdf:
-                    page_count = len(pdf.pages)
-                    text_parts = []
-
-                    for page in pdf.pages:
-                        page_text = page.extract_text()  # type: ignore
-                        if page_text:
-                            text_parts.append(page_text)
-
-                    text_content = "\n\n".join(text_parts)
-
-                    return {
-                        "text": text_content,
-                        "pages": page_count,
-                        "word_count": len(text_content.split()),
-                        "document_type": "pdf_document",
-                        "extraction_method": "pdfplumber",
-                    }
-            except Exception as e:
-                logger.warning(f"pdfplumber failed, trying PyPDF2: {str(e)}")
+    async def _process_pdf(
+        self,
+        content: Union[bytes, str],
+        filename: str,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Dict[str, Any]:
+        """Process PDF document from bytes or a file path
 
-        # Fallback to PyPDF2
-        if PyPDF2:
+        Pages are extracted in parallel worker processes.
+        """
+        methods = [
+            method
+            for method, library in (("pdfplumber", pdfplumber), ("PyPDF2", PyPDF2))
+            if library is not None
+        ]
+        if not methods:
+            raise DocumentProcessorError("No PDF processing library available")
+
+        # ワーカーがページ範囲ごとに開けるよう一時ファイルに書き出す（IPCは1回）
+        spooled = isinstance(content, bytes)
+        path = (
+            await asyncio.to_thread(self._spool_to_tempfile, content, ".pdf")
+            if spooled
+            else content
+        )
+        try:
+            # Try pdfplumber first (better for complex layouts), then PyPDF2
+            for method in methods[:-1]:
+                try:
+                    return await self._extract_pdf_pages(path, method, progress)
+                except Exception as e:
+                    logger.warning(f"{method} failed, trying PyPDF2: {str(e)}")
             try:
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-                page_count = len(pdf_reader.pages)
-                text_parts = []
-
-                for page in pdf_reader.pages:  # type: ignore
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_parts.append(page_text)
-
-                text_content = "\n\n".join(text_parts)
-
-                return {
-                    "text": text_content,
-                    "pages": page_count,
-                    "word_count": len(text_content.split()),
-                    "document_type": "pdf_document",
-                    "extraction_method": "PyPDF2",
-                }
+                return await self._extract_pdf_pages(path, methods[-1], progress)
             except Exception as e:
                 raise DocumentProcessorError(f"Failed to process PDF: {str(e)}")
+        finally:
+            if spooled:
+                os.unlink(path)
+
+    @staticmethod
+    def _spool_to_tempfile(content: bytes, suffix: str) -> str:
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+            f.write(content)
+            return f.name
+
+    async def _extract_pdf_pages(
+        self, path: str, method: str, progress: Optional[ProgressCallback]
+    ) -> Dict[str, Any]:
+        """ページ範囲ごとのタスクに分けて並列抽出し、ページ順に結合する"""
+        executor = self.extraction_executor
+        page_count = await executor.run(pdf_page_count, path, method)
+        step = executor.pages_per_task
+        calls = [
+            (extract_pdf_pages, (path, start, min(start + step, page_count), method))
+            for start in range(0, page_count, step)
+        ]
+        page_texts: List[List[str]] = [[] for _ in calls]
+        completed_pages = 0
+        self._report_progress(
+            progress, "extracting", completed_pages=0, total_pages=page_count
+        )
+        async for index, texts in executor.run_many(calls):
+            page_texts[index] = texts
+            completed_pages += len(texts)
+            self._report_progress(
+                progress,
+                "extracting",
+                completed_pages=completed_pages,
+                total_pages=page_count,
+            )
 
-        raise DocumentProcessorError("No PDF processing library available")
+        text_content = "\n\n".join(
+            text for texts in page_texts for text in texts if text
+        )
+        return {
+            "text": text_content,
+            "pages": page_count,
+            "word_count": len(text_content.split()),
+            "document_type": "pdf_document",
+            "extraction_method": method,
+        }
 
-    async def _process_xlsx(self, content: bytes, filename: str) -> Dict[str, Any]:
-        """Process Excel file (.xlsx)"""
+    async def _process_xlsx(
+        self, content: Union[bytes, str], filename: str
+    ) -> Dict[str, Any]:
+        """Process Excel file (.xlsx) from bytes or a file path"""
         if openpyxl is None:
             raise DocumentProcessorError("openpyxl not installed")
 
         try:
-            workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True)
-            sheets_content = []
-
-            for sheet_name in workbook.sheetnames:
-                sheet = workbook[sheet_name]
-                sheet_data = []
-
-                for row in sheet.iter_rows(values_only=True):
-                    row_data = [str(cell) if cell is not None else "" for cell in row]
-                    if any(cell.strip() for cell in row_data):  # Skip empty rows
-                        sheet_data.append(" | ".join(row_data))
-
-                if sheet_data:
-                    sheets_content.append(
-                        f"Sheet: {sheet_name}\n" + "\n".join(sheet_data)
-                    )
-
-            full_text = "\n\n".join(sheets_content)
-
-            return {
-                "text": full_text,
-                "sheets": len(workbook.sheetnames),
-                "sheet_names": workbook.sheetnames,
-                "word_count": len(full_text.split()),
-                "document_type": "excel_document",
-            }
+            return await self._extract(extract_xlsx, content)
 
         except Exception as e:
             raise DocumentProcessorError(f"Failed to process Excel file: {str(e)}")
 
-    async def _process_xls(self, content: bytes, filename: str) -> Dict[str, Any]:
-        """Process legacy Excel file (.xls)"""
+    async def _process_xls(
+        self, content: Union[bytes, str], filename: str
+    ) -> Dict[str, Any]:
+        """Process legacy Excel file (.xls) from bytes or a file path"""
         if xlrd is None:
             raise DocumentProcessorError("xlrd not installed")
 
         try:
-            workbook = xlrd.open_workbook(file_contents=content)
-            sheets_content = []
-
-            for sheet_index in range(workbook.nsheets):
-                sheet = workbook.sheet_by_index(sheet_index)
-                sheet_name = workbook.sheet_names()[sheet_index]
-                sheet_data = []
-
-                for row_idx in range(sheet.nrows):
-                    row_data = []
-                    for col_idx in range(sheet.ncols):
-                        cell_value = sheet.cell_value(row_idx, col_idx)
-                        row_data.append(str(cell_value) if cell_value else "")
-
-                    if any(cell.strip() for cell in row_data):
-                        sheet_data.append(" | ".join(row_data))
-
-                if sheet_data:
-                    sheets_content.append(
-                        f"Sheet: {sheet_name}\n" + "\n".join(sheet_data)
-                    )
-
-            full_text = "\n\n".join(sheets_content)
-
-            return {
-                "text": full_text,
-                "sheets": workbook.nsheets,
-                "sheet_names": workbook.sheet_names(),
-                "word_count": len(full_text.split()),
-                "document_type": "excel_legacy_document",
-            }
+            return await self._extract(extract_xls, content)
 
         except Exception as e:
             raise DocumentProcessorError(
                 f"Failed to process legacy Excel file: {str(e)}"
             )
 
-    async def _process_pptx(self, content: bytes, filename: str) -> Dict[str, Any]:
-        """Process PowerPoint presentation (.pptx)"""
+    async def _process_pptx(
+        self, content: Union[bytes, str], filename: str
+    ) -> Dict[str, Any]:
+        """Process PowerPoint presentation (.pptx) from bytes or a file path"""
         if Presentation is None:
             raise DocumentProcessorError("python-pptx not installed")
 
         try:
-            prs = Presentation(io.BytesIO(content))
-            slides_content = []
-
-            for slide_idx, slide in enumerate(prs.slides, 1):
-                slide_text = []
-
-                # Extract text from shapes
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        slide_text.append(shape.text)
-
-                if slide_text:
-                    slides_content.append(
-                        f"Slide {slide_idx}:\n" + "\n".join(slide_text)
-                    )
-
-            full_text = "\n\n".join(slides_content)
-
-            return {
-                "text": full_text,
-                "slides": len(prs.slides),
-                "word_count": len(full_text.split()),
-                "document_type": "powerpoint_document",
-            }
+            return await self._extract(extract_pptx, content)
 
         except Exception as e:
             raise DocumentProcessorError(f"Failed to process PowerPoint file: {str(e)}")
@@ -409,43 +610,63 @@ class DocumentProcessor:
         try:
             encoding = self._detect_encoding(content)
             text_content = content.decode(encoding, errors="replace")
+            return self._text_result(text_content, filename, encoding)
 
-            # Detect file type based on extension
-            file_path = Path(filename)
-            extension = file_path.suffix.lower()
-
-            document_types = {
-                ".txt": "text_document",
-                ".log": "log_file",
-                ".py": "python_source",
-                ".js": "javascript_source",
-                ".java": "java_source",
-                ".cpp": "cpp_source",
-                ".c": "c_source",
-                ".h": "header_file",
-                ".cs": "csharp_source",
-                ".php": "php_source",
-                ".rb": "ruby_source",
-                ".go": "go_source",
-                ".rs": "rust_source",
-                ".ts": "typescript_source",
-                ".sh": "shell_script",
-                ".sql": "sql_script",
-                ".css": "css_stylesheet",
-            }
+        except Exception as e:
+            raise DocumentProcessorError(f"Failed to process text file: {str(e)}")
 
-            return {
-                "text": text_content,
-                "lines": len(text_content.splitlines()),
-                "word_count": len(text_content.split()),
-                "character_count": len(text_content),
-                "document_type": document_types.get(extension, "text_document"),
-                "encoding": encoding,
-            }
+    def _process_text_stream(
+        self, upload: SpooledUpload, filename: str, max_text_chars: Optional[int]
+    ) -> Dict[str, Any]:
+        """Process a spooled text file, keeping at most max_text_chars (blocking)"""
+        try:
+            text_content, encoding, total_chars = upload.read_text(
+                max_text_chars, read_chars=_TEXT_READ_CHARS
+            )
+            result = self._text_result(text_content, filename, encoding)
+            if total_chars > len(text_content):
+                result["truncated"] = True
+                result["original_length"] = total_chars
+            return result
 
         except Exception as e:
             raise DocumentProcessorError(f"Failed to process text file: {str(e)}")
 
+    @staticmethod
+    def _text_result(text_content: str, filename: str, encoding: str) -> Dict[str, Any]:
+        # Detect file type based on extension
+        file_path = Path(filename)
+        extension = file_path.suffix.lower()
+
+        document_types = {
+            ".txt": "text_document",
+            ".log": "log_file",
+            ".py": "python_source",
+            ".js": "javascript_source",
+            ".java": "java_source",
+            ".cpp": "cpp_source",
+            ".c": "c_source",
+            ".h": "header_file",
+            ".cs": "csharp_source",
+            ".php": "php_source",
+            ".rb": "ruby_source",
+            ".go": "go_source",
+            ".rs": "rust_source",
+            ".ts": "typescript_source",
+            ".sh": "shell_script",
+            ".sql": "sql_script",
+            ".css": "css_stylesheet",
+        }
+
+        return {
+            "text": text_content,
+            "lines": len(text_content.splitlines()),
+            "word_count": len(text_content.split()),
+            "character_count": len(text_content),
+            "document_type": document_types.get(extension, "text_document"),
+            "encoding": encoding,
+        }
+
     async def _process_markdown(self, content: bytes, filename: str) -> Dict[str, Any]:
         """Process Markdown files"""
         try:
@@ -694,111 +915,200 @@ class DocumentProcessor:
         """Process CSV/TSV files"""
         try:
             encoding = self._detect_encoding(content)
-            csv_content = content.decode(encoding, errors="replace")
-
-            # Detect delimiter
-            delimiter = "\t" if filename.endswith(".tsv") else ","
-
-            # Use csv.Sniffer to detect delimiter if not TSV
-            if not filename.endswith(".tsv"):
-                try:
-                    sniffer = csv.Sniffer()
-                    delimiter = sniffer.sniff(csv_content[:1024]).delimiter
-                except Exception:
-                    delimiter = ","  # fallback to comma
-
-            lines = csv_content.splitlines()
-            if not lines:
-                return {
-                    "text": csv_content,
-                    "rows": 0,
-                    "columns": 0,
-                    "document_type": "csv_document",
-                    "encoding": encoding,
-                }
+            return self._parse_csv(io.BytesIO(content), encoding, filename, None)
 
-            # Use csv.reader for proper parsing
-            reader = csv.reader(io.StringIO(csv_content), delimiter=delimiter)
-            rows = list(reader)
-
-            if not rows:
-                return {
-                    "text": csv_content,
-                    "rows": 0,
-                    "columns": 0,
-                    "document_type": "csv_document",
-                    "encoding": encoding,
-                }
+        except Exception as e:
+            raise DocumentProcessorError(f"Failed to process CSV file: {str(e)}")
 
-            # Count columns from first row
-            columns = len(rows[0]) if rows else 0
+    def _process_csv_stream(
+        self, upload: SpooledUpload, filename: str, max_text_chars: Optional[int]
+    ) -> Dict[str, Any]:
+        """Process a spooled CSV/TSV file row by row (blocking)"""
+        try:
+            with upload.open() as raw:
+                return self._parse_csv(
+                    raw, upload.sniff_encoding(), filename, max_text_chars
+                )
 
-            # Create readable format
-            readable_lines = []
-            for i, row in enumerate(rows[:20]):  # Limit to first 20 rows for analysis
-                if any(cell.strip() for cell in row):  # Skip empty rows
-                    readable_lines.append(f"Row {i+1}: " + " | ".join(row))
+        except Exception as e:
+            raise DocumentProcessorError(f"Failed to process CSV file: {str(e)}")
 
-            if len(rows) > 20:
-                readable_lines.append(f"... and {len(rows) - 20} more rows")
+    def _parse_csv(
+        self,
+        raw: BinaryIO,
+        encoding: str,
+        filename: str,
+        max_text_chars: Optional[int],
+    ) -> Dict[str, Any]:
+        """行をストリーミングで読み、行数・列数と先頭20行の要約を作る"""
+        reader = io.TextIOWrapper(raw, encoding=encoding, errors="replace", newline="")
 
-            readable_text = "\n".join(readable_lines)
+        # Detect delimiter
+        delimiter = "\t" if filename.endswith(".tsv") else ","
 
+        # Use csv.Sniffer to detect delimiter if not TSV
+        if not filename.endswith(".tsv"):
+            try:
+                sniffer = csv.Sniffer()
+                delimiter = sniffer.sniff(reader.read(1024)).delimiter
+            except Exception:
+                delimiter = ","  # fallback to comma
+            reader.seek(0)
+
+        text_parts: List[str] = []
+        kept_chars = 0
+        total_chars = 0
+
+        def lines():
+            # csv.reader に渡しつつ、本文は max_text_chars までだけ保持する
+            nonlocal kept_chars, total_chars
+            for line in reader:
+                total_chars += len(line)
+                if max_text_chars is None:
+                    text_parts.append(line)
+                elif kept_chars < max_text_chars:
+                    kept = line[: max_text_chars - kept_chars]
+                    text_parts.append(kept)
+                    kept_chars += len(kept)
+                yield line
+
+        rows = 0
+        columns = 0
+        readable_lines = []
+        for row in csv.reader(lines(), delimiter=delimiter):
+            if rows == 0:
+                # Count columns from first row
+                columns = len(row)
+            # Limit to first 20 rows for analysis
+            if rows < 20 and any(cell.strip() for cell in row):  # Skip empty rows
+                readable_lines.append(f"Row {rows + 1}: " + " | ".join(row))
+            rows += 1
+        reader.detach()
+
+        csv_content = "".join(text_parts)
+        if rows == 0:
             return {
                 "text": csv_content,
-                "readable_text": readable_text,
-                "rows": len(rows),
-                "columns": columns,
-                "delimiter": delimiter,
-                "word_count": len(readable_text.split()),
+                "rows": 0,
+                "columns": 0,
                 "document_type": "csv_document",
                 "encoding": encoding,
             }
 
-        except Exception as e:
-            raise DocumentProcessorError(f"Failed to process CSV file: {str(e)}")
+        if rows > 20:
+            readable_lines.append(f"... and {rows - 20} more rows")
+
+        readable_text = "\n".join(readable_lines)
+
+        result = {
+            "text": csv_content,
+            "readable_text": readable_text,
+            "rows": rows,
+            "columns": columns,
+            "delimiter": delimiter,
+            "word_count": len(readable_text.split()),
+            "document_type": "csv_document",
+            "encoding": encoding,
+        }
+        if total_chars > len(csv_content):
+            result["truncated"] = True
+            result["original_length"] = total_chars
+        return result
 
     async def process_document_with_chunking(
         self,
-        file_content: bytes,
+        file_content: DocumentContent,
         filename: str,
         content_type: Optional[str] = None,
         target_provider: str = "groq",
+        progress: Optional[ProgressCallback] = None,
+        max_text_chars: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Process document with intelligent chunking for AI analysis
 
         Args:
-            file_content: Raw file content as bytes
+            file_content: Raw file content as bytes, or a SpooledUpload
             filename: Original filename
             content_type: MIME content type
             target_provider: Target AI provider for optimization
+            progress: Called with progress events (see process_document)
+            max_text_chars: Keep at most this many characters of text
 
         Returns:
             Processed document with chunked content
         """
         try:
-            # 基本的な文書処理
-            result = await self.process_document(file_content, filename, content_type)
-
-            # プロバイダーに応じたチャンクサイズ調整
+            # プロバイダーに応じたチャンクサイズ（トークン数）とトークナイザー
             chunk_size = self._get_optimal_chunk_size(target_provider)
-
-            # テキストをチャンクに分割
-            chunks = self._create_intelligent_chunks(
-                result["text"], chunk_size, filename
+            tokenizer = self._get_chunk_tokenizer(target_provider)
+            file_extension = Path(filename).suffix.lower()
+
+            cache_key = None
+            sha256 = None
+            if self.cache is not None and file_extension in self.supported_formats:
+                sha256 = await self._content_sha256(file_content)
+                cache_key = self.cache.make_key(
+                    sha256,
+                    file_extension,
+                    self._effective_text_cap(
+                        file_content, file_extension, max_text_chars
+                    ),
+                    f"{chunk_size}+{self.chunk_overlap}@{tokenizer.name}",
+                )
+                cached = await asyncio.to_thread(self.cache.get, cache_key)
+            else:
+                cached = None
+
+            # 基本的な文書処理（抽出結果のキャッシュも使う）
+            result = await self._process_document(
+                file_content,
+                filename,
+                content_type,
+                progress,
+                max_text_chars,
+                cache_sha256=sha256,
             )
+            text = result["text"]
+
+            # チャンクのキャッシュは位置とトークン数だけを持ち、本文は抽出結果から切り出す
+            spans = cached["chunks"] if cached is not None else None
+            if spans is not None and any(end > len(text) for _, end, _ in spans):
+                logger.warning(f"Cached chunk offsets do not match {filename}")
+                spans = None
+            if spans is None:
+                # テキストをチャンクに分割（長文は数百ms かかるためスレッドで）
+                started = time.perf_counter()
+                chunks = await asyncio.to_thread(
+                    self._create_intelligent_chunks,
+                    text,
+                    chunk_size,
+                    filename,
+                    tokenizer,
+                )
+                spans = [(c.start, c.end, c.token_count) for c in chunks]
+                if cache_key is not None:
+                    await asyncio.to_thread(
+                        self.cache.put,
+                        cache_key,
+                        {"chunks": spans},
+                        time.perf_counter() - started,
+                    )
 
             # 各チャンクにメタデータ付与
             processed_chunks = []
-            for i, chunk in enumerate(chunks):
+            for i, (start, end, token_count) in enumerate(spans):
+                content = text[start:end]
                 processed_chunks.append(
                     {
                         "chunk_id": i + 1,
-                        "content": chunk,
-                        "word_count": len(chunk.split()),
-                        "char_count": len(chunk),
-                        "position": f"{i + 1}/{len(chunks)}",
+                        "content": content,
+                        "word_count": len(content.split()),
+                        "char_count": len(content),
+                        "token_count": token_count,
+                        "start": start,
+                        "end": end,
+                        "position": f"{i + 1}/{len(spans)}",
                     }
                 )
 
@@ -806,8 +1116,11 @@ class DocumentProcessor:
             result.update(
                 {
                     "chunks": processed_chunks,
-                    "total_chunks": len(chunks),
+                    "total_chunks": len(processed_chunks),
                     "chunk_size": chunk_size,
+                    "chunk_unit": "tokens",
+                    "chunk_overlap": self.chunk_overlap,
+                    "tokenizer": tokenizer.name,
                     "chunking_method": "intelligent",
                     "optimized_for": target_provider,
                 }
@@ -820,152 +1133,59 @@ class DocumentProcessor:
             raise DocumentProcessorError(f"Document chunking failed: {str(e)}")
 
     def _get_optimal_chunk_size(self, provider: str) -> int:
-        """プロバイダーに応じた最適なチャンクサイズを決定"""
+        """プロバイダーに応じた最適なチャンクサイズ（トークン数）を決定"""
         provider_limits = {
-            "groq": 3000,  # Groqは短めに
-            "openai": 8000,  # OpenAIは中程度
-            "claude": 12000,  # Claudeは長めに
-            "gemini": 20000,  # Geminiは最大
+            "groq": 2000,  # Groqは短めに
+            "openai": 6000,  # OpenAIは中程度
+            "claude": 8000,  # Claudeは長めに
+            "gemini": 16000,  # Geminiは最大
         }
-        return provider_limits.get(provider.lower(), 4000)
+        return provider_limits.get(provider.lower(), 3000)
+
+    def _get_chunk_tokenizer(self, provider: str) -> Tokenizer:
+        """
+        トークナイザーを決定（DOCUMENT_CHUNK_TOKENIZER_<PROVIDER> →
+        DOCUMENT_CHUNK_TOKENIZER → 概算）
+        """
+        return get_tokenizer(
+            os.getenv(f"DOCUMENT_CHUNK_TOKENIZER_{provider.upper()}")
+            or os.getenv("DOCUMENT_CHUNK_TOKENIZER", "estimate")
+        )
 
     def _create_intelligent_chunks(
-        self, text: str, chunk_size: int, filename: str
-    ) -> List[str]:
+        self,
+        text: str,
+        chunk_size: int,
+        filename: str,
+        tokenizer: Optional[Tokenizer] = None,
+    ) -> List[TextChunk]:
         """
         文書の構造を考慮したインテリジェントなチャンク分割
-        """
-        chunks = []
 
+        chunk_size はトークン数。各チャンクは元テキスト上の (start, end) を持つ。
+        """
         # ファイルタイプに応じた分割戦略
         file_extension = Path(filename).suffix.lower()
 
         if file_extension in [".md", ".txt"]:
             # マークダウン・テキストファイルは見出しで分割
-            chunks = self._split_by_headings(text, chunk_size)
+            strategy = "headings"
         elif file_extension in [".pdf", ".docx"]:
             # PDF・Wordは段落で分割
-            chunks = self._split_by_paragraphs(text, chunk_size)
+            strategy = "paragraphs"
         elif file_extension in [".py", ".js", ".java"]:
             # ソースコードは関数・クラス単位で分割
-            chunks = self._split_by_code_blocks(text, chunk_size)
+            strategy = "code"
         else:
             # その他は汎用的な分割
-            chunks = self._split_by_sentences(text, chunk_size)
-
-        return chunks
-
-    def _split_by_headings(self, text: str, chunk_size: int) -> List[str]:
-        """見出し単位での分割"""
-        chunks = []
-        current_chunk = ""
-
-        for line in text.split("\n"):
-            # 見出しを検出（#で始まる行）
-            if line.strip().startswith("#") and current_chunk:
-                if len(current_chunk) > chunk_size:
-                    # 大きすぎる場合は文単位で再分割
-                    chunks.extend(self._split_by_sentences(current_chunk, chunk_size))
-                else:
-                    chunks.append(current_chunk.strip())
-                current_chunk = line + "\n"
-            else:
-                current_chunk += line + "\n"
-
-                # チャンクサイズ超過時は強制分割
-                if len(current_chunk) > chunk_size * 1.5:
-                    chunks.extend(self._split_by_sentences(current_chunk, chunk_size))
-                    current_chunk = ""
-
-        # 最後のチャンクを追加
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-
-        return chunks
-
-    def _split_by_paragraphs(self, text: str, chunk_size: int) -> List[str]:
-        """段落単位での分割"""
-        chunks = []
-        current_chunk = ""
-
-        paragraphs = text.split("\n\n")
-
-        for paragraph in paragraphs:
-            if len(current_chunk + paragraph) > chunk_size and current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = paragraph + "\n\n"
-            else:
-                current_chunk += paragraph + "\n\n"
-
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-
-        return chunks
-
-    def _split_by_code_blocks(self, text: str, chunk_size: int) -> List[str]:
-        """コードブロック単位での分割"""
-        chunks = []
-        current_chunk = ""
-
-        lines = text.split("\n")
-        current_function = ""
-
-        for line in lines:
-            # 関数・クラス定義を検出
-            if (
-                line.strip().startswith("def ")
-                or line.strip().startswith("class ")
-                or line.strip().startswith("function ")
-            ):
-
-                if current_chunk and len(current_chunk) > chunk_size:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = line + "\n"
-                else:
-                    current_chunk += line + "\n"
-            else:
-                current_chunk += line + "\n"
-
-                if len(current_chunk) > chunk_size * 1.5:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = ""
-
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-
-        return chunks
-
-    def _split_by_sentences(self, text: str, chunk_size: int) -> List[str]:
-        """文単位での分割（汎用）"""
-        chunks = []
-        current_chunk = ""
-
-        # 日本語の文区切り文字
-        sentence_endings = ["。", "！", "？", ".\n", "!\n", "?\n"]
-
-        sentences = []
-        current_sentence = ""
-
-        for char in text:
-            current_sentence += char
-            if any(current_sentence.endswith(ending) for ending in sentence_endings):
-                sentences.append(current_sentence.strip())
-                current_sentence = ""
-
-        if current_sentence.strip():
-            sentences.append(current_sentence.strip())
-
-        for sentence in sentences:
-            if len(current_chunk + sentence) > chunk_size and current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = sentence + " "
-            else:
-                current_chunk += sentence + " "
-
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-
-        return chunks
+            strategy = "sentences"
+
+        chunker = TextChunker(
+            tokenizer=tokenizer,
+            max_tokens=chunk_size,
+            overlap_tokens=self.chunk_overlap,
+        )
+        return chunker.chunk(text, strategy)
 
 
 # Global document processor instance
@@ -3,8 +3,6 @@ Email Service for Roleplay Reminder System
 営業ロールプレイリマインダーメール配信サービス
 """
 
-import smtplib
-import ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
@@ -19,6 +17,11 @@ from pathlib import Path
 import jinja2
 from jinja2 import Template
 
+try:
+    from services.smtp_pool import SmtpConnectionPool
+except ImportError:
+    from app.services.smtp_pool import SmtpConnectionPool
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,6 +36,7 @@ class EmailConfig:
     from_email: str
     from_name: str = "営業ロールプレイシステム"
     use_tls: bool = True
+    require_auth: bool = True  # ローカルのSMTPリレー（aiosmtpd等）では False
 
 
 @dataclass
@@ -59,7 +63,8 @@ class EmailService:
             config_path: Path to email configuration file
         """
         self.config_path = Path(config_path)
-        self.config: Optional[EmailConfig] = None
+        self._smtp_pool: Optional[SmtpConnectionPool] = None
+        self._config: Optional[EmailConfig] = None
         self.templates_path = Path("app/templates/email")
 
         # Create directories
@@ -77,6 +82,16 @@ class EmailService:
 
         logger.info("Email service initialized")
 
+    @property
+    def config(self) -> Optional[EmailConfig]:
+        return self._config
+
+    @config.setter
+    def config(self, config: Optional[EmailConfig]) -> None:
+        """設定を差し替え、古い設定の接続プールを閉じる（次の送信で作り直す）"""
+        self._config = config
+        self.close()
+
     def _load_config(self) -> None:
         """設定ファイルを読み込み"""
         try:
@@ -101,6 +116,7 @@ class EmailService:
             "from_email": "",
             "from_name": "営業ロールプレイシステム",
             "use_tls": True,
+            "require_auth": True,
         }
 
         try:
@@ -288,35 +304,66 @@ class EmailService:
 <p style="color: #e74c3c;"><strong>注意：</strong>今日を逃すと連続記録がリセットされます。たった10分で継続できます！</p>
 {% endblock %}"""
 
+    def is_configured(self) -> bool:
+        """送信に必要な設定が揃っているか"""
+        if not self.config or not self.config.smtp_server:
+            return False
+        if self.config.require_auth:
+            return bool(self.config.username and self.config.password)
+        return True
+
+    def get_smtp_pool(self) -> SmtpConnectionPool:
+        """設定に対応するSMTP接続プールを返す（初回呼び出し時に作成）"""
+        if self._smtp_pool is None:
+            self._smtp_pool = SmtpConnectionPool(
+                host=self.config.smtp_server,
+                port=self.config.smtp_port,
+                username=self.config.username if self.config.require_auth else "",
+                password=self.config.password,
+                use_tls=self.config.use_tls,
+                max_connections=int(os.getenv("SMTP_POOL_SIZE", "4")),
+                idle_timeout=float(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", "60")),
+                max_messages_per_connection=int(
+                    os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100")
+                ),
+                timeout=float(os.getenv("SMTP_TIMEOUT_SECONDS", "30")),
+            )
+        return self._smtp_pool
+
+    def build_reminder_message(self, reminder: ReminderEmail) -> MIMEMultipart:
+        """リマインダーメールのMIMEメッセージを組み立てる"""
+        # テンプレート選択
+        template_name = f"{reminder.reminder_type}_reminder.html"
+        template = self.jinja_env.get_template(template_name)
+
+        # HTML コンテンツ生成
+        html_content = template.render(
+            user_name=reminder.user_name,
+            last_roleplay_date=reminder.last_roleplay_date,
+            streak_count=reminder.streak_count,
+            improvement_points=reminder.improvement_points,
+            personalized_message=reminder.personalized_message,
+        )
+
+        # メッセージ作成
+        message = MIMEMultipart("alternative")
+        message["Subject"] = self._get_subject(reminder.reminder_type)
+        message["From"] = f"{self.config.from_name} <{self.config.from_email}>"
+        message["To"] = reminder.user_email
+
+        # HTML パート追加
+        html_part = MIMEText(html_content, "html", "utf-8")
+        message.attach(html_part)
+        return message
+
     async def send_reminder_email(self, reminder: ReminderEmail) -> bool:
         """リマインダーメールを送信"""
-        if not self.config or not self.config.username or not self.config.password:
+        if not self.is_configured():
             logger.warning("Email configuration not complete. Cannot send emails.")
             return False
 
         try:
-            # テンプレート選択
-            template_name = f"{reminder.reminder_type}_reminder.html"
-            template = self.jinja_env.get_template(template_name)
-
-            # HTML コンテンツ生成
-            html_content = template.render(
-                user_name=reminder.user_name,
-                last_roleplay_date=reminder.last_roleplay_date,
-                streak_count=reminder.streak_count,
-                improvement_points=reminder.improvement_points,
-                personalized_message=reminder.personalized_message,
-            )
-
-            # メッセージ作成
-            message = MIMEMultipart("alternative")
-            message["Subject"] = self._get_subject(reminder.reminder_type)
-            message["From"] = f"{self.config.from_name} <{self.config.from_email}>"
-            message["To"] = reminder.user_email
-
-            # HTML パート追加
-            html_part = MIMEText(html_content, "html", "utf-8")
-            message.attach(html_part)
+            message = self.build_reminder_message(reminder)
 
             # SMTP送信
             return await self._send_email(message, reminder.user_email)
@@ -334,22 +381,16 @@ class EmailService:
         }
         return subjects.get(reminder_type, "営業ロールプレイリマインダー")
 
+    async def deliver_message(self, message: MIMEMultipart, to_email: str) -> None:
+        """プール済み接続で送信する（失敗時は例外を送出し、再試行は呼び出し側で行う）"""
+        await self.get_smtp_pool().send_message(
+            message, self.config.from_email, to_email
+        )
+
     async def _send_email(self, message: MIMEMultipart, to_email: str) -> bool:
         """実際のメール送信"""
         try:
-            # SMTP接続
-            context = ssl.create_default_context()
-
-            with smtplib.SMTP(self.config.smtp_server, self.config.smtp_port) as server:
-                if self.config.use_tls:
-                    server.starttls(context=context)
-
-                server.login(self.config.username, self.config.password)
-
-                # メール送信
-                text = message.as_string()
-                server.sendmail(self.config.from_email, to_email, text)
-
+            await self.deliver_message(message, to_email)
             logger.info(f"Email sent successfully to {to_email}")
             return True
 
@@ -362,23 +403,26 @@ class EmailService:
         if not self.config:
             return {"success": False, "error": "Email configuration not loaded"}
 
-        if not self.config.username or not self.config.password:
+        if not self.is_configured():
             return {"success": False, "error": "Email credentials not configured"}
 
         try:
-            context = ssl.create_default_context()
-
-            with smtplib.SMTP(self.config.smtp_server, self.config.smtp_port) as server:
-                if self.config.use_tls:
-                    server.starttls(context=context)
-
-                server.login(self.config.username, self.config.password)
-
+            await self.get_smtp_pool().check_connection()
             return {"success": True, "message": "Email connection successful"}
 
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def get_smtp_metrics(self) -> Optional[Dict[str, Any]]:
+        """SMTP接続プールのメトリクス（未使用なら None）"""
+        return self._smtp_pool.get_metrics() if self._smtp_pool else None
+
+    def close(self) -> None:
+        """SMTP接続プールを閉じる"""
+        pool, self._smtp_pool = self._smtp_pool, None
+        if pool is not None:
+            pool.close()
+
 
 # Dependency injection
 _email_service: Optional[EmailService] = None
@@ -390,3 +434,9 @@ def get_email_service() -> EmailService:
     if _email_service is None:
         _email_service = EmailService()
     return _email_service
+
+
+def shutdown_email_service() -> None:
+    """Close pooled SMTP connections (called from the application lifespan)"""
+    if _email_service is not None:
+        _email_service.close()
@@ -9,6 +9,11 @@ from dataclasses import dataclass
 from enum import Enum
 import logging
 
+try:
+    from services.phrase_matcher import PhraseMatches, phrase_registry
+except ImportError:
+    from app.services.phrase_matcher import PhraseMatches, phrase_registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -261,8 +266,35 @@ class FriendlinessAnalyzer:
             "enthusiasm": ["ぜひ", "きっと", "必ず", "絶対", "間違いなく"],
         }
 
+        # 全辞書を共有オートマトンに登録（テキストは分析ごとに1回だけ走査する）
+        phrase_registry.register_dictionary(
+            "friendliness.warmth",
+            {k: v["patterns"] for k, v in self.warmth_expressions.items()},
+        )
+        phrase_registry.register_dictionary(
+            "friendliness.distance",
+            {k: v["patterns"] for k, v in self.distance_expressions.items()},
+        )
+        phrase_registry.register_dictionary(
+            "friendliness.empathy", self.empathy_expressions
+        )
+        phrase_registry.register_dictionary(
+            "friendliness.natural", self.natural_expressions
+        )
+        phrase_registry.register_dictionary(
+            "friendliness.emotion", self.emotional_expressions
+        )
+
+    @staticmethod
+    def _scan(text: str, matches: Optional[PhraseMatches]) -> PhraseMatches:
+        return matches if matches is not None else phrase_registry.scan(text)
+
     def analyze_friendliness(
-        self, text: str, context: str = "sales", customer_relationship: str = "new"
+        self,
+        text: str,
+        context: str = "sales",
+        customer_relationship: str = "new",
+        matches: Optional[PhraseMatches] = None,
     ) -> FriendlinessAnalysis:
         """
         親しみやすさの総合分析
@@ -271,25 +303,33 @@ class FriendlinessAnalyzer:
             text: 分析対象テキスト
             context: 文脈（sales, meeting, negotiation）
             customer_relationship: 顧客との関係性（new, existing, long_term）
+            matches: 走査済みのフレーズ一致（他の分析器と共有する場合）
         """
+        matches = self._scan(text, matches)
 
         # 1. 温かみ指標の分析
-        warmth_score, warmth_indicators = self._analyze_warmth(text)
+        warmth_score, warmth_indicators = self._analyze_warmth(text, matches)
 
         # 2. 距離感指標の分析
-        distance_score, distance_indicators = self._analyze_distance(text)
+        distance_score, distance_indicators = self._analyze_distance(text, matches)
 
         # 3. 共感・理解表現の分析
-        empathy_score, empathy_indicators = self._analyze_empathy(text)
+        empathy_score, empathy_indicators = self._analyze_empathy(text, matches)
 
         # 4. 自然さの分析
-        naturalness_score, naturalness_indicators = self._analyze_naturalness(text)
+        naturalness_score, naturalness_indicators = self._analyze_naturalness(
+            text, matches
+        )
 
         # 5. 感情表現の分析
-        emotion_score, emotion_indicators = self._analyze_emotional_expression(text)
+        emotion_score, emotion_indicators = self._analyze_emotional_expression(
+            text, matches
+        )
 
         # 6. 問題の検出
-        issues = self._detect_friendliness_issues(text, context, customer_relationship)
+        issues = self._detect_friendliness_issues(
+            text, context, customer_relationship, matches
+        )
 
         # 7. 総合スコア計算
         overall_score = self._calculate_friendliness_score(
@@ -325,8 +365,11 @@ class FriendlinessAnalyzer:
             recommendations=recommendations,
         )
 
-    def _analyze_warmth(self, text: str) -> Tuple[float, List[str]]:
+    def _analyze_warmth(
+        self, text: str, matches: Optional[PhraseMatches] = None
+    ) -> Tuple[float, List[str]]:
         """温かみの分析"""
+        matches = self._scan(text, matches)
         warmth_score = 0.0
         found_indicators = []
 
@@ -335,7 +378,7 @@ class FriendlinessAnalyzer:
             category_indicators = []
 
             for pattern in data["patterns"]:
-                if pattern in text:
+                if pattern in matches:
                     category_score += 1
                     category_indicators.append(pattern)
 
@@ -351,21 +394,27 @@ class FriendlinessAnalyzer:
 
         return min(1.0, warmth_score), found_indicators
 
-    def _analyze_distance(self, text: str) -> Tuple[float, List[str]]:
+    def _analyze_distance(
+        self, text: str, matches: Optional[PhraseMatches] = None
+    ) -> Tuple[float, List[str]]:
         """距離感の分析（低いほど良い）"""
+        matches = self._scan(text, matches)
         distance_score = 0.0
         found_indicators = []
 
         for category, data in self.distance_expressions.items():
             for pattern in data["patterns"]:
-                if pattern in text:
+                if pattern in matches:
                     distance_score += data["severity"] * 0.1  # 重み調整
                     found_indicators.append(pattern)
 
         return min(1.0, distance_score), found_indicators
 
-    def _analyze_empathy(self, text: str) -> Tuple[float, List[str]]:
+    def _analyze_empathy(
+        self, text: str, matches: Optional[PhraseMatches] = None
+    ) -> Tuple[float, List[str]]:
         """共感・理解表現の分析"""
+        matches = self._scan(text, matches)
         empathy_score = 0.0
         found_indicators = []
 
@@ -376,15 +425,18 @@ class FriendlinessAnalyzer:
 
         for category, patterns in self.empathy_expressions.items():
             for pattern in patterns:
-                if pattern in text:
+                if pattern in matches:
                     found_patterns += 1
                     found_indicators.append(pattern)
 
         empathy_score = found_patterns / total_patterns if total_patterns > 0 else 0.0
         return min(1.0, empathy_score), found_indicators
 
-    def _analyze_naturalness(self, text: str) -> Tuple[float, List[str]]:
+    def _analyze_naturalness(
+        self, text: str, matches: Optional[PhraseMatches] = None
+    ) -> Tuple[float, List[str]]:
         """自然さの分析"""
+        matches = self._scan(text, matches)
         naturalness_score = 0.0
         found_indicators = []
 
@@ -395,7 +447,7 @@ class FriendlinessAnalyzer:
 
         for category, patterns in self.natural_expressions.items():
             for pattern in patterns:
-                if pattern in text:
+                if pattern in matches:
                     found_patterns += 1
                     found_indicators.append(pattern)
 
@@ -404,8 +456,11 @@ class FriendlinessAnalyzer:
         )
         return min(1.0, naturalness_score), found_indicators
 
-    def _analyze_emotional_expression(self, text: str) -> Tuple[float, List[str]]:
+    def _analyze_emotional_expression(
+        self, text: str, matches: Optional[PhraseMatches] = None
+    ) -> Tuple[float, List[str]]:
         """感情表現の分析"""
+        matches = self._scan(text, matches)
         emotion_score = 0.0
         found_indicators = []
 
@@ -416,7 +471,7 @@ class FriendlinessAnalyzer:
 
         for category, patterns in self.emotional_expressions.items():
             for pattern in patterns:
-                if pattern in text:
+                if pattern in matches:
                     found_patterns += 1
                     found_indicators.append(pattern)
 
@@ -424,14 +479,19 @@ class FriendlinessAnalyzer:
         return min(1.0, emotion_score), found_indicators
 
     def _detect_friendliness_issues(
-        self, text: str, context: str, customer_relationship: str
+        self,
+        text: str,
+        context: str,
+        customer_relationship: str,
+        matches: Optional[PhraseMatches] = None,
     ) -> List[FriendlinessIssue]:
         """親しみやすさの問題を検出"""
+        matches = self._scan(text, matches)
         issues = []
 
         # 1. 過度に堅い表現の検出
         for category, data in self.distance_expressions.items():
-            found_patterns = [p for p in data["patterns"] if p in text]
+            found_patterns = [p for p in data["patterns"] if p in matches]
             if found_patterns:
                 issues.append(
                     FriendlinessIssue(
@@ -444,7 +504,7 @@ class FriendlinessAnalyzer:
                 )
 
         # 2. 温かみ不足の検出（閾値を下げて現実的に）
-        warmth_score, _ = self._analyze_warmth(text)
+        warmth_score, _ = self._analyze_warmth(text, matches)
         if warmth_score < 0.15:  # 0.3から0.15に下げる
             issues.append(
                 FriendlinessIssue(
@@ -457,7 +517,7 @@ class FriendlinessAnalyzer:
             )
 
         # 3. 共感表現不足の検出（閾値を下げて現実的に）
-        empathy_score, _ = self._analyze_empathy(text)
+        empathy_score, _ = self._analyze_empathy(text, matches)
         if empathy_score < 0.1:  # 0.2から0.1に下げる
             issues.append(
                 FriendlinessIssue(
@@ -0,0 +1,150 @@
+"""
+Shared HTTP client for Groq API
+Groq API向けのプロセス共有HTTPクライアント（コネクションプール・keep-alive・HTTP/2）
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+@dataclass
+class GroqClientStats:
+    """コネクション再利用の統計情報"""
+
+    requests: int = 0
+    new_connections: int = 0
+    http2_requests: int = 0
+    clients_created: int = 0
+
+
+class GroqClientPool:
+    """Groq API 呼び出しで共有する httpx.AsyncClient を管理する
+
+    httpx.AsyncClient はイベントループに紐づくため、ループが変わった場合
+    （スクリプトからの asyncio.run 等）はクライアントを作り直す。
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_GROQ_BASE_URL,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 30.0,
+        http2: bool = False,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        if http2 and not _http2_available():
+            logger.warning(
+                "GROQ_HTTP2 requested but 'h2' is not installed; using HTTP/1.1"
+            )
+            http2 = False
+        self.http2 = http2
+        self.stats = GroqClientStats()
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "GroqClientPool":
+        return cls(
+            base_url=os.getenv("GROQ_BASE_URL", DEFAULT_GROQ_BASE_URL),
+            max_connections=int(os.getenv("GROQ_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("GROQ_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "60")),
+            timeout=float(os.getenv("GROQ_TIMEOUT_SECONDS", "30")),
+            http2=os.getenv("GROQ_HTTP2", "false").lower() == "true",
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """現在のイベントループ用の共有クライアントを返す"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+            )
+            self._loop = loop
+            self.stats.clients_created += 1
+        return self._client
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        # 新規TCP接続の確立時のみ呼ばれるイベントで再利用率を算出する
+        if event_name == "connection.connect_tcp.complete":
+            self.stats.new_connections += 1
+
+    def request_extensions(self) -> Dict[str, Any]:
+        """リクエストごとに渡す httpx extensions（接続トレース用）"""
+        return {"trace": self._trace}
+
+    def record_response(self, response: httpx.Response) -> None:
+        self.stats.requests += 1
+        if response.http_version == "HTTP/2":
+            self.stats.http2_requests += 1
+
+    async def aclose(self) -> None:
+        """共有クライアントを閉じる（FastAPI lifespan の終了時に呼ぶ）"""
+        client, self._client, self._loop = self._client, None, None
+        if client is not None and not client.is_closed:
+            try:
+                await client.aclose()
+            except RuntimeError as e:
+                # 既に終了したイベントループに紐づくクライアント
+                logger.debug(f"Groq client close skipped: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        requests = self.stats.requests
+        reused = max(requests - self.stats.new_connections, 0)
+        return {
+            **asdict(self.stats),
+            "reused_connections": reused,
+            "reuse_rate": reused / requests if requests else 0.0,
+            "http2_enabled": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "base_url": self.base_url,
+        }
+
+
+# Global client pool
+_groq_client_pool: Optional[GroqClientPool] = None
+
+
+def get_groq_client_pool() -> GroqClientPool:
+    """Get or create the process-wide Groq client pool"""
+    global _groq_client_pool
+    if _groq_client_pool is None:
+        _groq_client_pool = GroqClientPool.from_env()
+    return _groq_client_pool
+
+
+async def shutdown_groq_client_pool() -> None:
+    """Close pooled connections (called from the application lifespan)"""
+    if _groq_client_pool is not None:
+        await _groq_client_pool.aclose()
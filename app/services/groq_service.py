@@ -1,20 +1,106 @@
 import os
+import re
+import json
 import httpx
-from typing import Dict, Any, Optional
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional
 import logging
 
+try:
+    from services.groq_client import GroqClientPool, get_groq_client_pool
+    from services.response_cache import SemanticResponseCache, estimate_tokens
+    from services.request_metrics import timed_stage
+except ImportError:
+    from app.services.groq_client import GroqClientPool, get_groq_client_pool
+    from app.services.response_cache import SemanticResponseCache, estimate_tokens
+    from app.services.request_metrics import timed_stage
+
 logger = logging.getLogger(__name__)
 
+# ストリーミング応答を文単位に区切る
+SENTENCE_END_PATTERN = re.compile(r"[。！？!?]")
+
+# sales_analysis の応答上限（これを超えると最初の1文に切り詰める）
+SALES_RESPONSE_MAX_CHARS = 80
+
+
+def truncate_sales_response(text: str) -> str:
+    """
+    上限を超える応答を最初の文末（。！？）で切り詰める
+
+    文末が1つもない場合だけ上限文字数で切る。
+    """
+    if len(text) <= SALES_RESPONSE_MAX_CHARS:
+        return text
+    match = SENTENCE_END_PATTERN.search(text)
+    if match:
+        return text[: match.end()]
+    return text[:SALES_RESPONSE_MAX_CHARS]
+
+# _build_sales_prompt を変更した場合はインクリメントする（応答キャッシュのキー）
+SALES_PROMPT_VERSION = "1"
+
+# 定型フォールバック応答（TTS音声キャッシュのウォームアップ対象）
+QUALITY_FALLBACK_RESPONSES = {
+    "pricing": "料金についてお聞かせいただき、ありがとうございます。お客様のご利用規模に応じた最適なプランをご提案させていただきます。",
+    "features": "機能についてご質問いただき、ありがとうございます。お客様のご要望に合わせて詳しくご説明させていただきます。",
+    "decision": "ご検討いただき、ありがとうございます。ご不明な点がございましたら、お気軽にお聞かせください。",
+    "busy": "お忙しい中、お時間をいただきありがとうございます。簡潔にご説明させていただきます。",
+    "default": "ありがとうございます。お客様のご要望について、詳しくお聞かせいただけますでしょうか。",
+}
+
+PROFESSIONAL_FALLBACK_RESPONSES = {
+    "pricing": "料金についてご質問いただき、ありがとうございます。お客様のご利用規模やご要望に応じて、最適なプランをご提案させていただきます。具体的な用途やご予算の範囲をお聞かせいただけますでしょうか？",
+    "features": "弊社サービスの機能についてご関心をお持ちいただき、ありがとうございます。お客様の業務効率化や課題解決に直結する様々な機能をご用意しております。特にどのような業務でのご活用をお考えでしょうか？",
+    "decision": "ご検討いただき、誠にありがとうございます。重要なご決定ですので、お客様が安心してお選びいただけるよう、しっかりとサポートさせていただきます。何かご不明な点やご懸念がございましたら、遠慮なくお聞かせください。",
+    "comparison": "他社様との比較検討をされているのですね。弊社の強みは、お客様一人ひとりのニーズに合わせたカスタマイズ性と、導入後の充実したサポート体制です。どのような点を最も重視されていますでしょうか？",
+    "problem": "課題についてお聞かせいただき、ありがとうございます。同様の課題を抱えていらしたお客様に対して、弊社では効果的なソリューションを提供し、大幅な改善を実現してまいりました。詳しい状況をお聞かせいただけますでしょうか？",
+    "timeline": "導入のタイミングについてですね。お客様のご都合に合わせて、最適なスケジュールをご提案いたします。ご希望の開始時期や、現在のシステムとの移行についてもご相談ください。",
+    "demo": "実際にご体験いただきたいとのこと、ありがとうございます！デモンストレーションでは、お客様の具体的な業務に合わせてご紹介いたします。どのような機能を重点的にご覧になりたいでしょうか？",
+    "greeting": "こんにちは！本日はお忙しい中、貴重なお時間をいただきありがとうございます。お客様のお役に立てるよう精一杯努めさせていただきます。どのようなことでご相談いただけますでしょうか？",
+    "default": "ありがとうございます。お客様のお話をより詳しくお聞かせいただけますでしょうか？お客様にとって最適なソリューションをご提案させていただくため、現在の状況やご要望について教えていただければと思います。",
+}
+
+# 会話処理で使用される定型応答
+GENERIC_FALLBACK_RESPONSES = ["申し訳ございません、もう一度お話しください。"]
+
+
+def get_fallback_phrases() -> List[str]:
+    """すべての定型フォールバック応答を重複なしで返す"""
+    phrases = [
+        *QUALITY_FALLBACK_RESPONSES.values(),
+        *PROFESSIONAL_FALLBACK_RESPONSES.values(),
+        *GENERIC_FALLBACK_RESPONSES,
+    ]
+    return list(dict.fromkeys(phrases))
+
+
+def _budget_reached(
+    text: str, max_sentences: Optional[int], max_chars: Optional[int]
+) -> bool:
+    visible = text.lstrip()
+    if max_chars is not None and len(visible) >= max_chars:
+        return True
+    if max_sentences is not None:
+        return len(SENTENCE_END_PATTERN.findall(visible)) >= max_sentences
+    return False
+
 
 class GroqService:
     """Groq API service for fast AI inference"""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        client_pool: Optional[GroqClientPool] = None,
+    ):
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
         if not self.api_key:
             raise ValueError("GROQ_API_KEY environment variable is required")
 
-        self.base_url = "https://api.groq.com/openai/v1"
+        # プロセス共有のコネクションプール（keep-alive / HTTP/2）
+        self.client_pool = client_pool or get_groq_client_pool()
+        self.base_url = self.client_pool.base_url
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -23,6 +109,12 @@ class GroqService:
         # 推奨モデル
         self.default_model = "llama-3.3-70b-versatile"
 
+        # sales_analysis の応答キャッシュ（SALES_CACHE_ENABLED=false で無効化）
+        self.response_cache: Optional[SemanticResponseCache] = None
+        if os.getenv("SALES_CACHE_ENABLED", "true").lower() == "true":
+            self.response_cache = SemanticResponseCache.from_env()
+
+    @timed_stage("llm")
     async def chat_completion(
         self,
         message: str,
@@ -42,21 +134,22 @@ class GroqService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=self.headers,
-                    json=payload,
-                )
-                response.raise_for_status()
-
-                result = response.json()
-                return {
-                    "response": result["choices"][0]["message"]["content"],
-                    "model": model,
-                    "usage": result.get("usage", {}),
-                    "provider": "groq",
-                }
+            response = await self.client_pool.client.post(
+                f"{self.base_url}/chat/completions",
+                headers=self.headers,
+                json=payload,
+                extensions=self.client_pool.request_extensions(),
+            )
+            self.client_pool.record_response(response)
+            response.raise_for_status()
+
+            result = response.json()
+            return {
+                "response": result["choices"][0]["message"]["content"],
+                "model": model,
+                "usage": result.get("usage", {}),
+                "provider": "groq",
+            }
 
         except httpx.HTTPError as e:
             logger.error(f"Groq API error: {e}")
@@ -65,11 +158,73 @@ class GroqService:
             logger.error(f"Unexpected error in Groq service: {e}")
             raise
 
-    async def sales_analysis(self, conversation_text: str) -> Dict[str, Any]:
-        """Enhanced sales conversation analysis with high-quality natural responses"""
+    async def stream_chat_completion(
+        self,
+        message: str,
+        model: Optional[str] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        max_sentences: Optional[int] = None,
+        max_chars: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Streaming chat completion using Groq API (yields content deltas)
+
+        max_sentences / max_chars を指定すると、予算に達した時点で
+        ストリームを閉じて上流の生成を打ち切る（不要なトークンを消費しない）。
+        先頭の空白は文字数に含めない。
+        """
+
+        model = model or self.default_model
+
+        payload = {
+            "model": model,
+            "messages": [{"role": "user", "content": message}],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+        }
+        text = ""
+
+        try:
+            async with self.client_pool.client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                headers=self.headers,
+                json=payload,
+                extensions=self.client_pool.request_extensions(),
+            ) as response:
+                self.client_pool.record_response(response)
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:") :].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    choices = chunk.get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if not delta:
+                        continue
+                    yield delta
+                    text += delta
+                    if _budget_reached(text, max_sentences, max_chars):
+                        logger.debug(
+                            f"Groq stream budget reached after {len(text)} chars; "
+                            "closing upstream"
+                        )
+                        break
+
+        except httpx.HTTPError as e:
+            logger.error(f"Groq API streaming error: {e}")
+            raise Exception(f"Groq API request failed: {e}")
+
+    def _build_sales_prompt(self, conversation_text: str) -> str:
+        """Build the sales roleplay prompt"""
 
         # HIGH QUALITY: Professional sales roleplay prompt with detailed context
-        prompt = f"""
+        return f"""
         あなたは経験豊富で親しみやすい営業担当者です。以下の顧客の発言に対して、自然で専門的な営業応答をしてください。
 
         顧客の発言: "{conversation_text[:200]}"
@@ -84,43 +239,165 @@ class GroqService:
         営業担当者として自然に応答してください：
         """
 
-        try:
-            # HIGH QUALITY: Balanced Groq call with quality parameters
-            result = await self.chat_completion(prompt, max_tokens=150, temperature=0.5)
-            response_text = result["response"].strip()
-
-            # Quality assurance: Ensure appropriate response length
-            if not response_text or len(response_text) < 20:
-                response_text = self._generate_quality_fallback(conversation_text)
-
-            # Quality control: Adjust length for natural conversation
-            if len(response_text) > 80:
-                # Truncate at sentence boundary if possible
-                sentences = response_text.split("。")
-                if len(sentences) > 1:
-                    response_text = sentences[0] + "。"
-                else:
-                    response_text = response_text[:80]
-
-            # Enhanced intent detection with business context
-            intent = self._detect_detailed_intent(conversation_text)
-            sentiment = self._analyze_customer_sentiment(conversation_text)
+    def _finalize_sales_response(
+        self, conversation_text: str, response_text: str
+    ) -> Dict[str, Any]:
+        """Apply quality control to a raw completion and attach intent/sentiment"""
+        response_text = response_text.strip()
 
-            return {
-                "response": response_text,
-                "intent": intent,
-                "sentiment": sentiment,
-                "confidence": 0.90,
-            }
+        # Quality assurance: Ensure appropriate response length
+        if not response_text or len(response_text) < 20:
+            response_text = self._generate_quality_fallback(conversation_text)
+
+        # Quality control: Adjust length for natural conversation
+        # Truncate at sentence boundary if possible
+        response_text = truncate_sales_response(response_text)
+
+        # Enhanced intent detection with business context
+        intent = self._detect_detailed_intent(conversation_text)
+        sentiment = self._analyze_customer_sentiment(conversation_text)
+
+        return {
+            "response": response_text,
+            "intent": intent,
+            "sentiment": sentiment,
+            "confidence": 0.90,
+        }
+
+    def _sales_analysis_fallback(self, conversation_text: str) -> Dict[str, Any]:
+        return {
+            "response": self._generate_quality_fallback(conversation_text),
+            "intent": "general_inquiry",
+            "sentiment": "neutral",
+            "confidence": 0.80,
+        }
+
+    async def sales_analysis(
+        self,
+        conversation_text: str,
+        use_cache: bool = True,
+        cache_scope: str = "",
+    ) -> Dict[str, Any]:
+        """Enhanced sales conversation analysis with high-quality natural responses
+
+        応答はストリーミングで受け取り、上限文字数を超えた時点で生成を打ち切る。
+        use_cache=False で応答キャッシュの参照をスキップする。
+        cache_scope（テナント/ユーザーID、cache_scope_for で作る）が異なる応答は
+        キャッシュで共有しない。
+        """
+        return await self.stream_sales_analysis(
+            conversation_text, use_cache=use_cache, cache_scope=cache_scope
+        )
+
+    async def stream_sales_sentences(
+        self, conversation_text: str
+    ) -> AsyncIterator[str]:
+        """
+        Stream the sales response sentence by sentence
+
+        Callers can start TTS on the first sentence while the rest is generated.
+        The joined sentences should be passed to _finalize_sales_response.
+
+        最終応答は truncate_sales_response で決まるため、上限を超えた時点で
+        文末が1つ以上あれば（最初の1文で確定）生成を打ち切る。文末がないまま
+        終わった場合は、上限で切った内容を1文として返す。
+        """
+        prompt = self._build_sales_prompt(conversation_text)
+        buffer = ""
+        received = ""
+        emitted = False
+        async with aclosing(
+            self.stream_chat_completion(prompt, max_tokens=150, temperature=0.5)
+        ) as deltas:
+            async for delta in deltas:
+                if not emitted:
+                    delta = delta if buffer else delta.lstrip()
+                buffer += delta
+                received += delta
+                while True:
+                    match = SENTENCE_END_PATTERN.search(buffer)
+                    if not match:
+                        break
+                    emitted = True
+                    yield buffer[: match.end()]
+                    buffer = buffer[match.end() :]
+                if emitted and len(received.strip()) > SALES_RESPONSE_MAX_CHARS:
+                    logger.debug(
+                        f"Sales response settled after {len(received)} chars; "
+                        "closing upstream"
+                    )
+                    break
+        if emitted:
+            # 打ち切った場合も、受け取った残り（文の途中）を含めて返す
+            if buffer:
+                yield buffer
+        elif buffer.strip():
+            yield truncate_sales_response(buffer.strip())
+
+    @timed_stage("llm")
+    async def stream_sales_analysis(
+        self,
+        conversation_text: str,
+        on_first_sentence: Optional[Callable[[str], None]] = None,
+        use_cache: bool = True,
+        cache_scope: str = "",
+    ) -> Dict[str, Any]:
+        """
+        sales_analysis と同じ結果を、ストリーミング応答から組み立てる
+
+        最初の1文が届いた時点で on_first_sentence を呼び出すため、
+        呼び出し側は応答全体を待たずに音声合成を開始できる。
+        キャッシュにヒットした場合は Groq を呼ばずに即座に返す。
+        """
+        cache = self.response_cache
+        if cache is not None:
+            if use_cache:
+                cached = cache.lookup(
+                    conversation_text, SALES_PROMPT_VERSION, cache_scope
+                )
+                if cached is not None:
+                    raw_response, match, similarity = cached
+                    result = self._finalize_sales_response(
+                        conversation_text, raw_response
+                    )
+                    result["cache"] = {
+                        "match": match,
+                        "similarity": round(similarity, 3),
+                    }
+                    return result
+            else:
+                cache.record_bypass()
+
+        sentences: List[str] = []
+        try:
+            async for sentence in self.stream_sales_sentences(conversation_text):
+                if not sentences and on_first_sentence is not None:
+                    on_first_sentence(sentence)
+                sentences.append(sentence)
 
         except Exception as e:
-            logger.error(f"Enhanced sales analysis error: {e}")
-            return {
-                "response": self._generate_quality_fallback(conversation_text),
-                "intent": "general_inquiry",
-                "sentiment": "neutral",
-                "confidence": 0.80,
-            }
+            logger.error(f"Streaming sales analysis error: {e}")
+            return self._sales_analysis_fallback(conversation_text)
+
+        raw_response = "".join(sentences)
+        if cache is not None and raw_response.strip():
+            tokens = estimate_tokens(
+                self._build_sales_prompt(conversation_text)
+            ) + estimate_tokens(raw_response)
+            # 個人情報を含む入力・応答はキャッシュ側で格納を見送る
+            cache.store(
+                conversation_text,
+                SALES_PROMPT_VERSION,
+                raw_response,
+                tokens,
+                scope=cache_scope,
+            )
+        return self._finalize_sales_response(conversation_text, raw_response)
+
+    def get_response_cache_metrics(self) -> Dict[str, Any]:
+        if self.response_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.response_cache.get_metrics()}
 
     def _generate_professional_fallback(self, conversation_text: str) -> str:
         """Generate professional contextual fallback responses for sales scenarios"""
@@ -131,35 +408,35 @@ class GroqService:
             keyword in text_lower
             for keyword in ["料金", "価格", "コスト", "費用", "値段", "予算"]
         ):
-            return "料金についてご質問いただき、ありがとうございます。お客様のご利用規模やご要望に応じて、最適なプランをご提案させていただきます。具体的な用途やご予算の範囲をお聞かせいただけますでしょうか？"
+            return PROFESSIONAL_FALLBACK_RESPONSES["pricing"]
 
         # Product/Service features with value proposition
         elif any(
             keyword in text_lower
             for keyword in ["機能", "サービス", "できる", "使える", "特徴", "メリット"]
         ):
-            return "弊社サービスの機能についてご関心をお持ちいただき、ありがとうございます。お客様の業務効率化や課題解決に直結する様々な機能をご用意しております。特にどのような業務でのご活用をお考えでしょうか？"
+            return PROFESSIONAL_FALLBACK_RESPONSES["features"]
 
         # Decision/Consideration phase with supportive approach
         elif any(
             keyword in text_lower
             for keyword in ["検討", "導入", "考えて", "悩んで", "決める", "選択"]
         ):
-            return "ご検討いただき、誠にありがとうございます。重要なご決定ですので、お客様が安心してお選びいただけるよう、しっかりとサポートさせていただきます。何かご不明な点やご懸念がございましたら、遠慮なくお聞かせください。"
+            return PROFESSIONAL_FALLBACK_RESPONSES["decision"]
 
         # Competitive comparison with differentiation
         elif any(
             keyword in text_lower
             for keyword in ["比較", "他社", "違い", "どっち", "選ぶ", "競合"]
         ):
-            return "他社様との比較検討をされているのですね。弊社の強みは、お客様一人ひとりのニーズに合わせたカスタマイズ性と、導入後の充実したサポート体制です。どのような点を最も重視されていますでしょうか？"
+            return PROFESSIONAL_FALLBACK_RESPONSES["comparison"]
 
         # Problems/Challenges with solution-focused approach
         elif any(
             keyword in text_lower
             for keyword in ["問題", "課題", "困って", "悩み", "トラブル", "改善"]
         ):
-            return "課題についてお聞かせいただき、ありがとうございます。同様の課題を抱えていらしたお客様に対して、弊社では効果的なソリューションを提供し、大幅な改善を実現してまいりました。詳しい状況をお聞かせいただけますでしょうか？"
+            return PROFESSIONAL_FALLBACK_RESPONSES["problem"]
 
         # Timeline/Implementation with practical approach
         elif any(
@@ -173,25 +450,25 @@ class GroqService:
                 "導入時期",
             ]
         ):
-            return "導入のタイミングについてですね。お客様のご都合に合わせて、最適なスケジュールをご提案いたします。ご希望の開始時期や、現在のシステムとの移行についてもご相談ください。"
+            return PROFESSIONAL_FALLBACK_RESPONSES["timeline"]
 
         # Demo/Trial requests with engagement focus
         elif any(
             keyword in text_lower
             for keyword in ["デモ", "試用", "トライアル", "体験", "見せて", "実際"]
         ):
-            return "実際にご体験いただきたいとのこと、ありがとうございます！デモンストレーションでは、お客様の具体的な業務に合わせてご紹介いたします。どのような機能を重点的にご覧になりたいでしょうか？"
+            return PROFESSIONAL_FALLBACK_RESPONSES["demo"]
 
         # Greetings/Introduction with welcoming approach
         elif any(
             keyword in text_lower
             for keyword in ["こんにちは", "はじめまして", "よろしく", "お疲れ"]
         ):
-            return "こんにちは！本日はお忙しい中、貴重なお時間をいただきありがとうございます。お客様のお役に立てるよう精一杯努めさせていただきます。どのようなことでご相談いただけますでしょうか？"
+            return PROFESSIONAL_FALLBACK_RESPONSES["greeting"]
 
         # Default professional response
         else:
-            return "ありがとうございます。お客様のお話をより詳しくお聞かせいただけますでしょうか？お客様にとって最適なソリューションをご提案させていただくため、現在の状況やご要望について教えていただければと思います。"
+            return PROFESSIONAL_FALLBACK_RESPONSES["default"]
 
     def _enhance_professional_response(self, response: str, context: str) -> str:
         """Enhance response quality with professional sales approach"""
@@ -228,15 +505,15 @@ class GroqService:
     def _generate_quality_fallback(self, conversation_text: str) -> str:
         """Generate high-quality fallback response based on context"""
         if "料金" in conversation_text or "価格" in conversation_text:
-            return "料金についてお聞かせいただき、ありがとうございます。お客様のご利用規模に応じた最適なプランをご提案させていただきます。"
+            return QUALITY_FALLBACK_RESPONSES["pricing"]
         elif "機能" in conversation_text or "できること" in conversation_text:
-            return "機能についてご質問いただき、ありがとうございます。お客様のご要望に合わせて詳しくご説明させていただきます。"
+            return QUALITY_FALLBACK_RESPONSES["features"]
         elif "検討" in conversation_text or "考える" in conversation_text:
-            return "ご検討いただき、ありがとうございます。ご不明な点がございましたら、お気軽にお聞かせください。"
+            return QUALITY_FALLBACK_RESPONSES["decision"]
         elif "忙しい" in conversation_text or "時間" in conversation_text:
-            return "お忙しい中、お時間をいただきありがとうございます。簡潔にご説明させていただきます。"
+            return QUALITY_FALLBACK_RESPONSES["busy"]
         else:
-            return "ありがとうございます。お客様のご要望について、詳しくお聞かせいただけますでしょうか。"
+            return QUALITY_FALLBACK_RESPONSES["default"]
 
     def _detect_business_intent(self, text: str) -> str:
         """Enhanced business intent detection for sales scenarios"""
@@ -457,3 +734,15 @@ class GroqService:
             "next_steps": ["demonstrate_value", "provide_case_study"],
             "raw_response": result["response"],
         }
+
+
+# Global service instance
+_groq_service: Optional[GroqService] = None
+
+
+def get_groq_service() -> GroqService:
+    """Get or create the shared Groq service instance"""
+    global _groq_service
+    if _groq_service is None:
+        _groq_service = GroqService()
+    return _groq_service
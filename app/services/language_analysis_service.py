@@ -6,11 +6,23 @@ from enum import Enum
 
 try:
     from services.friendliness_analyzer import friendliness_analyzer, FriendlinessLevel
+    from services.phrase_matcher import (
+        PhraseMatches,
+        is_literal,
+        phrase_registry,
+        split_span_pattern,
+    )
 except ImportError:
     from app.services.friendliness_analyzer import (
         friendliness_analyzer,
         FriendlinessLevel,
     )
+    from app.services.phrase_matcher import (
+        PhraseMatches,
+        is_literal,
+        phrase_registry,
+        split_span_pattern,
+    )
 
 logger = logging.getLogger(__name__)
 
@@ -141,6 +153,70 @@ class LanguageAnalysisService:
             "ダメ": "適切ではありません",
         }
 
+        # よくある敬語の誤用パターン
+        self.keigo_errors = {
+            "お疲れ様でした": "お疲れ様です（現在進行形が適切）",
+            "ご苦労様": "お疲れ様です（目上の人には使わない）",
+            "すいません": "申し訳ございません（より丁寧な表現）",
+        }
+
+        # コミュニケーショントーンの指標
+        self.tone_indicators = {
+            "friendly": ["ありがとう", "お疲れ", "よろしく", "嬉しい"],
+            "professional": ["ご提案", "ご検討", "申し上げ", "いたします"],
+            "confident": ["確信", "実績", "成功", "効果"],
+            "humble": ["恐れ入り", "申し訳", "未熟", "勉強"],
+            "enthusiastic": ["ぜひ", "素晴らしい", "期待", "楽しみ"],
+        }
+
+        self._register_phrases()
+
+    def _register_phrases(self) -> None:
+        """全辞書を共有オートマトンに登録する
+
+        敬語パターンのうちリテラルと「接頭辞.*接尾辞」形式はオートマトンの
+        一致位置から re.findall と同じ結果を組み立て、それ以外は正規表現で照合する。
+        """
+        self._keigo_matchers: Dict[str, List[Tuple[str, Any]]] = {}
+        keigo_phrases: Dict[str, List[str]] = {}
+        for keigo_type, data in self.keigo_patterns.items():
+            matchers = []
+            phrases = keigo_phrases.setdefault(keigo_type, [])
+            for pattern in data["patterns"]:
+                span = split_span_pattern(pattern)
+                if is_literal(pattern):
+                    matchers.append(("literal", pattern))
+                    phrases.append(pattern)
+                elif span is not None:
+                    matchers.append(("span", span))
+                    phrases.extend(part for part in span if part)
+                else:
+                    matchers.append(("regex", re.compile(pattern)))
+            self._keigo_matchers[keigo_type] = matchers
+
+        phrase_registry.register_dictionary("language.keigo", keigo_phrases)
+        phrase_registry.register_dictionary(
+            "language.business", self.business_expressions
+        )
+        phrase_registry.register_dictionary(
+            "language.inappropriate", self.inappropriate_expressions
+        )
+        phrase_registry.register("language.keigo_error", self.keigo_errors)
+        phrase_registry.register_dictionary("language.tone", self.tone_indicators)
+        phrase_registry.register("language.required", ["ありがとう"])
+
+    def _find_keigo(self, keigo_type: str, matches: PhraseMatches) -> List[List[str]]:
+        """敬語パターンごとの re.findall 相当の結果"""
+        results = []
+        for kind, matcher in self._keigo_matchers[keigo_type]:
+            if kind == "literal":
+                results.append([matcher] * matches.count(matcher))
+            elif kind == "span":
+                results.append(matches.span_matches(*matcher))
+            else:
+                results.append(matcher.findall(matches.text))
+        return results
+
     async def analyze_language_quality(
         self, text: str, context: str = "sales", customer_level: str = "business"
     ) -> Dict[str, Any]:
@@ -152,20 +228,29 @@ class LanguageAnalysisService:
             context: 文脈（sales, meeting, presentation）
             customer_level: 顧客レベル（executive, business, casual）
         """
+        return self.analyze_text(text, context, customer_level)
+
+    def analyze_text(
+        self, text: str, context: str = "sales", customer_level: str = "business"
+    ) -> Dict[str, Any]:
+        """言葉遣いの総合分析（同期版。バッチ分析のワーカープロセスから呼ばれる）"""
 
         try:
+            # 全分析器で共有するフレーズ照合（テキストを1回だけ走査）
+            matches = phrase_registry.scan(text)
+
             # 1. 丁寧度分析
-            politeness_analysis = self._analyze_politeness(text)
+            politeness_analysis = self._analyze_politeness(text, matches)
 
             # 2. 敬語使用状況
-            keigo_analysis = self._analyze_keigo_usage(text)
+            keigo_analysis = self._analyze_keigo_usage(text, matches)
 
             # 3. 不適切表現の検出
-            issues = self._detect_language_issues(text)
+            issues = self._detect_language_issues(text, matches)
 
             # 4. ビジネス適切性評価
             business_appropriateness = self._evaluate_business_appropriateness(
-                text, customer_level
+                text, customer_level, matches
             )
 
             # 5. 改善提案
@@ -181,6 +266,7 @@ class LanguageAnalysisService:
                 text=text,
                 context=context,
                 customer_relationship=customer_level,  # customer_levelを関係性として使用
+                matches=matches,
             )
 
             return {
@@ -209,7 +295,7 @@ class LanguageAnalysisService:
                 "context_analysis": self._analyze_context_appropriateness(
                     text, context
                 ),
-                "tone_assessment": self._assess_communication_tone(text),
+                "tone_assessment": self._assess_communication_tone(text, matches),
                 "friendliness_analysis": {
                     "level": friendliness_analysis.level.value,
                     "score": friendliness_analysis.score,
@@ -234,26 +320,28 @@ class LanguageAnalysisService:
             logger.error(f"Language analysis failed: {e}")
             return {"error": str(e)}
 
-    def _analyze_politeness(self, text: str) -> PolitenessAnalysis:
+    def _analyze_politeness(
+        self, text: str, matches: Optional[PhraseMatches] = None
+    ) -> PolitenessAnalysis:
         """丁寧度の分析"""
+        matches = self._scan(text, matches)
 
         # 丁寧語の出現回数
         teineigo_count = 0
         keigo_indicators = []
 
-        for category, patterns in self.keigo_patterns.items():
-            for pattern in patterns["patterns"]:
-                matches = re.findall(pattern, text)
-                count = len(matches)
+        for category in self.keigo_patterns:
+            for found in self._find_keigo(category, matches):
+                count = len(found)
                 if count > 0:
                     teineigo_count += count
-                    keigo_indicators.extend(matches)
+                    keigo_indicators.extend(found)
 
         # 配慮表現の確認
         consideration_count = 0
         for category, expressions in self.business_expressions.items():
             for expr in expressions:
-                if expr in text:
+                if expr in matches:
                     consideration_count += 1
                     keigo_indicators.append(expr)
 
@@ -282,11 +370,11 @@ class LanguageAnalysisService:
 
         # 不足要素の特定
         missing_elements = []
-        if "です" not in text and "ます" not in text:
+        if "です" not in matches and "ます" not in matches:
             missing_elements.append("基本的な丁寧語（です・ます）")
         if consideration_count == 0:
             missing_elements.append("配慮表現（お忙しい中等）")
-        if "ありがとう" not in text and len(text) > 50:
+        if "ありがとう" not in matches and len(text) > 50:
             missing_elements.append("感謝の表現")
 
         return PolitenessAnalysis(
@@ -301,8 +389,11 @@ class LanguageAnalysisService:
             missing_elements=missing_elements,
         )
 
-    def _analyze_keigo_usage(self, text: str) -> Dict[str, Any]:
+    def _analyze_keigo_usage(
+        self, text: str, matches: Optional[PhraseMatches] = None
+    ) -> Dict[str, Any]:
         """敬語使用状況の分析"""
+        matches = self._scan(text, matches)
 
         keigo_usage = {}
         total_keigo = 0
@@ -311,10 +402,9 @@ class LanguageAnalysisService:
             count = 0
             found_patterns = []
 
-            for pattern in data["patterns"]:
-                matches = re.findall(pattern, text)
-                count += len(matches)
-                found_patterns.extend(matches)
+            for found in self._find_keigo(keigo_type, matches):
+                count += len(found)
+                found_patterns.extend(found)
 
             keigo_usage[keigo_type] = {
                 "count": count,
@@ -338,16 +428,18 @@ class LanguageAnalysisService:
             "appropriate_usage": self._check_keigo_appropriateness(keigo_usage),
         }
 
-    def _detect_language_issues(self, text: str) -> List[LanguageIssue]:
+    def _detect_language_issues(
+        self, text: str, matches: Optional[PhraseMatches] = None
+    ) -> List[LanguageIssue]:
         """言葉遣いの問題を検出"""
+        matches = self._scan(text, matches)
 
         issues = []
 
-        # 不適切表現の検出
+        # 不適切表現の検出（単語境界 \b で区切られた出現のみ）
         for category, expressions in self.inappropriate_expressions.items():
             for expr in expressions:
-                pattern = re.compile(rf"\b{re.escape(expr)}\b")
-                for match in pattern.finditer(text):
+                for position in matches.word_bounded(expr):
                     severity = self._get_issue_severity(category, expr)
                     issue_type = self._map_category_to_issue_type(category)
 
@@ -358,7 +450,7 @@ class LanguageAnalysisService:
                     issues.append(
                         LanguageIssue(
                             issue_type=issue_type,
-                            position=match.start(),
+                            position=position,
                             original_text=expr,
                             suggested_fix=suggested_fix,
                             severity=severity,
@@ -367,15 +459,19 @@ class LanguageAnalysisService:
                     )
 
         # 敬語の誤用チェック
-        keigo_issues = self._check_keigo_errors(text)
+        keigo_issues = self._check_keigo_errors(text, matches)
         issues.extend(keigo_issues)
 
         return sorted(issues, key=lambda x: x.severity, reverse=True)
 
     def _evaluate_business_appropriateness(
-        self, text: str, customer_level: str
+        self,
+        text: str,
+        customer_level: str,
+        matches: Optional[PhraseMatches] = None,
     ) -> Dict[str, Any]:
         """ビジネス適切性の評価"""
+        matches = self._scan(text, matches)
 
         # 顧客レベルに応じた期待値
         expected_formality = {
@@ -393,7 +489,7 @@ class LanguageAnalysisService:
         for category, expressions in self.business_expressions.items():
             category_score = 0.0
             for expr in expressions:
-                if expr in text:
+                if expr in matches:
                     category_score += 1
                     used_expressions.append(expr)
 
@@ -530,20 +626,15 @@ class LanguageAnalysisService:
             ),
         }
 
-    def _assess_communication_tone(self, text: str) -> Dict[str, Any]:
+    def _assess_communication_tone(
+        self, text: str, matches: Optional[PhraseMatches] = None
+    ) -> Dict[str, Any]:
         """コミュニケーショントーンの評価"""
-
-        tone_indicators = {
-            "friendly": ["ありがとう", "お疲れ", "よろしく", "嬉しい"],
-            "professional": ["ご提案", "ご検討", "申し上げ", "いたします"],
-            "confident": ["確信", "実績", "成功", "効果"],
-            "humble": ["恐れ入り", "申し訳", "未熟", "勉強"],
-            "enthusiastic": ["ぜひ", "素晴らしい", "期待", "楽しみ"],
-        }
+        matches = self._scan(text, matches)
 
         tone_scores = {}
-        for tone, indicators in tone_indicators.items():
-            score = sum(1 for indicator in indicators if indicator in text)
+        for tone, indicators in self.tone_indicators.items():
+            score = sum(1 for indicator in indicators if indicator in matches)
             tone_scores[tone] = score / len(indicators)
 
         # 主要トーンの特定
@@ -557,6 +648,10 @@ class LanguageAnalysisService:
         }
 
     # 以下、ヘルパーメソッド
+    @staticmethod
+    def _scan(text: str, matches: Optional[PhraseMatches]) -> PhraseMatches:
+        return matches if matches is not None else phrase_registry.scan(text)
+
     def _get_issue_severity(self, category: str, expression: str) -> float:
         """問題の重要度を取得"""
         severity_map = {
@@ -587,21 +682,17 @@ class LanguageAnalysisService:
         }
         return explanations.get(category, "より適切な表現への変更をお勧めします")
 
-    def _check_keigo_errors(self, text: str) -> List[LanguageIssue]:
+    def _check_keigo_errors(
+        self, text: str, matches: Optional[PhraseMatches] = None
+    ) -> List[LanguageIssue]:
         """敬語の誤用をチェック"""
         # 簡略化された実装例
+        matches = self._scan(text, matches)
         issues = []
 
-        # よくある敬語の誤用パターン
-        common_errors = {
-            "お疲れ様でした": "お疲れ様です（現在進行形が適切）",
-            "ご苦労様": "お疲れ様です（目上の人には使わない）",
-            "すいません": "申し訳ございません（より丁寧な表現）",
-        }
-
-        for error, correction in common_errors.items():
-            if error in text:
-                position = text.find(error)
+        for error, correction in self.keigo_errors.items():
+            if error in matches:
+                position = matches.first(error)
                 issues.append(
                     LanguageIssue(
                         issue_type=LanguageIssueType.INCORRECT_KEIGO,
@@ -0,0 +1,283 @@
+"""
+Batch language-quality analysis
+録音済みロールプレイ全体（数百ターン）の言葉遣い分析をワーカープロセスに分散する
+
+各ワーカーは起動時に一度だけ分析サービス（パターン表・フレーズオートマトン）を
+構築し、以降のターンはそれを再利用する。
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (ターン番号, テキスト)
+Turn = Tuple[int, str]
+
+
+def _get_worker_service():
+    # プロセス内で一度だけ import され、モジュール単位のシングルトンを共有する
+    try:
+        from services.language_analysis_service import language_analysis_service
+    except ImportError:
+        from app.services.language_analysis_service import language_analysis_service
+    return language_analysis_service
+
+
+def _init_worker() -> None:
+    """ワーカー起動時にパターン表とフレーズオートマトンを構築する"""
+    try:
+        from services.phrase_matcher import phrase_registry
+    except ImportError:
+        from app.services.phrase_matcher import phrase_registry
+
+    _get_worker_service()
+    _ = phrase_registry.automaton
+    logger.debug(f"Language analysis worker ready (pid={os.getpid()})")
+
+
+def _analyze_chunk_in_worker(
+    turns: List[Turn], context: str, customer_level: str
+) -> List[Tuple[int, Dict[str, Any], float]]:
+    """ワーカー内で複数ターンを分析する（IPC回数を減らすためチャンク単位）"""
+    service = _get_worker_service()
+    results = []
+    for index, text in turns:
+        started = time.perf_counter()
+        result = service.analyze_text(text, context, customer_level)
+        results.append((index, result, time.perf_counter() - started))
+    return results
+
+
+class BatchAggregate:
+    """ターンごとの結果から分布・平均を集計する"""
+
+    def __init__(self):
+        self.turns = 0
+        self.failed = 0
+        self.score_total = 0.0
+        self.score_min: Optional[float] = None
+        self.score_max: Optional[float] = None
+        self.friendliness_total = 0.0
+        self.politeness_levels: Counter = Counter()
+        self.friendliness_levels: Counter = Counter()
+        self.issue_types: Counter = Counter()
+        self.issue_expressions: Counter = Counter()
+
+    def add(self, result: Dict[str, Any]) -> None:
+        self.turns += 1
+        if "error" in result:
+            self.failed += 1
+            return
+        score = result["overall_score"]
+        self.score_total += score
+        self.score_min = score if self.score_min is None else min(self.score_min, score)
+        self.score_max = score if self.score_max is None else max(self.score_max, score)
+        self.politeness_levels[result["politeness_analysis"]["level"]] += 1
+        friendliness = result["friendliness_analysis"]
+        self.friendliness_levels[friendliness["level"]] += 1
+        self.friendliness_total += friendliness["score"]
+        for issue in result["detected_issues"]:
+            self.issue_types[issue["issue_type"]] += 1
+            self.issue_expressions[issue["original_text"]] += 1
+
+    @staticmethod
+    def _distribution(counter: Counter, total: int) -> Dict[str, Dict[str, float]]:
+        return {
+            key: {"count": count, "ratio": round(count / total, 4)}
+            for key, count in counter.most_common()
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        analyzed = self.turns - self.failed
+        return {
+            "turns": self.turns,
+            "analyzed": analyzed,
+            "failed": self.failed,
+            "overall_score": {
+                "mean": round(self.score_total / analyzed, 4) if analyzed else None,
+                "min": self.score_min,
+                "max": self.score_max,
+            },
+            "friendliness_score_mean": (
+                round(self.friendliness_total / analyzed, 4) if analyzed else None
+            ),
+            "politeness_distribution": self._distribution(
+                self.politeness_levels, analyzed
+            ),
+            "friendliness_distribution": self._distribution(
+                self.friendliness_levels, analyzed
+            ),
+            "issue_type_counts": dict(self.issue_types.most_common()),
+            "top_issue_expressions": dict(self.issue_expressions.most_common(10)),
+        }
+
+
+@dataclass
+class LanguageBatchStats:
+    """バッチ分析の統計情報"""
+
+    batches: int = 0
+    turns: int = 0
+    chunks: int = 0
+    total_compute: float = 0.0
+    total_wall: float = 0.0
+
+
+class LanguageBatchAnalyzer:
+    """ターンをチャンクに分けてワーカープールで並列分析する"""
+
+    def __init__(
+        self, mode: str = "process", max_workers: int = 0, chunk_size: int = 16
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Invalid executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.chunk_size = max(chunk_size, 1)
+        self.stats = LanguageBatchStats()
+        self._executor: Optional[Executor] = None
+
+    @classmethod
+    def from_env(cls) -> "LanguageBatchAnalyzer":
+        """環境変数（LANGUAGE_BATCH_MODE / _WORKERS / _CHUNK_SIZE）から作成"""
+        return cls(
+            mode=os.getenv("LANGUAGE_BATCH_MODE", "process"),
+            max_workers=int(os.getenv("LANGUAGE_BATCH_WORKERS", "0")),
+            chunk_size=int(os.getenv("LANGUAGE_BATCH_CHUNK_SIZE", "16")),
+        )
+
+    @property
+    def executor(self) -> Executor:
+        # 初回のバッチ要求時にワーカーを起動する
+        if self._executor is None:
+            if self.mode == "process":
+                # fork はスレッドを持つサーバープロセスを複製してデッドロックしうるため spawn
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="language-batch",
+                    initializer=_init_worker,
+                )
+            logger.info(
+                f"Language batch executor started: mode={self.mode}, "
+                f"workers={self.max_workers}, chunk={self.chunk_size}"
+            )
+        return self._executor
+
+    def _chunks(self, texts: Sequence[str]) -> List[List[Turn]]:
+        turns = list(enumerate(texts))
+        return [
+            turns[i : i + self.chunk_size]
+            for i in range(0, len(turns), self.chunk_size)
+        ]
+
+    async def iter_results(
+        self,
+        texts: Sequence[str],
+        context: str = "sales",
+        customer_level: str = "business",
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        ターンを並列分析し、完了した順に (ターン番号, 分析結果) を返す
+
+        実行中のチャンクはワーカー数の2倍までに抑え、呼び出し側が
+        読み進めた分だけ投入する（途中で中断された場合は未実行分を取り消す）。
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        chunks = self._chunks(texts)
+        window = self.max_workers * 2
+        started = time.perf_counter()
+        pending: set = set()
+        next_chunk = 0
+        self.stats.batches += 1
+
+        def submit(chunk: List[Turn]) -> None:
+            future: Future = executor.submit(
+                _analyze_chunk_in_worker, chunk, context, customer_level
+            )
+            pending.add(asyncio.wrap_future(future, loop=loop))
+
+        try:
+            while next_chunk < len(chunks) or pending:
+                while next_chunk < len(chunks) and len(pending) < window:
+                    submit(chunks[next_chunk])
+                    next_chunk += 1
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    pending.discard(task)
+                    self.stats.chunks += 1
+                    for index, result, compute in task.result():
+                        self.stats.turns += 1
+                        self.stats.total_compute += compute
+                        yield index, result
+        finally:
+            for task in pending:
+                task.cancel()
+            self.stats.total_wall += time.perf_counter() - started
+
+    async def analyze_batch(
+        self,
+        texts: Sequence[str],
+        context: str = "sales",
+        customer_level: str = "business",
+    ) -> Dict[str, Any]:
+        """全ターンを分析し、ターン順の結果と集計を返す"""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        aggregate = BatchAggregate()
+        async for index, result in self.iter_results(texts, context, customer_level):
+            results[index] = result
+            aggregate.add(result)
+        return {"results": results, "summary": aggregate.to_dict()}
+
+    def get_metrics(self) -> Dict[str, Any]:
+        turns = self.stats.turns
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "chunk_size": self.chunk_size,
+            "started": self._executor is not None,
+            **asdict(self.stats),
+            "avg_turn_compute_ms": (
+                round(self.stats.total_compute / turns * 1000, 3) if turns else 0.0
+            ),
+        }
+
+    def shutdown(self) -> None:
+        """ワーカープールを停止"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global batch analyzer
+_language_batch_analyzer: Optional[LanguageBatchAnalyzer] = None
+
+
+def get_language_batch_analyzer() -> LanguageBatchAnalyzer:
+    """Get or create the batch analyzer (workers start on first use)"""
+    global _language_batch_analyzer
+    if _language_batch_analyzer is None:
+        _language_batch_analyzer = LanguageBatchAnalyzer.from_env()
+    return _language_batch_analyzer
+
+
+def shutdown_language_batch_analyzer() -> None:
+    """Stop batch analysis workers (called from the application lifespan)"""
+    if _language_batch_analyzer is not None:
+        _language_batch_analyzer.shutdown()
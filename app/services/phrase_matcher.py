@@ -0,0 +1,290 @@
+"""
+Shared phrase automaton for language analyzers
+言葉遣い・親しみやすさ分析で共有するフレーズ照合器（Aho–Corasick）
+
+各分析器はフレーズ辞書を名前空間付きカテゴリで登録し、テキストを1回走査した
+結果（PhraseMatches）を共有する。フレーズ数に依存せず O(テキスト長 + 一致数)。
+"""
+
+import bisect
+import logging
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORD_CHAR = re.compile(r"\w")
+# "接頭辞.*接尾辞" 形式の正規表現（リテラル部分のみ）
+_SPAN_PATTERN = re.compile(r"^([^.*+?()\[\]{}|\\^$]*)\.\*([^.*+?()\[\]{}|\\^$]+)$")
+
+
+def is_literal(pattern: str) -> bool:
+    """正規表現のメタ文字を含まないリテラルかどうか"""
+    return re.escape(pattern) == pattern
+
+
+def split_span_pattern(pattern: str) -> Optional[Tuple[str, str]]:
+    """``prefix.*suffix`` 形式なら (prefix, suffix) を返す"""
+    match = _SPAN_PATTERN.match(pattern)
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
+@dataclass(frozen=True)
+class PhraseMatch:
+    """フレーズの出現（start は文字位置）"""
+
+    start: int
+    end: int
+    phrase: str
+    categories: Tuple[str, ...]
+
+
+class PhraseAutomaton:
+    """Aho–Corasick オートマトン（構築後は読み取り専用）"""
+
+    def __init__(self, phrase_categories: Dict[str, Tuple[str, ...]]):
+        self.phrase_categories = phrase_categories
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # 各状態で確定する (フレーズ, 長さ)
+        self._output: List[Tuple[Tuple[str, int], ...]] = [()]
+
+        for phrase in phrase_categories:
+            if phrase:
+                self._insert(phrase)
+        self._build_failure_links()
+
+    def _insert(self, phrase: str) -> None:
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] = self._output[state] + ((phrase, len(phrase)),)
+
+    def _build_failure_links(self) -> None:
+        # 幅優先で失敗遷移を張り、失敗先の出力を併合する
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = (
+                    self._output[next_state] + self._output[self._fail[next_state]]
+                )
+
+    @property
+    def state_count(self) -> int:
+        return len(self._goto)
+
+    def scan(self, text: str) -> "PhraseMatches":
+        """テキストを1回走査し、全フレーズの出現位置（重なりを含む）を返す"""
+        goto, fail, output = self._goto, self._fail, self._output
+        positions: Dict[str, List[int]] = {}
+        state = 0
+        for index, char in enumerate(text):
+            next_state = goto[state].get(char)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(char)
+            state = next_state or 0
+            if output[state]:
+                for phrase, length in output[state]:
+                    positions.setdefault(phrase, []).append(index - length + 1)
+        return PhraseMatches(text, positions, self.phrase_categories)
+
+
+class PhraseMatches:
+    """1回の走査結果。分析器はこれを通して出現有無・回数・位置を参照する"""
+
+    def __init__(
+        self,
+        text: str,
+        positions: Dict[str, List[int]],
+        phrase_categories: Dict[str, Tuple[str, ...]],
+    ):
+        self.text = text
+        self._positions = positions
+        self._phrase_categories = phrase_categories
+        self._line_breaks: Optional[List[int]] = None
+
+    def __contains__(self, phrase: str) -> bool:
+        """``phrase in text`` と同じ結果"""
+        return phrase in self._positions
+
+    def positions(self, phrase: str) -> List[int]:
+        """出現開始位置（昇順・重なりを含む）"""
+        return self._positions.get(phrase, [])
+
+    def first(self, phrase: str) -> int:
+        """``text.find(phrase)`` と同じ結果"""
+        found = self._positions.get(phrase)
+        return found[0] if found else -1
+
+    def non_overlapping(self, phrase: str) -> List[int]:
+        """左から重ならないように取った出現位置（``re.finditer`` と同じ）"""
+        result: List[int] = []
+        next_allowed = 0
+        for start in self._positions.get(phrase, ()):
+            if start >= next_allowed:
+                result.append(start)
+                next_allowed = start + len(phrase)
+        return result
+
+    def count(self, phrase: str) -> int:
+        """``text.count(phrase)`` / ``len(re.findall(literal, text))`` と同じ結果"""
+        return len(self.non_overlapping(phrase))
+
+    def word_bounded(self, phrase: str) -> List[int]:
+        r"""``re.finditer(rf"\b{re.escape(phrase)}\b", text)`` と同じ開始位置"""
+        text = self.text
+        result: List[int] = []
+        next_allowed = 0
+        for start in self._positions.get(phrase, ()):
+            end = start + len(phrase)
+            if start < next_allowed:
+                continue
+            if _is_boundary(text, start) and _is_boundary(text, end):
+                result.append(start)
+                next_allowed = end
+        return result
+
+    def span_matches(self, prefix: str, suffix: str) -> List[str]:
+        """``re.findall(prefix + ".*" + suffix, text)`` と同じ結果
+
+        ``.`` は改行に一致しないため、各行で「最初の prefix から最後の suffix まで」
+        の最長一致が高々1つ得られる。
+        """
+        suffix_starts = self._positions.get(suffix)
+        if not suffix_starts:
+            return []
+        prefix_starts = self._positions.get(prefix, []) if prefix else None
+        line_breaks = self._get_line_breaks()
+        text = self.text
+
+        results: List[str] = []
+        line = bisect.bisect_right(line_breaks, suffix_starts[0] - 1)
+        while True:
+            line_start = line_breaks[line - 1] + 1 if line else 0
+            line_end = line_breaks[line] if line < len(line_breaks) else len(text)
+            # この行で最後に現れる suffix
+            last = bisect.bisect_right(suffix_starts, line_end - len(suffix)) - 1
+            if last >= 0 and suffix_starts[last] >= line_start:
+                last_start = suffix_starts[last]
+                if prefix_starts is None:
+                    match_start = line_start
+                else:
+                    first = bisect.bisect_left(prefix_starts, line_start)
+                    match_start = (
+                        prefix_starts[first]
+                        if first < len(prefix_starts)
+                        and prefix_starts[first] + len(prefix) <= last_start
+                        else -1
+                    )
+                if match_start >= 0:
+                    results.append(text[match_start : last_start + len(suffix)])
+            # 次に suffix が現れる行へ進む
+            following = bisect.bisect_left(suffix_starts, line_end + 1)
+            if following >= len(suffix_starts):
+                return results
+            line = bisect.bisect_right(line_breaks, suffix_starts[following] - 1)
+
+    def _get_line_breaks(self) -> List[int]:
+        if self._line_breaks is None:
+            breaks, index = [], self.text.find("\n")
+            while index >= 0:
+                breaks.append(index)
+                index = self.text.find("\n", index + 1)
+            self._line_breaks = breaks
+        return self._line_breaks
+
+    def iter_matches(self, category_prefix: str = "") -> Iterable[PhraseMatch]:
+        """カテゴリ（前方一致）で絞り込んだ全出現を位置順に返す"""
+        matches = []
+        for phrase, starts in self._positions.items():
+            categories = tuple(
+                c
+                for c in self._phrase_categories.get(phrase, ())
+                if c.startswith(category_prefix)
+            )
+            if not categories:
+                continue
+            for start in starts:
+                matches.append(
+                    PhraseMatch(start, start + len(phrase), phrase, categories)
+                )
+        matches.sort(key=lambda m: (m.start, m.end))
+        return matches
+
+
+def _is_boundary(text: str, index: int) -> bool:
+    before = index > 0 and _WORD_CHAR.match(text[index - 1]) is not None
+    after = index < len(text) and _WORD_CHAR.match(text[index]) is not None
+    return before != after
+
+
+class PhraseRegistry:
+    """分析器がフレーズ辞書を登録する共有レジストリ
+
+    登録内容が変わった後の最初の走査でオートマトンを1度だけ構築する。
+    """
+
+    def __init__(self):
+        self._phrases: Dict[str, Dict[str, None]] = {}
+        self._automaton: Optional[PhraseAutomaton] = None
+        self._lock = threading.Lock()
+
+    def register(self, category: str, phrases: Iterable[str]) -> None:
+        """フレーズ群をカテゴリ（例: "friendliness.warmth.empathy"）で登録"""
+        with self._lock:
+            for phrase in phrases:
+                if phrase:
+                    self._phrases.setdefault(phrase, {})[category] = None
+            self._automaton = None
+
+    def register_dictionary(
+        self, namespace: str, dictionary: Dict[str, Iterable[str]]
+    ) -> None:
+        for category, phrases in dictionary.items():
+            self.register(f"{namespace}.{category}", phrases)
+
+    @property
+    def automaton(self) -> PhraseAutomaton:
+        automaton = self._automaton
+        if automaton is None:
+            with self._lock:
+                if self._automaton is None:
+                    self._automaton = PhraseAutomaton(
+                        {
+                            phrase: tuple(categories)
+                            for phrase, categories in self._phrases.items()
+                        }
+                    )
+                    logger.debug(
+                        f"Phrase automaton built: {len(self._phrases)} phrases, "
+                        f"{self._automaton.state_count} states"
+                    )
+                automaton = self._automaton
+        return automaton
+
+    def scan(self, text: str) -> PhraseMatches:
+        return self.automaton.scan(text)
+
+
+# 言語分析サービス共有のレジストリ
+phrase_registry = PhraseRegistry()
@@ -21,8 +21,33 @@ import json
 import asyncio
 import re
 
+try:
+    from services.request_metrics import timed_stage
+except ImportError:
+    from app.services.request_metrics import timed_stage
+
 logger = logging.getLogger(__name__)
 
+# 個人情報パターン（名前・会社名・電話番号・メールアドレス・住所）
+ANONYMIZATION_RULES: List[Tuple["re.Pattern[str]", str]] = [
+    (re.compile(r"[一-龯]{2,4}(さん|様|氏|君)"), "[NAME]"),
+    (
+        re.compile(r"(株式会社|有限会社|合同会社|[A-Za-z]+(?:株式会社|Corp|Inc|Ltd))"),
+        "[COMPANY]",
+    ),
+    (re.compile(r"\d{2,4}-\d{2,4}-\d{4}"), "[PHONE]"),
+    (re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"), "[EMAIL]"),
+    (re.compile(r"[都道府県市区町村]{2,}[0-9一-九十百千万-]+"), "[ADDRESS]"),
+]
+
+
+def anonymize_text(content: str) -> str:
+    """個人情報パターンをプレースホルダーに置き換える"""
+    anonymized = content
+    for pattern, placeholder in ANONYMIZATION_RULES:
+        anonymized = pattern.sub(placeholder, anonymized)
+    return anonymized
+
 
 class ContextLevel(Enum):
     """文脈理解レベル"""
@@ -268,6 +293,7 @@ class PrivacyAwareContextService:
             logger.error(f"Failed to update context: {e}")
             return {"success": False, "error": str(e)}
 
+    @timed_stage("context")
     async def get_contextual_suggestions(
         self, session_id: str, current_input: str
     ) -> Dict[str, Any]:
@@ -326,33 +352,7 @@ class PrivacyAwareContextService:
     async def _anonymize_content(self, content: str) -> str:
         """コンテンツを匿名化"""
         try:
-            # 個人情報パターンを除去
-            anonymized = content
-
-            # 名前のパターンを除去
-            anonymized = re.sub(r"[一-龯]{2,4}(さん|様|氏|君)", "[NAME]", anonymized)
-
-            # 会社名のパターンを除去
-            anonymized = re.sub(
-                r"(株式会社|有限会社|合同会社|[A-Za-z]+(?:株式会社|Corp|Inc|Ltd))",
-                "[COMPANY]",
-                anonymized,
-            )
-
-            # 電話番号を除去
-            anonymized = re.sub(r"\d{2,4}-\d{2,4}-\d{4}", "[PHONE]", anonymized)
-
-            # メールアドレスを除去
-            anonymized = re.sub(
-                r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", "[EMAIL]", anonymized
-            )
-
-            # 住所情報を除去
-            anonymized = re.sub(
-                r"[都道府県市区町村]{2,}[0-9一-九十百千万-]+", "[ADDRESS]", anonymized
-            )
-
-            return anonymized
+            return anonymize_text(content)
 
         except Exception as e:
             logger.error(f"Anonymization failed: {e}")
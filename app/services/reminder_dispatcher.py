@@ -0,0 +1,277 @@
+"""
+Reminder dispatch engine
+リマインダーメールの並列配信エンジン（トークンバケット制限・ワーカープール・再試行）
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from dataclasses import dataclass, asdict, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    from services.email_service import EmailService, ReminderEmail
+    from services.smtp_pool import is_transient_smtp_error
+except ImportError:
+    from app.services.email_service import EmailService, ReminderEmail
+    from app.services.smtp_pool import is_transient_smtp_error
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """非同期トークンバケット（平均 rate 通/秒、最大 burst 通まで連続送信可）"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self) -> None:
+        # ロックを保持したまま待つことで、待機中のワーカーに先着順でトークンを配る
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+@dataclass
+class ReminderJob:
+    """配信ジョブ（1ユーザー1通）"""
+
+    user_id: str
+    reminder: ReminderEmail
+
+
+@dataclass
+class DeliveryResult:
+    """配信結果"""
+
+    user_id: str
+    reminder_type: str
+    email_address: str
+    success: bool
+    attempts: int
+    finished_at: str
+    error_message: Optional[str] = None
+
+
+@dataclass
+class DispatchStats:
+    """配信統計（プロセス累計）"""
+
+    dispatched: int = 0
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    batches_flushed: int = 0
+    last_run_seconds: float = 0.0
+    last_run_rate: float = 0.0
+
+
+ResultSink = Callable[[List[DeliveryResult]], Awaitable[None]]
+
+
+@dataclass
+class DispatchSummary:
+    """1回の dispatch() の集計"""
+
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    elapsed_seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+
+class ReminderDispatcher:
+    """リマインダー配信エンジン
+
+    - トークンバケットで送信レートを制限（SMTPサーバー・プロバイダーの制限対策）
+    - 固定数のワーカーが有界キューからジョブを取り出して並列送信
+    - SMTP送信は EmailService の接続プール（スレッド上）で実行
+    - 一時的なエラー（4xx・接続断）は指数バックオフ + ジッターで再試行
+    - 結果は log_batch_size 件ごとにまとめて sink へ渡す
+    """
+
+    def __init__(
+        self,
+        email_service: EmailService,
+        rate_per_second: float = 5.0,
+        burst: int = 10,
+        workers: int = 4,
+        max_retries: int = 3,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 30.0,
+        log_batch_size: int = 100,
+    ):
+        self.email_service = email_service
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.workers = max(workers, 1)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.log_batch_size = max(log_batch_size, 1)
+        self.stats = DispatchStats()
+        self._bucket = TokenBucket(rate_per_second, burst)
+
+    @classmethod
+    def from_env(cls, email_service: EmailService) -> "ReminderDispatcher":
+        return cls(
+            email_service,
+            rate_per_second=float(os.getenv("REMINDER_RATE_PER_SECOND", "5")),
+            burst=int(os.getenv("REMINDER_RATE_BURST", "10")),
+            workers=int(os.getenv("REMINDER_DISPATCH_WORKERS", "4")),
+            max_retries=int(os.getenv("REMINDER_MAX_RETRIES", "3")),
+            retry_base_seconds=float(os.getenv("REMINDER_RETRY_BASE_SECONDS", "1")),
+            retry_max_seconds=float(os.getenv("REMINDER_RETRY_MAX_SECONDS", "30")),
+            log_batch_size=int(os.getenv("REMINDER_LOG_BATCH_SIZE", "100")),
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _deliver(self, job: ReminderJob) -> DeliveryResult:
+        reminder = job.reminder
+        attempts = 0
+        error: Optional[BaseException] = None
+        try:
+            message = self.email_service.build_reminder_message(reminder)
+        except Exception as e:
+            message, error = None, e
+
+        while message is not None:
+            await self._bucket.acquire()
+            attempts += 1
+            try:
+                await self.email_service.deliver_message(message, reminder.user_email)
+                error = None
+                break
+            except Exception as e:
+                error = e
+                if attempts > self.max_retries or not is_transient_smtp_error(e):
+                    break
+                self.stats.retries += 1
+                delay = self._backoff(attempts - 1)
+                logger.warning(
+                    f"Transient SMTP error for {reminder.user_email} "
+                    f"(attempt {attempts}), retrying in {delay:.1f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+
+        return DeliveryResult(
+            user_id=job.user_id,
+            reminder_type=reminder.reminder_type,
+            email_address=reminder.user_email,
+            success=error is None,
+            attempts=attempts,
+            finished_at=datetime.now().isoformat(),
+            error_message=None if error is None else str(error),
+        )
+
+    async def dispatch(
+        self, jobs: List[ReminderJob], sink: Optional[ResultSink] = None
+    ) -> DispatchSummary:
+        """ジョブを並列配信し、結果をバッチ単位で sink に渡す"""
+        summary = DispatchSummary()
+        if not jobs:
+            return summary
+
+        started = time.perf_counter()
+        retries_before = self.stats.retries
+        queue: "asyncio.Queue[Optional[ReminderJob]]" = asyncio.Queue(
+            maxsize=self.workers * 2
+        )
+        pending: List[DeliveryResult] = []
+        flush_lock = asyncio.Lock()
+
+        async def flush(force: bool = False) -> None:
+            async with flush_lock:
+                while pending and (force or len(pending) >= self.log_batch_size):
+                    batch = pending[: self.log_batch_size]
+                    del pending[: self.log_batch_size]
+                    self.stats.batches_flushed += 1
+                    if sink is not None:
+                        try:
+                            await sink(batch)
+                        except Exception as e:
+                            logger.error(f"Failed to record reminder results: {e}")
+
+        async def worker() -> None:
+            while True:
+                job = await queue.get()
+                try:
+                    if job is None:
+                        return
+                    result = await self._deliver(job)
+                    if result.success:
+                        summary.sent += 1
+                    else:
+                        summary.failed += 1
+                        summary.errors.append(
+                            f"Failed to send {result.reminder_type} reminder to "
+                            f"{result.email_address}: {result.error_message}"
+                        )
+                    pending.append(result)
+                    if len(pending) >= self.log_batch_size:
+                        await flush()
+                finally:
+                    queue.task_done()
+
+        tasks = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        try:
+            for job in jobs:
+                await queue.put(job)
+            for _ in tasks:
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await flush(force=True)
+
+        summary.elapsed_seconds = time.perf_counter() - started
+        summary.retries = self.stats.retries - retries_before
+        self.stats.dispatched += len(jobs)
+        self.stats.sent += summary.sent
+        self.stats.failed += summary.failed
+        self.stats.last_run_seconds = round(summary.elapsed_seconds, 3)
+        self.stats.last_run_rate = (
+            round(len(jobs) / summary.elapsed_seconds, 2)
+            if summary.elapsed_seconds
+            else 0.0
+        )
+        return summary
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics: Dict[str, Any] = {
+            **asdict(self.stats),
+            "rate_per_second": self.rate_per_second,
+            "burst": self.burst,
+            "workers": self.workers,
+            "max_retries": self.max_retries,
+            "log_batch_size": self.log_batch_size,
+        }
+        smtp_metrics = self.email_service.get_smtp_metrics()
+        if smtp_metrics is not None:
+            metrics["smtp_pool"] = smtp_metrics
+        return metrics
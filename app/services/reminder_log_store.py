@@ -0,0 +1,410 @@
+"""
+Append-only reminder log store
+リマインダー送信ログの追記専用ストア（JSONL・サイズ/時間ローテーション・リングバッファ）
+
+- 追記のみなので1件あたりの書き込みコストは履歴の長さに依存しない
+- 起動時はアクティブファイル末尾から ring_size 行だけを読む
+- 検索はセグメントを古い順にストリーミングし、期間外のセグメントは読まない
+- 時刻はローカル時刻（タイムゾーンなし）で比較する。タイムゾーン付きの値は変換する
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_FILE_NAME = "reminder_logs.jsonl"
+_SEGMENT_PREFIX = "reminder_logs."
+_SEGMENT_TIME_FORMAT = "%Y%m%dT%H%M%S%f"
+_TAIL_BLOCK_SIZE = 64 * 1024
+
+
+@dataclass
+class ReminderLogStoreStats:
+    """ログストアの統計情報"""
+
+    appended: int = 0
+    batches: int = 0
+    rotations: int = 0
+    segments_deleted: int = 0
+    corrupt_lines: int = 0
+
+
+def _to_local_naive(value: datetime) -> datetime:
+    """タイムゾーン付きの時刻をローカル時刻（タイムゾーンなし）に変換する"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+def parse_time_range(
+    since: Optional[str] = None, until: Optional[str] = None
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    検索期間を (下限, 上限) のローカル時刻に変換する（上限は含まない）
+
+    Args:
+        since: この時刻以降（ISO形式、日付のみも可）
+        until: この時刻まで（日付のみの場合はその日を含む）
+
+    Raises:
+        ValueError: ISO形式として解釈できない場合
+    """
+    bounds: List[Optional[datetime]] = []
+    for name, value in (("since", since), ("until", until)):
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            bounds.append(_to_local_naive(datetime.fromisoformat(value)))
+        except ValueError:
+            raise ValueError(f"Invalid {name}: {value!r} (expected ISO 8601)") from None
+    since_time, until_time = bounds
+    if until_time is not None:
+        # 日付のみならその日の終わりまで、時刻指定ならその時刻を含める
+        until_time += (
+            timedelta(days=1) if len(until) == 10 else timedelta(microseconds=1)
+        )
+    return since_time, until_time
+
+
+def _tail_lines(path: Path, count: int) -> List[str]:
+    """ファイル末尾から最大 count 行を読む（ファイルサイズに依存しない）"""
+    if count <= 0:
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            step = min(_TAIL_BLOCK_SIZE, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    if position > 0:
+        # 先頭行は途中から読んでいる可能性がある
+        lines = lines[1:]
+    return [line for line in lines if line.strip()][-count:]
+
+
+class ReminderLogStore:
+    """追記専用のJSONLログストア
+
+    アクティブファイルが max_bytes を超えるか、先頭レコードから rotate_interval が
+    経過したらローテーションし、``reminder_logs.<最終レコード時刻>.jsonl``
+    として保存する。
+    """
+
+    def __init__(
+        self,
+        directory: str = "data/reminder_logs",
+        max_bytes: int = 10 * 1024 * 1024,
+        rotate_interval: timedelta = timedelta(hours=24),
+        backup_count: int = 30,
+        ring_size: int = 1000,
+        fsync: bool = True,
+        legacy_path: Optional[str] = "data/reminder_logs.json",
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.fsync = fsync
+        self.stats = ReminderLogStoreStats()
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=ring_size)
+
+        self._lock = threading.Lock()
+        self._active_path = self.directory / ACTIVE_FILE_NAME
+        self._segment_started: Optional[datetime] = None
+        self._last_record_time: Optional[datetime] = None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if legacy_path:
+            self._migrate_legacy(Path(legacy_path))
+        self._segment_started = self._read_segment_start()
+        self._warm_ring_buffer()
+        if self.recent:
+            self._last_record_time = self._parse_time(self.recent[-1].get("sent_at"))
+
+    @classmethod
+    def from_env(cls) -> "ReminderLogStore":
+        return cls(
+            directory=os.getenv("REMINDER_LOG_DIR", "data/reminder_logs"),
+            max_bytes=int(os.getenv("REMINDER_LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            rotate_interval=timedelta(
+                hours=float(os.getenv("REMINDER_LOG_ROTATE_HOURS", "24"))
+            ),
+            backup_count=int(os.getenv("REMINDER_LOG_BACKUP_COUNT", "30")),
+            ring_size=int(os.getenv("REMINDER_LOG_RING_SIZE", "1000")),
+            fsync=os.getenv("REMINDER_LOG_FSYNC", "true").lower() == "true",
+        )
+
+    # ------------------------------------------------------------------
+    # 起動処理
+    # ------------------------------------------------------------------
+
+    def _migrate_legacy(self, legacy_path: Path) -> None:
+        """旧形式（JSON配列の全書き換え）のログを一度だけ JSONL に変換する"""
+        if not legacy_path.exists() or self._active_path.exists():
+            return
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            self._write_lines(records)
+            legacy_path.rename(legacy_path.with_name(legacy_path.name + ".migrated"))
+            logger.info(
+                f"Migrated {len(records)} reminder logs from {legacy_path} "
+                f"to {self._active_path}"
+            )
+        except Exception as e:
+            logger.error(f"Failed to migrate legacy reminder logs: {e}")
+
+    @staticmethod
+    def _parse_time(value: Any) -> Optional[datetime]:
+        try:
+            return _to_local_naive(datetime.fromisoformat(str(value)))
+        except ValueError:
+            return None
+
+    def _read_segment_start(self) -> Optional[datetime]:
+        """アクティブファイルの開始時刻（先頭レコードの sent_at）
+
+        ファイルの ctime は rename や属性変更でも更新され、作成時刻を表さないため使わない。
+        """
+        try:
+            with open(self._active_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = self._decode(line)
+                        if record is None:
+                            break
+                        return self._parse_time(record.get("sent_at"))
+        except FileNotFoundError:
+            return None
+        # 先頭レコードが読めない場合は今から数える
+        return datetime.now() if self._active_path.stat().st_size else None
+
+    def _segments(self) -> List[Tuple[datetime, Path]]:
+        """ローテーション済みセグメントを古い順に返す"""
+        segments = []
+        for path in self.directory.glob(f"{_SEGMENT_PREFIX}*.jsonl"):
+            stamp = path.name[len(_SEGMENT_PREFIX) : -len(".jsonl")]
+            try:
+                segments.append((datetime.strptime(stamp, _SEGMENT_TIME_FORMAT), path))
+            except ValueError:
+                continue
+        segments.sort()
+        return segments
+
+    def _warm_ring_buffer(self) -> None:
+        # 新しいファイルから順に、リングバッファが埋まるまでだけ読む
+        needed = self.recent.maxlen or 0
+        files = [self._active_path] + [p for _, p in reversed(self._segments())]
+        chunks: List[List[str]] = []
+        for path in files:
+            if needed <= 0:
+                break
+            if not path.exists():
+                continue
+            lines = _tail_lines(path, needed)
+            chunks.append(lines)
+            needed -= len(lines)
+        for lines in reversed(chunks):
+            for line in lines:
+                record = self._decode(line)
+                if record is not None:
+                    self.recent.append(record)
+
+    # ------------------------------------------------------------------
+    # 書き込み
+    # ------------------------------------------------------------------
+
+    def _decode(self, line: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(line)
+        except ValueError:
+            # 書き込み途中で停止した末尾行など
+            self.stats.corrupt_lines += 1
+            return None
+
+    def _write_lines(self, records: Iterable[Dict[str, Any]]) -> int:
+        payload = "".join(
+            json.dumps(record, ensure_ascii=False) + "\n" for record in records
+        )
+        if not payload:
+            return 0
+        with open(self._active_path, "a", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        return len(payload)
+
+    def _should_rotate(self, now: datetime) -> bool:
+        if not self._active_path.exists():
+            return False
+        if self._active_path.stat().st_size >= self.max_bytes:
+            return True
+        return (
+            self._segment_started is not None
+            and now - self._segment_started >= self.rotate_interval
+        )
+
+    def _rotate(self, now: datetime) -> None:
+        # セグメント名は最後のレコード時刻（検索時の期間判定に使う上限）
+        closed_at = self._last_record_time or now
+        target = self.directory / (
+            f"{_SEGMENT_PREFIX}{closed_at.strftime(_SEGMENT_TIME_FORMAT)}.jsonl"
+        )
+        while target.exists():
+            closed_at += timedelta(microseconds=1)
+            target = self.directory / (
+                f"{_SEGMENT_PREFIX}{closed_at.strftime(_SEGMENT_TIME_FORMAT)}.jsonl"
+            )
+        os.replace(self._active_path, target)
+        self._segment_started = None
+        self.stats.rotations += 1
+
+        segments = self._segments()
+        for _, path in segments[: max(len(segments) - self.backup_count, 0)]:
+            path.unlink(missing_ok=True)
+            self.stats.segments_deleted += 1
+
+    def append_many(self, records: List[Dict[str, Any]]) -> None:
+        """レコードをまとめて追記する（スレッドセーフ・ブロッキング）"""
+        if not records:
+            return
+        with self._lock:
+            now = datetime.now()
+            if self._should_rotate(now):
+                self._rotate(now)
+            self._write_lines(records)
+            if self._segment_started is None:
+                self._segment_started = now
+            for record in records:
+                sent_at = self._parse_time(record.get("sent_at"))
+                if sent_at is not None and (
+                    self._last_record_time is None or sent_at > self._last_record_time
+                ):
+                    self._last_record_time = sent_at
+            self.recent.extend(records)
+            self.stats.appended += len(records)
+            self.stats.batches += 1
+
+    # ------------------------------------------------------------------
+    # 参照
+    # ------------------------------------------------------------------
+
+    def recent_records(self, limit: int) -> List[Dict[str, Any]]:
+        """リングバッファの直近 limit 件を時系列順で返す"""
+        if limit <= 0:
+            return []
+        return list(self.recent)[-limit:]
+
+    def query(
+        self,
+        user_id: Optional[str] = None,
+        reminder_type: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        success: Optional[bool] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        条件に合うログを古い順にストリーミングで返す
+
+        期間は呼び出し時に検証する（読み出しを始める前に ValueError を送出する）。
+
+        Args:
+            since: この時刻以降（ISO形式、日付のみも可）
+            until: この時刻まで（日付のみの場合はその日を含む）
+        """
+        since_time, until_time = parse_time_range(since, until)
+        return self._scan(
+            user_id, reminder_type, since_time, until_time, success, limit
+        )
+
+    def _scan(
+        self,
+        user_id: Optional[str],
+        reminder_type: Optional[str],
+        since_time: Optional[datetime],
+        until_time: Optional[datetime],
+        success: Optional[bool],
+        limit: Optional[int],
+    ) -> Iterator[Dict[str, Any]]:
+        files: List[Path] = []
+        lower_bound: Optional[datetime] = None
+        for closed_at, path in self._segments():
+            # セグメントは (前のセグメントの末尾, closed_at] の範囲を持つ
+            if since_time is not None and closed_at < since_time:
+                lower_bound = closed_at
+                continue
+            if (
+                until_time is not None
+                and lower_bound is not None
+                and lower_bound > until_time
+            ):
+                break
+            files.append(path)
+            lower_bound = closed_at
+        if until_time is None or lower_bound is None or lower_bound <= until_time:
+            files.append(self._active_path)
+
+        yielded = 0
+        for path in files:
+            try:
+                f = open(path, "r", encoding="utf-8")
+            except FileNotFoundError:
+                # 走査中にローテーション・削除された
+                continue
+            with f:
+                for line in f:
+                    record = self._decode(line)
+                    if record is None:
+                        continue
+                    if user_id is not None and record.get("user_id") != user_id:
+                        continue
+                    if (
+                        reminder_type is not None
+                        and record.get("reminder_type") != reminder_type
+                    ):
+                        continue
+                    if success is not None and record.get("success") != success:
+                        continue
+                    if since_time is not None or until_time is not None:
+                        sent_at = self._parse_time(record.get("sent_at"))
+                        if sent_at is None:
+                            continue
+                        if since_time is not None and sent_at < since_time:
+                            continue
+                        if until_time is not None and sent_at >= until_time:
+                            continue
+                    yield record
+                    yielded += 1
+                    if limit is not None and yielded >= limit:
+                        return
+
+    def get_metrics(self) -> Dict[str, Any]:
+        segments = self._segments()
+        active_bytes = (
+            self._active_path.stat().st_size if self._active_path.exists() else 0
+        )
+        return {
+            **asdict(self.stats),
+            "ring_size": self.recent.maxlen,
+            "ring_entries": len(self.recent),
+            "segments": len(segments),
+            "active_bytes": active_bytes,
+            "total_bytes": active_bytes
+            + sum(path.stat().st_size for _, path in segments if path.exists()),
+            "directory": str(self.directory),
+        }
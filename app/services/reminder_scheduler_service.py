@@ -6,7 +6,7 @@ Reminder Scheduler Service for Voice Roleplay System
 import asyncio
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 import json
 from pathlib import Path
 from dataclasses import dataclass, asdict
@@ -14,6 +14,12 @@ from dataclasses import dataclass, asdict
 try:
     from services.usage_limit_service import UsageLimitService
     from services.email_service import EmailService, ReminderEmail
+    from services.reminder_log_store import ReminderLogStore
+    from services.reminder_dispatcher import (
+        DeliveryResult,
+        ReminderDispatcher,
+        ReminderJob,
+    )
     from services.notification_service import (
         MultiChannelNotificationService,
         NotificationMessage,
@@ -21,6 +27,12 @@ try:
 except ImportError:
     from app.services.usage_limit_service import UsageLimitService
     from app.services.email_service import EmailService, ReminderEmail
+    from app.services.reminder_log_store import ReminderLogStore
+    from app.services.reminder_dispatcher import (
+        DeliveryResult,
+        ReminderDispatcher,
+        ReminderJob,
+    )
     from app.services.notification_service import (
         MultiChannelNotificationService,
         NotificationMessage,
@@ -60,6 +72,7 @@ class ReminderSchedulerService:
         usage_service: Optional[UsageLimitService] = None,
         email_service: Optional[EmailService] = None,
         config_path: str = "config/reminder_scheduler.json",
+        log_store: Optional[ReminderLogStore] = None,
     ):
         """
         Initialize reminder scheduler service
@@ -68,27 +81,29 @@ class ReminderSchedulerService:
             usage_service: Usage limit service instance
             email_service: Email service instance
             config_path: Path to scheduler configuration
+            log_store: Append-only reminder log store
         """
         self.usage_service = usage_service
         self.email_service = email_service
         self.config_path = Path(config_path)
-        self.logs_path = Path("data/reminder_logs.json")
 
         # Create directories
         self.config_path.parent.mkdir(parents=True, exist_ok=True)
-        self.logs_path.parent.mkdir(parents=True, exist_ok=True)
 
         # Load configuration
         self.config = self._load_config()
 
-        # In-memory logs (keep last 1000 entries)
-        self.recent_logs: List[ReminderLog] = []
-        self._load_logs()
+        # 追記専用ログ（起動時は直近分だけをリングバッファに読み込む）
+        self.log_store = log_store or ReminderLogStore.from_env()
+        logger.info(f"Loaded {len(self.log_store.recent)} recent reminder logs")
 
         # Scheduler state
         self.is_running = False
         self.last_check_date = None
 
+        # 配信エンジン（初回送信時に作成）
+        self._dispatcher: Optional[ReminderDispatcher] = None
+
         logger.info("Reminder scheduler service initialized")
 
     def _load_config(self) -> SchedulerConfig:
@@ -115,27 +130,60 @@ class ReminderSchedulerService:
             logger.error(f"Failed to create default config: {e}")
         return config
 
-    def _load_logs(self) -> None:
-        """ログを読み込み"""
+    async def _record_logs(self, entries: List[ReminderLog]) -> None:
+        """ログをまとめて追記（ファイル書き込みはスレッドで行う）"""
+        records = [asdict(entry) for entry in entries]
         try:
-            if self.logs_path.exists():
-                with open(self.logs_path, "r", encoding="utf-8") as f:
-                    logs_data = json.load(f)
-                self.recent_logs = [ReminderLog(**log) for log in logs_data[-1000:]]
-                logger.info(f"Loaded {len(self.recent_logs)} reminder logs")
-        except Exception as e:
-            logger.error(f"Failed to load reminder logs: {e}")
-            self.recent_logs = []
-
-    def _save_logs(self) -> None:
-        """ログを保存"""
-        try:
-            logs_data = [asdict(log) for log in self.recent_logs[-1000:]]
-            with open(self.logs_path, "w", encoding="utf-8") as f:
-                json.dump(logs_data, f, ensure_ascii=False, indent=2)
+            await asyncio.to_thread(self.log_store.append_many, records)
         except Exception as e:
             logger.error(f"Failed to save reminder logs: {e}")
 
+    def query_logs(
+        self,
+        user_id: Optional[str] = None,
+        reminder_type: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        success: Optional[bool] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[ReminderLog]:
+        """送信ログをユーザー・種別・期間で絞り込んで古い順に返す
+
+        Raises:
+            ValueError: since / until が ISO形式でない場合（呼び出し時に送出）
+        """
+        records = self.log_store.query(
+            user_id=user_id,
+            reminder_type=reminder_type,
+            since=since,
+            until=until,
+            success=success,
+            limit=limit,
+        )
+        return (ReminderLog(**record) for record in records)
+
+    async def _record_delivery_results(self, results: List[DeliveryResult]) -> None:
+        """配信エンジンからのバッチ結果をログに記録"""
+        await self._record_logs(
+            [
+                ReminderLog(
+                    user_id=result.user_id,
+                    reminder_type=result.reminder_type,
+                    sent_at=result.finished_at,
+                    email_address=result.email_address,
+                    success=result.success,
+                    error_message=result.error_message,
+                )
+                for result in results
+            ]
+        )
+
+    @property
+    def dispatcher(self) -> ReminderDispatcher:
+        if self._dispatcher is None:
+            self._dispatcher = ReminderDispatcher.from_env(self.email_service)
+        return self._dispatcher
+
     async def start_scheduler(self) -> Dict[str, Any]:
         """スケジューラーを開始"""
         if self.is_running:
@@ -355,8 +403,10 @@ class ReminderSchedulerService:
     async def _send_reminder_batch(
         self, users: List[Dict[str, Any]], reminder_type: str
     ) -> Dict[str, Any]:
-        """リマインダーメールのバッチ送信"""
+        """リマインダーメールのバッチ送信（配信エンジンで並列・レート制限付き）"""
         errors = []
+        jobs: List[ReminderJob] = []
+        invalid_logs: List[ReminderLog] = []
         for user_data in users:
             try:
                 # パーソナライズされたメッセージを生成
@@ -374,56 +424,63 @@ class ReminderSchedulerService:
                     improvement_points=user_data["improvement_points"][:3],  # 最大3個
                     personalized_message=personalized_message,
                 )
-
-                # メール送信
-                success = await self.email_service.send_reminder_email(reminder_email)
-
-                # ログ記録
-                log_entry = ReminderLog(
-                    user_id=user_data["user_id"],
-                    reminder_type=reminder_type,
-                    sent_at=datetime.now().isoformat(),
-                    email_address=user_data["email"],
-                    success=success,
-                    error_message=None if success else "Failed to send email",
-                )
-
-                self.recent_logs.append(log_entry)
-
-                if success:
-                    logger.info(
-                        f"Sent {reminder_type} reminder to {user_data['email']}"
-                    )
-                else:
-                    logger.error(
-                        f"Failed to send {reminder_type} reminder to {user_data['email']}"
-                    )
-
-                # メール送信間隔
-                await asyncio.sleep(1)
+                jobs.append(ReminderJob(user_data["user_id"], reminder_email))
 
             except Exception as e:
                 logger.error(
-                    f"Error sending reminder to {user_data.get('email', 'unknown')}: {e}"
+                    f"Error preparing reminder for {user_data.get('email', 'unknown')}: {e}"
                 )
 
                 # エラーログ記録
-                error_log = ReminderLog(
-                    user_id=user_data.get("user_id", "unknown"),
-                    reminder_type=reminder_type,
-                    sent_at=datetime.now().isoformat(),
-                    email_address=user_data.get("email", "unknown"),
-                    success=False,
-                    error_message=str(e),
+                invalid_logs.append(
+                    ReminderLog(
+                        user_id=user_data.get("user_id", "unknown"),
+                        reminder_type=reminder_type,
+                        sent_at=datetime.now().isoformat(),
+                        email_address=user_data.get("email", "unknown"),
+                        success=False,
+                        error_message=str(e),
+                    )
                 )
-                self.recent_logs.append(error_log)
                 errors.append(
                     f"Failed to send {reminder_type} reminder to {user_data.get('email', 'unknown')}: {str(e)}"
                 )
 
-        # ログ保存
-        self._save_logs()
-        return {"success": True, "sent_count": len(users), "errors": errors}
+        if invalid_logs:
+            await self._record_logs(invalid_logs)
+
+        if jobs and not self.email_service.is_configured():
+            logger.warning("Email configuration not complete. Cannot send emails.")
+            await self._record_logs(
+                [
+                    ReminderLog(
+                        user_id=job.user_id,
+                        reminder_type=reminder_type,
+                        sent_at=datetime.now().isoformat(),
+                        email_address=job.reminder.user_email,
+                        success=False,
+                        error_message="Email configuration not complete",
+                    )
+                    for job in jobs
+                ]
+            )
+            errors.append("Email configuration not complete")
+            return {"success": False, "sent_count": 0, "errors": errors}
+
+        summary = await self.dispatcher.dispatch(
+            jobs, sink=self._record_delivery_results
+        )
+        errors.extend(summary.errors)
+        logger.info(
+            f"Sent {summary.sent}/{len(jobs)} {reminder_type} reminders "
+            f"in {summary.elapsed_seconds:.1f}s ({summary.retries} retries)"
+        )
+        return {
+            "success": True,
+            "sent_count": summary.sent,
+            "failed_count": summary.failed + len(invalid_logs),
+            "errors": errors,
+        }
 
     def _generate_personalized_message(
         self, user_data: Dict[str, Any], reminder_type: str
@@ -523,8 +580,12 @@ class ReminderSchedulerService:
             "last_check_date": (
                 self.last_check_date.isoformat() if self.last_check_date else None
             ),
-            "recent_logs_count": len(self.recent_logs),
-            "last_10_logs": [asdict(log) for log in self.recent_logs[-10:]],
+            "recent_logs_count": len(self.log_store.recent),
+            "last_10_logs": self.log_store.recent_records(10),
+            "log_store": self.log_store.get_metrics(),
+            "dispatch": (
+                self._dispatcher.get_metrics() if self._dispatcher else None
+            ),
         }
 
     async def update_config(self, **kwargs) -> Dict[str, Any]:
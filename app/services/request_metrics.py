@@ -0,0 +1,266 @@
+"""
+Request and pipeline-stage latency metrics
+音声ロールプレイ API のリクエスト・処理ステージごとのレイテンシを Prometheus 形式で集計する
+
+- RequestTimingMiddleware: 素の ASGI ミドルウェア。ルートのテンプレート
+  （例: /api/conversation/{session_id}）単位でリクエスト時間を記録する。
+  どのルートにも一致しないパスは "<unmatched>" にまとめ、ラベル数を抑える
+- stage("stt") / timed_stage("tts"): STT・文脈解析・LLM・TTS などの処理時間を
+  ステージ別ヒストグラムに記録するスパン（with 文またはデコレーター）
+- ラベル付きの子メトリクスはキャッシュし、1リクエストあたりのオーバーヘッドを
+  数マイクロ秒に抑える（scripts/benchmark_request_metrics.py で計測）
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from prometheus_client import (  # type: ignore
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+)
+
+logger = logging.getLogger(__name__)
+
+# 音声パイプラインは数ミリ秒（キャッシュヒット）から数十秒（長い音声の STT）まで
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+_KNOWN_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+)
+
+
+class RequestMetrics:
+    """リクエスト・ステージ別のヒストグラム（ラベル付き子メトリクスをキャッシュする）"""
+
+    def __init__(self, registry: CollectorRegistry = REGISTRY):
+        self.registry = registry
+        self.request_duration = Histogram(
+            "voice_api_request_duration_seconds",
+            "Voice API request latency by route template",
+            ["route", "method", "status"],
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.stage_duration = Histogram(
+            "voice_pipeline_stage_duration_seconds",
+            "Voice pipeline stage latency (stt, context, llm, tts)",
+            ["stage", "outcome"],
+            buckets=LATENCY_BUCKETS,
+            registry=registry,
+        )
+        self.unhandled_errors = Counter(
+            "voice_api_unhandled_errors_total",
+            "Requests that raised before a response was sent",
+            ["route", "method"],
+            registry=registry,
+        )
+        self._request_children: Dict[Tuple[str, str, int], Any] = {}
+        self._stage_children: Dict[Tuple[str, str], Any] = {}
+
+    def observe_request(
+        self, route: str, method: str, status: int, seconds: float
+    ) -> None:
+        key = (route, method, status)
+        child = self._request_children.get(key)
+        if child is None:
+            child = self.request_duration.labels(route, method, str(status))
+            self._request_children[key] = child
+        child.observe(seconds)
+
+    def observe_stage(self, name: str, seconds: float, outcome: str = "ok") -> None:
+        key = (name, outcome)
+        child = self._stage_children.get(key)
+        if child is None:
+            child = self.stage_duration.labels(name, outcome)
+            self._stage_children[key] = child
+        child.observe(seconds)
+
+    def render(self) -> Tuple[bytes, str]:
+        """Prometheus のテキスト形式（本文と Content-Type）"""
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+
+_request_metrics: Optional[RequestMetrics] = None
+
+
+def get_request_metrics() -> RequestMetrics:
+    """Get global request metrics instance"""
+    global _request_metrics
+    if _request_metrics is None:
+        _request_metrics = RequestMetrics()
+    return _request_metrics
+
+
+def observe_stage(name: str, seconds: float, outcome: str = "ok") -> None:
+    """計測済みの所要時間をステージ別ヒストグラムに記録する"""
+    get_request_metrics().observe_stage(name, seconds, outcome)
+
+
+def _outcome(exc_type) -> str:
+    if exc_type is None:
+        return "ok"
+    if issubclass(exc_type, asyncio.CancelledError):
+        return "cancelled"
+    return "error"
+
+
+class stage:
+    """
+    処理ステージのスパン
+
+        with stage("stt") as span:
+            result = await speech_service.transcribe_audio(...)
+        stages["stt_ms"] = span.elapsed_ms
+
+    例外で抜けた場合は outcome="error"（キャンセルは "cancelled"）で記録する。
+    ステージ名はラベルになるため、固定の名前（stt / context / llm / tts など）を使う。
+    """
+
+    __slots__ = ("name", "started", "elapsed")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0.0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "stage":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.elapsed = time.perf_counter() - self.started
+        metrics = _request_metrics or get_request_metrics()
+        metrics.observe_stage(self.name, self.elapsed, _outcome(exc_type))
+        return False
+
+    @property
+    def elapsed_ms(self) -> float:
+        return round(self.elapsed * 1000, 2)
+
+
+def timed_stage(name: str) -> Callable:
+    """async 関数全体をステージとして計測するデコレーター"""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with stage(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class RequestTimingMiddleware:
+    """
+    ルートのテンプレート単位でリクエスト時間を記録する ASGI ミドルウェア
+
+    BaseHTTPMiddleware と違いリクエストをタスクに包み直さないため、
+    ストリーミング応答も含めて本文の送信完了までを低コストで計測できる。
+    ルーティング後に scope["route"] に設定されるルートからテンプレートを得る。
+    """
+
+    def __init__(
+        self,
+        app,
+        metrics: Optional[RequestMetrics] = None,
+        exclude_paths: Iterable[str] = ("/metrics",),
+    ):
+        self.app = app
+        self.metrics = metrics or get_request_metrics()
+        self.exclude_paths = frozenset(exclude_paths)
+        # id(route) -> テンプレート（ルートはアプリの生存期間中変わらない）
+        self._templates: Dict[int, str] = {}
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 0
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            # 応答前の例外はサーバー側で 500 になる
+            if not status:
+                self.metrics.unhandled_errors.labels(
+                    self._route(scope), self._method(scope)
+                ).inc()
+                status = 500
+            raise
+        finally:
+            self.metrics.observe_request(
+                self._route(scope),
+                self._method(scope),
+                status or 500,
+                time.perf_counter() - started,
+            )
+
+    def _route(self, scope) -> str:
+        route = scope.get("route")
+        if route is None:
+            return UNMATCHED_ROUTE
+        template = self._templates.get(id(route))
+        if template is None:
+            template = self._template(scope, route)
+            self._templates[id(route)] = template
+        return template
+
+    @staticmethod
+    def _template(scope, route) -> str:
+        """
+        ルートのテンプレート（ルーターの prefix を含む）
+
+        FastAPI のバージョンによって include_router(prefix=...) の prefix が
+        route.path に含まれないため、実際のパスから同じ段数を除いた先頭部分を
+        prefix とみなす（prefix はパスパラメータを含まない固定文字列の前提）。
+        """
+        template = getattr(route, "path_format", None) or route.path
+        if "{path" in template or ":path}" in template:
+            # Mount や path コンバーターは段数が一致しないのでそのまま使う
+            return template
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path) :]
+        segments = path.split("/")
+        depth = template.count("/")
+        prefix = "/".join(segments[:-depth]) if depth < len(segments) else ""
+        return prefix + template
+
+    @staticmethod
+    def _method(scope) -> str:
+        method = scope["method"]
+        return method if method in _KNOWN_METHODS else "OTHER"
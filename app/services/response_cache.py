@@ -0,0 +1,298 @@
+"""
+Semantic response cache for sales analysis
+営業応答のセマンティックキャッシュ（完全一致 + 文字n-gram TF-IDFによる近似一致）
+
+キーは匿名化・正規化した入力・プロンプトテンプレートのバージョン・
+テナント/ユーザー単位のスコープから作る。
+入力または応答に個人情報が含まれる場合は格納しない。
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from services.privacy_aware_context_service import anonymize_text
+except ImportError:
+    from app.services.privacy_aware_context_service import anonymize_text
+
+logger = logging.getLogger(__name__)
+
+# 同じ意味で使われる営業用語を代表語に寄せる（近似一致の取りこぼしを減らす）
+CANONICAL_TERMS = {
+    "価格": "料金",
+    "値段": "料金",
+    "費用": "料金",
+    "金額": "料金",
+    "コスト": "料金",
+    "お試し": "デモ",
+    "トライアル": "デモ",
+}
+_CANONICAL_PATTERN = re.compile("|".join(map(re.escape, CANONICAL_TERMS)))
+_NOISE_PATTERN = re.compile(r"[\s、。，．,.!?！？「」『』（）()・…ー〜~]+")
+# 匿名化プレースホルダー（[NAME] 等）は1文字の記号にまとめる
+_PLACEHOLDER_PATTERN = re.compile(r"\[[A-Z]+\]")
+# 文末の丁寧表現は応答内容に影響しないため除去する
+_ENDING_PATTERN = re.compile(r"(でしょうか|ですか|ますか|ください|下さい|です|ます|か)$")
+
+# 近似一致の候補として評価する最大件数
+MAX_CANDIDATES = 64
+
+
+def cache_scope_for(
+    profile: Optional[Dict[str, Any]] = None, user_id: Optional[str] = None
+) -> str:
+    """
+    応答キャッシュのスコープ（テナントID、なければユーザーID）
+
+    どちらも不明な場合は空文字を返し、同じプロンプトバージョンの
+    呼び出し全体で共有する（個人情報を含む応答はそもそも格納しない）。
+    セッションIDは呼び出しごとに変わるためスコープには使わない。
+    """
+    profile = profile or {}
+    return str(profile.get("tenant_id") or user_id or profile.get("user_id") or "")
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算（日本語は1文字≒1トークン、ASCIIは4文字≒1トークン）"""
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return (len(text) - ascii_chars) + math.ceil(ascii_chars / 4)
+
+
+@dataclass
+class ResponseCacheStats:
+    """応答キャッシュの統計情報"""
+
+    exact_hits: int = 0
+    near_hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    tokens_saved: int = 0
+    skipped_pii: int = 0
+
+
+@dataclass
+class _Entry:
+    version: str
+    scope: str
+    value: str
+    tokens: int
+    created_at: float
+    ngrams: Counter
+
+
+class SemanticResponseCache:
+    """TTL + LRU 付きのセマンティック応答キャッシュ
+
+    完全一致はハッシュで O(1)、近似一致は n-gram の転置インデックスで
+    候補を絞り込んでから TF-IDF コサイン類似度で判定する。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        similarity_threshold: float = 0.85,
+        ngram_size: int = 2,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.ngram_size = ngram_size
+        self.stats = ResponseCacheStats()
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # (バージョン, スコープ, n-gram) -> キーの集合（検索対象外の応答は候補に入れない）
+        self._index: Dict[Tuple[str, str, str], set] = {}
+        self._document_frequency: Counter = Counter()
+
+    @classmethod
+    def from_env(cls) -> "SemanticResponseCache":
+        return cls(
+            max_entries=int(os.getenv("SALES_CACHE_MAX_ENTRIES", "1024")),
+            ttl_seconds=float(os.getenv("SALES_CACHE_TTL_SECONDS", "3600")),
+            similarity_threshold=float(os.getenv("SALES_CACHE_SIMILARITY", "0.85")),
+        )
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """匿名化・NFKC正規化・用語の代表語化・記号と文末表現の除去"""
+        text = _PLACEHOLDER_PATTERN.sub("●", anonymize_text(text))
+        text = unicodedata.normalize("NFKC", text).lower()
+        text = _CANONICAL_PATTERN.sub(lambda m: CANONICAL_TERMS[m.group(0)], text)
+        text = _NOISE_PATTERN.sub("", text)
+        return _ENDING_PATTERN.sub("", text) or text
+
+    @staticmethod
+    def make_key(normalized: str, version: str, scope: str = "") -> str:
+        payload = f"{version}\0{scope}\0{normalized}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def contains_pii(text: str) -> bool:
+        return anonymize_text(text) != text
+
+    def _ngrams(self, normalized: str) -> Counter:
+        n = self.ngram_size
+        if len(normalized) <= n:
+            return Counter([normalized]) if normalized else Counter()
+        return Counter(normalized[i : i + n] for i in range(len(normalized) - n + 1))
+
+    def _idf(self, gram: str) -> float:
+        # 平滑化IDF（未知語も1.0以上の重みを持つ）
+        documents = 1 + len(self._entries)
+        return math.log(documents / (1 + self._document_frequency[gram])) + 1
+
+    def _cosine(self, query: Counter, candidate: Counter) -> float:
+        dot = 0.0
+        for gram, count in query.items():
+            if gram in candidate:
+                dot += count * candidate[gram] * self._idf(gram) ** 2
+        if dot == 0.0:
+            return 0.0
+        query_norm = math.sqrt(sum((c * self._idf(g)) ** 2 for g, c in query.items()))
+        candidate_norm = math.sqrt(
+            sum((c * self._idf(g)) ** 2 for g, c in candidate.items())
+        )
+        return dot / (query_norm * candidate_norm)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for gram in entry.ngrams:
+            posting = (entry.version, entry.scope, gram)
+            keys = self._index.get(posting)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[posting]
+            self._document_frequency[gram] -= 1
+            if self._document_frequency[gram] <= 0:
+                del self._document_frequency[gram]
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return now - entry.created_at > self.ttl_seconds
+
+    def _purge_expired(self, now: float) -> None:
+        # LRU順の先頭から期限切れを除去する（途中の期限切れは参照時に除去）
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if not self._expired(entry, now):
+                break
+            self._remove(key)
+            self.stats.expirations += 1
+
+    def _hit(self, key: str, entry: _Entry, exact: bool) -> str:
+        self._entries.move_to_end(key)
+        if exact:
+            self.stats.exact_hits += 1
+        else:
+            self.stats.near_hits += 1
+        self.stats.tokens_saved += entry.tokens
+        return entry.value
+
+    def lookup(
+        self, text: str, version: str, scope: str = ""
+    ) -> Optional[Tuple[str, str, float]]:
+        """
+        キャッシュを検索する（同じスコープに格納された応答のみが対象）
+
+        Returns:
+            (キャッシュ値, "exact" | "near", 類似度) または None
+        """
+        now = time.monotonic()
+        normalized = self.normalize(text)
+        key = self.make_key(normalized, version, scope)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if not self._expired(entry, now):
+                return self._hit(key, entry, exact=True), "exact", 1.0
+            self._remove(key)
+            self.stats.expirations += 1
+
+        # 同じバージョン・スコープの応答だけを数えてから上位候補に絞る
+        query = self._ngrams(normalized)
+        shared: Counter = Counter()
+        for gram in query:
+            for candidate_key in self._index.get((version, scope, gram), ()):
+                shared[candidate_key] += 1
+
+        best_key, best_score = None, 0.0
+        for candidate_key, _ in shared.most_common(MAX_CANDIDATES):
+            candidate = self._entries[candidate_key]
+            if self._expired(candidate, now):
+                continue
+            score = self._cosine(query, candidate.ngrams)
+            if score > best_score:
+                best_key, best_score = candidate_key, score
+
+        if best_key is not None and best_score >= self.similarity_threshold:
+            entry = self._entries[best_key]
+            return self._hit(best_key, entry, exact=False), "near", best_score
+
+        self.stats.misses += 1
+        return None
+
+    def store(
+        self, text: str, version: str, value: str, tokens: int, scope: str = ""
+    ) -> None:
+        """応答を格納し、期限切れ・上限超過分を追い出す
+
+        入力または応答に個人情報が含まれる場合は、匿名化したキーで
+        他の利用者に返さないよう格納しない。
+        """
+        if self.contains_pii(text) or self.contains_pii(value):
+            self.stats.skipped_pii += 1
+            return
+        now = time.monotonic()
+        normalized = self.normalize(text)
+        if not normalized:
+            return
+        key = self.make_key(normalized, version, scope)
+        self._remove(key)
+
+        ngrams = self._ngrams(normalized)
+        self._entries[key] = _Entry(version, scope, value, tokens, now, ngrams)
+        for gram in ngrams:
+            self._index.setdefault((version, scope, gram), set()).add(key)
+            self._document_frequency[gram] += 1
+        self.stats.stores += 1
+
+        self._purge_expired(now)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def record_bypass(self) -> None:
+        self.stats.bypassed += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._index.clear()
+        self._document_frequency.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """ヒット率・推定トークン削減数などのメトリクスを返す"""
+        hits = self.stats.exact_hits + self.stats.near_hits
+        lookups = hits + self.stats.misses
+        return {
+            **asdict(self.stats),
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "similarity_threshold": self.similarity_threshold,
+        }
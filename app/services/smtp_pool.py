@@ -0,0 +1,211 @@
+"""
+Pooled SMTP connections for reminder delivery
+SMTP接続プール（STARTTLS・ログインは接続ごとに1回、送信はワーカースレッドで実行）
+"""
+
+import asyncio
+import logging
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from email.message import Message
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# 接続断・一時的なエラーとして再接続/再試行の対象にする例外
+_DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+def is_transient_smtp_error(error: BaseException) -> bool:
+    """再試行すべき一時的なエラーかどうか（4xx応答・接続断・タイムアウト）"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPException, OSError))
+
+
+@dataclass
+class SmtpPoolStats:
+    """SMTP接続プールの統計情報"""
+
+    connections_opened: int = 0
+    connections_closed: int = 0
+    messages_sent: int = 0
+    send_failures: int = 0
+    reconnects: int = 0
+
+
+class _PooledConnection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages = 0
+
+
+class SmtpConnectionPool:
+    """スレッドセーフなSMTP接続プール
+
+    smtplib はブロッキングなので、送信は専用スレッドプール上で実行し
+    イベントループを止めない。アイドル接続は LIFO で再利用し、
+    idle_timeout を超えたものやサーバーから切断されたものは作り直す。
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        use_tls: bool = True,
+        max_connections: int = 4,
+        idle_timeout: float = 60.0,
+        max_messages_per_connection: int = 100,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.max_messages_per_connection = max_messages_per_connection
+        self.timeout = timeout
+        self.stats = SmtpPoolStats()
+
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._stats_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_connections, thread_name_prefix="smtp"
+        )
+        self._closed = False
+
+    def _count(self, field: str) -> None:
+        with self._stats_lock:
+            setattr(self.stats, field, getattr(self.stats, field) + 1)
+
+    def _connect(self) -> _PooledConnection:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.use_tls:
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._count("connections_opened")
+        return _PooledConnection(smtp)
+
+    def _discard(self, conn: _PooledConnection) -> None:
+        try:
+            conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+        self._count("connections_closed")
+
+    def _checkout(self) -> _PooledConnection:
+        now = time.monotonic()
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if now - conn.last_used <= self.idle_timeout:
+                return conn
+            self._discard(conn)
+
+    def _checkin(self, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        if self._closed or conn.messages >= self.max_messages_per_connection:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    def send_message_sync(
+        self, message: Message, from_addr: str, to_addr: str
+    ) -> None:
+        """ブロッキング送信（ワーカースレッドから呼ぶ）
+
+        プール済み接続がサーバー側で切断されていた場合は一度だけ再接続する。
+        それ以外のSMTPエラーは呼び出し側（再試行制御）へそのまま送出する。
+        """
+        payload = message.as_string()
+        with self._slots:
+            conn = self._checkout()
+            try:
+                try:
+                    conn.smtp.sendmail(from_addr, [to_addr], payload)
+                except _DISCONNECT_ERRORS:
+                    if conn.messages == 0:
+                        raise
+                    # アイドル中に切断された接続 → 新しい接続で再送
+                    self._discard(conn)
+                    self._count("reconnects")
+                    conn = self._connect()
+                    conn.smtp.sendmail(from_addr, [to_addr], payload)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+                # サーバーが応答を返している＝接続自体は健全なので再利用する
+                self._count("send_failures")
+                try:
+                    conn.smtp.rset()
+                    self._checkin(conn)
+                except Exception:
+                    self._discard(conn)
+                raise
+            except Exception:
+                self._count("send_failures")
+                self._discard(conn)
+                raise
+            conn.messages += 1
+            self._count("messages_sent")
+            self._checkin(conn)
+
+    async def send_message(
+        self, message: Message, from_addr: str, to_addr: str
+    ) -> None:
+        """イベントループを止めずにメールを送信する"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self._executor, self.send_message_sync, message, from_addr, to_addr
+        )
+
+    def check_connection_sync(self) -> None:
+        """接続・STARTTLS・ログインが通るか確認する（プールには戻さない）"""
+        conn = self._connect()
+        self._discard(conn)
+
+    async def check_connection(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.check_connection_sync)
+
+    def close(self) -> None:
+        """アイドル接続を閉じ、ワーカースレッドを停止する"""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        self._executor.shutdown(wait=False)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        sent = self.stats.messages_sent
+        opened = self.stats.connections_opened
+        return {
+            **asdict(self.stats),
+            "idle_connections": self._idle.qsize(),
+            "max_connections": self.max_connections,
+            "messages_per_connection": sent / opened if opened else 0.0,
+            "server": f"{self.host}:{self.port}",
+        }
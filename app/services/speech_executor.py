@@ -0,0 +1,441 @@
+"""
+Speech inference executor
+WhisperXの推論をイベントループ外のワーカープールで実行する
+"""
+
+import asyncio
+import bisect
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# WhisperXが想定する入力サンプリングレート
+SAMPLE_RATE = 16000
+
+# バッチ内の音声の間に挟む無音（VADのチャンク長30秒以上あればリクエストをまたいで結合されない）
+BATCH_GAP_SAMPLES = 30 * SAMPLE_RATE
+
+# ワーカーごとのモデル（スレッドプールではスレッド単位、プロセスプールではプロセス単位）
+_worker_state = threading.local()
+
+
+class SpeechQueueFullError(Exception):
+    """推論キューが満杯（呼び出し側は429を返す）"""
+
+    pass
+
+
+def _init_worker(model_size: str, device: str, compute_type: str) -> None:
+    """ワーカー起動時に一度だけWhisperXモデルを読み込む"""
+    try:
+        import whisperx  # type: ignore
+
+        _worker_state.model = whisperx.load_model(
+            model_size, device=device, compute_type=compute_type
+        )
+        logger.info(
+            f"WhisperX {model_size} model loaded in worker "
+            f"(pid={os.getpid()}, thread={threading.get_ident()})"
+        )
+    except Exception as e:
+        # 初期化で例外を投げるとプール全体が壊れるため、None を保持して呼び出し時に通知
+        logger.error(f"Failed to load WhisperX model in worker: {e}")
+        _worker_state.model = None
+
+
+def _decode_padded(decode: Callable[[bytes], Any], audio_data: bytes) -> Any:
+    import numpy as np
+
+    audio = decode(audio_data)
+    # 0.5秒未満の音声はパディング
+    if len(audio) < 8000:
+        audio = np.pad(audio, (0, 8000 - len(audio)), "constant")
+    return audio
+
+
+def _transcribe_batch_in_worker(
+    decode: Callable[[bytes], Any],
+    audio_batch: List[bytes],
+    language: str,
+    batch_size: int,
+) -> Tuple[Optional[List[Any]], float, float]:
+    """ワーカー内で複数リクエストの音声をデコードし、1回の推論で処理する
+
+    複数の音声は無音区間を挟んで連結して transcribe に渡し、
+    セグメントは重なりが最も大きい元のリクエストに振り分ける。
+
+    Args:
+        decode: 音声バイト列を16kHz float32配列に変換する関数（一時ファイルを使わない）
+
+    Returns:
+        (リクエストごとの結果または例外のリスト（モデル未ロード時はNone）, 開始時刻, 終了時刻)
+    """
+    started_at = time.time()
+    model = getattr(_worker_state, "model", None)
+    if model is None:
+        return None, started_at, time.time()
+
+    import numpy as np
+
+    results: List[Any] = [None] * len(audio_batch)
+    buffers = []
+    spans = []  # (リクエスト番号, 開始サンプル, 終了サンプル)
+    position = 0
+    gap = np.zeros(BATCH_GAP_SAMPLES, dtype=np.float32)
+    for index, audio_data in enumerate(audio_batch):
+        try:
+            audio = _decode_padded(decode, audio_data)
+        except Exception as e:
+            results[index] = e
+            continue
+        if buffers:
+            buffers.append(gap)
+            position += len(gap)
+        spans.append((index, position, position + len(audio)))
+        buffers.append(audio)
+        position += len(audio)
+
+    if not buffers:
+        return results, started_at, time.time()
+
+    audio = buffers[0] if len(buffers) == 1 else np.concatenate(buffers)
+    result = model.transcribe(audio, batch_size=batch_size, language=language)
+
+    starts = [start for _, start, _ in spans]
+    for index, _, _ in spans:
+        results[index] = {**result, "segments": []}
+    for segment in result.get("segments", []):
+        seg_start = segment["start"] * SAMPLE_RATE
+        seg_end = max(segment["end"] * SAMPLE_RATE, seg_start)
+        # WhisperX の開始時刻は境界より少し前になることがあるため、開始位置ではなく
+        # 重なりが最も大きいリクエストに割り当てる（重なりがなければ中点で決める）
+        first = max(0, bisect.bisect_right(starts, seg_start) - 1)
+        last = max(0, bisect.bisect_right(starts, seg_end) - 1)
+        span = max(0, bisect.bisect_right(starts, (seg_start + seg_end) / 2) - 1)
+        best_overlap = 0.0
+        for candidate in range(first, last + 1):
+            _, clip_start, clip_end = spans[candidate]
+            overlap = min(seg_end, clip_end) - max(seg_start, clip_start)
+            if overlap > best_overlap:
+                span, best_overlap = candidate, overlap
+        index, clip_start, clip_end = spans[span]
+        # 元の音声の範囲に収めてから、その音声の先頭からの時刻に直す
+        shift = clip_start / SAMPLE_RATE
+        clip_length = (clip_end - clip_start) / SAMPLE_RATE
+        results[index]["segments"].append(
+            {
+                **segment,
+                "start": min(max(segment["start"] - shift, 0.0), clip_length),
+                "end": min(max(segment["end"] - shift, 0.0), clip_length),
+            }
+        )
+    return results, started_at, time.time()
+
+
+@dataclass
+class SpeechExecutorStats:
+    """推論エグゼキューターの統計情報"""
+
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    total_queue_wait: float = 0.0
+    total_compute: float = 0.0
+
+
+class SpeechInferenceExecutor:
+    """WhisperX専用の推論エグゼキューター
+
+    スレッドプールまたはプロセスプールでモデルを保持するワーカーを起動し、
+    実行中＋待機中のリクエスト数が上限に達した場合は SpeechQueueFullError を送出する。
+    """
+
+    def __init__(
+        self,
+        decode: Callable[[bytes], Any],
+        mode: str = "thread",
+        max_workers: int = 1,
+        max_queue_size: int = 8,
+        model_size: str = "tiny",
+        device: str = "cpu",
+        compute_type: str = "int8",
+    ):
+        """
+        Args:
+            decode: 音声バイト列を16kHz float32配列に変換する関数（ワーカー内で実行）
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Invalid executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.model_size = model_size
+        self.decode = decode
+        self.stats = SpeechExecutorStats()
+        self._in_flight = 0
+
+        initargs = (model_size, device, compute_type)
+        if mode == "process":
+            # fork はスレッドを持つサーバープロセスを複製してデッドロックしうるため spawn
+            self._executor: Executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=initargs,
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="speech-worker",
+                initializer=_init_worker,
+                initargs=initargs,
+            )
+        logger.info(
+            f"Speech inference executor started: mode={mode}, "
+            f"workers={max_workers}, queue={max_queue_size}"
+        )
+
+    @classmethod
+    def from_env(
+        cls, decode: Callable[[bytes], Any], model_size: str = "tiny"
+    ) -> "SpeechInferenceExecutor":
+        """環境変数（STT_EXECUTOR_MODE / STT_WORKERS / STT_QUEUE_SIZE）から作成"""
+        return cls(
+            decode,
+            mode=os.getenv("STT_EXECUTOR_MODE", "thread"),
+            max_workers=int(os.getenv("STT_WORKERS", "1")),
+            max_queue_size=int(os.getenv("STT_QUEUE_SIZE", "8")),
+            model_size=model_size,
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue_size
+
+    def acquire(self, count: int = 1) -> None:
+        """実行中＋待機中の枠を確保（満杯なら SpeechQueueFullError）"""
+        if self._in_flight + count > self.capacity:
+            self.stats.rejected += count
+            raise SpeechQueueFullError(
+                f"Speech recognition queue is full ({self._in_flight} requests)"
+            )
+        self._in_flight += count
+        self.stats.submitted += count
+
+    def release(self, count: int = 1) -> None:
+        self._in_flight -= count
+
+    async def transcribe_batch(
+        self, audio_batch: List[bytes], language: str, batch_size: int = 1
+    ) -> Tuple[Optional[List[Any]], float, float]:
+        """確保済みのリクエストをまとめてワーカーで推論する
+
+        Returns:
+            (リクエストごとの結果または例外のリスト, ワーカー開始時刻, 終了時刻)
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            results, started_at, finished_at = await loop.run_in_executor(
+                self._executor,
+                _transcribe_batch_in_worker,
+                self.decode,
+                audio_batch,
+                language,
+                batch_size,
+            )
+        except Exception:
+            self.stats.failed += len(audio_batch)
+            raise
+
+        compute = finished_at - started_at
+        self.stats.completed += len(audio_batch)
+        self.stats.total_compute += compute * len(audio_batch)
+        return results, started_at, finished_at
+
+    async def transcribe(
+        self, audio_data: bytes, language: str, batch_size: int = 1
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, float]]:
+        """ワーカーで推論し、結果とキュー待ち・計算時間を返す"""
+        self.acquire()
+        submitted_at = time.time()
+        try:
+            results, started_at, finished_at = await self.transcribe_batch(
+                [audio_data], language, batch_size
+            )
+        finally:
+            self.release()
+
+        queue_wait = max(0.0, started_at - submitted_at)
+        self.stats.total_queue_wait += queue_wait
+        result = results[0] if results is not None else None
+        if isinstance(result, Exception):
+            raise result
+        return result, {
+            "queue_wait_ms": round(queue_wait * 1000, 2),
+            "compute_ms": round((finished_at - started_at) * 1000, 2),
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """キュー状況と平均待ち時間・計算時間を返す"""
+        completed = self.stats.completed
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "in_flight": self._in_flight,
+            **asdict(self.stats),
+            "avg_queue_wait_ms": (
+                round(self.stats.total_queue_wait / completed * 1000, 2)
+                if completed
+                else 0.0
+            ),
+            "avg_compute_ms": (
+                round(self.stats.total_compute / completed * 1000, 2)
+                if completed
+                else 0.0
+            ),
+        }
+
+    def shutdown(self) -> None:
+        """ワーカープールを停止"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@dataclass
+class _PendingTranscription:
+    audio_data: bytes
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class SpeechMicroBatcher:
+    """同時に届いたSTTリクエストをまとめて1回の推論で処理するマイクロバッチ層
+
+    最初のリクエストから max_wait_ms 以内に届いた同一言語のリクエストを
+    最大 max_batch_size 件まで束ね、結果をそれぞれの待機中コルーチンに返す。
+    """
+
+    def __init__(
+        self,
+        executor: SpeechInferenceExecutor,
+        max_batch_size: int = 4,
+        max_wait_ms: float = 15.0,
+        latency_window: int = 1000,
+    ):
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.batch_size_histogram: Counter = Counter()
+        self._latencies: deque = deque(maxlen=latency_window)
+        self._pending: Dict[str, List[_PendingTranscription]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: set = set()
+
+    @classmethod
+    def from_env(cls, executor: SpeechInferenceExecutor) -> "SpeechMicroBatcher":
+        """環境変数（STT_MAX_BATCH_SIZE / STT_MAX_BATCH_WAIT_MS）から作成"""
+        return cls(
+            executor,
+            max_batch_size=int(os.getenv("STT_MAX_BATCH_SIZE", "4")),
+            max_wait_ms=float(os.getenv("STT_MAX_BATCH_WAIT_MS", "15")),
+        )
+
+    async def transcribe(
+        self, audio_data: bytes, language: str
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, float]]:
+        """バッチに参加して推論結果とタイミングを返す"""
+        self.executor.acquire()
+        loop = asyncio.get_running_loop()
+        pending = _PendingTranscription(audio_data, loop.create_future(), time.time())
+        try:
+            queue = self._pending.setdefault(language, [])
+            queue.append(pending)
+            if len(queue) >= self.max_batch_size:
+                self._flush(language)
+            elif len(queue) == 1:
+                self._timers[language] = loop.call_later(
+                    self.max_wait, self._flush, language
+                )
+            return await pending.future
+        finally:
+            self.executor.release()
+
+    def _flush(self, language: str) -> None:
+        timer = self._timers.pop(language, None)
+        if timer is not None:
+            timer.cancel()
+        queue = self._pending.pop(language, [])
+        # キャンセル済みの待機者は推論対象から外す
+        batch = [item for item in queue if not item.future.done()]
+        if batch:
+            task = asyncio.create_task(self._run_batch(language, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(
+        self, language: str, batch: List[_PendingTranscription]
+    ) -> None:
+        self.batch_size_histogram[len(batch)] += 1
+        try:
+            results, started_at, finished_at = await self.executor.transcribe_batch(
+                [item.audio_data for item in batch],
+                language,
+                batch_size=len(batch),
+            )
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        compute_ms = round((finished_at - started_at) * 1000, 2)
+        for index, item in enumerate(batch):
+            queue_wait = max(0.0, started_at - item.enqueued_at)
+            self.executor.stats.total_queue_wait += queue_wait
+            self._latencies.append(finished_at - item.enqueued_at)
+            if item.future.done():
+                continue
+            result = results[index] if results is not None else None
+            if isinstance(result, Exception):
+                item.future.set_exception(result)
+            else:
+                item.future.set_result(
+                    (
+                        result,
+                        {
+                            "queue_wait_ms": round(queue_wait * 1000, 2),
+                            "compute_ms": compute_ms,
+                            "batch_size": len(batch),
+                        },
+                    )
+                )
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """バッチサイズのヒストグラムとレイテンシ分布を返す"""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(p * len(latencies)))
+            return round(latencies[index] * 1000, 2)
+
+        batches = sum(self.batch_size_histogram.values())
+        requests = sum(size * n for size, n in self.batch_size_histogram.items())
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": batches,
+            "avg_batch_size": round(requests / batches, 2) if batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95)},
+        }
@@ -12,9 +12,9 @@ try:
 except ImportError:
     WHISPERX_AVAILABLE = False
 
-import tempfile
-import os
 import logging
+import struct
+import subprocess
 from typing import Optional, Dict, Any, List
 from pathlib import Path
 
@@ -22,6 +22,23 @@ from pathlib import Path
 import gc
 import numpy as np
 
+try:
+    from services.speech_executor import (
+        SAMPLE_RATE,
+        SpeechInferenceExecutor,
+        SpeechMicroBatcher,
+        SpeechQueueFullError,
+    )
+    from services.request_metrics import timed_stage
+except ImportError:
+    from app.services.speech_executor import (
+        SAMPLE_RATE,
+        SpeechInferenceExecutor,
+        SpeechMicroBatcher,
+        SpeechQueueFullError,
+    )
+    from app.services.request_metrics import timed_stage
+
 logger = logging.getLogger(__name__)
 
 
@@ -31,6 +48,105 @@ class SpeechServiceError(Exception):
     pass
 
 
+# WAVE_FORMAT_PCM / WAVE_FORMAT_IEEE_FLOAT / WAVE_FORMAT_EXTENSIBLE
+_WAV_PCM = 1
+_WAV_FLOAT = 3
+_WAV_EXTENSIBLE = 0xFFFE
+
+
+def _decode_pcm_wav(audio_data: bytes) -> Optional[np.ndarray]:
+    """16kHzのPCM WAVをnp.frombufferで直接float32に変換する
+
+    対応外の形式（圧縮・16kHz以外など）の場合はNoneを返す。
+    """
+    if len(audio_data) < 12 or audio_data[:4] != b"RIFF" or audio_data[8:12] != b"WAVE":
+        return None
+
+    view = memoryview(audio_data)
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(audio_data):
+        chunk_id = audio_data[offset : offset + 4]
+        (chunk_size,) = struct.unpack_from("<I", audio_data, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt " and chunk_size >= 16:
+            fmt = struct.unpack_from("<HHIIHH", audio_data, body)
+            if fmt[0] == _WAV_EXTENSIBLE and chunk_size >= 26:
+                # SubFormat GUIDの先頭2バイトが実際の形式
+                (sub_format,) = struct.unpack_from("<H", audio_data, body + 24)
+                fmt = (sub_format,) + fmt[1:]
+        elif chunk_id == b"data" and fmt is not None:
+            audio_format, channels, sample_rate, _, block_align, bits = fmt
+            if sample_rate != SAMPLE_RATE or channels < 1:
+                return None
+            # ストリーミングWAVなどでデータ長が実データを超える場合は切り詰める
+            end = min(body + chunk_size, len(audio_data))
+            end -= (end - body) % block_align
+            pcm = view[body:end]
+
+            if audio_format == _WAV_PCM and bits == 16:
+                samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+                samples /= 32768.0
+            elif audio_format == _WAV_PCM and bits == 32:
+                samples = np.frombuffer(pcm, dtype="<i4").astype(np.float32)
+                samples /= 2147483648.0
+            elif audio_format == _WAV_FLOAT and bits == 32:
+                samples = np.frombuffer(pcm, dtype="<f4")
+            else:
+                return None
+
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1)
+            return samples.astype(np.float32, copy=False)
+        offset = body + chunk_size + (chunk_size & 1)
+
+    return None
+
+
+def _decode_with_ffmpeg(audio_data: bytes) -> np.ndarray:
+    """圧縮形式などをffmpegでパイプ経由でデコードする（一時ファイルなし）"""
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-threads",
+        "0",
+        "-i",
+        "pipe:0",
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+    try:
+        out = subprocess.run(
+            cmd, input=audio_data, capture_output=True, check=True
+        ).stdout
+    except FileNotFoundError as e:
+        raise SpeechServiceError("ffmpeg is not installed") from e
+    except subprocess.CalledProcessError as e:
+        raise SpeechServiceError(
+            f"Failed to decode audio: {e.stderr.decode(errors='ignore')[-200:]}"
+        ) from e
+    return np.frombuffer(out, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def decode_audio(audio_data: bytes) -> np.ndarray:
+    """
+    Decode uploaded audio bytes into a mono float32 16kHz buffer
+
+    PCM WAVはnp.frombufferで直接変換し、それ以外はffmpegにパイプで渡す。
+    """
+    audio = _decode_pcm_wav(audio_data)
+    if audio is None:
+        audio = _decode_with_ffmpeg(audio_data)
+    return audio
+
+
 class SpeechService:
     """Service for handling speech-to-text conversion using WhisperX with speaker diarization"""
 
@@ -58,6 +174,8 @@ class SpeechService:
         self.model = None
         self.align_model = None
         self.diarize_model = None
+        self.executor: Optional[SpeechInferenceExecutor] = None
+        self.batcher: Optional[SpeechMicroBatcher] = None
 
         # Extreme speed settings
         self.extreme_speed = True
@@ -85,15 +203,19 @@ class SpeechService:
                 logger.info("Fallback speech service initialized (no WhisperX)")
                 return
 
-            logger.info(f"Loading WhisperX TINY model for extreme speed")
+            logger.info(f"Starting WhisperX TINY inference workers for extreme speed")
 
-            # Load ONLY the core WhisperX model
-            self.model = whisperx.load_model(
-                "tiny",  # Always tiny for speed
-                device="cpu",  # CPU for tiny model stability
-                compute_type="int8",  # Fastest compute type
+            # 推論はイベントループ外のワーカーで実行し、モデルは各ワーカーが一度だけ読み込む
+            # (tiny / cpu / int8 は各ワーカーの初期化で使用)
+            self.executor = SpeechInferenceExecutor.from_env(
+                decode_audio, model_size="tiny"
             )
-            logger.info(f"WhisperX TINY model loaded (EXTREME SPEED MODE)")
+            self.model = self.executor
+            # 同時リクエストをまとめて推論するマイクロバッチ（STT_MAX_BATCH_SIZE=1で無効）
+            batcher = SpeechMicroBatcher.from_env(self.executor)
+            if batcher.max_batch_size > 1:
+                self.batcher = batcher
+            logger.info(f"WhisperX inference executor ready (EXTREME SPEED MODE)")
 
             # Skip ALL other models for maximum speed
             self.align_model = None
@@ -133,6 +255,7 @@ class SpeechService:
             logger.error(f"Failed to load diarization model on demand: {str(e)}")
             return False
 
+    @timed_stage("stt")
     async def transcribe_audio(
         self,
         audio_data: bytes,
@@ -155,30 +278,22 @@ class SpeechService:
             logger.info("Using fallback speech recognition")
             return self._fallback_transcribe(audio_data, use_language)
 
-        # Create temporary file to store audio data
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            temp_file.write(audio_data)
-            temp_file_path = temp_file.name
-
         try:
             logger.info(f"EXTREME SPEED: Transcribing audio")
 
-            # Load audio with WhisperX
-            audio = whisperx.load_audio(temp_file_path)
-
-            # EXTREME SPEED: Skip duration checks for maximum speed
-            # Only pad if absolutely necessary
-            if len(audio) < 8000:  # Less than 0.5 seconds at 16kHz
-                padding = 8000 - len(audio)
-                audio = np.pad(audio, (0, padding), "constant")
-
             # 1. Transcribe with WhisperX (EXTREME SPEED MODE)
-            # Absolute minimum settings for sub-second processing
-            result = self.model.transcribe(
-                audio,
-                batch_size=1,  # Minimum batch for maximum speed
-                language=use_language,
-            )
+            # 読み込み・推論はワーカーで実行し、イベントループをブロックしない
+            if self.batcher is not None:
+                result, timing = await self.batcher.transcribe(audio_data, use_language)
+            else:
+                result, timing = await self.executor.transcribe(
+                    audio_data,
+                    use_language,
+                    batch_size=1,  # Minimum batch for maximum speed
+                )
+            if result is None:
+                logger.warning("WhisperX model unavailable in worker, using fallback")
+                return self._fallback_transcribe(audio_data, use_language)
 
             # 2. EXTREME SPEED: Skip ALL extra processing
             diarization_successful = False
@@ -186,22 +301,25 @@ class SpeechService:
 
             # Process and format results with minimal overhead
             transcription_result = self._format_result_fast(result, use_language)
+            transcription_result["timing"] = timing
+            transcription_result["processing_time"] = (
+                timing["queue_wait_ms"] + timing["compute_ms"]
+            ) / 1000
 
             # EXTREME SPEED: Skip GPU cleanup for speed
-            logger.info(f"EXTREME SPEED: Transcription completed")
+            logger.info(
+                f"EXTREME SPEED: Transcription completed "
+                f"(queue {timing['queue_wait_ms']}ms, compute {timing['compute_ms']}ms)"
+            )
             return transcription_result
 
+        except SpeechQueueFullError:
+            # バックプレッシャーは呼び出し側で429に変換する
+            raise
         except Exception as e:
             logger.error(f"Failed to transcribe audio: {str(e)}")
             raise SpeechServiceError(f"Failed to transcribe audio: {str(e)}")
 
-        finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_file_path)
-            except OSError:
-                pass
-
     def _fallback_transcribe(self, audio_data: bytes, language: str) -> Dict[str, Any]:
         """
         Fallback transcription when WhisperX is not available
@@ -380,6 +498,8 @@ class SpeechService:
             "loaded": self.model is not None,
             "alignment_available": self.align_model is not None,
             "diarization_available": self.diarize_model is not None,
+            "executor": self.executor.get_metrics() if self.executor else None,
+            "batching": self.batcher.get_metrics() if self.batcher else None,
             "features": {
                 "transcription": True,
                 "alignment": self.align_model is not None,
@@ -402,8 +522,18 @@ class SpeechService:
             "whisperx_available": WHISPERX_AVAILABLE,
             "fallback_mode": is_fallback,
             "warning": "WhisperXが利用できません" if is_fallback else None,
+            "executor": self.executor.get_metrics() if self.executor else None,
+            "batching": self.batcher.get_metrics() if self.batcher else None,
         }
 
+    def shutdown(self) -> None:
+        """推論ワーカーを停止"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+            self.batcher = None
+            self.model = None
+
 
 # Global speech service instance
 _speech_service_instance: Optional[SpeechService] = None
@@ -431,3 +561,12 @@ def get_speech_service(
         )
 
     return _speech_service_instance
+
+
+def shutdown_speech_service() -> None:
+    """Stop the global speech service's inference workers"""
+    global _speech_service_instance
+
+    if _speech_service_instance is not None:
+        _speech_service_instance.shutdown()
+        _speech_service_instance = None
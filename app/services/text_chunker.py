@@ -0,0 +1,293 @@
+"""
+Token-aware text chunker
+AIプロバイダーのトークン数で大きさを測るチャンク分割（オーバーラップ・文字位置付き）
+
+1. 見出し・段落・文・行の境界を正規表現で1回ずつ走査し、境界の強さ（ランク）付きの
+   区間列を作る（最大トークン数を超える区間はトークン数で強制分割する）
+2. 区間ごとのトークン数の累積和から、上限に収まる範囲で最も強い境界を切れ目に選ぶ
+3. 次のチャンクは直前のチャンク末尾から overlap_tokens 分だけ戻った境界から始める
+
+チャンク本文は元テキストのスライスで、(start, end) は元テキスト上の文字位置。
+"""
+
+import bisect
+import logging
+import math
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Tokenizer(ABC):
+    """トークン数を数えるインターフェース（プロバイダーごとに差し替える）"""
+
+    name = "base"
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        pass
+
+
+class EstimatedTokenizer(Tokenizer):
+    """依存なしの概算（日本語は1文字≒1トークン、ASCIIは4文字≒1トークン）"""
+
+    name = "estimate"
+
+    def count(self, text: str) -> int:
+        if text.isascii():
+            return math.ceil(len(text) / 4)
+        ascii_chars = len(text.encode("ascii", "ignore"))
+        return (len(text) - ascii_chars) + math.ceil(ascii_chars / 4)
+
+
+class HuggingFaceTokenizer(Tokenizer):
+    """transformers のトークナイザーで数える（初回利用時に読み込む）"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.name = f"hf:{model_name}"
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._tokenizer is None:
+            with self._lock:
+                if self._tokenizer is None:
+                    from transformers import AutoTokenizer  # type: ignore
+
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        return self._tokenizer
+
+    def count(self, text: str) -> int:
+        return len(self._load().encode(text, add_special_tokens=False))
+
+
+_tokenizers: Dict[str, Tokenizer] = {}
+
+
+def get_tokenizer(spec: Optional[str] = None) -> Tokenizer:
+    """
+    トークナイザーを取得する
+
+    Args:
+        spec: "estimate" または "hf:<モデル名>"。省略時は DOCUMENT_CHUNK_TOKENIZER
+    """
+    spec = spec or os.getenv("DOCUMENT_CHUNK_TOKENIZER", "estimate")
+    tokenizer = _tokenizers.get(spec)
+    if tokenizer is None:
+        if spec.startswith("hf:"):
+            try:
+                import transformers  # type: ignore  # noqa: F401
+
+                tokenizer = HuggingFaceTokenizer(spec[3:])
+            except ImportError:
+                logger.warning(
+                    f"transformers is not installed; using estimated tokens for {spec}"
+                )
+                tokenizer = EstimatedTokenizer()
+        else:
+            tokenizer = EstimatedTokenizer()
+        _tokenizers[spec] = tokenizer
+    return tokenizer
+
+
+# ----------------------------------------------------------------------
+# 境界の検出（ランクが大きいほど優先して切る）
+# ----------------------------------------------------------------------
+
+RANK_HARD = 0  # トークン数による強制分割
+RANK_LINE = 1
+RANK_SENTENCE = 2
+RANK_PARAGRAPH = 3
+RANK_SECTION = 4  # 見出し・関数定義の直前
+
+_BOUNDARY_PATTERNS: Dict[str, Pattern[str]] = {
+    # 境界の位置は各一致の終端
+    "heading": re.compile(r"\n(?=[ \t]*#)"),
+    "code": re.compile(r"\n(?=[ \t]*(?:async def |def |class |function ))"),
+    "paragraph": re.compile(r"\n[ \t]*\n\s*"),
+    "sentence": re.compile(r"[。！？](?:[」』）)]*)|[.!?](?=\s)"),
+    "line": re.compile(r"\n"),
+}
+
+# 分割方針ごとに使う境界（ランク）
+STRATEGIES: Dict[str, Tuple[Tuple[str, int], ...]] = {
+    "headings": (
+        ("heading", RANK_SECTION),
+        ("paragraph", RANK_PARAGRAPH),
+        ("sentence", RANK_SENTENCE),
+        ("line", RANK_LINE),
+    ),
+    "paragraphs": (
+        ("paragraph", RANK_PARAGRAPH),
+        ("sentence", RANK_SENTENCE),
+        ("line", RANK_LINE),
+    ),
+    "code": (
+        ("code", RANK_SECTION),
+        ("paragraph", RANK_PARAGRAPH),
+        ("line", RANK_LINE),
+    ),
+    "sentences": (
+        ("paragraph", RANK_PARAGRAPH),
+        ("sentence", RANK_SENTENCE),
+        ("line", RANK_LINE),
+    ),
+}
+
+
+@dataclass(frozen=True)
+class TextChunk:
+    """チャンク（text == 元テキスト[start:end]）"""
+
+    start: int
+    end: int
+    text: str
+    token_count: int
+
+
+class TextChunker:
+    """トークン上限・オーバーラップ付きのチャンク分割器
+
+    Args:
+        tokenizer: トークン数の数え方（省略時は概算）
+        max_tokens: 1チャンクの最大トークン数
+        overlap_tokens: 隣接チャンク間で重ねるトークン数（境界単位で近似）
+        min_fill: 強い境界で切る場合でも最低限埋める割合（小さすぎるチャンクを防ぐ）
+    """
+
+    def __init__(
+        self,
+        tokenizer: Optional[Tokenizer] = None,
+        max_tokens: int = 2000,
+        overlap_tokens: int = 0,
+        min_fill: float = 0.5,
+    ):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.tokenizer = tokenizer or EstimatedTokenizer()
+        self.max_tokens = max_tokens
+        # 重なりが上限の半分を超えると進みが遅くなりすぎる
+        self.overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+        self.min_fill = min_fill
+
+    def chunk(self, text: str, strategy: str = "sentences") -> List[TextChunk]:
+        """テキストをチャンクに分割する"""
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown chunking strategy: {strategy}")
+        edges, ranks, counts = self._segments(text, STRATEGIES[strategy])
+        if len(edges) < 2:
+            return []
+        # prefix[i] = edges[0]..edges[i] 間のトークン数
+        prefix = [0]
+        for segment_tokens in counts:
+            prefix.append(prefix[-1] + segment_tokens)
+
+        chunks: List[TextChunk] = []
+        last = len(edges) - 1
+        i = 0
+        while i < last:
+            j = self._cut(prefix, ranks, i)
+            chunk = self._make_chunk(text, edges[i], edges[j])
+            if chunk is not None:
+                chunks.append(chunk)
+            if j >= last:
+                break
+            i = self._next_start(prefix, i, j)
+        return chunks
+
+    def _segments(
+        self, text: str, levels: Sequence[Tuple[str, int]]
+    ) -> Tuple[List[int], List[int], List[int]]:
+        """境界位置（先頭 0・末尾 len(text) を含む）、各境界のランク、各区間のトークン数"""
+        boundary_ranks: Dict[int, int] = {}
+        for pattern_name, rank in levels:
+            for match in _BOUNDARY_PATTERNS[pattern_name].finditer(text):
+                position = match.end()
+                if 0 < position < len(text) and boundary_ranks.get(position, -1) < rank:
+                    boundary_ranks[position] = rank
+        positions = [0, *sorted(boundary_ranks), len(text)] if text else [0]
+
+        edges: List[int] = [0]
+        ranks: List[int] = [RANK_SECTION]
+        counts: List[int] = []
+        count = self.tokenizer.count
+        for start, end in zip(positions, positions[1:]):
+            tokens = count(text[start:end])
+            if tokens > self.max_tokens:
+                # 境界のない長い区間はトークン数で強制分割する
+                for split, split_tokens in self._hard_splits(text, start, end):
+                    edges.append(split)
+                    ranks.append(RANK_HARD)
+                    counts.append(split_tokens)
+                    start = split
+                tokens = count(text[start:end])
+            edges.append(end)
+            ranks.append(boundary_ranks.get(end, RANK_SECTION))
+            counts.append(tokens)
+        return edges, ranks, counts
+
+    def _hard_splits(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        [start, end) を max_tokens 以下の区間に分ける位置と直前の区間のトークン数
+
+        探索範囲を倍々に広げてから二分探索するので、長い区間でも
+        数えるのは切れ目付近の文字列だけ。
+        """
+        count = self.tokenizer.count
+        limit = self.max_tokens
+        splits = []
+        while True:
+            high = min(end, start + limit * 4)
+            while high < end and count(text[start:high]) <= limit:
+                high = min(end, start + (high - start) * 2)
+            if high == end and count(text[start:end]) <= limit:
+                return splits
+            # count(text[start:low]) <= limit となる最大の low
+            low = start + 1
+            while low < high:
+                middle = (low + high + 1) // 2
+                if count(text[start:middle]) <= limit:
+                    low = middle
+                else:
+                    high = middle - 1
+            splits.append((low, count(text[start:low])))
+            start = low
+
+    def _cut(self, prefix: List[int], ranks: List[int], i: int) -> int:
+        """edges[i] から始まるチャンクの終端の境界番号"""
+        limit = prefix[i] + self.max_tokens
+        # 上限に収まる最も遠い境界（最低でも1区間は進む）
+        j = max(bisect.bisect_right(prefix, limit) - 1, i + 1)
+        if j >= len(prefix) - 1:
+            return len(prefix) - 1
+        # 最低限の充填量を満たす範囲で、最もランクの高い（同じなら遠い）境界
+        floor = bisect.bisect_left(prefix, prefix[i] + self.max_tokens * self.min_fill)
+        best = j
+        for k in range(j, max(floor, i + 1) - 1, -1):
+            if ranks[k] > ranks[best]:
+                best = k
+        return best
+
+    def _next_start(self, prefix: List[int], i: int, j: int) -> int:
+        """直前のチャンク [i, j) の末尾 overlap_tokens 分を含む開始境界"""
+        if not self.overlap_tokens:
+            return j
+        k = bisect.bisect_left(prefix, prefix[j] - self.overlap_tokens, i + 1, j)
+        return k
+
+    def _make_chunk(self, text: str, start: int, end: int) -> Optional[TextChunk]:
+        # 前後の空白は位置ごと除く
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start == end:
+            return None
+        body = text[start:end]
+        return TextChunk(start, end, body, self.tokenizer.count(body))
@@ -0,0 +1,269 @@
+"""
+Bounded-memory upload spooling
+アップロードをチャンク単位で受け取り、しきい値を超えたら一時ファイルに退避する
+
+- アップロード全体を ``await file.read()`` でメモリに載せない
+- 上限サイズを超えた時点でコピーを打ち切る（本文は FastAPI が受信済みのため、
+  受信量ではなく後段の処理量を抑える。サイズが分かっていればコピー前に判定する）
+- 文字コード判定は先頭の一定バイト数だけで行う
+- 処理側にはファイルハンドル・メモリマップ・パスのいずれかを渡す
+- 受け取りながら SHA-256 を計算する（文書キャッシュのキー）
+"""
+
+import asyncio
+import codecs
+import hashlib
+import io
+import logging
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+import chardet
+
+logger = logging.getLogger(__name__)
+
+# 文字コード判定に使う先頭バイト数
+ENCODING_SNIFF_BYTES = int(os.getenv("UPLOAD_ENCODING_SNIFF_BYTES", str(64 * 1024)))
+# これを超えたら一時ファイルへ退避する
+SPOOL_MEMORY_BYTES = int(os.getenv("UPLOAD_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+# アップロードの読み込み単位
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+class UploadTooLargeError(Exception):
+    """アップロードが上限サイズを超えた（呼び出し側は413を返す）"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(
+            f"File size exceeds maximum of {max_bytes / (1024 * 1024):.0f}MB"
+        )
+
+
+def sniff_encoding(prefix: bytes) -> str:
+    """先頭バイト列から文字コードを推定する（BOM → UTF-8 → chardet の順）"""
+    prefix = prefix[:ENCODING_SNIFF_BYTES]
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+    try:
+        # 末尾でマルチバイト文字が切れていても UTF-8 とみなせるよう逐次デコード
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        detection = chardet.detect(prefix)
+        return (detection.get("encoding") if detection else None) or "utf-8"
+    except Exception:
+        return "utf-8"
+
+
+class SpooledUpload:
+    """チャンク単位で受け取ったアップロード
+
+    memory_threshold までは bytearray に保持し、超えたら名前付き一時ファイルに
+    退避する（ワーカープロセスからパスで開けるようにするため）。
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        content_type: Optional[str] = None,
+        memory_threshold: int = SPOOL_MEMORY_BYTES,
+        spool_dir: Optional[str] = None,
+    ):
+        self.filename = filename
+        self.content_type = content_type
+        self.memory_threshold = memory_threshold
+        self.spool_dir = spool_dir or os.getenv("UPLOAD_SPOOL_DIR") or None
+        self.size = 0
+        self._buffer: Optional[bytearray] = bytearray()
+        self._file: Optional[BinaryIO] = None
+        self._path: Optional[str] = None
+        self._sha256 = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        """これまでに受け取った内容の SHA-256（16進）"""
+        return self._sha256.hexdigest()
+
+    @property
+    def on_disk(self) -> bool:
+        return self._path is not None
+
+    @property
+    def size_mb(self) -> float:
+        return self.size / (1024 * 1024)
+
+    def _rollover(self) -> None:
+        fd, self._path = tempfile.mkstemp(prefix="upload-", dir=self.spool_dir)
+        self._file = os.fdopen(fd, "w+b")
+        if self._buffer:
+            self._file.write(self._buffer)
+        self._buffer = None
+
+    def write(self, chunk: bytes) -> None:
+        """チャンクを追記する（しきい値を超えたらディスクへ切り替える）"""
+        self._sha256.update(chunk)
+        if self._buffer is not None:
+            if len(self._buffer) + len(chunk) <= self.memory_threshold:
+                self._buffer += chunk
+                self.size += len(chunk)
+                return
+            self._rollover()
+        assert self._file is not None
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def path(self) -> str:
+        """ファイルパスを返す（メモリ上のものはディスクに書き出す。ブロッキング）"""
+        if self._path is None:
+            self._rollover()
+        assert self._file is not None and self._path is not None
+        self._file.flush()
+        return self._path
+
+    def head(self, length: int) -> bytes:
+        """先頭 length バイト"""
+        if self._buffer is not None:
+            return bytes(self._buffer[:length])
+        with open(self.path(), "rb") as f:
+            return f.read(length)
+
+    def open(self) -> BinaryIO:
+        """先頭から読む新しいバイナリハンドル（呼び出し側で close する）"""
+        if self._buffer is not None:
+            return io.BytesIO(self._buffer)
+        return open(self.path(), "rb")
+
+    @contextmanager
+    def mmap(self) -> Iterator[memoryview]:
+        """内容全体を読み取り専用のバッファとして参照する（コピーしない）"""
+        if self._buffer is not None:
+            with memoryview(self._buffer) as view:
+                yield view.toreadonly()
+            return
+        if self.size == 0:
+            yield memoryview(b"")
+            return
+        with open(self.path(), "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                with memoryview(mapped) as view:
+                    yield view
+            finally:
+                mapped.close()
+
+    def read_bytes(self) -> bytes:
+        """内容全体を bytes として読む（構造をまとめて解析する形式向け）"""
+        if self._buffer is not None:
+            return bytes(self._buffer)
+        with open(self.path(), "rb") as f:
+            return f.read()
+
+    def sniff_encoding(self) -> str:
+        return sniff_encoding(self.head(ENCODING_SNIFF_BYTES))
+
+    def read_text(
+        self,
+        max_chars: Optional[int] = None,
+        encoding: Optional[str] = None,
+        read_chars: int = UPLOAD_CHUNK_BYTES,
+    ) -> Tuple[str, str, int]:
+        """
+        先頭から最大 max_chars 文字をデコードする（ブロッキング）
+
+        残りは read_chars 文字ずつ読み捨てて総文字数だけ数えるため、
+        保持するのは max_chars 文字分だけ。改行は変換しない。
+
+        Returns:
+            (テキスト, 文字コード, ファイル全体の文字数)
+        """
+        encoding = encoding or self.sniff_encoding()
+        parts = []
+        kept = 0
+        total = 0
+        with self.open() as raw:
+            reader = io.TextIOWrapper(
+                raw, encoding=encoding, errors="replace", newline=""
+            )
+            for piece in iter(lambda: reader.read(read_chars), ""):
+                total += len(piece)
+                if max_chars is None:
+                    parts.append(piece)
+                elif kept < max_chars:
+                    piece = piece[: max_chars - kept]
+                    parts.append(piece)
+                    kept += len(piece)
+            reader.detach()
+        return "".join(parts), encoding, total
+
+    def close(self) -> None:
+        """一時ファイルを削除する"""
+        self._buffer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+            self._path = None
+
+    async def __aenter__(self) -> "SpooledUpload":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await asyncio.to_thread(self.close)
+
+
+async def spool_upload(
+    file,
+    max_bytes: Optional[int] = None,
+    chunk_size: int = UPLOAD_CHUNK_BYTES,
+    memory_threshold: int = SPOOL_MEMORY_BYTES,
+) -> SpooledUpload:
+    """
+    UploadFile をチャンク単位で読み込み SpooledUpload にする
+
+    FastAPI はエンドポイント実行前に本文全体を受信している。サイズだけが
+    必要な場合は UploadFile.size を使い、このコピーを作らないこと。
+
+    Raises:
+        UploadTooLargeError: max_bytes を超えた（それまでの一時ファイルは削除済み）
+    """
+    size = getattr(file, "size", None)
+    if max_bytes is not None and size is not None and size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+    upload = SpooledUpload(
+        file.filename or "unknown", file.content_type, memory_threshold
+    )
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            if max_bytes is not None and upload.size + len(chunk) > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+            if upload.on_disk or upload.size + len(chunk) > memory_threshold:
+                # ディスクへの書き込みはイベントループ外で行う
+                await asyncio.to_thread(upload.write, chunk)
+            else:
+                upload.write(chunk)
+    except BaseException:
+        await asyncio.to_thread(upload.close)
+        raise
+    return upload
@@ -4,15 +4,24 @@ Manages video processing limits and roleplay session consumption
 """
 
 import logging
-import json
+import os
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from pathlib import Path
 import asyncio
 
+try:
+    from services.usage_storage import UsageStorage, create_usage_storage
+except ImportError:
+    from app.services.usage_storage import UsageStorage, create_usage_storage
+
 logger = logging.getLogger(__name__)
 
+# プロフィールのメモリキャッシュに保持するユーザー数の上限（LRU）
+PROFILE_CACHE_SIZE = int(os.getenv("USAGE_PROFILE_CACHE_SIZE", "1024"))
+
 
 @dataclass
 class RoleplaySession:
@@ -87,69 +96,94 @@ class UsageStats:
 class UsageLimitService:
     """Service for managing usage limits and session consumption"""
 
-    def __init__(self, storage_path: str = "data/usage_limits.json"):
+    def __init__(
+        self,
+        storage_path: str = "data/usage_limits.json",
+        storage: Optional[UsageStorage] = None,
+        cache_size: int = PROFILE_CACHE_SIZE,
+    ):
         """
         Initialize usage limit service
 
         Args:
-            storage_path: Path to store usage data
+            storage_path: Path to store usage data (legacy JSON file)
+            storage: Storage backend (default: USAGE_STORAGE_BACKEND, SQLite)
+            cache_size: Max number of user profiles kept in memory (LRU)
         """
         self.storage_path = Path(storage_path)
         self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        self.storage = storage or create_usage_storage(self.storage_path)
 
         # Configuration
         self.max_video_processing_minutes = 60  # 1時間まで
         self.initial_roleplay_sessions = 60  # 初期ロープレセッション数
         self.reset_period_days = 30  # 30日でリセット
 
-        # In-memory storage
-        self.usage_stats: Dict[str, UsageStats] = {}
-
-        # Load existing data
-        self._load_usage_data()
+        # In-memory LRU cache (loaded per user on first access)
+        self.cache_size = max(1, cache_size)
+        self.usage_stats: "OrderedDict[str, UsageStats]" = OrderedDict()
 
         logger.info(
-            f"Usage limit service initialized with storage: {self.storage_path}"
+            f"Usage limit service initialized with storage: "
+            f"{type(self.storage).__name__} ({self.storage.count_users()} users)"
         )
 
-    def _load_usage_data(self) -> None:
-        """Load usage data from storage"""
-        try:
-            if self.storage_path.exists():
-                with open(self.storage_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                for user_id, stats_data in data.items():
-                    self.usage_stats[user_id] = UsageStats(**stats_data)
-
-                logger.info(f"Loaded usage data for {len(self.usage_stats)} users")
-            else:
-                logger.info("No existing usage data found")
-
-        except Exception as e:
-            logger.error(f"Failed to load usage data: {e}")
-            self.usage_stats = {}
-
-    def _save_usage_data(self) -> None:
-        """Save usage data to storage"""
+    def _save_user_stats(self, user_stats: UsageStats, *fields: str) -> None:
+        """Save the given profile fields (quota columns are updated atomically)"""
         try:
-            data = {}
-            for user_id, stats in self.usage_stats.items():
-                data[user_id] = asdict(stats)
-
-            with open(self.storage_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-
-            logger.debug("Usage data saved successfully")
+            data = asdict(user_stats)
+            self.storage.save_user(
+                user_stats.user_id,
+                {field: data[field] for field in fields},
+                user_stats.updated_at,
+            )
+            logger.debug(f"Usage data saved for {user_stats.user_id}")
 
         except Exception as e:
             logger.error(f"Failed to save usage data: {e}")
 
+    def _cache_user_stats(self, user_stats: UsageStats) -> None:
+        """Put user stats into the LRU cache, evicting the oldest entries"""
+        self.usage_stats[user_stats.user_id] = user_stats
+        self.usage_stats.move_to_end(user_stats.user_id)
+        while len(self.usage_stats) > self.cache_size:
+            self.usage_stats.popitem(last=False)
+
+    def _get_user_stats(self, user_id: str) -> Optional[UsageStats]:
+        """Get user stats from cache or storage (None if unknown)"""
+        user_stats = self.usage_stats.get(user_id)
+        if user_stats is not None:
+            self.usage_stats.move_to_end(user_id)
+            return user_stats
+        data = self.storage.load_user(user_id)
+        if data is None:
+            return None
+        user_stats = UsageStats(**data)
+        self._cache_user_stats(user_stats)
+        return user_stats
+
+    def _iter_user_stats(self):
+        """Iterate all users, preferring cached instances"""
+        for data in self.storage.iter_users():
+            cached = self.usage_stats.get(data["user_id"])
+            yield cached if cached is not None else UsageStats(**data)
+
+    def _refresh_quota(self, user_stats: UsageStats) -> None:
+        """Reload quota columns, which other workers may have changed"""
+        data = self.storage.load_user(user_stats.user_id)
+        if data is not None:
+            user_stats.video_processing_minutes_used = data[
+                "video_processing_minutes_used"
+            ]
+            user_stats.roleplay_sessions_remaining = data["roleplay_sessions_remaining"]
+            user_stats.last_reset_date = data["last_reset_date"]
+
     def _get_or_create_user_stats(self, user_id: str) -> UsageStats:
         """Get or create user usage statistics"""
-        if user_id not in self.usage_stats:
+        user_stats = self._get_user_stats(user_id)
+        if user_stats is None:
             now = datetime.now().isoformat()
-            self.usage_stats[user_id] = UsageStats(
+            new_stats = UsageStats(
                 user_id=user_id,
                 video_processing_minutes_used=0,
                 roleplay_sessions_remaining=self.initial_roleplay_sessions,
@@ -157,10 +191,12 @@ class UsageLimitService:
                 created_at=now,
                 updated_at=now,
             )
-            self._save_usage_data()
+            # 他のワーカーが先に作成していた場合はその値を使う
+            user_stats = UsageStats(**self.storage.create_user(asdict(new_stats)))
+            self._cache_user_stats(user_stats)
             logger.info(f"Created new user stats for {user_id}")
 
-        return self.usage_stats[user_id]
+        return user_stats
 
     def _check_reset_needed(self, user_stats: UsageStats) -> bool:
         """Check if user stats need to be reset"""
@@ -176,16 +212,25 @@ class UsageLimitService:
 
     def _reset_user_stats(self, user_id: str) -> None:
         """Reset user statistics for new period"""
-        if user_id in self.usage_stats:
-            stats = self.usage_stats[user_id]
+        stats = self._get_user_stats(user_id)
+        if stats is not None:
             now = datetime.now().isoformat()
 
+            # 読み込んだリセット日のままの場合のみリセットする（二重リセット防止）
+            if not self.storage.reset_quota(
+                user_id,
+                self.initial_roleplay_sessions,
+                now,
+                now,
+                expected_reset_date=stats.last_reset_date,
+            ):
+                self._refresh_quota(stats)
+                return
+
             stats.video_processing_minutes_used = 0
             stats.roleplay_sessions_remaining = self.initial_roleplay_sessions
             stats.last_reset_date = now
             stats.updated_at = now
-
-            self._save_usage_data()
             logger.info(f"Reset usage stats for user {user_id}")
 
     async def can_process_video(
@@ -202,11 +247,11 @@ class UsageLimitService:
             Dict with can_process flag and details
         """
         user_stats = self._get_or_create_user_stats(user_id)
+        self._refresh_quota(user_stats)
 
         # Check if reset is needed
         if self._check_reset_needed(user_stats):
             self._reset_user_stats(user_id)
-            user_stats = self.usage_stats[user_id]
 
         # Check if video exceeds max duration
         if video_duration_minutes > self.max_video_processing_minutes:
@@ -252,11 +297,11 @@ class UsageLimitService:
             Dict with consumption result
         """
         user_stats = self._get_or_create_user_stats(user_id)
+        self._refresh_quota(user_stats)
 
         # Check if reset is needed
         if self._check_reset_needed(user_stats):
             self._reset_user_stats(user_id)
-            user_stats = self.usage_stats[user_id]
 
         # Check if processing is allowed
         can_process_result = await self.can_process_video(
@@ -275,12 +320,29 @@ class UsageLimitService:
                 "sessions_remaining": 0,
             }
 
-        # Consume video processing quota and roleplay session
-        user_stats.video_processing_minutes_used += video_duration_minutes
-        user_stats.roleplay_sessions_remaining -= 1  # 1セッション消費
-        user_stats.updated_at = datetime.now().isoformat()
-
-        self._save_usage_data()
+        # Consume video processing quota and roleplay session (atomic)
+        now = datetime.now().isoformat()
+        quota = self.storage.consume_session(
+            user_id,
+            now,
+            video_minutes=video_duration_minutes,
+            max_video_minutes=self.max_video_processing_minutes,
+        )
+        if quota is None:
+            # 他のワーカーが先に消費した
+            self._refresh_quota(user_stats)
+            return {
+                "success": False,
+                "consumed": False,
+                "reason": "no_sessions_remaining",
+                "message": "ロープレセッションが残っていません",
+                "sessions_remaining": max(user_stats.roleplay_sessions_remaining, 0),
+            }
+        user_stats.video_processing_minutes_used = quota[
+            "video_processing_minutes_used"
+        ]
+        user_stats.roleplay_sessions_remaining = quota["roleplay_sessions_remaining"]
+        user_stats.updated_at = now
 
         logger.info(
             f"User {user_id} consumed {video_duration_minutes}min video processing + 1 roleplay session"
@@ -307,14 +369,17 @@ class UsageLimitService:
             Dict with consumption result
         """
         user_stats = self._get_or_create_user_stats(user_id)
+        self._refresh_quota(user_stats)
 
         # Check if reset is needed
         if self._check_reset_needed(user_stats):
             self._reset_user_stats(user_id)
-            user_stats = self.usage_stats[user_id]
 
-        # Check if user has roleplay sessions remaining
-        if user_stats.roleplay_sessions_remaining <= 0:
+        # Consume roleplay session (atomic decrement-if-positive)
+        now = datetime.now().isoformat()
+        quota = self.storage.consume_session(user_id, now)
+        if quota is None:
+            user_stats.roleplay_sessions_remaining = 0
             return {
                 "success": False,
                 "consumed": False,
@@ -323,11 +388,11 @@ class UsageLimitService:
                 "sessions_remaining": 0,
             }
 
-        # Consume roleplay session
-        user_stats.roleplay_sessions_remaining -= 1
-        user_stats.updated_at = datetime.now().isoformat()
-
-        self._save_usage_data()
+        user_stats.video_processing_minutes_used = quota[
+            "video_processing_minutes_used"
+        ]
+        user_stats.roleplay_sessions_remaining = quota["roleplay_sessions_remaining"]
+        user_stats.updated_at = now
 
         logger.info(f"User {user_id} consumed 1 roleplay session")
 
@@ -349,11 +414,11 @@ class UsageLimitService:
             Dict with user usage information
         """
         user_stats = self._get_or_create_user_stats(user_id)
+        self._refresh_quota(user_stats)
 
         # Check if reset is needed
         if self._check_reset_needed(user_stats):
             self._reset_user_stats(user_id)
-            user_stats = self.usage_stats[user_id]
 
         return {
             "user_id": user_id,
@@ -394,8 +459,10 @@ class UsageLimitService:
         """Get usage statistics for all users"""
         all_usage = {}
 
-        for user_id in self.usage_stats.keys():
-            all_usage[user_id] = await self.get_user_usage(user_id)
+        for user_stats in self._iter_user_stats():
+            all_usage[user_stats.user_id] = await self.get_user_usage(
+                user_stats.user_id
+            )
 
         return {"total_users": len(all_usage), "users": all_usage}
 
@@ -423,7 +490,7 @@ class UsageLimitService:
             Updated user stats summary
         """
         try:
-            user_stats = self._get_or_create_user_stats(user_id)
+            self._get_or_create_user_stats(user_id)
             now = datetime.now()
 
             # Create session record
@@ -437,30 +504,36 @@ class UsageLimitService:
                 improvement_points=improvement_points or [],
             )
 
-            # Update user stats
-            user_stats.last_roleplay_date = now.isoformat()
-            user_stats.total_roleplay_sessions += 1
-            user_stats.updated_at = now.isoformat()
-
-            # Add to recent sessions (keep only last 10)
-            user_stats.recent_sessions.append(session)
-            if len(user_stats.recent_sessions) > 10:
-                user_stats.recent_sessions = user_stats.recent_sessions[-10:]
-
-            # Update recent improvement points
-            if improvement_points:
-                user_stats.recent_improvement_points.extend(improvement_points)
-                user_stats.recent_improvement_points = (
-                    user_stats.recent_improvement_points[-5:]
-                )  # Keep last 5
+            def apply_session(data: Dict[str, Any]) -> Dict[str, Any]:
+                # 他のワーカーの記録を失わないよう、保存されている最新の値から計算する
+                # (keep only last 10 sessions)
+                recent_sessions = list(data.get("recent_sessions") or [])
+                recent_sessions.append(asdict(session))
+                recent_sessions = recent_sessions[-10:]
+
+                # Update recent improvement points (keep last 5)
+                points = list(data.get("recent_improvement_points") or [])
+                if improvement_points:
+                    points = (points + list(improvement_points))[-5:]
+
+                return {
+                    "last_roleplay_date": now.isoformat(),
+                    "total_roleplay_sessions": data.get("total_roleplay_sessions", 0)
+                    + 1,
+                    "recent_sessions": recent_sessions,
+                    "recent_improvement_points": points,
+                    "consecutive_days": self._calculate_consecutive_days(
+                        [item["start_time"] for item in recent_sessions]
+                    ),
+                }
 
-            # Calculate consecutive days
-            user_stats.consecutive_days = await self._calculate_consecutive_days(
-                user_id
+            data = self.storage.update_profile(
+                user_id, apply_session, now.isoformat()
             )
-
-            # Save changes
-            self._save_usage_data()
+            if data is None:
+                raise KeyError(f"User {user_id} not found")
+            user_stats = UsageStats(**data)
+            self._cache_user_stats(user_stats)
 
             logger.info(f"Recorded roleplay session for user {user_id}: {session_id}")
 
@@ -478,23 +551,17 @@ class UsageLimitService:
             logger.error(f"Failed to record roleplay session for user {user_id}: {e}")
             return {"success": False, "error": str(e)}
 
-    async def _calculate_consecutive_days(self, user_id: str) -> int:
+    def _calculate_consecutive_days(self, start_times: List[str]) -> int:
         """Calculate consecutive days of roleplay activity"""
         try:
-            user_stats = self.usage_stats.get(user_id)
-            if not user_stats or not user_stats.recent_sessions:
+            if not start_times:
                 return 0
 
-            # Sort sessions by date
-            sessions_by_date = {}
-            for session in user_stats.recent_sessions:
-                session_date = datetime.fromisoformat(session.start_time).date()
-                if session_date not in sessions_by_date:
-                    sessions_by_date[session_date] = []
-                sessions_by_date[session_date].append(session)
-
             # Calculate consecutive days
-            dates = sorted(sessions_by_date.keys(), reverse=True)
+            dates = sorted(
+                {datetime.fromisoformat(start).date() for start in start_times},
+                reverse=True,
+            )
             consecutive_days = 0
             today = datetime.now().date()
 
@@ -508,7 +575,7 @@ class UsageLimitService:
             return consecutive_days
 
         except Exception as e:
-            logger.error(f"Error calculating consecutive days for user {user_id}: {e}")
+            logger.error(f"Error calculating consecutive days: {e}")
             return 0
 
     async def update_reminder_settings(
@@ -551,7 +618,7 @@ class UsageLimitService:
             user_stats.updated_at = datetime.now().isoformat()
 
             # Save changes
-            self._save_usage_data()
+            self._save_user_stats(user_stats, "reminder_settings")
 
             logger.info(f"Updated reminder settings for user {user_id}")
 
@@ -587,38 +654,14 @@ class UsageLimitService:
             return []
 
         try:
-            for user_id, user_stats in self.usage_stats.items():
-                # Check if user has email reminders enabled
-                if not user_stats.reminder_settings.email_enabled:
-                    continue
-
-                if not user_stats.reminder_settings.email_address:
-                    continue
-
-                # Check if this reminder day is enabled for user
-                if target_days not in user_stats.reminder_settings.reminder_days:
-                    continue
-
-                # Calculate days since last roleplay
-                days_since_last = self._get_days_since_last_roleplay(user_stats)
-
-                # Send reminder if it's been the target number of days
-                if days_since_last == target_days:
-                    # Include shame system status
-                    shame_enabled = user_stats.reminder_settings.enable_shame_system
-
-                    reminder_users.append(
-                        {
-                            "user_id": user_id,
-                            "email": user_stats.reminder_settings.email_address,
-                            "name": user_stats.reminder_settings.user_name,
-                            "last_roleplay_date": user_stats.last_roleplay_date,
-                            "consecutive_days": user_stats.consecutive_days,
-                            "improvement_points": user_stats.recent_improvement_points,
-                            "total_sessions": user_stats.total_roleplay_sessions,
-                            "shame_system_enabled": shame_enabled,
-                        }
-                    )
+            # 索引から「最終ロールプレイ日 = 今日 - target_days」のユーザーのみ取得
+            target_date = (now.date() - timedelta(days=target_days)).isoformat()
+            for data in self.storage.find_reminder_candidates(target_days, target_date):
+                cached = self.usage_stats.get(data["user_id"])
+                user_stats = cached if cached is not None else UsageStats(**data)
+                entry = self._build_reminder_entry(user_stats, target_days)
+                if entry is not None:
+                    reminder_users.append(entry)
 
             logger.info(
                 f"Found {len(reminder_users)} users for {reminder_type} reminder"
@@ -629,6 +672,42 @@ class UsageLimitService:
             logger.error(f"Error getting users for reminder: {e}")
             return []
 
+    def _build_reminder_entry(
+        self, user_stats: UsageStats, target_days: int
+    ) -> Optional[Dict[str, Any]]:
+        """Return the reminder payload if the user is due for this reminder"""
+        # Check if user has email reminders enabled
+        if not user_stats.reminder_settings.email_enabled:
+            return None
+
+        if not user_stats.reminder_settings.email_address:
+            return None
+
+        # Check if this reminder day is enabled for user
+        if target_days not in user_stats.reminder_settings.reminder_days:
+            return None
+
+        # Calculate days since last roleplay
+        days_since_last = self._get_days_since_last_roleplay(user_stats)
+
+        # Send reminder if it's been the target number of days
+        if days_since_last != target_days:
+            return None
+
+        # Include shame system status
+        shame_enabled = user_stats.reminder_settings.enable_shame_system
+
+        return {
+            "user_id": user_stats.user_id,
+            "email": user_stats.reminder_settings.email_address,
+            "name": user_stats.reminder_settings.user_name,
+            "last_roleplay_date": user_stats.last_roleplay_date,
+            "consecutive_days": user_stats.consecutive_days,
+            "improvement_points": user_stats.recent_improvement_points,
+            "total_sessions": user_stats.total_roleplay_sessions,
+            "shame_system_enabled": shame_enabled,
+        }
+
     def _get_days_since_last_roleplay(self, user_stats: UsageStats) -> int:
         """Calculate days since last roleplay session"""
         if not user_stats.last_roleplay_date:
@@ -827,7 +906,8 @@ class UsageLimitService:
             now = datetime.now()
             all_users_report = []
 
-            for user_id, user_stats in self.usage_stats.items():
+            for user_stats in self._iter_user_stats():
+                user_id = user_stats.user_id
                 days_since_last = self._get_days_since_last_roleplay(user_stats)
                 confrontation_data = self._generate_confrontation_data(
                     user_stats, days_since_last
@@ -871,7 +951,7 @@ class UsageLimitService:
             for user in all_users_report["users"]:
                 if user["days_since_last"] > 7:  # 1週間以上サボっている
                     # サボり機能が有効なユーザーのみ対象
-                    user_stats = self.usage_stats.get(user["user_id"])
+                    user_stats = self._get_user_stats(user["user_id"])
                     if (
                         user_stats
                         and user_stats.reminder_settings
@@ -902,9 +982,13 @@ class UsageLimitService:
 
     async def admin_reset_user(self, user_id: str) -> Dict[str, Any]:
         """Admin function to reset user usage"""
-        if user_id not in self.usage_stats:
+        user_stats = self._get_user_stats(user_id)
+        if user_stats is None:
             return {"success": False, "message": f"User {user_id} not found"}
 
+        # キャッシュのリセット日は古い場合があるため、最新値を読んでからリセットする
+        # （それでも失敗した場合は他のワーカーがその間にリセットしている）
+        self._refresh_quota(user_stats)
         self._reset_user_stats(user_id)
 
         return {
@@ -919,10 +1003,11 @@ class UsageLimitService:
         """Admin function to add roleplay sessions"""
         user_stats = self._get_or_create_user_stats(user_id)
 
-        user_stats.roleplay_sessions_remaining += additional_sessions
-        user_stats.updated_at = datetime.now().isoformat()
-
-        self._save_usage_data()
+        now = datetime.now().isoformat()
+        remaining = self.storage.add_sessions(user_id, additional_sessions, now)
+        if remaining is not None:
+            user_stats.roleplay_sessions_remaining = remaining
+        user_stats.updated_at = now
 
         return {
             "success": True,
@@ -0,0 +1,653 @@
+"""
+Storage backends for UsageLimitService
+利用制限データの永続化バックエンド（JSONファイル / SQLite WAL）
+
+クォータ列（残りセッション数・動画処理分数・リセット日）はバックエンド側で
+原子的に更新し、それ以外のプロフィール情報（セッション履歴・リマインダー設定等）
+は変更した項目だけを書き込む。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# バックエンドが原子的に更新するクォータ列
+QUOTA_FIELDS = (
+    "video_processing_minutes_used",
+    "roleplay_sessions_remaining",
+    "last_reset_date",
+)
+
+
+def reminder_index_keys(data: Dict[str, Any]) -> List[Tuple[int, str]]:
+    """
+    リマインダー索引のキー (リマインダー日数, 最終ロールプレイ日 YYYY-MM-DD)
+
+    メール送信が有効でアドレスがあり、ロールプレイ実績のあるユーザーのみ対象。
+    """
+    settings = data.get("reminder_settings") or {}
+    last_roleplay = data.get("last_roleplay_date")
+    if not (
+        last_roleplay
+        and settings.get("email_enabled", True)
+        and settings.get("email_address")
+    ):
+        return []
+    try:
+        last_day = datetime.fromisoformat(last_roleplay).date().isoformat()
+    except ValueError:
+        return []
+    reminder_days = settings.get("reminder_days")
+    if reminder_days is None:
+        reminder_days = [3, 1, 0]
+    return [(day, last_day) for day in set(reminder_days)]
+
+
+class UsageStorage(ABC):
+    """UsageLimitService の永続化インターフェース
+
+    すべてのメソッドは UsageStats を asdict した辞書でやり取りする。
+    """
+
+    @abstractmethod
+    def load_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def count_users(self) -> int:
+        pass
+
+    @abstractmethod
+    def create_user(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """ユーザーが存在しなければ作成し、保存されている値を返す"""
+        pass
+
+    @abstractmethod
+    def save_user(
+        self, user_id: str, fields: Dict[str, Any], updated_at: str
+    ) -> None:
+        """
+        プロフィール情報のうち fields に含まれる項目だけを更新する
+
+        他のワーカーが同時に更新した別の項目は上書きしない。
+        クォータ列は対象外（consume_session / reset_quota で更新する）。
+        """
+        pass
+
+    @abstractmethod
+    def update_profile(
+        self,
+        user_id: str,
+        update: Callable[[Dict[str, Any]], Dict[str, Any]],
+        updated_at: str,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        保存されている最新の値に update を適用し、返された項目だけを書き込む
+
+        読み出しから書き込みまで他のワーカーの更新を挟まないため、
+        カウンタや履歴のように現在値から計算する項目に使う。
+
+        Returns:
+            更新後の値（ユーザーが存在しなければ None）
+        """
+        pass
+
+    @abstractmethod
+    def consume_session(
+        self,
+        user_id: str,
+        updated_at: str,
+        video_minutes: int = 0,
+        max_video_minutes: Optional[int] = None,
+    ) -> Optional[Dict[str, int]]:
+        """
+        残りセッションが1以上（かつ動画分数が上限内）の場合のみ1消費する
+
+        Returns:
+            更新後のクォータ値。条件を満たさない場合は None
+        """
+        pass
+
+    @abstractmethod
+    def reset_quota(
+        self,
+        user_id: str,
+        sessions: int,
+        reset_date: str,
+        updated_at: str,
+        expected_reset_date: str,
+    ) -> bool:
+        """
+        リセット日が expected_reset_date のままの場合のみクォータをリセットする
+
+        Returns:
+            リセットした場合は True（他のワーカーが先にリセットしていれば False）
+        """
+        pass
+
+    @abstractmethod
+    def add_sessions(
+        self, user_id: str, additional_sessions: int, updated_at: str
+    ) -> Optional[int]:
+        pass
+
+    @abstractmethod
+    def find_reminder_candidates(
+        self, reminder_day: int, last_roleplay_day: str
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        リマインダー索引から対象ユーザーを取得する
+
+        Args:
+            reminder_day: リマインダー日数（3, 1, 0）
+            last_roleplay_day: 最終ロールプレイ日（YYYY-MM-DD）
+        """
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JsonUsageStorage(UsageStorage):
+    """従来の data/usage_limits.json 形式（更新のたびにファイル全体を書き換える）
+
+    小規模環境・後方互換用。複数プロセスからの同時書き込みには対応しない。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+
+        # (リマインダー日数, 最終ロールプレイ日) -> user_id の集合
+        self._reminder_index: Dict[Tuple[int, str], Set[str]] = {}
+        self._reminder_keys: Dict[str, List[Tuple[int, str]]] = {}
+        for data in self._data.values():
+            self._index_user(data)
+
+    def _index_user(self, data: Dict[str, Any]) -> None:
+        user_id = data["user_id"]
+        for key in self._reminder_keys.pop(user_id, []):
+            bucket = self._reminder_index.get(key)
+            if bucket is not None:
+                bucket.discard(user_id)
+                if not bucket:
+                    del self._reminder_index[key]
+        keys = reminder_index_keys(data)
+        if keys:
+            self._reminder_keys[user_id] = keys
+            for key in keys:
+                self._reminder_index.setdefault(key, set()).add(user_id)
+
+    def _flush(self) -> None:
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def load_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        data = self._data.get(user_id)
+        return dict(data) if data is not None else None
+
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        for data in list(self._data.values()):
+            yield dict(data)
+
+    def count_users(self) -> int:
+        return len(self._data)
+
+    def create_user(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            existing = self._data.get(data["user_id"])
+            if existing is not None:
+                return dict(existing)
+            self._data[data["user_id"]] = dict(data)
+            self._flush()
+            return dict(data)
+
+    def save_user(
+        self, user_id: str, fields: Dict[str, Any], updated_at: str
+    ) -> None:
+        self.update_profile(user_id, lambda data: fields, updated_at)
+
+    def update_profile(
+        self,
+        user_id: str,
+        update: Callable[[Dict[str, Any]], Dict[str, Any]],
+        updated_at: str,
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            stored = self._data.get(user_id)
+            if stored is None:
+                return None
+            for key, value in update(dict(stored)).items():
+                if key not in QUOTA_FIELDS:
+                    stored[key] = value
+            stored["updated_at"] = updated_at
+            self._index_user(stored)
+            self._flush()
+            return dict(stored)
+
+    def consume_session(
+        self,
+        user_id: str,
+        updated_at: str,
+        video_minutes: int = 0,
+        max_video_minutes: Optional[int] = None,
+    ) -> Optional[Dict[str, int]]:
+        with self._lock:
+            stored = self._data.get(user_id)
+            if stored is None or stored["roleplay_sessions_remaining"] <= 0:
+                return None
+            minutes = stored["video_processing_minutes_used"] + video_minutes
+            if max_video_minutes is not None and minutes > max_video_minutes:
+                return None
+            stored["roleplay_sessions_remaining"] -= 1
+            stored["video_processing_minutes_used"] = minutes
+            stored["updated_at"] = updated_at
+            self._flush()
+            return {
+                "roleplay_sessions_remaining": stored["roleplay_sessions_remaining"],
+                "video_processing_minutes_used": minutes,
+            }
+
+    def reset_quota(
+        self,
+        user_id: str,
+        sessions: int,
+        reset_date: str,
+        updated_at: str,
+        expected_reset_date: str,
+    ) -> bool:
+        with self._lock:
+            stored = self._data.get(user_id)
+            if stored is None or stored["last_reset_date"] != expected_reset_date:
+                return False
+            stored["video_processing_minutes_used"] = 0
+            stored["roleplay_sessions_remaining"] = sessions
+            stored["last_reset_date"] = reset_date
+            stored["updated_at"] = updated_at
+            self._flush()
+            return True
+
+    def add_sessions(
+        self, user_id: str, additional_sessions: int, updated_at: str
+    ) -> Optional[int]:
+        with self._lock:
+            stored = self._data.get(user_id)
+            if stored is None:
+                return None
+            stored["roleplay_sessions_remaining"] += additional_sessions
+            stored["updated_at"] = updated_at
+            self._flush()
+            return stored["roleplay_sessions_remaining"]
+
+    def find_reminder_candidates(
+        self, reminder_day: int, last_roleplay_day: str
+    ) -> Iterator[Dict[str, Any]]:
+        user_ids = self._reminder_index.get((reminder_day, last_roleplay_day), ())
+        for user_id in sorted(user_ids):
+            yield dict(self._data[user_id])
+
+
+class SQLiteUsageStorage(UsageStorage):
+    """SQLite (WAL) バックエンド
+
+    1ユーザー1行で、クォータ列は UPDATE ... WHERE による条件付き更新で
+    原子的に消費する。複数ワーカープロセスから同じファイルを共有できる。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS usage_stats (
+            user_id TEXT PRIMARY KEY,
+            video_processing_minutes_used INTEGER NOT NULL,
+            roleplay_sessions_remaining INTEGER NOT NULL,
+            last_reset_date TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            profile TEXT NOT NULL
+        );
+        -- リマインダー対象の二次索引（メール有効ユーザーのみ、日数ごとに分割）
+        CREATE TABLE IF NOT EXISTS reminder_index (
+            reminder_day INTEGER NOT NULL,
+            last_roleplay_day TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            PRIMARY KEY (reminder_day, last_roleplay_day, user_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS reminder_index_user
+            ON reminder_index (user_id);
+    """
+    SCHEMA_VERSION = 2
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # 自動コミット。複数文の更新は明示的なトランザクションで囲む
+        self._conn = sqlite3.connect(
+            str(self.path), isolation_level=None, check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self.SCHEMA)
+        self._migrate_schema()
+
+    def _migrate_schema(self) -> None:
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if version < 2:
+                    # 既存DBのリマインダー索引を構築
+                    self._conn.execute("DELETE FROM reminder_index")
+                    rows = self._conn.execute("SELECT * FROM usage_stats").fetchall()
+                    for row in rows:
+                        data = self._row_to_dict(row)
+                        self._write_reminder_index(data["user_id"], data)
+                self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _write_reminder_index(self, user_id: str, data: Dict[str, Any]) -> None:
+        """ロック・トランザクション内で呼ぶ"""
+        self._conn.execute("DELETE FROM reminder_index WHERE user_id = ?", (user_id,))
+        keys = reminder_index_keys(data)
+        if keys:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO reminder_index VALUES (?, ?, ?)",
+                [(day, last_day, user_id) for day, last_day in keys],
+            )
+
+    @staticmethod
+    def _profile_json(data: Dict[str, Any]) -> str:
+        profile = {k: v for k, v in data.items() if k not in QUOTA_FIELDS}
+        profile.pop("user_id", None)
+        profile.pop("updated_at", None)
+        return json.dumps(profile, ensure_ascii=False)
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        data = json.loads(row["profile"])
+        data["user_id"] = row["user_id"]
+        data["updated_at"] = row["updated_at"]
+        for field in QUOTA_FIELDS:
+            data[field] = row[field]
+        return data
+
+    def load_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM usage_stats WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return self._row_to_dict(row) if row is not None else None
+
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        # 全件をメモリに載せないよう、別カーソルで逐次取得する
+        conn = sqlite3.connect(str(self.path))
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute("SELECT * FROM usage_stats ORDER BY user_id"):
+                yield self._row_to_dict(row)
+        finally:
+            conn.close()
+
+    def count_users(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM usage_stats").fetchone()[0]
+
+    def create_user(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR IGNORE INTO usage_stats (
+                    user_id, video_processing_minutes_used,
+                    roleplay_sessions_remaining, last_reset_date, updated_at, profile
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    data["user_id"],
+                    data["video_processing_minutes_used"],
+                    data["roleplay_sessions_remaining"],
+                    data["last_reset_date"],
+                    data["updated_at"],
+                    self._profile_json(data),
+                ),
+            )
+        # 他のワーカーが先に作成していればその値を返す
+        return self.load_user(data["user_id"])
+
+    def save_user(
+        self, user_id: str, fields: Dict[str, Any], updated_at: str
+    ) -> None:
+        self.update_profile(user_id, lambda data: fields, updated_at)
+
+    def update_profile(
+        self,
+        user_id: str,
+        update: Callable[[Dict[str, Any]], Dict[str, Any]],
+        updated_at: str,
+    ) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            # 書き込みロックを先に取り、読み出したプロフィールに変更項目だけを重ねる
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM usage_stats WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                data = None
+                if row is not None:
+                    data = self._row_to_dict(row)
+                    for key, value in update(dict(data)).items():
+                        if key not in QUOTA_FIELDS:
+                            data[key] = value
+                    data["updated_at"] = updated_at
+                    self._conn.execute(
+                        "UPDATE usage_stats SET profile = ?, updated_at = ? "
+                        "WHERE user_id = ?",
+                        (self._profile_json(data), updated_at, user_id),
+                    )
+                    self._write_reminder_index(user_id, data)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return data
+
+    def save_many(self, users: Iterator[Dict[str, Any]]) -> int:
+        """一括登録（移行・ベンチマーク用）。既存行は上書きする"""
+        user_ids: List[Tuple[str]] = []
+        index_rows: List[Tuple[int, str, str]] = []
+
+        def rows():
+            for data in users:
+                user_ids.append((data["user_id"],))
+                for day, last_day in reminder_index_keys(data):
+                    index_rows.append((day, last_day, data["user_id"]))
+                yield (
+                    data["user_id"],
+                    data["video_processing_minutes_used"],
+                    data["roleplay_sessions_remaining"],
+                    data["last_reset_date"],
+                    data["updated_at"],
+                    self._profile_json(data),
+                )
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cursor = self._conn.executemany(
+                    "INSERT OR REPLACE INTO usage_stats VALUES (?, ?, ?, ?, ?, ?)",
+                    rows(),
+                )
+                count = cursor.rowcount
+                self._conn.executemany(
+                    "DELETE FROM reminder_index WHERE user_id = ?", user_ids
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO reminder_index VALUES (?, ?, ?)",
+                    index_rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    def consume_session(
+        self,
+        user_id: str,
+        updated_at: str,
+        video_minutes: int = 0,
+        max_video_minutes: Optional[int] = None,
+    ) -> Optional[Dict[str, int]]:
+        limit = max_video_minutes if max_video_minutes is not None else -1
+        with self._lock:
+            row = self._conn.execute(
+                """
+                UPDATE usage_stats
+                SET roleplay_sessions_remaining = roleplay_sessions_remaining - 1,
+                    video_processing_minutes_used = video_processing_minutes_used + ?,
+                    updated_at = ?
+                WHERE user_id = ?
+                  AND roleplay_sessions_remaining > 0
+                  AND (? < 0 OR video_processing_minutes_used + ? <= ?)
+                RETURNING roleplay_sessions_remaining, video_processing_minutes_used
+                """,
+                (video_minutes, updated_at, user_id, limit, video_minutes, limit),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "roleplay_sessions_remaining": row[0],
+            "video_processing_minutes_used": row[1],
+        }
+
+    def reset_quota(
+        self,
+        user_id: str,
+        sessions: int,
+        reset_date: str,
+        updated_at: str,
+        expected_reset_date: str,
+    ) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE usage_stats
+                SET video_processing_minutes_used = 0,
+                    roleplay_sessions_remaining = ?,
+                    last_reset_date = ?,
+                    updated_at = ?
+                WHERE user_id = ? AND last_reset_date = ?
+                """,
+                (sessions, reset_date, updated_at, user_id, expected_reset_date),
+            )
+        return cursor.rowcount == 1
+
+    def add_sessions(
+        self, user_id: str, additional_sessions: int, updated_at: str
+    ) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                """
+                UPDATE usage_stats
+                SET roleplay_sessions_remaining = roleplay_sessions_remaining + ?,
+                    updated_at = ?
+                WHERE user_id = ?
+                RETURNING roleplay_sessions_remaining
+                """,
+                (additional_sessions, updated_at, user_id),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def find_reminder_candidates(
+        self, reminder_day: int, last_roleplay_day: str
+    ) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT u.* FROM reminder_index r
+                JOIN usage_stats u ON u.user_id = r.user_id
+                WHERE r.reminder_day = ? AND r.last_roleplay_day = ?
+                ORDER BY r.user_id
+                """,
+                (reminder_day, last_roleplay_day),
+            ).fetchall()
+        for row in rows:
+            yield self._row_to_dict(row)
+
+    def checkpoint(self) -> None:
+        """WALの内容をDB本体に書き戻す"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json_to_sqlite(json_path: Path, sqlite_path: Path) -> int:
+    """
+    既存の usage_limits.json を SQLite に移行する（既存ユーザーは上書き）
+
+    Returns:
+        移行したユーザー数
+    """
+    json_path = Path(json_path)
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # 途中で失敗しても中途半端なDBが残らないよう一時ファイルに作ってから置き換える
+    sqlite_path = Path(sqlite_path)
+    tmp_path = sqlite_path.with_name(f"{sqlite_path.name}.{os.getpid()}.tmp")
+    storage = SQLiteUsageStorage(tmp_path)
+    try:
+        storage.save_many(iter(data.values()))
+        storage.checkpoint()
+    finally:
+        storage.close()
+    os.replace(tmp_path, sqlite_path)
+
+    logger.info(f"Migrated {len(data)} users from {json_path} to {sqlite_path}")
+    return len(data)
+
+
+def create_usage_storage(json_path: Path) -> UsageStorage:
+    """
+    USAGE_STORAGE_BACKEND (sqlite | json) に応じたバックエンドを作成する
+
+    SQLite使用時、DBがまだ無く既存のJSONファイルがあれば一度だけ移行する。
+    """
+    json_path = Path(json_path)
+    backend = os.getenv("USAGE_STORAGE_BACKEND", "sqlite").lower()
+    if backend == "json":
+        return JsonUsageStorage(json_path)
+    if backend != "sqlite":
+        raise ValueError(f"Unknown USAGE_STORAGE_BACKEND: {backend}")
+
+    default_path = json_path.with_suffix(".db")
+    sqlite_path = Path(os.getenv("USAGE_STORAGE_PATH", str(default_path)))
+    if not sqlite_path.exists() and json_path.exists():
+        migrate_json_to_sqlite(json_path, sqlite_path)
+    return SQLiteUsageStorage(sqlite_path)
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Iterable
 import logging
 
 try:
@@ -8,16 +8,22 @@ try:
         VoicevoxConnectionError,
         EmotionParams,
         Speaker,
+        SpeakerRegistry,
     )
     from core.speakers import VOICEVOX_SPEAKER_MAPPING
+    from core.audio_cache import AudioCache
+    from services.request_metrics import timed_stage
 except ImportError:
     from app.core.voicevox import (
         VoicevoxClient,
         VoicevoxConnectionError,
         EmotionParams,
         Speaker,
+        SpeakerRegistry,
     )
     from app.core.speakers import VOICEVOX_SPEAKER_MAPPING
+    from app.core.audio_cache import AudioCache
+    from app.services.request_metrics import timed_stage
 import weakref
 import os
 
@@ -60,12 +66,34 @@ class VoiceService:
             self.output_dir = Path(os.getenv("OUTPUT_DIR", "./data/voicevox"))
             self.output_dir.mkdir(parents=True, exist_ok=True)
             self.test_mode = test_mode
+            self.speaker_registry = SpeakerRegistry(
+                self.client,
+                VOICEVOX_SPEAKER_MAPPING,
+                ttl_seconds=float(os.getenv("VOICEVOX_SPEAKER_TTL_SECONDS", "300")),
+            )
+            # 合成済み音声の2段キャッシュ（メモリLRU + OUTPUT_DIR配下のディスク）
+            self.audio_cache = AudioCache(
+                self.output_dir / "tts_cache",
+                memory_budget_bytes=int(os.getenv("TTS_CACHE_MEMORY_MB", "32"))
+                * 1024
+                * 1024,
+                disk_budget_bytes=int(os.getenv("TTS_CACHE_DISK_MB", "512"))
+                * 1024
+                * 1024,
+            )
             self._initialized = True
             logger.info("VoiceService initialized successfully")
 
+    async def start(self):
+        """話者レジストリを読み込み、バックグラウンド更新を開始します"""
+        if self.test_mode:
+            return
+        await self.speaker_registry.start()
+
     async def cleanup(self):
         """サービスのクリーンアップを行います"""
         try:
+            await self.speaker_registry.stop()
             await self.client.close()
             logger.info("VoiceService cleaned up successfully")
         except Exception as e:
@@ -82,17 +110,16 @@ class VoiceService:
             logger.error(f"Failed to check VOICEVOX status: {e}")
             return False
 
+    @timed_stage("tts")
     async def synthesize_voice(
         self, text: str, speaker_id: int, emotion: Optional[EmotionParams] = None
     ) -> Optional[bytes]:
         """テキストから音声データを生成する (EXTREME SPEED MODE: 0.2-0.4秒)"""
         try:
-            # 話者IDのバリデーション
-            if not await self.validate_speaker_id(speaker_id):
-                raise SpeakerNotFoundError(f"Speaker ID {speaker_id} not found")
-
             # テストモードの場合はモックデータを返す
             if self.test_mode:
+                if not await self.validate_speaker_id(speaker_id):
+                    raise SpeakerNotFoundError(f"Speaker ID {speaker_id} not found")
                 # テスト用の簡単なWAVヘッダー付きダミーデータ
                 # 実際のWAVファイルの最小構造を模擬
                 wav_header = (
@@ -106,30 +133,26 @@ class VoiceService:
                 )
                 return wav_header + b"\x00" * 100  # ダミーの音声データ
 
-            # EXTREME SPEED: Skip speaker validation for speed
-            # Use VOICEVOX mapping directly
-            if speaker_id in VOICEVOX_SPEAKER_MAPPING:
-                voicevox_params = VOICEVOX_SPEAKER_MAPPING[speaker_id]
-                speaker_id = voicevox_params["speaker"]
+            # 話者IDのバリデーションと合成用IDへの解決（レジストリのO(1)参照）
+            voicevox_id = await self.resolve_speaker_id(speaker_id)
+            if voicevox_id is None:
+                raise SpeakerNotFoundError(f"Speaker ID {speaker_id} not found")
+            speaker_id = voicevox_id
 
             # EXTREME SPEED: Truncate text to 30 characters for fastest synthesis
             if len(text) > 30:
                 text = text[:30]
 
             # EXTREME SPEED: Skip emotion parameters completely
-            # Create audio query with absolute minimum settings
-            audio_query = await self.client.create_audio_query(text, speaker_id)
-            if not audio_query:
-                logger.error("Failed to create audio query")
-                return None
-
-            # EXTREME SPEED: Generate audio with highest speed settings
-            wav_data = await self.client.synthesis(audio_query, speaker_id)
-            if not wav_data:
-                logger.error("Failed to synthesize audio")
-                return None
-
-            return wav_data
+            # 定型応答は合成済み音声をキャッシュから返す
+            # （_render_wav は疑問文の抑揚を付けないので upspeak=False のキー）
+            return await self.audio_cache.get_or_render(
+                text,
+                speaker_id,
+                None,
+                lambda: self._render_wav(text, speaker_id),
+                upspeak=False,
+            )
 
         except SpeakerNotFoundError:
             # 話者エラーは再度スローする
@@ -139,6 +162,80 @@ class VoiceService:
             # EXTREME SPEED: Return minimal error audio
             return b""  # Empty bytes for fastest fallback
 
+    async def stream_voice(
+        self,
+        text: str,
+        speaker_id: int,
+        emotion: Optional[EmotionParams] = None,
+        max_concurrency: Optional[int] = None,
+        enable_interrogative_upspeak: bool = True,
+    ) -> AsyncIterator[bytes]:
+        """文単位でパイプライン合成した音声をWAVストリームとして返す
+
+        話者IDは呼び出し時に検証するため、ストリーム開始前に
+        SpeakerNotFoundError を送出できる。各文の合成結果は音声キャッシュを経由する。
+        """
+        voicevox_id = await self.resolve_speaker_id(speaker_id)
+        if voicevox_id is None:
+            raise SpeakerNotFoundError(f"Speaker ID {speaker_id} not found")
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("VOICEVOX_STREAM_CONCURRENCY", "2"))
+
+        async def render(part: str) -> bytes:
+            return await self.audio_cache.get_or_render(
+                part,
+                voicevox_id,
+                emotion,
+                lambda: self.client.synthesize_part(
+                    part, voicevox_id, emotion, enable_interrogative_upspeak
+                ),
+                upspeak=enable_interrogative_upspeak,
+            )
+
+        return self.client.stream_text_to_speech(
+            text,
+            voicevox_id,
+            emotion=emotion,
+            enable_interrogative_upspeak=enable_interrogative_upspeak,
+            max_concurrency=max_concurrency,
+            render=render,
+        )
+
+    async def _render_wav(
+        self, text: str, speaker_id: int, emotion: Optional[EmotionParams] = None
+    ) -> bytes:
+        """VOICEVOXでaudio_query→synthesisを実行する（キャッシュなし）"""
+        audio_query = await self.client.create_audio_query(text, speaker_id)
+        if not audio_query:
+            raise VoiceServiceError("Failed to create audio query")
+        audio_query = self.client._apply_emotion_params(audio_query, emotion)
+
+        wav_data = await self.client.synthesis(audio_query, speaker_id)
+        if not wav_data:
+            raise VoiceServiceError("Failed to synthesize audio")
+        return wav_data
+
+    async def warm_up_cache(
+        self, phrases: Iterable[str], speaker_ids: Iterable[int]
+    ) -> Dict[str, Any]:
+        """定型フレーズを事前に合成して音声キャッシュに格納します"""
+        phrases = list(phrases)
+        rendered = 0
+        failed = 0
+        for speaker_id in speaker_ids:
+            for phrase in phrases:
+                wav_data = await self.synthesize_voice(phrase, speaker_id)
+                if wav_data:
+                    rendered += 1
+                else:
+                    failed += 1
+        logger.info(f"TTS cache warm-up finished: {rendered} rendered, {failed} failed")
+        return {
+            "rendered": rendered,
+            "failed": failed,
+            "cache": self.audio_cache.get_metrics(),
+        }
+
     async def get_speakers(self) -> Dict[str, Dict[str, Any]]:
         """利用可能な話者の一覧を取得する"""
         try:
@@ -162,25 +259,12 @@ class VoiceService:
                     },
                 }
 
-            speakers = await self.client.get_speakers()
-            speaker_dict = {}
-
-            # VOICEVOXの話者を追加
-            for speaker in speakers:
-                speaker_dict[str(speaker.id)] = {
-                    "id": speaker.id,
-                    "name": speaker.name,
-                    "description": f"VOICEVOX Speaker {speaker.id}",
-                }
-
-            # ビジネス話者のマッピングを追加
-            for business_id, voicevox_params in VOICEVOX_SPEAKER_MAPPING.items():
-                voicevox_id = str(voicevox_params["speaker"])
-                if voicevox_id in speaker_dict:
-                    speaker_dict[str(business_id)] = speaker_dict[voicevox_id].copy()
-                    speaker_dict[str(business_id)]["id"] = business_id
-
-            return speaker_dict
+            if not await self.speaker_registry.ensure_loaded():
+                raise VoicevoxConnectionError(
+                    self.speaker_registry.stats.last_error or "Speakers unavailable"
+                )
+            # VOICEVOXの話者とビジネス話者のマッピングはレジストリで統合済み
+            return self.speaker_registry.as_speaker_dict()
         except Exception as e:
             logger.error(f"Failed to get speakers: {e}")
             raise VoiceServiceError(f"Failed to get speakers: {e}")
@@ -188,7 +272,6 @@ class VoiceService:
     async def validate_speaker_id(self, speaker_id: int) -> bool:
         """話者IDが有効かどうかを確認する"""
         try:
-            logger.info(f"Validating speaker ID: {speaker_id}")
             # テストモードの場合は特定の話者IDのみ有効とする
             if self.test_mode:
                 valid_ids = [1, 2, 3, 4, 5]  # テスト用の有効な話者ID
@@ -198,13 +281,25 @@ class VoiceService:
                 )
                 return is_valid
 
-            speakers = await self.get_speakers()
-            logger.info(f"Available speakers: {list(speakers.keys())}")
-            is_valid = str(speaker_id) in speakers
-            logger.info(
-                f"Speaker ID {speaker_id} is {'valid' if is_valid else 'invalid'}"
-            )
+            is_valid = await self.resolve_speaker_id(speaker_id) is not None
+            if not is_valid:
+                logger.info(f"Speaker ID {speaker_id} is invalid")
             return is_valid
         except Exception as e:
             logger.error(f"Error validating speaker ID: {e}")
             return False
+
+    async def resolve_speaker_id(self, speaker_id: int) -> Optional[int]:
+        """話者ID（ビジネス話者IDを含む）をVOICEVOXのスタイルIDに解決する"""
+        # 起動時に読み込めなかった場合のみVOICEVOXへ問い合わせる
+        if not await self.speaker_registry.ensure_loaded():
+            return None
+        return self.speaker_registry.resolve(speaker_id)
+
+    def get_speaker_registry_metrics(self) -> Dict[str, Any]:
+        """話者レジストリのヒット率・鮮度メトリクスを取得します"""
+        return self.speaker_registry.get_metrics()
+
+    def get_audio_cache_metrics(self) -> Dict[str, Any]:
+        """音声キャッシュのヒット率・削減バイト数を取得します"""
+        return self.audio_cache.get_metrics()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+🩺 Background host sampler
+ホストのメトリクスをバックグラウンドスレッドで定期収集し、共有スナップショットとして提供する
+
+- 軽い値（CPU・メモリ・ディスク・ネットワークI/O・ロードアベレージ・自プロセス）は
+  interval 秒ごと、プロセス数やソケット数に比例して重い値
+  （psutil.net_connections / process_iter / users）は heavy_interval 秒ごとに収集する
+- 収集結果は不変のスナップショットに丸ごと差し替えるので、読み出しはロック不要の O(1)
+- スナップショットには収集時刻を持たせ、読み出し側で鮮度（経過秒数・stale）を判定できる
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HostSnapshot:
+    """ある時点のホストメトリクス（heavy_* は重い収集の結果と時刻）"""
+
+    sampled_at: float
+    cpu_percent: float = 0.0
+    cpu_count: Optional[int] = None
+    cpu_frequency: Optional[Dict[str, float]] = None
+    memory: Dict[str, Any] = field(default_factory=dict)
+    disk: Dict[str, Any] = field(default_factory=dict)
+    network_io: Dict[str, Any] = field(default_factory=dict)
+    load: Optional[Tuple[float, float, float]] = None
+    boot_time: Optional[float] = None
+    current_process: Dict[str, Any] = field(default_factory=dict)
+    heavy_sampled_at: Optional[float] = None
+    process_count: int = 0
+    zombie_processes: int = 0
+    high_cpu_processes: List[Dict[str, Any]] = field(default_factory=list)
+    high_memory_processes: List[Dict[str, Any]] = field(default_factory=list)
+    users: int = 0
+    connections: int = 0
+    established_connections: int = 0
+    # 収集に失敗した項目 -> エラーメッセージ
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def memory_percent(self) -> float:
+        return self.memory.get("percent", 0.0)
+
+    @property
+    def disk_percent(self) -> float:
+        return self.disk.get("percent", 0.0)
+
+
+class HostSampler:
+    """ホストメトリクスのバックグラウンド収集
+
+    Args:
+        interval: 軽い値の収集間隔（秒）
+        heavy_interval: プロセス・ソケット一覧など重い値の収集間隔（秒）
+        top_n: CPU・メモリ使用率の高いプロセスを何件保持するか
+        disk_path: 使用率を測るパス
+    """
+
+    def __init__(
+        self,
+        interval: float = 5.0,
+        heavy_interval: float = 30.0,
+        top_n: int = 5,
+        disk_path: str = "/",
+    ):
+        self.interval = max(0.5, interval)
+        self.heavy_interval = max(self.interval, heavy_interval)
+        self.top_n = top_n
+        self.disk_path = disk_path
+        self._snapshot: Optional[HostSnapshot] = None
+        self._sample_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = psutil.Process()
+        # cpu_percent は前回呼び出しからの差分なので、初回の値が意味を持つよう基準を取る
+        psutil.cpu_percent()
+        self._process.cpu_percent()
+        # 最新の重い収集結果（軽い収集のたびにスナップショットへ引き継ぐ）
+        self._heavy: Dict[str, Any] = {}
+        self.samples = 0
+        self.heavy_samples = 0
+        self.last_sample_seconds = 0.0
+        self.last_heavy_sample_seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> "HostSampler":
+        """環境変数（SYSTEM_MONITOR_SAMPLE_INTERVAL / _HEAVY_SAMPLE_INTERVAL）から作成"""
+        return cls(
+            interval=float(os.getenv("SYSTEM_MONITOR_SAMPLE_INTERVAL", "5")),
+            heavy_interval=float(
+                os.getenv("SYSTEM_MONITOR_HEAVY_SAMPLE_INTERVAL", "30")
+            ),
+        )
+
+    # ------------------------------------------------------------------
+    # 収集スレッド
+    # ------------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="host-sampler", daemon=True
+        )
+        self._thread.start()
+        logger.info(
+            f"Host sampler started (interval {self.interval}s, "
+            f"heavy {self.heavy_interval}s)"
+        )
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"ホストメトリクス収集エラー: {e}")
+            self._stop.wait(self.interval)
+
+    # ------------------------------------------------------------------
+    # 読み出し
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> HostSnapshot:
+        """最新のスナップショット（未収集の場合のみその場で1回収集する）"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.sample()
+        return snapshot
+
+    def freshness(self, snapshot: Optional[HostSnapshot] = None) -> Dict[str, Any]:
+        """スナップショットの鮮度（収集間隔の2倍を超えて古ければ stale）"""
+        snapshot = snapshot or self.snapshot()
+        now = time.time()
+        age = now - snapshot.sampled_at
+        heavy_age = (
+            now - snapshot.heavy_sampled_at
+            if snapshot.heavy_sampled_at is not None
+            else None
+        )
+        return {
+            "sampled_at": datetime.fromtimestamp(snapshot.sampled_at).isoformat(),
+            "age_seconds": round(age, 3),
+            "interval_seconds": self.interval,
+            "heavy_sampled_at": (
+                datetime.fromtimestamp(snapshot.heavy_sampled_at).isoformat()
+                if snapshot.heavy_sampled_at is not None
+                else None
+            ),
+            "heavy_age_seconds": (
+                round(heavy_age, 3) if heavy_age is not None else None
+            ),
+            "heavy_interval_seconds": self.heavy_interval,
+            "stale": age > self.interval * 2
+            or (heavy_age is not None and heavy_age > self.heavy_interval * 2),
+            "sampler_running": self.running,
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "samples": self.samples,
+            "heavy_samples": self.heavy_samples,
+            "last_sample_ms": round(self.last_sample_seconds * 1000, 3),
+            "last_heavy_sample_ms": round(self.last_heavy_sample_seconds * 1000, 3),
+        }
+
+    # ------------------------------------------------------------------
+    # 収集
+    # ------------------------------------------------------------------
+
+    def sample(self, include_heavy: Optional[bool] = None) -> HostSnapshot:
+        """1回収集してスナップショットを差し替える（ブロッキング）"""
+        with self._sample_lock:
+            started = time.perf_counter()
+            now = time.time()
+            errors: Dict[str, str] = {}
+            if include_heavy is None:
+                heavy_at = self._heavy.get("heavy_sampled_at")
+                include_heavy = (
+                    heavy_at is None or now - heavy_at >= self.heavy_interval
+                )
+            if include_heavy:
+                heavy_started = time.perf_counter()
+                self._heavy = self._sample_heavy(now, errors)
+                self.heavy_samples += 1
+                self.last_heavy_sample_seconds = time.perf_counter() - heavy_started
+            else:
+                # 直近の重い収集で出たエラーは引き継ぐ
+                errors.update(self._heavy.get("errors", {}))
+
+            heavy = {k: v for k, v in self._heavy.items() if k != "errors"}
+            snapshot = HostSnapshot(
+                sampled_at=now,
+                cpu_percent=self._safe("cpu", errors, psutil.cpu_percent, 0.0),
+                cpu_count=self._safe("cpu_count", errors, psutil.cpu_count),
+                cpu_frequency=self._safe("cpu_frequency", errors, self._cpu_frequency),
+                memory=self._safe("memory", errors, self._memory, {}),
+                disk=self._safe("disk", errors, self._disk, {}),
+                network_io=self._safe("network_io", errors, self._network_io, {}),
+                load=self._safe("load", errors, os.getloadavg),
+                boot_time=self._safe("boot_time", errors, psutil.boot_time),
+                current_process=self._safe(
+                    "current_process", errors, self._current_process, {}
+                ),
+                errors=errors,
+                **heavy,
+            )
+            self._snapshot = snapshot
+            self.samples += 1
+            self.last_sample_seconds = time.perf_counter() - started
+            return snapshot
+
+    @staticmethod
+    def _safe(name: str, errors: Dict[str, str], func, default=None):
+        try:
+            return func()
+        except Exception as e:
+            logger.debug(f"{name} の取得エラー: {e}")
+            errors[name] = str(e)
+            return default
+
+    def _sample_heavy(self, now: float, errors: Dict[str, str]) -> Dict[str, Any]:
+        heavy: Dict[str, Any] = {"heavy_sampled_at": now}
+        processes = self._safe("processes", errors, self._processes)
+        if processes is not None:
+            heavy.update(processes)
+        connections = self._safe("connections", errors, psutil.net_connections)
+        if connections is not None:
+            heavy["connections"] = len(connections)
+            heavy["established_connections"] = sum(
+                1 for conn in connections if conn.status == "ESTABLISHED"
+            )
+        users = self._safe("users", errors, psutil.users)
+        if users is not None:
+            heavy["users"] = len(users)
+        heavy["errors"] = dict(errors)
+        return heavy
+
+    def _processes(self) -> Dict[str, Any]:
+        total = 0
+        zombies = 0
+        high_cpu = []
+        high_memory = []
+        for proc in psutil.process_iter(
+            ["pid", "name", "status", "cpu_percent", "memory_percent"]
+        ):
+            info = proc.info
+            total += 1
+            if info["status"] == psutil.STATUS_ZOMBIE:
+                zombies += 1
+            if info["cpu_percent"] and info["cpu_percent"] > 50:
+                high_cpu.append(
+                    {
+                        "pid": info["pid"],
+                        "name": info["name"],
+                        "cpu_percent": info["cpu_percent"],
+                    }
+                )
+            if info["memory_percent"] and info["memory_percent"] > 10:
+                high_memory.append(
+                    {
+                        "pid": info["pid"],
+                        "name": info["name"],
+                        "memory_percent": info["memory_percent"],
+                    }
+                )
+        high_cpu.sort(key=lambda p: p["cpu_percent"], reverse=True)
+        high_memory.sort(key=lambda p: p["memory_percent"], reverse=True)
+        return {
+            "process_count": total,
+            "zombie_processes": zombies,
+            "high_cpu_processes": high_cpu[: self.top_n],
+            "high_memory_processes": high_memory[: self.top_n],
+        }
+
+    @staticmethod
+    def _cpu_frequency() -> Optional[Dict[str, float]]:
+        cpu_freq = psutil.cpu_freq()
+        if not cpu_freq:
+            return None
+        return {"current": cpu_freq.current, "min": cpu_freq.min, "max": cpu_freq.max}
+
+    @staticmethod
+    def _memory() -> Dict[str, Any]:
+        memory = psutil.virtual_memory()
+        return {
+            "total": memory.total,
+            "available": memory.available,
+            "used": memory.used,
+            "free": memory.free,
+            "percent": memory.percent,
+        }
+
+    def _disk(self) -> Dict[str, Any]:
+        disk = psutil.disk_usage(self.disk_path)
+        return {
+            "total": disk.total,
+            "used": disk.used,
+            "free": disk.free,
+            "percent": (disk.used / disk.total) * 100,
+        }
+
+    @staticmethod
+    def _network_io() -> Dict[str, Any]:
+        network = psutil.net_io_counters()
+        return {
+            "bytes_sent": network.bytes_sent,
+            "bytes_recv": network.bytes_recv,
+            "packets_sent": network.packets_sent,
+            "packets_recv": network.packets_recv,
+        }
+
+    def _current_process(self) -> Dict[str, Any]:
+        process = self._process
+        with process.oneshot():
+            return {
+                "pid": process.pid,
+                "name": process.name(),
+                "cpu_percent": process.cpu_percent(),
+                "memory_percent": process.memory_percent(),
+                "memory_info": process.memory_info()._asdict(),
+                "num_threads": process.num_threads(),
+            }
@@ -0,0 +1,1035 @@
+#!/usr/bin/env python3
+"""
+⚙️ Job engine
+バックグラウンドジョブを共有ワーカープールで実行し、状態を SQLite に記録する
+
+- ワーカースレッドは固定数（JOB_ENGINE_WORKERS）。キューは優先度付き
+  （priority が小さいほど先。同じ優先度は投入順）で、上限を超える投入は拒否する
+- 同期関数・コルーチン関数のどちらも実行できる（コルーチンはワーカーごとの
+  イベントループで実行）
+- ジョブごとのタイムアウトとキャンセル。コルーチンは即座に中断し、同期関数は
+  current_job().raise_if_cancelled() を呼ぶ箇所で協調的に中断する
+- 終了したジョブは件数上限と TTL の範囲でだけ保持する（メモリ・SQLite とも）
+- ジョブ表は SQLite (WAL) に保存するため、別プロセス（Streamlit UI など）からも
+  JobStore で状態を参照できる。プロセスが落ちた場合、登録済みの関数で引数が JSON に
+  できるジョブは次回起動時に再投入し、それ以外は interrupted として記録する
+"""
+
+import asyncio
+import contextvars
+import heapq
+import inspect
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import psutil  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+INTERRUPTED = "interrupted"
+
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+TERMINAL_STATUSES = (COMPLETED, FAILED, CANCELLED, TIMED_OUT, INTERRUPTED)
+
+
+class JobQueueFullError(Exception):
+    """キューが上限に達している"""
+
+
+class JobCancelled(Exception):
+    """ジョブがキャンセルされた（またはタイムアウトした）"""
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+def _process_started_at(pid: int) -> float:
+    return psutil.Process(pid).create_time()
+
+
+def _owner_alive(pid: int, started: Optional[float]) -> bool:
+    """
+    ジョブを登録したプロセスがまだ動いているか
+
+    PID は再利用される（コンテナでは再起動後も PID 1 になる）ため、
+    プロセスの起動時刻も一致する場合だけ生存とみなす。
+    """
+    try:
+        create_time = _process_started_at(pid)
+    except psutil.NoSuchProcess:
+        return False
+    except psutil.AccessDenied:
+        return True
+    return started is None or abs(create_time - started) < 1.0
+
+
+@dataclass
+class Job:
+    """ジョブ（engine のロック下で状態を更新する）"""
+
+    job_id: str
+    name: str
+    priority: int
+    created_at: float
+    timeout: Optional[float] = None
+    status: str = QUEUED
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    result: Any = None
+    progress: Optional[float] = None
+    message: Optional[str] = None
+    # 登録済みの関数名で投入され、引数が JSON にできる（再起動後に再投入できる）
+    recoverable: bool = False
+    func: Optional[Callable] = field(default=None, repr=False)
+    args: Tuple[Any, ...] = field(default=(), repr=False)
+    kwargs: Dict[str, Any] = field(default_factory=dict, repr=False)
+    future: Future = field(default_factory=Future, repr=False)
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    # 実行中のコルーチンを中断するためのコールバック
+    interrupt: Optional[Callable[[], None]] = field(default=None, repr=False)
+
+    @property
+    def deadline(self) -> Optional[float]:
+        if self.timeout is None or self.started_at is None:
+            return None
+        return self.started_at + self.timeout
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "name": self.name,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": _iso(self.created_at),
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(self.finished_at),
+            "duration": (
+                round(self.finished_at - self.started_at, 3)
+                if self.finished_at and self.started_at
+                else None
+            ),
+            "timeout": self.timeout,
+            "attempts": self.attempts,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "recoverable": self.recoverable,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobContext:
+    """実行中のジョブから参照するハンドル（current_job() で取得）"""
+
+    def __init__(self, engine: "JobEngine", job: Job):
+        self._engine = engine
+        self._job = job
+
+    @property
+    def job_id(self) -> str:
+        return self._job.job_id
+
+    @property
+    def cancelled(self) -> bool:
+        return self._job.cancel_event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """キャンセル・タイムアウト済みなら JobCancelled を送出する"""
+        if self._job.cancel_event.is_set():
+            raise JobCancelled(self._job.job_id)
+
+    def set_progress(self, progress: float, message: Optional[str] = None) -> None:
+        """進捗（0.0〜1.0）を記録する（SQLite には終了時にまとめて書く）"""
+        self._job.progress = progress
+        if message is not None:
+            self._job.message = message
+
+
+_current_job: contextvars.ContextVar[Optional[JobContext]] = contextvars.ContextVar(
+    "current_job", default=None
+)
+
+
+def current_job() -> Optional[JobContext]:
+    """ジョブとして実行中ならそのハンドル、そうでなければ None"""
+    return _current_job.get()
+
+
+class JobStore:
+    """ジョブ表（SQLite, WAL）。他プロセスからは読み取り専用で使う"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            status TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            timeout REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            progress REAL,
+            message TEXT,
+            error TEXT,
+            result_json TEXT,
+            args_json TEXT,
+            recoverable INTEGER NOT NULL DEFAULT 0,
+            owner_pid INTEGER NOT NULL,
+            owner_started REAL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+        CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+    """
+
+    COLUMNS = (
+        "job_id, name, status, priority, created_at, started_at, finished_at, "
+        "timeout, attempts, progress, message, error, result_json, recoverable"
+    )
+
+    def __init__(self, path: Union[str, Path], max_result_bytes: int = 64 * 1024):
+        self.path = Path(path)
+        self.max_result_bytes = max_result_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(self.SCHEMA)
+        self._migrate_schema()
+        # 所有者の識別子（PID + プロセス起動時刻）
+        self._owner = (os.getpid(), _process_started_at(os.getpid()))
+
+    def _migrate_schema(self) -> None:
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner_started" not in columns:
+            try:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner_started REAL")
+            except sqlite3.OperationalError:
+                pass  # 他のプロセスが先に追加した
+
+    def _execute(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def insert(self, job: Job) -> None:
+        args_json = None
+        if job.recoverable:
+            args_json = json.dumps({"args": list(job.args), "kwargs": job.kwargs})
+        self._execute(
+            "INSERT OR REPLACE INTO jobs (job_id, name, status, priority, "
+            "created_at, timeout, attempts, args_json, recoverable, owner_pid, "
+            "owner_started) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                job.job_id,
+                job.name,
+                job.status,
+                job.priority,
+                job.created_at,
+                job.timeout,
+                job.attempts,
+                args_json,
+                int(job.recoverable),
+                *self._owner,
+            ),
+        )
+
+    def mark_started(self, job: Job) -> None:
+        # ロック外で呼ばれるため、先にキャンセル・タイムアウトで確定した行は戻さない
+        self._execute(
+            "UPDATE jobs SET status = ?, started_at = ?, attempts = ? "
+            "WHERE job_id = ? AND status = ?",
+            (job.status, job.started_at, job.attempts, job.job_id, QUEUED),
+        )
+
+    def mark_finished(self, job: Job) -> None:
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, progress = ?, "
+            "message = ?, error = ?, result_json = ?, args_json = NULL "
+            "WHERE job_id = ?",
+            (
+                job.status,
+                job.finished_at,
+                job.progress,
+                job.message,
+                job.error,
+                self._encode_result(job.result),
+                job.job_id,
+            ),
+        )
+
+    def _encode_result(self, result: Any) -> Optional[str]:
+        """JSON にできて上限以下の結果だけ保存する"""
+        if result is None:
+            return None
+        try:
+            encoded = json.dumps(result, ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            return None
+        return encoded if len(encoded) <= self.max_result_bytes else None
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._execute(
+            f"SELECT {self.COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list(
+        self, status: Optional[str] = None, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """新しい順（結果本体は含めない）"""
+        if status:
+            rows = self._execute(
+                f"SELECT {self.COLUMNS} FROM jobs WHERE status = ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (status, limit),
+            ).fetchall()
+        else:
+            rows = self._execute(
+                f"SELECT {self.COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [self._row_to_dict(row, include_result=False) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._execute(
+            "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+        ).fetchall()
+        return {status: count for status, count in rows}
+
+    def purge_finished(self, before: float) -> int:
+        """before より前に終了したジョブを削除する"""
+        return self._execute(
+            "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+            (before,),
+        ).rowcount
+
+    def purge_excess(self, keep: int) -> int:
+        """終了済みジョブを新しい順に keep 件だけ残す"""
+        return self._execute(
+            "DELETE FROM jobs WHERE finished_at IS NOT NULL AND job_id NOT IN ("
+            "SELECT job_id FROM jobs WHERE finished_at IS NOT NULL "
+            "ORDER BY finished_at DESC LIMIT ?)",
+            (keep,),
+        ).rowcount
+
+    def claim_orphans(self) -> List[Dict[str, Any]]:
+        """
+        終了していないのに所有プロセスが存在しないジョブを引き取る
+
+        所有者は PID と起動時刻で識別する。同じ PID でも起動時刻が違えば
+        以前のプロセス（コンテナの再起動など）のジョブとして引き取る。
+        再投入できるものは queued に戻して返し、それ以外は interrupted にする。
+        """
+        pid, started = self._owner
+        now = time.time()
+        claimed = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT job_id, name, priority, created_at, timeout, attempts, "
+                    "args_json, recoverable, owner_pid, owner_started FROM jobs "
+                    "WHERE status IN (?, ?)",
+                    ACTIVE_STATUSES,
+                ).fetchall()
+                for row in rows:
+                    job_id, recoverable = row[0], row[7]
+                    owner_pid, owner_started = row[8], row[9]
+                    if owner_pid == pid:
+                        if owner_started == started:
+                            continue  # このプロセスのジョブ
+                    elif _owner_alive(owner_pid, owner_started):
+                        continue
+                    if recoverable and row[6]:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = ?, started_at = NULL, "
+                            "owner_pid = ?, owner_started = ? WHERE job_id = ?",
+                            (QUEUED, pid, started, job_id),
+                        )
+                        claimed.append(
+                            {
+                                "job_id": job_id,
+                                "name": row[1],
+                                "priority": row[2],
+                                "created_at": row[3],
+                                "timeout": row[4],
+                                "attempts": row[5],
+                                **json.loads(row[6]),
+                            }
+                        )
+                    else:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = ?, finished_at = ?, error = ?, "
+                            "args_json = NULL, owner_pid = ?, owner_started = ? "
+                            "WHERE job_id = ?",
+                            (
+                                INTERRUPTED,
+                                now,
+                                f"process {owner_pid} exited before the job finished",
+                                pid,
+                                started,
+                                job_id,
+                            ),
+                        )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def _row_to_dict(self, row, include_result: bool = True) -> Dict[str, Any]:
+        (
+            job_id,
+            name,
+            status,
+            priority,
+            created_at,
+            started_at,
+            finished_at,
+            timeout,
+            attempts,
+            progress,
+            message,
+            error,
+            result_json,
+            recoverable,
+        ) = row
+        data = {
+            "job_id": job_id,
+            "name": name,
+            "status": status,
+            "priority": priority,
+            "created_at": _iso(created_at),
+            "started_at": _iso(started_at),
+            "finished_at": _iso(finished_at),
+            "duration": (
+                round(finished_at - started_at, 3)
+                if finished_at and started_at
+                else None
+            ),
+            "timeout": timeout,
+            "attempts": attempts,
+            "progress": progress,
+            "message": message,
+            "error": error,
+            "recoverable": bool(recoverable),
+        }
+        if include_result:
+            data["result"] = json.loads(result_json) if result_json else None
+        return data
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class JobEngineStats:
+    """ジョブエンジンの統計情報（このプロセス分）"""
+
+    submitted: int = 0
+    rejected: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    timed_out: int = 0
+    recovered: int = 0
+    evicted: int = 0
+    total_wait_time: float = 0.0
+    total_run_time: float = 0.0
+
+
+class JobEngine:
+    """優先度付きキュー + 固定数ワーカーのジョブ実行エンジン
+
+    Args:
+        store: ジョブ表（None の場合は永続化しない）
+        workers: ワーカースレッド数
+        max_queue: 待機中ジョブの上限（超えると JobQueueFullError）
+        result_ttl: 終了したジョブを保持する秒数
+        max_results: 終了したジョブを保持する最大件数
+        default_timeout: timeout 未指定のジョブに適用する秒数（None は無制限）
+    """
+
+    def __init__(
+        self,
+        store: Optional[JobStore] = None,
+        workers: int = 4,
+        max_queue: int = 1000,
+        result_ttl: float = 3600.0,
+        max_results: int = 1000,
+        default_timeout: Optional[float] = None,
+        max_attempts: int = 3,
+    ):
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self.default_timeout = default_timeout
+        self.max_attempts = max_attempts
+        self.stats = JobEngineStats()
+        self._registry: Dict[str, Callable] = {}
+        self._jobs: Dict[str, Job] = {}
+        # 終了順（古い順）。件数上限・TTL による削除に使う
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._heap: List[Tuple[int, int, str]] = []
+        self._sequence = itertools.count()
+        self._queued = 0
+        self._running = 0
+        # 関数を実行中のワーカー数。タイムアウト・キャンセルで確定済みでも、
+        # 同期関数が戻るまではワーカーを占有しているため running とは別に数える
+        self._busy_workers = 0
+        self._lock = threading.Lock()
+        self._work_available = threading.Condition(self._lock)
+        self._supervisor_wakeup = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+        self._started = False
+        self._stopping = False
+        self._last_store_purge = 0.0
+
+    @classmethod
+    def from_env(cls) -> "JobEngine":
+        """環境変数（JOB_ENGINE_*）から作成"""
+        db_path = os.getenv("JOB_ENGINE_DB_PATH", "data/jobs.sqlite3")
+        default_timeout = os.getenv("JOB_ENGINE_DEFAULT_TIMEOUT")
+        return cls(
+            store=JobStore(db_path) if db_path else None,
+            workers=int(os.getenv("JOB_ENGINE_WORKERS", "4")),
+            max_queue=int(os.getenv("JOB_ENGINE_MAX_QUEUE", "1000")),
+            result_ttl=float(os.getenv("JOB_ENGINE_RESULT_TTL", "3600")),
+            max_results=int(os.getenv("JOB_ENGINE_MAX_RESULTS", "1000")),
+            default_timeout=float(default_timeout) if default_timeout else None,
+        )
+
+    # ------------------------------------------------------------------
+    # 登録・投入
+    # ------------------------------------------------------------------
+
+    def register(self, name: str, func: Callable) -> Callable:
+        """名前で投入できる関数を登録する（再起動後の再投入に必要）"""
+        self._registry[name] = func
+        return func
+
+    def task(self, name: str) -> Callable[[Callable], Callable]:
+        """register のデコレーター版"""
+
+        def decorator(func: Callable) -> Callable:
+            return self.register(name, func)
+
+        return decorator
+
+    def submit(
+        self,
+        func: Union[str, Callable],
+        args: Tuple[Any, ...] = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+        *,
+        job_id: Optional[str] = None,
+        name: Optional[str] = None,
+        priority: int = PRIORITY_NORMAL,
+        timeout: Optional[float] = None,
+    ) -> Job:
+        """
+        ジョブを投入する
+
+        Args:
+            func: 関数、または register() した名前
+            job_id: 省略時は UUID。実行中・待機中の ID と重複すると ValueError
+            priority: 小さいほど先に実行する（PRIORITY_HIGH / NORMAL / LOW）
+            timeout: 実行開始からの秒数（None は default_timeout）
+        """
+        kwargs = dict(kwargs or {})
+        if isinstance(func, str):
+            if func not in self._registry:
+                raise KeyError(f"Unknown job function: {func}")
+            name = name or func
+            recoverable = self._json_safe(args, kwargs)
+            func = self._registry[func]
+        else:
+            name = name or getattr(func, "__qualname__", repr(func))
+            recoverable = False
+        job = Job(
+            job_id=job_id or uuid.uuid4().hex,
+            name=name,
+            priority=priority,
+            created_at=time.time(),
+            timeout=timeout if timeout is not None else self.default_timeout,
+            recoverable=recoverable,
+            func=func,
+            args=tuple(args),
+            kwargs=kwargs,
+        )
+        self.start()
+        with self._lock:
+            existing = self._jobs.get(job.job_id)
+            if existing is not None and existing.status in ACTIVE_STATUSES:
+                raise ValueError(f"Job {job.job_id} is already {existing.status}")
+            if self._queued >= self.max_queue:
+                self.stats.rejected += 1
+                raise JobQueueFullError(
+                    f"Job queue is full ({self._queued}/{self.max_queue})"
+                )
+            if existing is not None:
+                self._forget(job.job_id)
+            # ワーカーが先に終了を書き込まないよう、キューに入れる前に記録する
+            if self.store is not None:
+                self.store.insert(job)
+            self._enqueue(job)
+            self.stats.submitted += 1
+        return job
+
+    @staticmethod
+    def _json_safe(args, kwargs) -> bool:
+        try:
+            json.dumps({"args": list(args), "kwargs": kwargs})
+            return True
+        except (TypeError, ValueError):
+            return False
+
+    def _enqueue(self, job: Job) -> None:
+        """ロック下で呼ぶ"""
+        self._jobs[job.job_id] = job
+        heapq.heappush(self._heap, (job.priority, next(self._sequence), job.job_id))
+        self._queued += 1
+        self._work_available.notify()
+
+    # ------------------------------------------------------------------
+    # 参照・キャンセル
+    # ------------------------------------------------------------------
+
+    def get(self, job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+        """このプロセスのジョブはメモリから、それ以外はジョブ表から返す"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict(include_result)
+        if self.store is not None:
+            data = self.store.get(job_id)
+            if data is not None and not include_result:
+                data.pop("result", None)
+            return data
+        return None
+
+    def list_jobs(
+        self, status: Optional[str] = None, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """新しい順のジョブ一覧（ジョブ表があれば他プロセスの分も含む）"""
+        if self.store is not None:
+            jobs = self.store.list(status, limit)
+            # 進捗は終了時にしか書かないので、このプロセスの実行中ジョブはメモリの値
+            for data in jobs:
+                job = self._jobs.get(data["job_id"])
+                if job is not None:
+                    data.update(job.to_dict(include_result=False))
+            return jobs
+        with self._lock:
+            jobs = [
+                job
+                for job in self._jobs.values()
+                if status is None or job.status == status
+            ]
+        jobs.sort(key=lambda job: job.created_at, reverse=True)
+        return [job.to_dict(include_result=False) for job in jobs[:limit]]
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Any:
+        """ジョブの終了を待って結果を返す（失敗時は例外を送出）"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"Unknown job: {job_id}")
+        return job.future.result(timeout)
+
+    def cancel(self, job_id: str) -> bool:
+        """待機中なら取り消し、実行中なら中断を要求する（このプロセスのジョブのみ）"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE_STATUSES:
+                return False
+            if job.status == QUEUED:
+                # ヒープからは取り出し時に読み飛ばす
+                self._queued -= 1
+                self._finish_locked(job, CANCELLED, error="cancelled before start")
+            else:
+                self._interrupt_locked(job, CANCELLED, "cancelled while running")
+        self._after_finish(job)
+        return True
+
+    def _interrupt_locked(self, job: Job, status: str, error: str) -> None:
+        """
+        実行中のジョブを中断済みとして確定し、関数側に中断を伝える
+
+        同期関数が戻るのを待たずに確定する（戻り値は破棄される）。中断は協調的で、
+        関数が戻るまでワーカーは busy_workers に数えられたままになる。呼び出し側は
+        ロックを外してから _after_finish() を呼ぶ。
+        """
+        self._running -= 1
+        self._finish_locked(job, status, error=error)
+        job.cancel_event.set()
+        if job.interrupt is not None:
+            job.interrupt()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = self._queued
+            running = self._running
+            busy_workers = self._busy_workers
+            retained = len(self._finished)
+        finished = self.stats.completed + self.stats.failed
+        return {
+            "workers": self.workers,
+            "busy_workers": busy_workers,
+            "running": running,
+            "queued": queued,
+            "max_queue": self.max_queue,
+            "retained_results": retained,
+            "max_results": self.max_results,
+            "result_ttl": self.result_ttl,
+            "persistent": self.store is not None,
+            "stored_status_counts": self.store.counts() if self.store else {},
+            "submitted": self.stats.submitted,
+            "rejected": self.stats.rejected,
+            "completed": self.stats.completed,
+            "failed": self.stats.failed,
+            "cancelled": self.stats.cancelled,
+            "timed_out": self.stats.timed_out,
+            "recovered": self.stats.recovered,
+            "evicted": self.stats.evicted,
+            "avg_wait_ms": (
+                round(self.stats.total_wait_time / finished * 1000, 2)
+                if finished
+                else 0.0
+            ),
+            "avg_run_ms": (
+                round(self.stats.total_run_time / finished * 1000, 2)
+                if finished
+                else 0.0
+            ),
+        }
+
+    # ------------------------------------------------------------------
+    # ライフサイクル
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._stopping = False
+        if self.store is not None:
+            self._recover()
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop, name=f"job-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        supervisor = threading.Thread(
+            target=self._supervise, name="job-supervisor", daemon=True
+        )
+        supervisor.start()
+        self._threads.append(supervisor)
+        logger.info(f"Job engine started with {self.workers} workers")
+
+    def shutdown(self, cancel_pending: bool = True, timeout: float = 5.0) -> None:
+        """
+        停止する
+
+        待機中のジョブは cancel_pending=True なら取り消す。False の場合、
+        再投入できるジョブはジョブ表に queued のまま残り、次回起動時に実行される。
+        """
+        with self._lock:
+            if not self._started:
+                return
+            self._stopping = True
+            pending = [
+                job for job in self._jobs.values() if job.status in ACTIVE_STATUSES
+            ]
+            self._work_available.notify_all()
+            self._supervisor_wakeup.notify_all()
+        for job in pending:
+            if cancel_pending or job.status == RUNNING:
+                self.cancel(job.job_id)
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+        with self._lock:
+            self._started = False
+        logger.info("Job engine stopped")
+
+    def _recover(self) -> None:
+        """前回異常終了したプロセスのジョブを引き取る"""
+        try:
+            orphans = self.store.claim_orphans()
+        except sqlite3.Error as e:
+            logger.warning(f"Job recovery failed: {e}")
+            return
+        for orphan in orphans:
+            func = self._registry.get(orphan["name"])
+            if func is None or orphan["attempts"] >= self.max_attempts:
+                job = Job(
+                    job_id=orphan["job_id"],
+                    name=orphan["name"],
+                    priority=orphan["priority"],
+                    created_at=orphan["created_at"],
+                    attempts=orphan["attempts"],
+                )
+                job.status = INTERRUPTED
+                job.finished_at = time.time()
+                job.error = (
+                    "job function is not registered in this process"
+                    if func is None
+                    else f"gave up after {job.attempts} attempts"
+                )
+                self.store.mark_finished(job)
+                continue
+            job = Job(
+                job_id=orphan["job_id"],
+                name=orphan["name"],
+                priority=orphan["priority"],
+                created_at=orphan["created_at"],
+                timeout=orphan["timeout"],
+                attempts=orphan["attempts"],
+                recoverable=True,
+                func=func,
+                args=tuple(orphan["args"]),
+                kwargs=orphan["kwargs"],
+            )
+            with self._lock:
+                self._enqueue(job)
+            self.stats.recovered += 1
+        if orphans:
+            logger.info(f"Job engine recovered {len(orphans)} orphaned jobs")
+
+    # ------------------------------------------------------------------
+    # 実行
+    # ------------------------------------------------------------------
+
+    def _next_job(self) -> Optional[Job]:
+        with self._lock:
+            while True:
+                if self._stopping:
+                    return None
+                while self._heap:
+                    _, _, job_id = heapq.heappop(self._heap)
+                    job = self._jobs.get(job_id)
+                    if job is None or job.status != QUEUED:
+                        continue  # キャンセル済み
+                    self._queued -= 1
+                    self._running += 1
+                    self._busy_workers += 1
+                    job.status = RUNNING
+                    job.started_at = time.time()
+                    job.attempts += 1
+                    if job.timeout is not None:
+                        self._supervisor_wakeup.notify()
+                    return job
+                self._work_available.wait()
+
+    def _worker_loop(self) -> None:
+        loop: Optional[asyncio.AbstractEventLoop] = None
+        try:
+            while True:
+                job = self._next_job()
+                if job is None:
+                    return
+                if self.store is not None:
+                    self.store.mark_started(job)
+                if loop is None and inspect.iscoroutinefunction(job.func):
+                    loop = asyncio.new_event_loop()
+                self._execute(job, lambda: self._call(loop, job))
+        finally:
+            if loop is not None:
+                loop.close()
+
+    def _call(self, loop: Optional[asyncio.AbstractEventLoop], job: Job) -> Any:
+        result = job.func(*job.args, **job.kwargs)
+        if not inspect.iscoroutine(result):
+            return result
+        if loop is None:
+            # コルーチンを返す通常の関数（functools.partial など）
+            loop = asyncio.new_event_loop()
+            try:
+                return self._run_coroutine(loop, job, result)
+            finally:
+                loop.close()
+        return self._run_coroutine(loop, job, result)
+
+    @staticmethod
+    def _run_coroutine(loop: asyncio.AbstractEventLoop, job: Job, coro) -> Any:
+        task = loop.create_task(coro)
+        job.interrupt = lambda: loop.call_soon_threadsafe(task.cancel)
+        if job.cancel_event.is_set():
+            task.cancel()
+        try:
+            return loop.run_until_complete(task)
+        finally:
+            job.interrupt = None
+
+    def _execute(self, job: Job, run: Callable[[], Any]) -> None:
+        token = _current_job.set(JobContext(self, job))
+        status, result, error = COMPLETED, None, None
+        try:
+            result = run()
+        except (asyncio.CancelledError, JobCancelled):
+            status, error = CANCELLED, "cancelled while running"
+        except Exception as e:
+            status, error = FAILED, f"{type(e).__name__}: {e}"
+            logger.error(f"Job {job.job_id} ({job.name}) failed: {error}")
+        finally:
+            _current_job.reset(token)
+
+        with self._lock:
+            self._busy_workers -= 1
+            if job.status != RUNNING:
+                # キャンセル・タイムアウトで確定済み（結果は破棄する）
+                return
+            self._running -= 1
+            self._finish_locked(job, status, result=result, error=error)
+        self._after_finish(job)
+
+    def _finish_locked(
+        self, job: Job, status: str, result: Any = None, error: Optional[str] = None
+    ) -> None:
+        """ロック下で呼ぶ。状態を確定し、保持件数を超えた古いジョブを捨てる"""
+        now = time.time()
+        job.status = status
+        job.finished_at = now
+        job.result = result
+        job.error = error
+        job.func, job.args, job.kwargs = None, (), {}
+        if job.started_at is not None:
+            self.stats.total_wait_time += job.started_at - job.created_at
+            self.stats.total_run_time += now - job.started_at
+        counter = {
+            COMPLETED: "completed",
+            FAILED: "failed",
+            CANCELLED: "cancelled",
+            TIMED_OUT: "timed_out",
+        }.get(status)
+        if counter:
+            setattr(self.stats, counter, getattr(self.stats, counter) + 1)
+        self._finished[job.job_id] = now
+        while len(self._finished) > self.max_results:
+            old_id, _ = self._finished.popitem(last=False)
+            self._jobs.pop(old_id, None)
+            self.stats.evicted += 1
+
+    def _forget(self, job_id: str) -> None:
+        """ロック下で呼ぶ"""
+        self._finished.pop(job_id, None)
+        self._jobs.pop(job_id, None)
+
+    def _after_finish(self, job: Job) -> None:
+        """ロック外で呼ぶ。ジョブ表と Future に結果を反映する"""
+        if self.store is not None:
+            try:
+                self.store.mark_finished(job)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to persist job {job.job_id}: {e}")
+        if job.future.done():
+            return
+        if job.status == COMPLETED:
+            job.future.set_result(job.result)
+        elif job.status == FAILED:
+            job.future.set_exception(RuntimeError(job.error))
+        else:
+            job.future.set_exception(JobCancelled(f"{job.job_id}: {job.status}"))
+
+    def _supervise(self) -> None:
+        """タイムアウトの検出と、保持期限を過ぎた結果の削除"""
+        while True:
+            expired: List[Job] = []
+            with self._lock:
+                if self._stopping:
+                    return
+                now = time.time()
+                next_deadline = now + 1.0
+                for job in self._jobs.values():
+                    deadline = job.deadline
+                    if job.status != RUNNING or deadline is None:
+                        continue
+                    if deadline <= now:
+                        expired.append(job)
+                    else:
+                        next_deadline = min(next_deadline, deadline)
+                for job in expired:
+                    self._interrupt_locked(
+                        job, TIMED_OUT, f"timed out after {job.timeout}s"
+                    )
+                cutoff = now - self.result_ttl
+                while self._finished:
+                    job_id, finished_at = next(iter(self._finished.items()))
+                    if finished_at >= cutoff:
+                        break
+                    self._forget(job_id)
+                    self.stats.evicted += 1
+                if not expired:
+                    self._supervisor_wakeup.wait(max(0.0, next_deadline - now))
+            for job in expired:
+                logger.warning(f"Job {job.job_id} ({job.name}) timed out")
+                self._after_finish(job)
+            self._purge_store()
+
+    def _purge_store(self) -> None:
+        if self.store is None or time.time() - self._last_store_purge < 60:
+            return
+        self._last_store_purge = time.time()
+        try:
+            self.store.purge_finished(time.time() - self.result_ttl)
+            self.store.purge_excess(self.max_results)
+        except sqlite3.Error as e:
+            logger.warning(f"Job table cleanup failed: {e}")
+
+
+_job_engine: Optional[JobEngine] = None
+_job_engine_lock = threading.Lock()
+
+
+def get_job_engine() -> JobEngine:
+    """Get global job engine instance"""
+    global _job_engine
+    if _job_engine is None:
+        with _job_engine_lock:
+            if _job_engine is None:
+                _job_engine = JobEngine.from_env()
+    return _job_engine
+
+
+def shutdown_job_engine() -> None:
+    """Stop the global job engine (pending recoverable jobs stay queued)"""
+    global _job_engine
+    if _job_engine is not None:
+        _job_engine.shutdown(cancel_pending=False)
+        _job_engine = None
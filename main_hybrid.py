@@ -60,6 +60,13 @@ except ImportError:
     MONITOR_AVAILABLE = False
     logging.warning("System monitor not available")
 
+try:
+    from job_engine import get_job_engine, shutdown_job_engine, JobEngine
+    JOB_ENGINE_AVAILABLE = True
+except ImportError:
+    JOB_ENGINE_AVAILABLE = False
+    logging.warning("Job engine not available")
+
 # ログ設定
 logging.basicConfig(
     level=logging.INFO,
@@ -73,6 +80,7 @@ class AppState:
         self.composer: Optional[ScriptComposer] = None
         self.mcp_generator: Optional[YouTubeScriptGenerator] = None
         self.system_monitor: Optional["SystemMonitor"] = None
+        self.job_engine: Optional["JobEngine"] = None
         self.is_healthy = False
 
 app_state = AppState()
@@ -144,6 +152,16 @@ async def lifespan(app: FastAPI):
             logger.error(f"System Monitor初期化エラー: {e}")
             app_state.system_monitor = None
     
+    # ジョブエンジン初期化（前回異常終了時のジョブはここで再投入される）
+    if JOB_ENGINE_AVAILABLE:
+        try:
+            app_state.job_engine = get_job_engine()
+            app_state.job_engine.start()
+            logger.info("Job Engine初期化完了")
+        except Exception as e:
+            logger.error(f"Job Engine初期化エラー: {e}")
+            app_state.job_engine = None
+    
     # Vault接続テスト（オプショナル）
     try:
         async with httpx.AsyncClient() as client:
@@ -164,6 +182,16 @@ async def lifespan(app: FastAPI):
     logger.info("AI Systems Hybrid シャットダウン中...")
     app_state.is_healthy = False
 
+    # 監視を停止し、履歴を保存（SYSTEM_MONITOR_HISTORY_DIR 設定時）
+    if app_state.system_monitor:
+        app_state.system_monitor.stop_monitoring()
+        app_state.system_monitor.save_history()
+
+    # ジョブエンジン停止（再投入できる未実行ジョブはジョブ表に残る）
+    if app_state.job_engine:
+        shutdown_job_engine()
+        app_state.job_engine = None
+
 # FastAPIアプリケーション作成
 app = FastAPI(
     title="AI Systems Hybrid",
@@ -215,6 +243,12 @@ def get_system_monitor() -> Optional["SystemMonitor"]:
         logger.error(f"System monitor取得エラー: {e}")
         return None
 
+def get_jobs() -> Optional["JobEngine"]:
+    """ジョブエンジン取得"""
+    if not app_state.job_engine:
+        raise HTTPException(status_code=503, detail="Job engine not initialized")
+    return app_state.job_engine
+
 # ヘルスチェック
 @app.get("/health")
 async def health_check():
@@ -405,14 +439,15 @@ async def system_health(
 # パフォーマンス分析
 @app.get("/system/performance")
 async def system_performance(
+    window: Optional[int] = None,
     system_monitor: "SystemMonitor" = Depends(get_system_monitor)
 ):
-    """パフォーマンス分析取得"""
+    """パフォーマンス分析取得（window: 直近の件数。省略時は保持している全件）"""
     try:
         if system_monitor is None:
             return {"error": "System monitor not available"}
         
-        performance_analysis = system_monitor.get_performance_analysis()
+        performance_analysis = system_monitor.get_performance_analysis(window)
         return performance_analysis
     except Exception as e:
         logger.error(f"System performance error: {e}")
@@ -421,14 +456,15 @@ async def system_performance(
 # 健全性トレンド
 @app.get("/system/health/trends")
 async def system_health_trends(
+    window: Optional[int] = None,
     system_monitor: "SystemMonitor" = Depends(get_system_monitor)
 ):
-    """健全性トレンド取得"""
+    """健全性トレンド取得（window: 直近の件数。省略時は保持している全件）"""
     try:
         if system_monitor is None:
             return {"error": "System monitor not available"}
         
-        health_trends = system_monitor.get_health_trends()
+        health_trends = system_monitor.get_health_trends(window)
         return health_trends
     except Exception as e:
         logger.error(f"System health trends error: {e}")
@@ -655,14 +691,15 @@ async def stop_real_time_monitoring(
 # 予測分析
 @app.get("/system/predictive")
 async def predictive_analysis(
+    window: Optional[int] = None,
     system_monitor: "SystemMonitor" = Depends(get_system_monitor)
 ):
-    """予測分析取得"""
+    """予測分析取得（window: 直近の件数。省略時は保持している全件）"""
     try:
         if system_monitor is None:
             return {"error": "System monitor not available"}
         
-        predictive_data = system_monitor.get_predictive_analysis()
+        predictive_data = system_monitor.get_predictive_analysis(window)
         return predictive_data
     except Exception as e:
         logger.error(f"Predictive analysis error: {e}")
@@ -894,6 +931,48 @@ async def system_optimization_proposals(
         logger.error(f"Optimization proposals error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+# バックグラウンドジョブ
+@app.get("/jobs")
+async def list_jobs(
+    status: Optional[str] = None,
+    limit: int = 50,
+    job_engine: "JobEngine" = Depends(get_jobs)
+):
+    """ジョブ一覧取得（新しい順。ジョブ表を共有する他プロセスのジョブも含む）
+
+    タイムアウト・キャンセルは同期関数のジョブでは協調的に行われる。状態は
+    すぐに timed_out / cancelled になるが、関数が current_job().raise_if_cancelled()
+    で中断するか戻るまでワーカーは占有される（/jobs/metrics の busy_workers）。
+    """
+    jobs = await asyncio.to_thread(job_engine.list_jobs, status, min(max(limit, 1), 500))
+    return {"jobs": jobs, "count": len(jobs)}
+
+@app.get("/jobs/metrics")
+async def job_metrics(job_engine: "JobEngine" = Depends(get_jobs)):
+    """ジョブエンジンの統計取得"""
+    return await asyncio.to_thread(job_engine.get_metrics)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, job_engine: "JobEngine" = Depends(get_jobs)):
+    """ジョブの状態・結果取得"""
+    job = await asyncio.to_thread(job_engine.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, job_engine: "JobEngine" = Depends(get_jobs)):
+    """ジョブのキャンセル（このサーバーで実行中・待機中のジョブのみ）"""
+    if not job_engine.cancel(job_id):
+        job = await asyncio.to_thread(job_engine.get, job_id, False)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job cannot be cancelled (status: {job['status']})"
+        )
+    return {"status": "success", "job": job_engine.get(job_id, False)}
+
 # 統合テスト
 @app.post("/test/integration")
 async def test_integration():
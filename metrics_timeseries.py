@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+📈 Columnar ring-buffer time series
+SystemMonitor の履歴（パフォーマンス・健全性）を固定容量の NumPy 配列で保持する
+
+- 追記は O(1)（上限到達後は最古の値を上書きするだけでコピーしない）
+- タイムスタンプはエポック秒（float64）。ISO 文字列への変換は出力時のみ
+- 平均・最小・最大・パーセンタイル・傾き（最小二乗）を直近 window 件に対して
+  ベクトル演算で求める（O(window)）
+- save()/load() で .npz に保存し、再起動後もダッシュボードの履歴を引き継げる
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def linear_trend(values: np.ndarray) -> Dict[str, float]:
+    """等間隔サンプルに対する最小二乗直線の傾きと決定係数"""
+    n = len(values)
+    if n < 2:
+        intercept = float(values[0]) if n else 0.0
+        return {"slope": 0.0, "intercept": intercept, "r_squared": 0.0}
+    x = np.arange(n, dtype=np.float64)
+    x_mean = (n - 1) / 2.0
+    y_mean = float(values.mean())
+    dx = x - x_mean
+    dy = values - y_mean
+    sxx = float(dx @ dx)
+    slope = float(dx @ dy) / sxx
+    intercept = y_mean - slope * x_mean
+    ss_tot = float(dy @ dy)
+    residuals = values - (slope * x + intercept)
+    ss_res = float(residuals @ residuals)
+    r_squared = 0.0 if ss_tot == 0 else 1.0 - ss_res / ss_tot
+    return {"slope": slope, "intercept": intercept, "r_squared": r_squared}
+
+
+class TimeSeriesRing:
+    """固定容量の列指向リングバッファ
+
+    Args:
+        fields: 数値列の名前
+        capacity: 保持する最大件数（超えたら古いものから上書き）
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int = 1000):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._columns = {
+            field: np.zeros(capacity, dtype=np.float64) for field in self.fields
+        }
+        # 次に書き込む位置と現在の件数
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, values: Dict[str, float]) -> None:
+        """1件追記する（未指定の列は 0）"""
+        head = self._head
+        self._timestamps[head] = timestamp
+        for field, column in self._columns.items():
+            column[head] = values.get(field, 0) or 0
+        self._head = (head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def _ordered(self, array: np.ndarray, count: int) -> np.ndarray:
+        """古い順に並べた直近 count 件（折り返していなければコピーしないビュー）"""
+        start = self._head - count
+        if start >= 0:
+            return array[start : self._head]
+        return np.concatenate((array[start:], array[: self._head]))
+
+    def _window_size(self, window: Optional[int]) -> int:
+        if window is None or window <= 0:
+            return self._size
+        return min(window, self._size)
+
+    def timestamps(self, window: Optional[int] = None) -> np.ndarray:
+        return self._ordered(self._timestamps, self._window_size(window))
+
+    def column(self, field: str, window: Optional[int] = None) -> np.ndarray:
+        """列の直近 window 件（古い順）"""
+        return self._ordered(self._columns[field], self._window_size(window))
+
+    def last(self, field: str) -> float:
+        if not self._size:
+            return 0.0
+        return float(self._columns[field][self._head - 1])
+
+    def last_timestamp(self) -> Optional[float]:
+        if not self._size:
+            return None
+        return float(self._timestamps[self._head - 1])
+
+    def time_range(self, window: Optional[int] = None) -> Dict[str, str]:
+        """範囲の開始・終了（ISO 形式）"""
+        count = self._window_size(window)
+        if not count:
+            return {"start": "", "end": ""}
+        timestamps = self._ordered(self._timestamps, count)
+        return {"start": to_iso(timestamps[0]), "end": to_iso(timestamps[-1])}
+
+    def aggregate(
+        self,
+        field: str,
+        window: Optional[int] = None,
+        percentiles: Sequence[float] = (50, 95, 99),
+    ) -> Dict[str, float]:
+        """直近 window 件の要約統計（件数・現在値・平均・最小・最大・分位点・傾き）"""
+        values = self.column(field, window)
+        if not len(values):
+            return {"count": 0}
+        result = {
+            "count": int(len(values)),
+            "current": float(values[-1]),
+            "mean": float(values.mean()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "std": float(values.std()),
+        }
+        for q, value in zip(percentiles, np.percentile(values, percentiles)):
+            result[f"p{q:g}"] = float(value)
+        result["slope"] = linear_trend(values)["slope"]
+        return result
+
+    def prune_before(self, cutoff: float) -> int:
+        """cutoff（エポック秒）より古い記録を捨てる。捨てた件数を返す"""
+        if not self._size:
+            return 0
+        timestamps = self._ordered(self._timestamps, self._size)
+        dropped = int(np.searchsorted(timestamps, cutoff, side="left"))
+        self._size -= dropped
+        return dropped
+
+    def iter_records(self, window: Optional[int] = None) -> Iterator[Dict[str, float]]:
+        """辞書形式で古い順に返す（互換用。timestamp はエポック秒）"""
+        count = self._window_size(window)
+        timestamps = self._ordered(self._timestamps, count)
+        columns = {f: self._ordered(c, count) for f, c in self._columns.items()}
+        for index in range(count):
+            record = {"timestamp": float(timestamps[index])}
+            for field, column in columns.items():
+                record[field] = float(column[index])
+            yield record
+
+    # ------------------------------------------------------------------
+    # 永続化
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """保存する内容（有効な範囲を古い順に並べたコピー）"""
+        arrays = {f"col_{f}": self.column(f).copy() for f in self.fields}
+        arrays["timestamps"] = self.timestamps().copy()
+        return arrays
+
+    def save(self, path: str, snapshot: Optional[Dict[str, np.ndarray]] = None) -> None:
+        """
+        有効な範囲を .npz に保存する（書き込みは置き換え方式）
+
+        snapshot() の結果を渡すと、それを書き込む（別スレッドで保存する場合）。
+        """
+        arrays = snapshot if snapshot is not None else self.snapshot()
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """save() したファイルを読み込む（存在する列だけ。読み込んだ件数を返す）"""
+        if not os.path.exists(path):
+            return 0
+        with np.load(path, allow_pickle=False) as data:
+            timestamps = data["timestamps"][-self.capacity :]
+            count = len(timestamps)
+            self._timestamps[:count] = timestamps
+            for field, column in self._columns.items():
+                key = f"col_{field}"
+                if count and key in data.files:
+                    column[:count] = data[key][-count:]
+                else:
+                    column[:count] = 0
+        self._size = count
+        self._head = count % self.capacity
+        return count
+
+
+def to_iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(float(timestamp)).isoformat()
@@ -4,8 +4,6 @@ Performance Optimization System
 パフォーマンス最適化システム
 """
 
-import asyncio
-import time
 import psutil
 import streamlit as st
 from typing import Dict, Any, List, Optional
@@ -13,10 +11,15 @@ import logging
 from datetime import datetime
 import threading
 import queue
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import Future
 import gc
 import tracemalloc
 
+from app.core.ttl_cache import get_cache
+from job_engine import (
+    get_job_engine, PRIORITY_NORMAL, QUEUED, COMPLETED, FAILED, TERMINAL_STATUSES
+)
+
 class PerformanceOptimizer:
     """パフォーマンス最適化システム"""
     
@@ -24,8 +27,10 @@ class PerformanceOptimizer:
         self.setup_logging()
         self.performance_metrics = {}
         self.optimization_history = []
-        self.cache = {}
-        self.background_tasks = {}
+        # TTL + LRU キャッシュ（プロセス共通。PERFORMANCE_CACHE_* で上限・ディスク層を設定）
+        self.cache = get_cache('PERFORMANCE_CACHE', max_entries=1000)
+        # バックグラウンドタスクはプロセス共通のジョブエンジンで実行する
+        self.job_engine = get_job_engine()
         
     def setup_logging(self):
         """ログ設定"""
@@ -114,24 +119,25 @@ class PerformanceOptimizer:
             return {}
     
     def optimize_cache(self, max_size: int = 1000) -> Dict[str, Any]:
-        """キャッシュ最適化"""
+        """キャッシュ最適化（期限切れの掃除と、max_size 件を超えた分の LRU 追い出し）"""
         try:
             cache_size_before = len(self.cache)
             
-            # LRUキャッシュ実装
-            if len(self.cache) > max_size:
-                # 最も古いエントリを削除
-                oldest_keys = sorted(self.cache.keys(), key=lambda k: self.cache[k].get('timestamp', 0))[:len(self.cache) - max_size]
-                for key in oldest_keys:
-                    del self.cache[key]
+            expired = self.cache.purge_expired()
+            evicted = self.cache.trim(max_size)
             
             cache_size_after = len(self.cache)
+            metrics = self.cache.get_metrics()
             
             return {
                 'timestamp': datetime.now().isoformat(),
                 'cache_size_before': cache_size_before,
                 'cache_size_after': cache_size_after,
                 'cache_entries_removed': cache_size_before - cache_size_after,
+                'expired_entries': expired,
+                'evicted_entries': evicted,
+                'cache_bytes': metrics['size_bytes'],
+                'hit_rate': metrics['hit_rate'],
                 'max_cache_size': max_size
             }
             
@@ -140,32 +146,20 @@ class PerformanceOptimizer:
             return {}
     
     def optimize_background_tasks(self) -> Dict[str, Any]:
-        """バックグラウンドタスク最適化"""
+        """バックグラウンドタスク最適化（保持期限・件数上限を超えた結果の削除はジョブエンジンが行う）"""
         try:
-            active_tasks = len(self.background_tasks)
-            completed_tasks = 0
-            failed_tasks = 0
-            
-            # 完了したタスクのクリーンアップ
-            tasks_to_remove = []
-            for task_id, task_info in self.background_tasks.items():
-                if task_info.get('status') == 'completed':
-                    completed_tasks += 1
-                    tasks_to_remove.append(task_id)
-                elif task_info.get('status') == 'failed':
-                    failed_tasks += 1
-                    tasks_to_remove.append(task_id)
-            
-            # 完了/失敗したタスクを削除
-            for task_id in tasks_to_remove:
-                del self.background_tasks[task_id]
+            metrics = self.job_engine.get_metrics()
             
             return {
                 'timestamp': datetime.now().isoformat(),
-                'active_tasks': len(self.background_tasks),
-                'completed_tasks': completed_tasks,
-                'failed_tasks': failed_tasks,
-                'tasks_cleaned': len(tasks_to_remove)
+                'active_tasks': metrics['running'] + metrics['queued'],
+                'running_tasks': metrics['running'],
+                'queued_tasks': metrics['queued'],
+                'completed_tasks': metrics['completed'],
+                'failed_tasks': metrics['failed'],
+                'cancelled_tasks': metrics['cancelled'] + metrics['timed_out'],
+                'tasks_cleaned': metrics['evicted'],
+                'retained_results': metrics['retained_results']
             }
             
         except Exception as e:
@@ -174,58 +168,34 @@ class PerformanceOptimizer:
     
     def add_to_cache(self, key: str, value: Any, ttl: int = 3600):
         """キャッシュに追加"""
-        self.cache[key] = {
-            'value': value,
-            'timestamp': time.time(),
-            'ttl': ttl
-        }
+        self.cache.set(key, value, ttl)
     
     def get_from_cache(self, key: str) -> Optional[Any]:
-        """キャッシュから取得"""
-        if key in self.cache:
-            cache_entry = self.cache[key]
-            if time.time() - cache_entry['timestamp'] < cache_entry['ttl']:
-                return cache_entry['value']
-            else:
-                # TTL期限切れ
-                del self.cache[key]
-        return None
+        """キャッシュから取得（期限切れは None）"""
+        return self.cache.get(key)
     
-    def run_background_task(self, task_id: str, task_func, *args, **kwargs):
-        """バックグラウンドタスク実行"""
-        def task_wrapper():
-            try:
-                self.background_tasks[task_id] = {
-                    'status': 'running',
-                    'start_time': time.time(),
-                    'args': args,
-                    'kwargs': kwargs
-                }
-                
-                result = task_func(*args, **kwargs)
-                
-                self.background_tasks[task_id].update({
-                    'status': 'completed',
-                    'result': result,
-                    'end_time': time.time(),
-                    'duration': time.time() - self.background_tasks[task_id]['start_time']
-                })
-                
-                return result
-                
-            except Exception as e:
-                self.background_tasks[task_id].update({
-                    'status': 'failed',
-                    'error': str(e),
-                    'end_time': time.time()
-                })
-                self.logger.error(f"バックグラウンドタスクエラー {task_id}: {e}")
-                raise
-        
-        # スレッドプールで実行
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            future = executor.submit(task_wrapper)
-            return future
+    def run_background_task(self, task_id: str, task_func, *args, **kwargs) -> Future:
+        """
+        バックグラウンドタスク実行（ジョブエンジンの共有ワーカーに投入し、すぐに戻る）
+
+        優先度・タイムアウトは job_priority / job_timeout キーワードで指定する。
+        戻り値の Future で結果を待てる。状態は get_background_task() で参照する。
+        """
+        priority = kwargs.pop('job_priority', PRIORITY_NORMAL)
+        timeout = kwargs.pop('job_timeout', None)
+        job = self.job_engine.submit(
+            task_func, args, kwargs,
+            job_id=task_id, priority=priority, timeout=timeout
+        )
+        return job.future
+    
+    def get_background_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """バックグラウンドタスクの状態取得"""
+        return self.job_engine.get(task_id)
+    
+    def cancel_background_task(self, task_id: str) -> bool:
+        """バックグラウンドタスクのキャンセル"""
+        return self.job_engine.cancel(task_id)
     
     def get_performance_report(self) -> Dict[str, Any]:
         """性能レポート生成"""
@@ -308,53 +278,63 @@ class PerformanceOptimizer:
         return recommendations
 
 class AsyncTaskManager:
-    """非同期タスク管理"""
+    """非同期タスク管理（ジョブエンジンの共有ワーカー・優先度付きキューで実行する）
+
+    コルーチン関数のタスクは呼び出し側のイベントループではなく、ワーカースレッドごとの
+    専用イベントループで実行される。呼び出し側のループに紐づくオブジェクト
+    （aiohttp のセッション、asyncio.Lock/Queue/Future など）は渡さず、タスク内で作ること。
+    """
     
-    def __init__(self):
-        self.task_queue = asyncio.Queue()
-        self.results = {}
+    def __init__(self, engine=None):
+        self.engine = engine or get_job_engine()
+        self.task_ids = set()
         self.running = False
         
     async def start_worker(self):
-        """ワーカー開始"""
+        """ワーカー開始（実行はジョブエンジンのワーカーが行うので、すぐに戻る）"""
         self.running = True
-        while self.running:
-            try:
-                task = await self.task_queue.get()
-                if task is None:
-                    break
-                
-                task_id, func, args, kwargs = task
-                try:
-                    result = await func(*args, **kwargs)
-                    self.results[task_id] = {
-                        'status': 'completed',
-                        'result': result,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                except Exception as e:
-                    self.results[task_id] = {
-                        'status': 'failed',
-                        'error': str(e),
-                        'timestamp': datetime.now().isoformat()
-                    }
-                
-                self.task_queue.task_done()
-                
-            except Exception as e:
-                logging.error(f"ワーカーエラー: {e}")
+        self.engine.start()
     
     async def add_task(self, task_id: str, func, *args, **kwargs):
-        """タスク追加"""
-        await self.task_queue.put((task_id, func, args, kwargs))
+        """タスク追加（job_priority / job_timeout で優先度・タイムアウトを指定できる）
+
+        func がコルーチン関数の場合もワーカースレッドの専用イベントループで実行する
+        （呼び出し側のループ上では動かない）。
+        """
+        priority = kwargs.pop('job_priority', PRIORITY_NORMAL)
+        timeout = kwargs.pop('job_timeout', None)
+        self.engine.submit(
+            func, args, kwargs,
+            job_id=task_id, priority=priority, timeout=timeout
+        )
+        self.task_ids.add(task_id)
     
     def get_task_result(self, task_id: str) -> Optional[Dict[str, Any]]:
-        """タスク結果取得"""
-        return self.results.get(task_id)
+        """タスク結果取得（未完了の場合は None）"""
+        job = self.engine.get(task_id)
+        if job is None or job['status'] not in TERMINAL_STATUSES:
+            return None
+        self.task_ids.discard(task_id)
+        if job['status'] == COMPLETED:
+            return {
+                'status': 'completed',
+                'result': job['result'],
+                'timestamp': job['finished_at']
+            }
+        return {
+            'status': 'failed' if job['status'] == FAILED else job['status'],
+            'error': job['error'],
+            'timestamp': job['finished_at']
+        }
     
     def stop_worker(self):
-        """ワーカー停止"""
+        """ワーカー停止（このマネージャーが投入した未実行のタスクを取り消す）"""
         self.running = False
+        for task_id in list(self.task_ids):
+            job = self.engine.get(task_id, include_result=False)
+            if job is not None and job['status'] == QUEUED:
+                self.engine.cancel(task_id)
+            self.task_ids.discard(task_id)
 
 def display_performance_optimizer_interface():
     """パフォーマンス最適化インターフェース表示"""
@@ -415,6 +395,7 @@ def display_performance_optimizer_interface():
                         st.success("キャッシュ最適化完了！")
                         st.metric("削除エントリ", result['cache_entries_removed'])
                         st.metric("現在サイズ", result['cache_size_after'])
+                        st.metric("ヒット率", f"{result['hit_rate'] * 100:.1f}%")
         
         with col3:
             if st.button("⚙️ タスク最適化"):
@@ -425,6 +406,21 @@ def display_performance_optimizer_interface():
                         st.success("タスク最適化完了！")
                         st.metric("アクティブタスク", result['active_tasks'])
                         st.metric("完了タスク", result['completed_tasks'])
+                        st.metric("待機タスク", result['queued_tasks'])
+        
+        # ジョブ一覧（ジョブ表を共有している他プロセスのジョブも含む）
+        st.write("**📋 ジョブ一覧**")
+        status_filter = st.selectbox(
+            "状態",
+            ["すべて", "queued", "running", "completed", "failed", "cancelled", "timed_out", "interrupted"]
+        )
+        jobs = optimizer.job_engine.list_jobs(
+            status=None if status_filter == "すべて" else status_filter, limit=100
+        )
+        if jobs:
+            st.dataframe(jobs, use_container_width=True)
+        else:
+            st.info("ジョブはありません")
     
     with tab3:
         st.subheader("📈 性能レポート")
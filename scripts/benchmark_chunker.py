@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+チャンク分割のベンチマーク（トークン基準の TextChunker vs 従来の文字数基準の分割）
+
+営業資料風の長文（既定 10MB）を各分割方針でチャンク化し、処理時間・チャンク数・
+最大トークン数を比較する。TextChunker については全チャンクが
+``text[start:end] == chunk.text`` を満たし、上限トークン数を超えないことを確認する。
+
+Usage:
+    python scripts/benchmark_chunker.py --mb 10 --max-tokens 2000 --overlap 200
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.text_chunker import (  # noqa: E402
+    STRATEGIES,
+    EstimatedTokenizer,
+    TextChunker,
+)
+
+SENTENCES = [
+    "お忙しい中ありがとうございます。",
+    "弊社のクラウドサービスは導入実績が500社を超えています。",
+    "価格は月額10,000円からご利用いただけます！",
+    "ご不明な点はございますか？",
+    "The onboarding takes about two weeks. ",
+    "Support is available 24/7 via chat and email. ",
+]
+
+
+class LegacyChunker:
+    """従来と同じ「文字列を連結しながら文字数で切る」参照実装"""
+
+    def chunk(self, text: str, chunk_size: int, strategy: str):
+        if strategy == "headings":
+            return self._split_by_headings(text, chunk_size)
+        if strategy == "paragraphs":
+            return self._split_by_paragraphs(text, chunk_size)
+        if strategy == "code":
+            return self._split_by_code_blocks(text, chunk_size)
+        return self._split_by_sentences(text, chunk_size)
+
+    def _split_by_headings(self, text, chunk_size):
+        chunks = []
+        current_chunk = ""
+        for line in text.split("\n"):
+            if line.strip().startswith("#") and current_chunk:
+                if len(current_chunk) > chunk_size:
+                    chunks.extend(self._split_by_sentences(current_chunk, chunk_size))
+                else:
+                    chunks.append(current_chunk.strip())
+                current_chunk = line + "\n"
+            else:
+                current_chunk += line + "\n"
+                if len(current_chunk) > chunk_size * 1.5:
+                    chunks.extend(self._split_by_sentences(current_chunk, chunk_size))
+                    current_chunk = ""
+        if current_chunk.strip():
+            chunks.append(current_chunk.strip())
+        return chunks
+
+    def _split_by_paragraphs(self, text, chunk_size):
+        chunks = []
+        current_chunk = ""
+        for paragraph in text.split("\n\n"):
+            if len(current_chunk + paragraph) > chunk_size and current_chunk:
+                chunks.append(current_chunk.strip())
+                current_chunk = paragraph + "\n\n"
+            else:
+                current_chunk += paragraph + "\n\n"
+        if current_chunk.strip():
+            chunks.append(current_chunk.strip())
+        return chunks
+
+    def _split_by_code_blocks(self, text, chunk_size):
+        chunks = []
+        current_chunk = ""
+        for line in text.split("\n"):
+            if (
+                line.strip().startswith("def ")
+                or line.strip().startswith("class ")
+                or line.strip().startswith("function ")
+            ):
+                if current_chunk and len(current_chunk) > chunk_size:
+                    chunks.append(current_chunk.strip())
+                    current_chunk = line + "\n"
+                else:
+                    current_chunk += line + "\n"
+            else:
+                current_chunk += line + "\n"
+                if len(current_chunk) > chunk_size * 1.5:
+                    chunks.append(current_chunk.strip())
+                    current_chunk = ""
+        if current_chunk.strip():
+            chunks.append(current_chunk.strip())
+        return chunks
+
+    def _split_by_sentences(self, text, chunk_size):
+        chunks = []
+        current_chunk = ""
+        sentence_endings = ["。", "！", "？", ".\n", "!\n", "?\n"]
+        sentences = []
+        current_sentence = ""
+        for char in text:
+            current_sentence += char
+            if any(current_sentence.endswith(ending) for ending in sentence_endings):
+                sentences.append(current_sentence.strip())
+                current_sentence = ""
+        if current_sentence.strip():
+            sentences.append(current_sentence.strip())
+        for sentence in sentences:
+            if len(current_chunk + sentence) > chunk_size and current_chunk:
+                chunks.append(current_chunk.strip())
+                current_chunk = sentence + " "
+            else:
+                current_chunk += sentence + " "
+        if current_chunk.strip():
+            chunks.append(current_chunk.strip())
+        return chunks
+
+
+def make_document(target_bytes: int, seed: int) -> str:
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < target_bytes:
+        if rng.random() < 0.02:
+            part = f"\n# 第{len(parts)}章 製品概要\n\n"
+        else:
+            part = "".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 8)))
+            part += "\n\n" if rng.random() < 0.3 else "\n"
+        parts.append(part)
+        size += len(part.encode("utf-8"))
+    return "".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunker benchmark")
+    parser.add_argument("--mb", type=float, default=10)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--overlap", type=int, default=200)
+    parser.add_argument(
+        "--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES)
+    )
+    parser.add_argument(
+        "--skip-legacy", action="store_true", help="従来実装の計測を省く"
+    )
+    args = parser.parse_args()
+
+    text = make_document(int(args.mb * 1024 * 1024), seed=42)
+    tokenizer = EstimatedTokenizer()
+    chunker = TextChunker(tokenizer, args.max_tokens, args.overlap)
+    legacy = LegacyChunker()
+    print(
+        f"text: {len(text.encode('utf-8')) / 1024 / 1024:.1f}MB, {len(text)} chars, "
+        f"{tokenizer.count(text)} tokens (estimated)"
+    )
+    print(
+        f"{'strategy':>10} {'impl':>7} {'seconds':>8} {'chunks':>7} "
+        f"{'max tok':>8} {'over':>5}  offsets"
+    )
+    for strategy in args.strategies:
+        started = time.perf_counter()
+        chunks = chunker.chunk(text, strategy)
+        elapsed = time.perf_counter() - started
+        offsets_ok = all(text[c.start : c.end] == c.text for c in chunks)
+        over = sum(1 for c in chunks if c.token_count > args.max_tokens)
+        print(
+            f"{strategy:>10} {'token':>7} {elapsed:>8.2f} {len(chunks):>7} "
+            f"{max(c.token_count for c in chunks):>8} {over:>5}  {offsets_ok}"
+        )
+        if not offsets_ok or over:
+            sys.exit("chunk offsets or token limits violated")
+
+        if args.skip_legacy:
+            continue
+        # 従来実装は文字数基準なので、同じ上限値を文字数として渡す
+        started = time.perf_counter()
+        legacy_chunks = legacy.chunk(text, args.max_tokens, strategy)
+        elapsed = time.perf_counter() - started
+        legacy_tokens = [tokenizer.count(c) for c in legacy_chunks]
+        print(
+            f"{strategy:>10} {'legacy':>7} {elapsed:>8.2f} {len(legacy_chunks):>7} "
+            f"{max(legacy_tokens):>8} "
+            f"{sum(1 for t in legacy_tokens if t > args.max_tokens):>5}  -"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+リマインダー対象抽出の計測（全件スキャン vs 二次索引）
+合成ユーザーで get_users_for_reminder の所要時間を比較し、結果の一致を確認する
+
+Usage:
+    python scripts/benchmark_reminder_index.py [--users 1000000] [--no-memory-scan]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.usage_limit_service import (  # noqa: E402
+    ReminderSettings,
+    UsageLimitService,
+    UsageStats,
+)
+from app.services.usage_storage import SQLiteUsageStorage  # noqa: E402
+
+REMINDER_TYPES = {"3days": 3, "1day": 1, "same_day": 0}
+
+
+def _users(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    now = datetime.now()
+    for i in range(count):
+        last_roleplay = None
+        if rng.random() < 0.9:
+            last_roleplay = (now - timedelta(days=rng.randrange(60))).isoformat()
+        yield asdict(
+            UsageStats(
+                user_id=f"user-{i}",
+                video_processing_minutes_used=0,
+                roleplay_sessions_remaining=60,
+                last_reset_date=now.isoformat(),
+                created_at=now.isoformat(),
+                updated_at=now.isoformat(),
+                last_roleplay_date=last_roleplay,
+                total_roleplay_sessions=rng.randrange(100),
+                reminder_settings=ReminderSettings(
+                    email_enabled=rng.random() < 0.7,
+                    email_address=f"user{i}@example.com",
+                    user_name=f"User {i}",
+                    reminder_days=rng.sample([3, 1, 0], rng.randint(1, 3)),
+                ),
+            )
+        )
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reminder selection")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument(
+        "--no-memory-scan",
+        action="store_true",
+        help="skip the legacy scan over in-memory UsageStats",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteUsageStorage(Path(tmp) / "usage.db")
+        _, build_ms = _timed(lambda: storage.save_many(_users(args.users)))
+        service = UsageLimitService(
+            storage_path=str(Path(tmp) / "usage.json"), storage=storage
+        )
+        print(f"users={args.users} build={build_ms / 1000:.1f}s")
+
+        in_memory = None
+        if not args.no_memory_scan:
+            in_memory = [UsageStats(**data) for data in _users(args.users)]
+
+        print(f"{'type':<9} {'matches':>8} {'index_ms':>10} {'scan_db_ms':>11} "
+              f"{'scan_mem_ms':>12}")
+        for reminder_type, days in REMINDER_TYPES.items():
+            indexed, index_ms = _timed(
+                lambda: asyncio.run(service.get_users_for_reminder(reminder_type))
+            )
+            scanned, scan_db_ms = _timed(
+                lambda: [
+                    entry
+                    for stats in service._iter_user_stats()
+                    if (entry := service._build_reminder_entry(stats, days))
+                ]
+            )
+            scan_mem = "-"
+            if in_memory is not None:
+                scanned_mem, scan_mem_ms = _timed(
+                    lambda: [
+                        entry
+                        for stats in in_memory
+                        if (entry := service._build_reminder_entry(stats, days))
+                    ]
+                )
+                assert {u["user_id"] for u in scanned_mem} == {
+                    u["user_id"] for u in indexed
+                }
+                scan_mem = f"{scan_mem_ms:.1f}"
+
+            assert {u["user_id"] for u in scanned} == {u["user_id"] for u in indexed}
+            print(
+                f"{reminder_type:<9} {len(indexed):>8} {index_ms:>10.1f} "
+                f"{scan_db_ms:>11.1f} {scan_mem:>12}"
+            )
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+リクエスト計測のオーバーヘッド計測（RequestTimingMiddleware / stage / timed_stage）
+
+何もしない ASGI アプリを直接呼び出し、ミドルウェアの有無で 1 リクエストあたりの
+時間差を求める。ステージのスパンとデコレーターについても同様に計測する。
+いずれかが --max-us を超えた場合は終了コード 1 で終わる。
+
+Usage:
+    python scripts/benchmark_request_metrics.py --requests 200000 --max-us 5
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from prometheus_client import CollectorRegistry  # noqa: E402
+
+import app.services.request_metrics as request_metrics  # noqa: E402
+from app.services.request_metrics import (  # noqa: E402
+    RequestMetrics,
+    RequestTimingMiddleware,
+    stage,
+    timed_stage,
+)
+
+
+class FakeRoute:
+    path = "/conversation/{session_id}"
+    path_format = path
+
+
+ROUTE = FakeRoute()
+START = {"type": "http.response.start", "status": 200, "headers": []}
+BODY = {"type": "http.response.body", "body": b"{}"}
+
+
+async def endpoint_app(scope, receive, send):
+    # ルーティング済みの状態を模擬する（FastAPI が scope["route"] を設定する）
+    scope["route"] = ROUTE
+    await send(START)
+    await send(BODY)
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def make_scope():
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/conversation/abc123",
+        "root_path": "",
+    }
+
+
+async def time_requests(app, requests: int) -> float:
+    scopes = [make_scope() for _ in range(requests)]
+    started = time.perf_counter()
+    for scope in scopes:
+        await app(scope, receive, send)
+    return time.perf_counter() - started
+
+
+async def noop():
+    return None
+
+
+@timed_stage("llm")
+async def timed_noop():
+    return None
+
+
+async def time_coroutines(func, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        await func()
+    return time.perf_counter() - started
+
+
+def time_spans(count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        with stage("stt"):
+            pass
+    return time.perf_counter() - started
+
+
+def best_of(repeat: int, func):
+    return min(func() for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request metrics overhead benchmark")
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-us", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # 計測用に独立したレジストリを使う（グローバルなメトリクスを汚さない）
+    metrics = RequestMetrics(registry=CollectorRegistry())
+    request_metrics._request_metrics = metrics
+    wrapped = RequestTimingMiddleware(endpoint_app, metrics=metrics)
+    n = args.requests
+
+    loop = asyncio.new_event_loop()
+    run = loop.run_until_complete
+    bare = best_of(args.repeat, lambda: run(time_requests(endpoint_app, n)))
+    timed = best_of(args.repeat, lambda: run(time_requests(wrapped, n)))
+    plain_coro = best_of(args.repeat, lambda: run(time_coroutines(noop, n)))
+    timed_coro = best_of(args.repeat, lambda: run(time_coroutines(timed_noop, n)))
+    loop.close()
+    span = best_of(args.repeat, lambda: time_spans(n))
+
+    results = {
+        "middleware": (timed - bare) / n * 1e6,
+        "stage span": span / n * 1e6,
+        "timed_stage": (timed_coro - plain_coro) / n * 1e6,
+    }
+    print(f"{n} iterations, best of {args.repeat}")
+    print(f"  bare ASGI call       {bare / n * 1e6:8.3f} us/request")
+    print(f"  with middleware      {timed / n * 1e6:8.3f} us/request")
+    for name, overhead in results.items():
+        print(f"  {name + ' overhead':<20} {overhead:8.3f} us")
+
+    recorded = metrics.registry.get_sample_value(
+        "voice_api_request_duration_seconds_count",
+        {"route": "/api/conversation/{session_id}", "method": "POST", "status": "200"},
+    )
+    if not recorded:
+        sys.exit("middleware did not record any request")
+    over = [name for name, overhead in results.items() if overhead > args.max_us]
+    if over:
+        sys.exit(f"overhead above {args.max_us}us: {', '.join(over)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+TTLCache と従来の PerformanceOptimizer.cache（dict + ソートによる追い出し）の比較
+
+同じ件数上限のもとで、ランダムなキーの set / get を繰り返したときの
+1操作あたりの時間を求める。従来方式は上限を超えるたびに optimize_cache() と同じく
+全キーをタイムスタンプでソートして追い出す。
+
+Usage:
+    python scripts/benchmark_ttl_cache.py --entries 10000 --operations 200000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.ttl_cache import TTLCache  # noqa: E402
+
+
+class LegacyCache:
+    """従来の PerformanceOptimizer.cache の動作を再現したもの"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.cache = {}
+
+    def set(self, key, value, ttl=3600):
+        self.cache[key] = {"value": value, "timestamp": time.time(), "ttl": ttl}
+        if len(self.cache) > self.max_size:
+            oldest_keys = sorted(
+                self.cache.keys(), key=lambda k: self.cache[k].get("timestamp", 0)
+            )[: len(self.cache) - self.max_size]
+            for key in oldest_keys:
+                del self.cache[key]
+
+    def get(self, key):
+        if key in self.cache:
+            entry = self.cache[key]
+            if time.time() - entry["timestamp"] < entry["ttl"]:
+                return entry["value"]
+            del self.cache[key]
+        return None
+
+
+def run(cache, keys, reads_per_write: int) -> float:
+    started = time.perf_counter()
+    for index, key in enumerate(keys):
+        if index % (reads_per_write + 1) == 0:
+            cache.set(key, key)
+        else:
+            cache.get(key)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTL cache benchmark")
+    parser.add_argument("--entries", type=int, default=10_000)
+    parser.add_argument("--operations", type=int, default=200_000)
+    parser.add_argument("--reads-per-write", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # 上限の2倍のキー空間から選び、追い出しが常に起きる状態にする
+    keys = [f"key-{rng.randrange(args.entries * 2)}" for _ in range(args.operations)]
+
+    legacy = LegacyCache(args.entries)
+    cache = TTLCache(max_entries=args.entries, default_ttl=3600)
+    legacy_seconds = run(legacy, keys, args.reads_per_write)
+    cache_seconds = run(cache, keys, args.reads_per_write)
+
+    n = args.operations
+    print(f"{n} operations, {args.entries} entries, {args.reads_per_write} reads/write")
+    print(f"  legacy dict + sort  {legacy_seconds / n * 1e6:10.3f} us/op")
+    print(f"  TTLCache            {cache_seconds / n * 1e6:10.3f} us/op")
+    print(f"  speedup             {legacy_seconds / cache_seconds:10.1f}x")
+    metrics = cache.get_metrics()
+    print(
+        f"  TTLCache hit rate {metrics['hit_rate']:.3f}, "
+        f"evictions {metrics['evictions']}, size {metrics['size_bytes']} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()
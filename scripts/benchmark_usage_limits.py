@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+UsageLimitService のセッション消費レイテンシ計測
+ユーザー数を変えて consume_roleplay_session の p50/p95 を比較する
+
+Usage:
+    python scripts/benchmark_usage_limits.py [--sizes 100 10000 1000000] [--json-max 10000]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.usage_limit_service import (  # noqa: E402
+    UsageLimitService,
+    UsageStats,
+)
+from app.services.usage_storage import (  # noqa: E402
+    JsonUsageStorage,
+    SQLiteUsageStorage,
+)
+
+
+def _users(count: int):
+    now = datetime.now().isoformat()
+    for i in range(count):
+        yield asdict(
+            UsageStats(
+                user_id=f"user-{i}",
+                video_processing_minutes_used=0,
+                roleplay_sessions_remaining=60,
+                last_reset_date=now,
+                created_at=now,
+                updated_at=now,
+            )
+        )
+
+
+def _build_storage(backend: str, workdir: Path, count: int):
+    if backend == "sqlite":
+        storage = SQLiteUsageStorage(workdir / "usage.db")
+        storage.save_many(_users(count))
+        return storage
+    path = workdir / "usage.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({u["user_id"]: u for u in _users(count)}, f)
+    return JsonUsageStorage(path)
+
+
+async def _measure(service: UsageLimitService, count: int, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        user_id = f"user-{random.randrange(count)}"
+        start = time.perf_counter()
+        await service.consume_roleplay_session(user_id)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "p50_us": round(statistics.median(samples), 1),
+        "p95_us": round(samples[int(len(samples) * 0.95)], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark usage limit storage")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument(
+        "--json-max",
+        type=int,
+        default=10_000,
+        help="largest user count to run against the legacy JSON backend",
+    )
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'users':>10} {'setup_s':>8} {'p50_us':>10} {'p95_us':>10}")
+    for backend in ("json", "sqlite"):
+        for count in args.sizes:
+            if backend == "json" and count > args.json_max:
+                continue
+            with tempfile.TemporaryDirectory() as tmp:
+                setup_start = time.perf_counter()
+                storage = _build_storage(backend, Path(tmp), count)
+                setup = time.perf_counter() - setup_start
+                service = UsageLimitService(
+                    storage_path=str(Path(tmp) / "usage.json"), storage=storage
+                )
+                iterations = args.iterations if backend == "sqlite" else 200
+                result = asyncio.run(_measure(service, count, iterations))
+                storage.close()
+            print(
+                f"{backend:<8} {count:>10} {setup:>8.1f} "
+                f"{result['p50_us']:>10} {result['p95_us']:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
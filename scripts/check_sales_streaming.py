@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+営業応答のストリーミング版と一括版の出力が一致することを確認する
+
+ランダムに組み立てた応答（長い1文・文末なし・！？混在・前後の空白など）を
+チャンクに分けて stream_sales_analysis に流し、応答全体を
+_finalize_sales_response に渡した場合（一括版）と最終応答が一致すること、
+最初の1文（先行TTSの対象）が最終応答の先頭と一致することを確認する。
+
+Usage:
+    python scripts/check_sales_streaming.py --cases 2000
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.groq_service import GroqService  # noqa: E402
+
+CUSTOMER_TEXT = "料金について教えてください"
+ENDINGS = ["。", "！", "？", "", ""]
+
+
+class ScriptedGroqService(GroqService):
+    """決まった応答をチャンク単位で返す GroqService（API を呼ばない）"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.response_cache = None
+
+    async def stream_chat_completion(self, message, **kwargs):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def random_completion(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(1, 4)):
+        body = "あ" * rng.randint(1, 120)
+        parts.append(body + rng.choice(ENDINGS))
+    return rng.choice(["", " ", "\n"]) + "".join(parts) + rng.choice(["", " "])
+
+
+def split_chunks(rng: random.Random, text: str):
+    chunks, position = [], 0
+    while position < len(text):
+        size = rng.randint(1, 8)
+        chunks.append(text[position : position + size])
+        position += size
+    return chunks
+
+
+async def check(cases: int, seed: int) -> int:
+    rng = random.Random(seed)
+    failures = 0
+    for case in range(cases):
+        completion = random_completion(rng)
+        service = ScriptedGroqService(split_chunks(rng, completion))
+        expected = service._finalize_sales_response(CUSTOMER_TEXT, completion)
+        first = []
+        streamed = await service.stream_sales_analysis(
+            CUSTOMER_TEXT, on_first_sentence=first.append, use_cache=False
+        )
+        mismatch = streamed["response"] != expected["response"]
+        # 短すぎてフォールバック応答になった場合は先行TTSの文と一致しなくてよい
+        from_completion = completion.strip().startswith(streamed["response"])
+        if not mismatch and first and from_completion:
+            mismatch = not streamed["response"].startswith(first[0])
+        if mismatch:
+            failures += 1
+            print(f"case {case}: {completion!r}")
+            print(f"  batch    {expected['response']!r}")
+            print(f"  streamed {streamed['response']!r} (first {first[:1]!r})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sales streaming consistency check")
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failures = asyncio.run(check(args.cases, args.seed))
+    print(f"{args.cases} cases, {failures} mismatches")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+利用制限データの移行
+data/usage_limits.json の内容を SQLite (WAL) バックエンドへ一度だけ移行する
+
+Usage:
+    python scripts/migrate_usage_limits.py [--json data/usage_limits.json] [--db data/usage_limits.db]
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.usage_storage import migrate_json_to_sqlite  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate usage limits to SQLite")
+    parser.add_argument("--json", default="data/usage_limits.json")
+    parser.add_argument("--db", default="data/usage_limits.db")
+    parser.add_argument(
+        "--force", action="store_true", help="replace an existing DB (stop the app first)"
+    )
+    args = parser.parse_args()
+
+    json_path, db_path = Path(args.json), Path(args.db)
+    if not json_path.exists():
+        logger.error(f"{json_path} not found")
+        return 1
+    if db_path.exists() and not args.force:
+        logger.error(f"{db_path} already exists (use --force to replace it)")
+        return 1
+
+    count = migrate_json_to_sqlite(json_path, db_path)
+    print(f"Migrated {count} users to {db_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+OpenAI互換のモックLLMサーバー
+GroqService をネットワークなしで検証するためのローカルサーバー
+
+Usage:
+    python scripts/mock_groq_server.py --port 8901
+    GROQ_BASE_URL=http://127.0.0.1:8901/v1 GROQ_API_KEY=dummy python main.py
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_REPLY = (
+    "ありがとうございます。お客様のご要望に合わせて最適なプランをご提案いたします。"
+)
+
+app = FastAPI(title="Mock OpenAI-compatible server")
+app.state.reply = DEFAULT_REPLY
+app.state.chunk_delay = 0.0
+app.state.requests = 0
+
+
+def _completion(model: str, content: str) -> dict:
+    return {
+        "id": f"mock-{app.state.requests}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": 0,
+            "completion_tokens": len(content),
+            "total_tokens": len(content),
+        },
+    }
+
+
+async def _sse_chunks(model: str, content: str):
+    for char in content:
+        chunk = {
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": char}}],
+        }
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        if app.state.chunk_delay:
+            await asyncio.sleep(app.state.chunk_delay)
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    app.state.requests += 1
+    model = body.get("model", "mock-model")
+    if body.get("stream"):
+        return StreamingResponse(
+            _sse_chunks(model, app.state.reply), media_type="text/event-stream"
+        )
+    return JSONResponse(_completion(model, app.state.reply))
+
+
+@app.get("/stats")
+async def stats():
+    return {"requests": app.state.requests}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+    parser.add_argument(
+        "--chunk-delay", type=float, default=0.0, help="seconds between SSE chunks"
+    )
+    args = parser.parse_args()
+
+    app.state.reply = args.reply
+    app.state.chunk_delay = args.chunk_delay
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
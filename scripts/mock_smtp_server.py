@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+ローカルSMTPスタンドイン（aiosmtpd）
+リマインダー配信エンジンを実SMTPサーバーなしで検証するためのサーバー
+
+Usage:
+    python scripts/mock_smtp_server.py --port 8025 --fail-rate 0.05
+    # config/email_config.json:
+    #   {"smtp_server": "127.0.0.1", "smtp_port": 8025, "use_tls": false,
+    #    "require_auth": false, "from_email": "noreply@example.com", ...}
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from aiosmtpd.controller import Controller
+
+
+class StandInHandler:
+    """受信したメールを数えるだけのハンドラー（一部を一時エラーで拒否できる）"""
+
+    def __init__(self, fail_rate: float = 0.0, delay: float = 0.0):
+        self.fail_rate = fail_rate
+        self.delay = delay
+        self.accepted = 0
+        self.rejected = 0
+        self.sessions = 0
+        self.started = time.monotonic()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if random.random() < self.fail_rate:
+            self.rejected += 1
+            return "451 4.3.0 Temporary failure, try again later"
+        self.accepted += 1
+        return "250 Message accepted for delivery"
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        return (
+            f"accepted={self.accepted} rejected={self.rejected} "
+            f"ehlo={self.sessions} elapsed={elapsed:.1f}s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument(
+        "--fail-rate", type=float, default=0.0, help="ratio of 451 responses"
+    )
+    parser.add_argument(
+        "--delay", type=float, default=0.0, help="seconds spent per message"
+    )
+    args = parser.parse_args()
+
+    handler = StandInHandler(args.fail_rate, args.delay)
+    controller = Controller(handler, hostname=args.host, port=args.port)
+    controller.start()
+    print(f"SMTP stand-in listening on {args.host}:{args.port}")
+    try:
+        while True:
+            time.sleep(5)
+            print(handler.summary(), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
+        print(handler.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+TTS音声キャッシュのウォームアップ
+GroqServiceの定型フォールバック応答を全ビジネス話者で事前合成し、
+OUTPUT_DIR配下のディスクキャッシュに格納する
+
+Usage:
+    python scripts/warm_tts_cache.py [--speaker 6 --speaker 2] [--host localhost]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.speakers import VOICEVOX_SPEAKER_MAPPING  # noqa: E402
+from app.services.groq_service import get_fallback_phrases  # noqa: E402
+from app.services.voice_service import VoiceService  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+async def warm_up(host: str, port: str, speaker_ids) -> dict:
+    voice_service = VoiceService(host=host, port=port)
+    await voice_service.start()
+    try:
+        phrases = get_fallback_phrases()
+        logger.info(
+            f"Warming TTS cache: {len(phrases)} phrases x {len(speaker_ids)} speakers"
+        )
+        return await voice_service.warm_up_cache(phrases, speaker_ids)
+    finally:
+        await voice_service.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render fallback phrases")
+    parser.add_argument("--host", default=os.getenv("VOICEVOX_HOST", "localhost"))
+    parser.add_argument("--port", default=os.getenv("VOICEVOX_PORT", "50021"))
+    parser.add_argument(
+        "--speaker",
+        type=int,
+        action="append",
+        dest="speakers",
+        help="business speaker ID (default: all mapped speakers)",
+    )
+    args = parser.parse_args()
+
+    speaker_ids = args.speakers or list(VOICEVOX_SPEAKER_MAPPING.keys())
+    result = asyncio.run(warm_up(args.host, args.port, speaker_ids))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0 if result["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
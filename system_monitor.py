@@ -11,17 +11,27 @@ import psutil  # type: ignore
 import logging
 import asyncio
 import json
-from typing import Dict, Any, List
+from collections import deque
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
+import numpy as np
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST  # type: ignore
 from fastapi import Response, WebSocket  # type: ignore
-import threading
 import queue
 
+from metrics_timeseries import TimeSeriesRing, linear_trend, to_iso
+from host_sampler import HostSampler, HostSnapshot
+
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 履歴の数値列（リングバッファに列ごとに保持する）
+PERFORMANCE_FIELDS = ('cpu_percent', 'memory_percent', 'disk_percent', 'response_time', 'active_connections')
+HEALTH_FIELDS = ('score', 'status_code', 'warnings', 'critical_alerts', 'cpu_percent', 'memory_percent', 'disk_percent')
+HEALTH_STATUS_CODES = {'healthy': 0, 'warning': 1, 'critical': 2, 'error': 3, 'unknown': 4}
+HEALTH_STATUS_NAMES = {code: name for name, code in HEALTH_STATUS_CODES.items()}
+
 class SystemMonitor:
     """システム監視クラス"""
     
@@ -70,12 +80,12 @@ class SystemMonitor:
             'System health status (1=healthy, 0=unhealthy)'
         )
         
-        # 監視データ
-        self.metrics_history = []
-        self.alert_history = []
-        self.health_history = []
-        self.performance_history = []
         self._monitoring_started = False
+        self._collect_cycles = 0
+
+        # ホストメトリクスはバックグラウンドで収集したスナップショットを読むだけにする
+        # （net_connections / process_iter などをリクエストごとに呼ばない）
+        self.host_sampler = HostSampler.from_env()
         
         # アラート設定
         self.alert_thresholds = {
@@ -95,6 +105,18 @@ class SystemMonitor:
             'alert_cooldown_minutes': 5,
             'max_history_size': 1000
         }
+
+        # 監視データ（固定容量。上限到達後は古いものから上書き）
+        max_history = self.monitoring_config['max_history_size']
+        self.metrics_history = deque(maxlen=max_history)
+        self.alert_history = deque(maxlen=max_history)
+        self.performance_series = TimeSeriesRing(PERFORMANCE_FIELDS, max_history)
+        self.health_series = TimeSeriesRing(HEALTH_FIELDS, max_history)
+        self._latest_health = None
+
+        # 履歴の保存先（設定時のみ。再起動後もダッシュボードの履歴を引き継ぐ）
+        self.history_dir = os.getenv('SYSTEM_MONITOR_HISTORY_DIR') or None
+        self.load_history()
         
         # WebSocket接続管理
         self.active_connections: List[WebSocket] = []
@@ -102,7 +124,7 @@ class SystemMonitor:
         
         # リアルタイムデータ配信
         self.real_time_data_queue = queue.Queue(maxsize=100)
-        self.real_time_thread = None
+        self.real_time_task = None
         self.real_time_running = False
         
         # 監視イベント
@@ -120,6 +142,7 @@ class SystemMonitor:
             
         logger.info("システム監視を開始しました")
         self._monitoring_started = True
+        self.host_sampler.start()
         
         # イベントループが実行中の場合のみタスクを作成
         try:
@@ -153,6 +176,17 @@ class SystemMonitor:
                 logger.warning("イベントループが利用できません")
             except Exception as e:
                 logger.error(f"監視タスク開始エラー: {e}")
+
+    def stop_monitoring(self):
+        """監視停止（収集タスク・リアルタイム配信・ホストサンプラー）"""
+        self._monitoring_started = False
+        for task_name in ('_metrics_task', '_health_task'):
+            task = getattr(self, task_name, None)
+            if task is not None and not task.done():
+                task.cancel()
+        self.stop_real_time_monitoring()
+        self.host_sampler.stop()
+        logger.info("システム監視を停止しました")
     
     async def collect_system_metrics(self):
         """システムメトリクス収集"""
@@ -188,10 +222,16 @@ class SystemMonitor:
                 for alert in alerts:
                     self.record_alert(alert['type'], alert['message'])
 
-                # 古いデータのクリーンアップ（60サンプル毎 ≒ 1時間）
-                if len(self.metrics_history) % 60 == 0:
+                # 古いデータのクリーンアップ（60サイクル毎 ≒ 1時間）
+                # 履歴は上限で長さが止まるため、件数ではなく収集回数で判定する
+                self._collect_cycles += 1
+                if self._collect_cycles % 60 == 0:
                     self.cleanup_old_data()
 
+                # ファイル書き込みはイベントループ外で行う（内容はここで確定させる）
+                if self.history_dir:
+                    await asyncio.to_thread(self.save_history, self._history_snapshot())
+
             except Exception as e:
                 logger.error(f"メトリクス収集エラー: {e}")
             finally:
@@ -246,15 +286,12 @@ class SystemMonitor:
         alert = {
             'type': alert_type,
             'message': message,
-                    'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.now().isoformat(),
             'severity': 'warning' if 'warning' in alert_type.lower() else 'critical'
         }
+        # 上限を超えた分は deque が古い順に捨てる
         self.alert_history.append(alert)
         
-        # 履歴サイズ制限
-        if len(self.alert_history) > self.monitoring_config['max_history_size']:
-            self.alert_history = self.alert_history[-self.monitoring_config['max_history_size']:]
-        
         logger.warning(f"アラート記録: {alert_type} - {message}")
 
     def add_health_record(self, health_data: Dict[str, Any]):
@@ -267,27 +304,88 @@ class SystemMonitor:
             'warnings': health_data.get('warnings', []),
             'critical_alerts': health_data.get('critical_alerts', [])
         }
-        self.health_history.append(record)
-        
-        # 履歴サイズ制限
-        if len(self.health_history) > self.monitoring_config['max_history_size']:
-            self.health_history = self.health_history[-self.monitoring_config['max_history_size']:]
+        # 推奨事項・修復提案は最新の記録だけを参照する
+        self._latest_health = record
+        metrics = record['metrics']
+        self.health_series.append(time.time(), {
+            'score': record['score'],
+            'status_code': HEALTH_STATUS_CODES.get(record['status'], HEALTH_STATUS_CODES['unknown']),
+            'warnings': len(record['warnings']),
+            'critical_alerts': len(record['critical_alerts']),
+            'cpu_percent': metrics.get('cpu_percent', 0),
+            'memory_percent': metrics.get('memory_percent', 0),
+            'disk_percent': metrics.get('disk_percent', 0)
+        })
 
     def add_performance_record(self, performance_data: Dict[str, Any]):
         """パフォーマンス記録を追加"""
-        record = {
-            'timestamp': datetime.now().isoformat(),
-            'cpu_percent': performance_data.get('cpu_percent', 0),
-            'memory_percent': performance_data.get('memory_percent', 0),
-            'disk_percent': performance_data.get('disk_percent', 0),
-            'response_time': performance_data.get('response_time', 0),
-            'active_connections': performance_data.get('active_connections', 0)
-        }
-        self.performance_history.append(record)
-        
-        # 履歴サイズ制限
-        if len(self.performance_history) > self.monitoring_config['max_history_size']:
-            self.performance_history = self.performance_history[-self.monitoring_config['max_history_size']:]
+        self.performance_series.append(time.time(), performance_data)
+
+    @property
+    def performance_history(self) -> List[Dict[str, Any]]:
+        """パフォーマンス履歴（互換用。分析には performance_series を使う）"""
+        return [
+            {**record, 'timestamp': to_iso(record['timestamp'])}
+            for record in self.performance_series.iter_records()
+        ]
+
+    @property
+    def health_history(self) -> List[Dict[str, Any]]:
+        """健全性履歴の数値列（互換用。最新の完全な記録は _latest_health）"""
+        return [
+            {
+                **record,
+                'timestamp': to_iso(record['timestamp']),
+                'status': HEALTH_STATUS_NAMES.get(int(record['status_code']), 'unknown')
+            }
+            for record in self.health_series.iter_records()
+        ]
+
+    def load_history(self):
+        """保存済みの履歴を読み込む（SYSTEM_MONITOR_HISTORY_DIR 設定時）"""
+        if not self.history_dir:
+            return
+        try:
+            loaded = self.performance_series.load(os.path.join(self.history_dir, 'performance.npz'))
+            loaded_health = self.health_series.load(os.path.join(self.history_dir, 'health.npz'))
+            alerts_path = os.path.join(self.history_dir, 'alerts.json')
+            if os.path.exists(alerts_path):
+                with open(alerts_path, 'r', encoding='utf-8') as f:
+                    self.alert_history.extend(json.load(f))
+            logger.info(
+                f"監視履歴を読み込みました: {loaded} パフォーマンス, {loaded_health} 健全性, "
+                f"{len(self.alert_history)} アラート"
+            )
+        except Exception as e:
+            logger.error(f"監視履歴読み込みエラー: {e}")
+
+    def _history_snapshot(self):
+        """保存する履歴のコピー（別スレッドでの書き込み中に更新されないように）"""
+        return (
+            self.performance_series.snapshot(),
+            self.health_series.snapshot(),
+            list(self.alert_history)
+        )
+
+    def save_history(self, snapshot=None):
+        """履歴を保存する（SYSTEM_MONITOR_HISTORY_DIR 設定時）
+
+        snapshot には _history_snapshot() の結果を渡せる（スレッドから呼ぶ場合）
+        """
+        if not self.history_dir:
+            return
+        try:
+            performance, health, alerts = snapshot or self._history_snapshot()
+            os.makedirs(self.history_dir, exist_ok=True)
+            self.performance_series.save(os.path.join(self.history_dir, 'performance.npz'), performance)
+            self.health_series.save(os.path.join(self.history_dir, 'health.npz'), health)
+            alerts_path = os.path.join(self.history_dir, 'alerts.json')
+            tmp_path = f"{alerts_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(alerts, f, ensure_ascii=False)
+            os.replace(tmp_path, alerts_path)
+        except Exception as e:
+            logger.error(f"監視履歴保存エラー: {e}")
 
     def check_alerts(self, metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
         """アラートチェック"""
@@ -352,55 +450,45 @@ class SystemMonitor:
         
         return alerts
 
-    def get_performance_analysis(self) -> Dict[str, Any]:
-        """パフォーマンス分析を取得"""
+    def get_performance_analysis(self, window: Optional[int] = None) -> Dict[str, Any]:
+        """パフォーマンス分析を取得（window: 直近の件数。省略時は保持している全件）"""
         try:
-            if not self.performance_history:
+            series = self.performance_series
+            if not len(series):
                 return {'error': 'No performance data available'}
 
-            # 統計計算
-            cpu_values = [record['cpu_percent'] for record in self.performance_history]
-            memory_values = [record['memory_percent'] for record in self.performance_history]
-            disk_values = [record['disk_percent'] for record in self.performance_history]
-
-            analysis = {
-                'cpu': {
-                    'current': cpu_values[-1] if cpu_values else 0,
-                    'average': sum(cpu_values) / len(cpu_values) if cpu_values else 0,
-                    'max': max(cpu_values) if cpu_values else 0,
-                    'min': min(cpu_values) if cpu_values else 0,
-                    'trend': self._calculate_trend(cpu_values)
-                },
-                'memory': {
-                    'current': memory_values[-1] if memory_values else 0,
-                    'average': sum(memory_values) / len(memory_values) if memory_values else 0,
-                    'max': max(memory_values) if memory_values else 0,
-                    'min': min(memory_values) if memory_values else 0,
-                    'trend': self._calculate_trend(memory_values)
-                },
-                'disk': {
-                    'current': disk_values[-1] if disk_values else 0,
-                    'average': sum(disk_values) / len(disk_values) if disk_values else 0,
-                    'max': max(disk_values) if disk_values else 0,
-                    'min': min(disk_values) if disk_values else 0,
-                    'trend': self._calculate_trend(disk_values)
-                },
-                'data_points': len(self.performance_history),
-                'time_range': self._get_time_range()
-            }
+            # 統計計算（列ごとのベクトル演算）
+            analysis = {}
+            for name in ('cpu', 'memory', 'disk'):
+                values = series.column(f'{name}_percent', window)
+                stats = series.aggregate(f'{name}_percent', window)
+                analysis[name] = {
+                    'current': stats['current'],
+                    'average': stats['mean'],
+                    'max': stats['max'],
+                    'min': stats['min'],
+                    'p50': stats['p50'],
+                    'p95': stats['p95'],
+                    'p99': stats['p99'],
+                    'slope': stats['slope'],
+                    'trend': self._calculate_trend(values)
+                }
+            analysis['data_points'] = len(values)
+            analysis['time_range'] = self._get_time_range(window)
 
             return analysis
         except Exception as e:
             logger.error(f"パフォーマンス分析エラー: {e}")
             return {'error': str(e)}
 
-    def _calculate_trend(self, values: List[float]) -> str:
-        """トレンドを計算"""
+    def _calculate_trend(self, values: np.ndarray) -> str:
+        """トレンドを計算（先頭5件と末尾5件の平均を比較）"""
+        values = np.asarray(values, dtype=np.float64)
         if len(values) < 2:
             return 'stable'
         
-        recent_avg = sum(values[-5:]) / len(values[-5:]) if len(values) >= 5 else values[-1]
-        older_avg = sum(values[:5]) / len(values[:5]) if len(values) >= 5 else values[0]
+        recent_avg = float(values[-5:].mean()) if len(values) >= 5 else float(values[-1])
+        older_avg = float(values[:5].mean()) if len(values) >= 5 else float(values[0])
         
         if recent_avg > older_avg * 1.1:
             return 'increasing'
@@ -409,54 +497,47 @@ class SystemMonitor:
         else:
             return 'stable'
 
-    def _get_time_range(self) -> Dict[str, str]:
+    def _get_time_range(self, window: Optional[int] = None) -> Dict[str, str]:
         """時間範囲を取得"""
-        if not self.performance_history:
-            return {'start': '', 'end': ''}
-        
-        start_time = self.performance_history[0]['timestamp']
-        end_time = self.performance_history[-1]['timestamp']
-        
-        return {
-            'start': start_time,
-            'end': end_time
-        }
+        return self.performance_series.time_range(window)
 
-    def get_health_trends(self) -> Dict[str, Any]:
+    def get_health_trends(self, window: Optional[int] = None) -> Dict[str, Any]:
         """健全性トレンドを取得"""
         try:
-            if not self.health_history:
+            series = self.health_series
+            if not len(series):
                 return {'error': 'No health data available'}
             
             # ステータス分布
-            status_counts = {}
-            for record in self.health_history:
-                status = record['status']
-                status_counts[status] = status_counts.get(status, 0) + 1
+            codes, counts = np.unique(series.column('status_code', window), return_counts=True)
+            status_counts = {
+                HEALTH_STATUS_NAMES.get(int(code), 'unknown'): int(count)
+                for code, count in zip(codes, counts)
+            }
             
             # スコアトレンド
-            scores = [record['score'] for record in self.health_history]
+            scores = series.column('score', window)
             
             # 警告統計
-            total_warnings = sum(len(record['warnings']) for record in self.health_history)
-            total_critical = sum(len(record['critical_alerts']) for record in self.health_history)
+            total_warnings = int(series.column('warnings', window).sum())
+            total_critical = int(series.column('critical_alerts', window).sum())
             
             trends = {
                 'status_distribution': status_counts,
                 'score': {
-                    'current': scores[-1] if scores else 0,
-                    'average': sum(scores) / len(scores) if scores else 0,
-                    'max': max(scores) if scores else 0,
-                    'min': min(scores) if scores else 0,
+                    'current': float(scores[-1]),
+                    'average': float(scores.mean()),
+                    'max': float(scores.max()),
+                    'min': float(scores.min()),
                     'trend': self._calculate_trend(scores)
                 },
                 'alerts': {
                     'total_warnings': total_warnings,
                     'total_critical': total_critical,
-                    'average_warnings_per_check': total_warnings / len(self.health_history) if self.health_history else 0
+                    'average_warnings_per_check': total_warnings / len(scores)
                 },
-                'data_points': len(self.health_history),
-                'time_range': self._get_health_time_range()
+                'data_points': len(scores),
+                'time_range': self._get_health_time_range(window)
             }
             
             return trends
@@ -464,18 +545,9 @@ class SystemMonitor:
             logger.error(f"健全性トレンド取得エラー: {e}")
             return {'error': str(e)}
 
-    def _get_health_time_range(self) -> Dict[str, str]:
+    def _get_health_time_range(self, window: Optional[int] = None) -> Dict[str, str]:
         """健全性データの時間範囲を取得"""
-        if not self.health_history:
-            return {'start': '', 'end': ''}
-        
-        start_time = self.health_history[0]['timestamp']
-        end_time = self.health_history[-1]['timestamp']
-        
-        return {
-            'start': start_time,
-            'end': end_time
-        }
+        return self.health_series.time_range(window)
 
     def cleanup_old_data(self):
         """古いデータをクリーンアップ"""
@@ -483,27 +555,21 @@ class SystemMonitor:
             retention_hours = self.monitoring_config.get('metrics_retention_hours', 24)
             cutoff_time = datetime.now() - timedelta(hours=retention_hours)
 
-            # メトリクス履歴のクリーンアップ
-            self.metrics_history = [
-                record for record in self.metrics_history
-                if datetime.fromisoformat(record['timestamp']) > cutoff_time
-            ]
-
-            # パフォーマンス履歴のクリーンアップ
-            self.performance_history = [
-                record for record in self.performance_history
-                if datetime.fromisoformat(record['timestamp']) > cutoff_time
-            ]
+            # メトリクス履歴のクリーンアップ（古い順に並んでいるので先頭から捨てる）
+            while (
+                self.metrics_history
+                and datetime.fromisoformat(self.metrics_history[0]['timestamp']) <= cutoff_time
+            ):
+                self.metrics_history.popleft()
 
-            # 健全性履歴のクリーンアップ
-            self.health_history = [
-                record for record in self.health_history
-                if datetime.fromisoformat(record['timestamp']) > cutoff_time
-            ]
+            # パフォーマンス・健全性履歴のクリーンアップ
+            cutoff = cutoff_time.timestamp()
+            self.performance_series.prune_before(cutoff)
+            self.health_series.prune_before(cutoff)
 
             logger.info(
                 f"古いデータをクリーンアップしました: {len(self.metrics_history)} メトリクス, "
-                f"{len(self.performance_history)} パフォーマンス, {len(self.health_history)} 健全性記録"
+                f"{len(self.performance_series)} パフォーマンス, {len(self.health_series)} 健全性記録"
             )
         except Exception as e:
             logger.error(f"データクリーンアップエラー: {e}")
@@ -513,8 +579,8 @@ class SystemMonitor:
         recommendations = []
         try:
             # 最新の健全性データを取得
-            if self.health_history:
-                latest_health = self.health_history[-1]
+            if self._latest_health:
+                latest_health = self._latest_health
                 
                 # CPU推奨事項
                 cpu_percent = latest_health.get('metrics', {}).get('cpu_percent', 0)
@@ -594,73 +660,80 @@ class SystemMonitor:
             logger.info(f"切断されたWebSocket接続: {len(disconnected)}")
 
     def start_real_time_monitoring(self):
-        """リアルタイム監視開始"""
+        """リアルタイム監視開始（イベントループ上のタスクでスナップショットを配信）"""
         if self.real_time_running:
             return
-        
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.warning("イベントループが実行されていないため、リアルタイム監視を開始できません")
+            return
+
+        self.host_sampler.start()
         self.real_time_running = True
-        self.real_time_thread = threading.Thread(target=self._real_time_monitoring_loop, daemon=True)
-        self.real_time_thread.start()
+        self.real_time_task = loop.create_task(self._real_time_monitoring_loop())
         logger.info("リアルタイム監視を開始しました")
 
     def stop_real_time_monitoring(self):
         """リアルタイム監視停止"""
         self.real_time_running = False
-        if self.real_time_thread:
-            self.real_time_thread.join(timeout=5)
+        if self.real_time_task is not None:
+            self.real_time_task.cancel()
+            self.real_time_task = None
         logger.info("リアルタイム監視を停止しました")
 
-    def _real_time_monitoring_loop(self):
-        """リアルタイム監視ループ"""
+    async def _real_time_monitoring_loop(self):
+        """リアルタイム監視ループ（新しいスナップショットが収集されるたびに配信）"""
+        # 収集間隔の半分で確認し、新しいサンプルを取りこぼさない
+        poll_interval = self.host_sampler.interval / 2
+        last_sampled_at = None
         while self.real_time_running:
             try:
-                # リアルタイムデータを収集
-                real_time_data = self._collect_real_time_data()
-                
-                # WebSocket接続に配信
-                asyncio.run(self.broadcast_to_websockets(real_time_data))
-                
-                # イベント検出
-                self._detect_monitoring_events(real_time_data)
-                
-                time.sleep(5)  # 5秒間隔
-                
+                snapshot = self.host_sampler.snapshot()
+                if snapshot.sampled_at != last_sampled_at:
+                    last_sampled_at = snapshot.sampled_at
+                    real_time_data = self._collect_real_time_data(snapshot)
+
+                    # WebSocket接続に配信
+                    await self.broadcast_to_websockets(real_time_data)
+
+                    # イベント検出
+                    self._detect_monitoring_events(real_time_data)
+
+                await asyncio.sleep(poll_interval)
+
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"リアルタイム監視エラー: {e}")
-                time.sleep(10)
+                await asyncio.sleep(self.host_sampler.interval * 2)
 
-    def _collect_real_time_data(self) -> Dict[str, Any]:
-        """リアルタイムデータを収集"""
+    def _collect_real_time_data(self, snapshot: Optional[HostSnapshot] = None) -> Dict[str, Any]:
+        """リアルタイムデータを収集（ホストサンプラーのスナップショットから組み立てる）"""
         try:
-            # 基本メトリクス
-            cpu_percent = psutil.cpu_percent()
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            
-            # ネットワーク情報
-            net_io = psutil.net_io_counters()
-            
-            # プロセス情報
-            processes = len(list(psutil.process_iter()))
-            
-            # システムロード
-            load_avg = os.getloadavg()
-            
+            snapshot = snapshot or self.host_sampler.snapshot()
+            cpu_percent = snapshot.cpu_percent
+            memory_percent = snapshot.memory_percent
+            disk_percent = snapshot.disk_percent
+            load_avg = snapshot.load or (0.0, 0.0, 0.0)
+
             real_time_data = {
                 'timestamp': datetime.now().isoformat(),
                 'metrics': {
                     'cpu_percent': cpu_percent,
-                    'memory_percent': memory.percent,
-                    'disk_percent': (disk.used / disk.total) * 100,
-                    'network_bytes_sent': net_io.bytes_sent,
-                    'network_bytes_recv': net_io.bytes_recv,
-                    'process_count': processes,
+                    'memory_percent': memory_percent,
+                    'disk_percent': disk_percent,
+                    'network_bytes_sent': snapshot.network_io.get('bytes_sent', 0),
+                    'network_bytes_recv': snapshot.network_io.get('bytes_recv', 0),
+                    'process_count': snapshot.process_count,
                     'load_1min': load_avg[0],
                     'load_5min': load_avg[1],
                     'load_15min': load_avg[2]
                 },
-                'status': self._get_real_time_status(cpu_percent, memory.percent, (disk.used / disk.total) * 100),
-                'alerts': self._get_real_time_alerts(cpu_percent, memory.percent, (disk.used / disk.total) * 100)
+                'status': self._get_real_time_status(cpu_percent, memory_percent, disk_percent),
+                'alerts': self._get_real_time_alerts(cpu_percent, memory_percent, disk_percent),
+                'sampling': self.host_sampler.freshness(snapshot)
             }
             
             return real_time_data
@@ -784,64 +857,46 @@ class SystemMonitor:
             }
         }
 
-    def get_predictive_analysis(self) -> Dict[str, Any]:
-        """予測分析を取得"""
+    def get_predictive_analysis(self, window: Optional[int] = None) -> Dict[str, Any]:
+        """予測分析を取得（window: 直近の件数。省略時は保持している全件）"""
         try:
-            if len(self.performance_history) < 10:
+            series = self.performance_series
+            if min(len(series), window or len(series)) < 10:
                 return {'error': 'Insufficient data for predictive analysis'}
             
+            columns = {
+                name: series.column(f'{name}_percent', window)
+                for name in ('cpu', 'memory', 'disk')
+            }
+            
             # トレンド分析
-            cpu_trend = self._analyze_trend([record['cpu_percent'] for record in self.performance_history])
-            memory_trend = self._analyze_trend([record['memory_percent'] for record in self.performance_history])
-            disk_trend = self._analyze_trend([record['disk_percent'] for record in self.performance_history])
+            trends = {name: self._analyze_trend(values) for name, values in columns.items()}
             
             # 予測計算
-            predictions = {
-                'cpu': self._predict_next_value([record['cpu_percent'] for record in self.performance_history]),
-                'memory': self._predict_next_value([record['memory_percent'] for record in self.performance_history]),
-                'disk': self._predict_next_value([record['disk_percent'] for record in self.performance_history])
-            }
+            predictions = {name: self._predict_next_value(values) for name, values in columns.items()}
             
             # 異常検出
-            anomalies = self._detect_anomalies()
+            anomalies = self._detect_anomalies(window)
             
             return {
-                'trends': {
-                    'cpu': cpu_trend,
-                    'memory': memory_trend,
-                    'disk': disk_trend
-                },
+                'trends': trends,
                 'predictions': predictions,
                 'anomalies': anomalies,
-                'confidence_level': self._calculate_confidence_level()
+                'confidence_level': self._calculate_confidence_level(window)
             }
         except Exception as e:
             logger.error(f"予測分析エラー: {e}")
             return {'error': str(e)}
 
-    def _analyze_trend(self, values: List[float]) -> Dict[str, Any]:
-        """トレンド分析"""
+    def _analyze_trend(self, values: np.ndarray) -> Dict[str, Any]:
+        """トレンド分析（線形回帰）"""
+        values = np.asarray(values, dtype=np.float64)
         if len(values) < 2:
             return {'direction': 'stable', 'slope': 0, 'strength': 'weak'}
         
-        # 線形回帰による傾き計算
-        n = len(values)
-        x_sum = sum(range(n))
-        y_sum = sum(values)
-        xy_sum = sum(i * val for i, val in enumerate(values))
-        x2_sum = sum(i * i for i in range(n))
-        
-        slope = (n * xy_sum - x_sum * y_sum) / (n * x2_sum - x_sum * x_sum)
-        
-        # トレンド強度の計算
-        mean_y = y_sum / n
-        ss_tot = sum((val - mean_y) ** 2 for val in values)
-        ss_res = sum((val - (slope * i + (y_sum / n - slope * x_sum / n))) ** 2 for i, val in enumerate(values))
-        
-        if ss_tot == 0:
-            r_squared = 0
-        else:
-            r_squared = 1 - (ss_res / ss_tot)
+        fit = linear_trend(values)
+        slope = fit['slope']
+        r_squared = fit['r_squared']
         
         # 方向と強度の判定
         if abs(slope) < 0.1:
@@ -865,18 +920,17 @@ class SystemMonitor:
             'r_squared': r_squared
         }
 
-    def _predict_next_value(self, values: List[float]) -> Dict[str, Any]:
+    def _predict_next_value(self, values: np.ndarray) -> Dict[str, Any]:
         """次の値を予測"""
         if len(values) < 5:
             return {'predicted': 0, 'confidence': 0, 'range': [0, 0]}
         
         # 移動平均による予測
-        recent_values = values[-5:]
-        predicted = sum(recent_values) / len(recent_values)
+        recent_values = np.asarray(values[-5:], dtype=np.float64)
+        predicted = float(recent_values.mean())
         
         # 信頼区間の計算
-        variance = sum((val - predicted) ** 2 for val in recent_values) / len(recent_values)
-        std_dev = variance ** 0.5
+        std_dev = float(recent_values.std())
         
         confidence_range = [max(0, predicted - 2 * std_dev), min(100, predicted + 2 * std_dev)]
         
@@ -891,79 +945,65 @@ class SystemMonitor:
             'std_dev': std_dev
         }
 
-    def _detect_anomalies(self) -> List[Dict[str, Any]]:
+    def _detect_anomalies(self, window: Optional[int] = None) -> List[Dict[str, Any]]:
         """異常検出"""
         anomalies = []
         try:
-            if len(self.performance_history) < 10:
+            series = self.performance_series
+            cpu_values = series.column('cpu_percent', window)
+            if len(cpu_values) < 10:
                 return anomalies
             
-            # 統計的異常検出
-            cpu_values = [record['cpu_percent'] for record in self.performance_history]
-            memory_values = [record['memory_percent'] for record in self.performance_history]
-            disk_values = [record['disk_percent'] for record in self.performance_history]
-            
-            # CPU異常検出
-            cpu_mean = sum(cpu_values) / len(cpu_values)
-            cpu_std = (sum((val - cpu_mean) ** 2 for val in cpu_values) / len(cpu_values)) ** 0.5
-            
-            for i, val in enumerate(cpu_values[-5:]):  # 最新5件をチェック
-                if abs(val - cpu_mean) > 2 * cpu_std:
+            # 最新5件の時刻
+            recent_times = series.timestamps(5)
+            
+            # 統計的異常検出（平均から2σ以上離れた最新5件）
+            for name in ('cpu', 'memory'):
+                values = series.column(f'{name}_percent', window)
+                mean = float(values.mean())
+                std = float(values.std())
+                recent = values[-5:]
+                deviation = np.abs(recent - mean)
+                for index in np.flatnonzero(deviation > 2 * std):
                     anomalies.append({
-                        'type': 'cpu_anomaly',
-                        'value': val,
-                        'expected_range': [cpu_mean - 2 * cpu_std, cpu_mean + 2 * cpu_std],
-                        'severity': 'high' if abs(val - cpu_mean) > 3 * cpu_std else 'medium',
-                        'timestamp': self.performance_history[-(5-i)]['timestamp']
-                    })
-            
-            # メモリ異常検出
-            memory_mean = sum(memory_values) / len(memory_values)
-            memory_std = (sum((val - memory_mean) ** 2 for val in memory_values) / len(memory_values)) ** 0.5
-            
-            for i, val in enumerate(memory_values[-5:]):
-                if abs(val - memory_mean) > 2 * memory_std:
-                    anomalies.append({
-                        'type': 'memory_anomaly',
-                        'value': val,
-                        'expected_range': [memory_mean - 2 * memory_std, memory_mean + 2 * memory_std],
-                        'severity': 'high' if abs(val - memory_mean) > 3 * memory_std else 'medium',
-                        'timestamp': self.performance_history[-(5-i)]['timestamp']
+                        'type': f'{name}_anomaly',
+                        'value': float(recent[index]),
+                        'expected_range': [mean - 2 * std, mean + 2 * std],
+                        'severity': 'high' if deviation[index] > 3 * std else 'medium',
+                        'timestamp': to_iso(recent_times[index])
                     })
             
             # 急激な変化の検出
-            if len(cpu_values) >= 3:
-                recent_cpu_change = abs(cpu_values[-1] - cpu_values[-2])
-                if recent_cpu_change > 20:  # 20%以上の急激な変化
-                    anomalies.append({
-                        'type': 'sudden_cpu_change',
-                        'change': recent_cpu_change,
-                        'from': cpu_values[-2],
-                        'to': cpu_values[-1],
-                        'severity': 'high' if recent_cpu_change > 30 else 'medium',
-                        'timestamp': self.performance_history[-1]['timestamp']
-                    })
+            recent_cpu_change = abs(float(cpu_values[-1] - cpu_values[-2]))
+            if recent_cpu_change > 20:  # 20%以上の急激な変化
+                anomalies.append({
+                    'type': 'sudden_cpu_change',
+                    'change': recent_cpu_change,
+                    'from': float(cpu_values[-2]),
+                    'to': float(cpu_values[-1]),
+                    'severity': 'high' if recent_cpu_change > 30 else 'medium',
+                    'timestamp': to_iso(recent_times[-1])
+                })
         except Exception as e:
             logger.error(f"異常検出エラー: {e}")
 
         return anomalies
 
-    def _calculate_confidence_level(self) -> float:
+    def _calculate_confidence_level(self, window: Optional[int] = None) -> float:
         """信頼度レベルを計算"""
         try:
-            if len(self.performance_history) < 10:
+            series = self.performance_series
+            cpu_values = series.column('cpu_percent', window)
+            if len(cpu_values) < 10:
                 return 0.5
-            
-            # データの一貫性を評価
-            cpu_values = [record['cpu_percent'] for record in self.performance_history]
-            memory_values = [record['memory_percent'] for record in self.performance_history]
+            memory_values = series.column('memory_percent', window)
             
             # 変動係数の計算
-            cpu_mean = sum(cpu_values) / len(cpu_values)
-            cpu_cv = (sum((val - cpu_mean) ** 2 for val in cpu_values) / len(cpu_values)) ** 0.5 / cpu_mean if cpu_mean > 0 else 0
+            cpu_mean = float(cpu_values.mean())
+            cpu_cv = float(cpu_values.std()) / cpu_mean if cpu_mean > 0 else 0
             
-            memory_mean = sum(memory_values) / len(memory_values)
-            memory_cv = (sum((val - memory_mean) ** 2 for val in memory_values) / len(memory_values)) ** 0.5 / memory_mean if memory_mean > 0 else 0
+            memory_mean = float(memory_values.mean())
+            memory_cv = float(memory_values.std()) / memory_mean if memory_mean > 0 else 0
             
             # 信頼度の計算（変動が少ないほど信頼度が高い）
             confidence = max(0, min(1, 1 - (cpu_cv + memory_cv) / 2))
@@ -1095,8 +1135,8 @@ class SystemMonitor:
         
         try:
             # 最新の健全性データを取得
-            if self.health_history:
-                latest_health = self.health_history[-1]
+            if self._latest_health:
+                latest_health = self._latest_health
                 metrics = latest_health.get('metrics', {})
                 
                 # CPU関連の修復提案
@@ -1640,19 +1680,19 @@ class SystemMonitor:
         """
     
     def get_system_metrics(self) -> Dict[str, Any]:
-        """システムメトリクス取得"""
+        """システムメトリクス取得（ホストサンプラーのスナップショットから組み立てる）"""
         try:
-            # 現在のプロセスIDを取得
-            current_pid = os.getpid()
+            snapshot = self.host_sampler.snapshot()
             
             metrics = {
                 'timestamp': datetime.now().isoformat(),
-                'cpu': self._get_cpu_metrics(),
-                'memory': self._get_memory_metrics(),
-                'disk': self._get_disk_metrics(),
-                'network': self._get_network_metrics(),
-                'process': self._get_process_metrics(current_pid),
-                'system': self._get_system_metrics()
+                'cpu': self._get_cpu_metrics(snapshot),
+                'memory': self._get_memory_metrics(snapshot),
+                'disk': self._get_disk_metrics(snapshot),
+                'network': self._get_network_metrics(snapshot),
+                'process': self._get_process_metrics(snapshot),
+                'system': self._get_system_metrics(snapshot),
+                'sampling': self.host_sampler.freshness(snapshot)
             }
             
             return metrics
@@ -1661,143 +1701,56 @@ class SystemMonitor:
             logger.error(f"メトリクス取得エラー: {e}")
             return {'error': str(e)}
     
-    def _get_cpu_metrics(self) -> Dict[str, Any]:
+    def _get_cpu_metrics(self, snapshot: HostSnapshot) -> Dict[str, Any]:
         """CPUメトリクス取得"""
-        try:
-            cpu_percent = psutil.cpu_percent()
-            return {
-                'usage_percent': cpu_percent,
-                'count': psutil.cpu_count(),
-                'frequency': self._get_cpu_frequency()
-            }
-        except Exception as e:
-            logger.debug(f"CPUメトリクス取得エラー: {e}")
-            return {'error': str(e)}
+        if 'cpu' in snapshot.errors:
+            return {'error': snapshot.errors['cpu']}
+        return {
+            'usage_percent': snapshot.cpu_percent,
+            'count': snapshot.cpu_count,
+            'frequency': snapshot.cpu_frequency
+        }
     
-    def _get_memory_metrics(self) -> Dict[str, Any]:
+    def _get_memory_metrics(self, snapshot: HostSnapshot) -> Dict[str, Any]:
         """メモリメトリクス取得"""
-        try:
-            memory = psutil.virtual_memory()
-            return {
-                'total': memory.total,
-                'available': memory.available,
-                'used': memory.used,
-                'percent': memory.percent
-            }
-        except Exception as e:
-            logger.debug(f"メモリメトリクス取得エラー: {e}")
-            return {'error': str(e)}
+        if 'memory' in snapshot.errors:
+            return {'error': snapshot.errors['memory']}
+        return {key: snapshot.memory[key] for key in ('total', 'available', 'used', 'percent')}
     
-    def _get_disk_metrics(self) -> Dict[str, Any]:
+    def _get_disk_metrics(self, snapshot: HostSnapshot) -> Dict[str, Any]:
         """ディスクメトリクス取得"""
-        try:
-            disk = psutil.disk_usage('/')
-            return {
-                'total': disk.total,
-                'used': disk.used,
-                'free': disk.free,
-                'percent': (disk.used / disk.total) * 100
-            }
-        except Exception as e:
-            logger.debug(f"ディスクメトリクス取得エラー: {e}")
-            return {'error': str(e)}
+        if 'disk' in snapshot.errors:
+            return {'error': snapshot.errors['disk']}
+        return dict(snapshot.disk)
     
-    def _get_network_metrics(self) -> Dict[str, Any]:
+    def _get_network_metrics(self, snapshot: HostSnapshot) -> Dict[str, Any]:
         """ネットワークメトリクス取得"""
-        try:
-            network = psutil.net_io_counters()
-            return {
-                'bytes_sent': network.bytes_sent,
-                'bytes_recv': network.bytes_recv,
-                'packets_sent': network.packets_sent,
-                'packets_recv': network.packets_recv
-            }
-        except Exception as e:
-            logger.debug(f"ネットワークメトリクス取得エラー: {e}")
-            return {'error': str(e)}
+        if 'network_io' in snapshot.errors:
+            return {'error': snapshot.errors['network_io']}
+        return dict(snapshot.network_io)
     
-    def _get_process_metrics(self, pid: int) -> Dict[str, Any]:
-        """プロセスメトリクス取得"""
-        try:
-            process = psutil.Process(pid)
-            
-            # メモリ情報を安全に取得
-            memory_info = None
-            try:
-                memory_info = process.memory_info()._asdict()
-            except Exception as e:
-                logger.debug(f"プロセスメモリ情報取得エラー: {e}")
-            
-            # CPU使用率を安全に取得
-            cpu_percent = 0.0
-            try:
-                cpu_percent = process.cpu_percent()
-            except Exception as e:
-                logger.debug(f"プロセスCPU使用率取得エラー: {e}")
-            
-            # スレッド数を安全に取得
-            num_threads = 0
-            try:
-                num_threads = process.num_threads()
-            except Exception as e:
-                logger.debug(f"プロセススレッド数取得エラー: {e}")
-            
-            return {
-                'pid': pid,
-                'memory_info': memory_info,
-                'cpu_percent': cpu_percent,
-                'num_threads': num_threads
-            }
-        except Exception as e:
-            logger.debug(f"プロセスメトリクス取得エラー: {e}")
-            return {
-                'pid': pid,
-                'memory_info': None,
-                'cpu_percent': 0.0,
-                'num_threads': 0
-            }
+    def _get_process_metrics(self, snapshot: HostSnapshot) -> Dict[str, Any]:
+        """プロセスメトリクス取得（自プロセス）"""
+        process = snapshot.current_process
+        return {
+            'pid': process.get('pid', os.getpid()),
+            'memory_info': process.get('memory_info'),
+            'cpu_percent': process.get('cpu_percent', 0.0),
+            'num_threads': process.get('num_threads', 0)
+        }
     
-    def _get_system_metrics(self) -> Dict[str, Any]:
-        """システムメトリクス取得"""
-        try:
-            # ブート時間を安全に取得
-            boot_time = None
-            try:
-                boot_time = psutil.boot_time()
-            except Exception as e:
-                logger.debug(f"ブート時間取得エラー: {e}")
-            
-            # ユーザー数を安全に取得
-            users_count = 0
-            try:
-                users_count = len(psutil.users())
-            except Exception as e:
-                logger.debug(f"ユーザー数取得エラー: {e}")
-            
-            # 接続数を安全に取得
-            connections_count = 0
-            try:
-                connections_count = len(psutil.net_connections())
-            except Exception as e:
-                logger.debug(f"接続数取得エラー: {e}")
-            
-            return {
-                'boot_time': boot_time,
-                'users': users_count,
-                'connections': connections_count
-            }
-        except Exception as e:
-            logger.debug(f"システムメトリクス取得エラー: {e}")
-            return {
-                'boot_time': None,
-                'users': 0,
-                'connections': 0
-            }
+    def _get_system_metrics(self, snapshot: HostSnapshot) -> Dict[str, Any]:
+        """システムメトリクス取得（ユーザー数・接続数は重い収集の結果）"""
+        return {
+            'boot_time': snapshot.boot_time,
+            'users': snapshot.users,
+            'connections': snapshot.connections
+        }
     
     def get_metrics_history(self) -> List[Dict[str, Any]]:
         """メトリクス履歴取得"""
         try:
-            return self.metrics_history
+            return list(self.metrics_history)
         except Exception as e:
             logger.error(f"メトリクス履歴取得エラー: {e}")
             return []
@@ -1805,7 +1758,7 @@ class SystemMonitor:
     def get_alert_history(self) -> List[Dict[str, Any]]:
         """アラート履歴取得"""
         try:
-            return self.alert_history
+            return list(self.alert_history)
         except Exception as e:
             logger.error(f"アラート履歴取得エラー: {e}")
             return []
@@ -1825,60 +1778,30 @@ class SystemMonitor:
             )
     
     def get_health_summary(self) -> Dict[str, Any]:
-        """健全性サマリー取得"""
+        """健全性サマリー取得（ホストサンプラーのスナップショットから組み立てる O(1)）"""
         try:
-            # CPU使用率を安全に取得
-            cpu_percent = 0.0
-            try:
-                cpu_percent = psutil.cpu_percent()
-            except Exception as e:
-                logger.debug(f"CPU使用率取得エラー: {e}")
-            
-            # メモリ使用率を安全に取得
-            memory_percent = 0.0
-            memory_info = {}
-            try:
-                memory = psutil.virtual_memory()
-                memory_percent = memory.percent
-                memory_info = {
-                    'total': memory.total,
-                    'available': memory.available,
-                    'used': memory.used,
-                    'free': memory.free,
-                    'percent': memory.percent
-                }
-            except Exception as e:
-                logger.debug(f"メモリ使用率取得エラー: {e}")
-            
-            # ディスク使用率を安全に取得
-            disk_percent = 0.0
-            disk_info = {}
-            try:
-                disk = psutil.disk_usage('/')
-                disk_percent = (disk.used / disk.total) * 100
-                disk_info = {
-                    'total': disk.total,
-                    'used': disk.used,
-                    'free': disk.free,
-                    'percent': disk_percent
-                }
-            except Exception as e:
-                logger.debug(f"ディスク使用率取得エラー: {e}")
+            snapshot = self.host_sampler.snapshot()
+
+            cpu_percent = snapshot.cpu_percent
+            memory_percent = snapshot.memory_percent
+            memory_info = dict(snapshot.memory)
+            disk_percent = snapshot.disk_percent
+            disk_info = dict(snapshot.disk)
             
             # ネットワーク接続を監視
-            network_info = self._get_network_health()
+            network_info = self._get_network_health(snapshot)
             
             # プロセス監視
-            process_info = self._get_process_health()
+            process_info = self._get_process_health(snapshot)
             
             # システムロード監視
-            load_info = self._get_system_load()
+            load_info = self._get_system_load(snapshot)
             
             # セキュリティ監視
             security_info = self._get_security_health()
             
             # サービス監視
-            service_info = self._get_service_health()
+            service_info = self._get_service_health(snapshot)
             
             # 健全性判定
             health_status = "healthy"
@@ -1941,7 +1864,8 @@ class SystemMonitor:
                 'services': service_info,
                 'warnings': warnings,
                 'critical_alerts': critical_alerts,
-                'overall_score': self._calculate_health_score(cpu_percent, memory_percent, disk_percent)
+                'overall_score': self._calculate_health_score(cpu_percent, memory_percent, disk_percent),
+                'sampling': self.host_sampler.freshness(snapshot)
             }
             
         except Exception as e:
@@ -1952,85 +1876,37 @@ class SystemMonitor:
                 'timestamp': datetime.now().isoformat()
             }
 
-    def _get_network_health(self) -> Dict[str, Any]:
+    def _get_network_health(self, snapshot: HostSnapshot) -> Dict[str, Any]:
         """ネットワーク健全性を取得"""
-        try:
-            # ネットワーク接続を確認
-            connections = psutil.net_connections()
-            active_connections = len([conn for conn in connections if conn.status == 'ESTABLISHED'])
-            
-            # ネットワークインターフェース情報
-            net_io = psutil.net_io_counters()
-            
-            return {
-                'status': 'healthy',
-                'active_connections': active_connections,
-                'bytes_sent': net_io.bytes_sent,
-                'bytes_recv': net_io.bytes_recv,
-                'packets_sent': net_io.packets_sent,
-                'packets_recv': net_io.packets_recv
-            }
-        except Exception as e:
-            logger.debug(f"ネットワーク健全性取得エラー: {e}")
-            return {'status': 'error', 'error': str(e)}
+        error = snapshot.errors.get('connections') or snapshot.errors.get('network_io')
+        if error:
+            return {'status': 'error', 'error': error}
+        return {
+            'status': 'healthy',
+            'active_connections': snapshot.established_connections,
+            **snapshot.network_io
+        }
 
-    def _get_process_health(self) -> Dict[str, Any]:
+    def _get_process_health(self, snapshot: HostSnapshot) -> Dict[str, Any]:
         """プロセス健全性を取得"""
-        try:
-            processes = psutil.process_iter(['pid', 'name', 'status', 'cpu_percent', 'memory_percent'])
-            
-            total_processes = 0
-            zombie_processes = 0
-            high_cpu_processes = []
-            high_memory_processes = []
-            
-            for proc in processes:
-                try:
-                    total_processes += 1
-                    info = proc.info
-                    
-                    if info['status'] == 'zombie':
-                        zombie_processes += 1
-                    
-                    if info['cpu_percent'] and info['cpu_percent'] > 50:
-                        high_cpu_processes.append({
-                            'pid': info['pid'],
-                            'name': info['name'],
-                            'cpu_percent': info['cpu_percent']
-                        })
-                    
-                    if info['memory_percent'] and info['memory_percent'] > 10:
-                        high_memory_processes.append({
-                            'pid': info['pid'],
-                            'name': info['name'],
-                            'memory_percent': info['memory_percent']
-                        })
-                        
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-            
-            return {
-                'total_processes': total_processes,
-                'zombie_processes': zombie_processes,
-                'high_cpu_processes': high_cpu_processes[:5],  # 上位5件
-                'high_memory_processes': high_memory_processes[:5]  # 上位5件
-            }
-        except Exception as e:
-            logger.debug(f"プロセス健全性取得エラー: {e}")
-            return {'error': str(e)}
+        if 'processes' in snapshot.errors:
+            return {'error': snapshot.errors['processes']}
+        return {
+            'total_processes': snapshot.process_count,
+            'zombie_processes': snapshot.zombie_processes,
+            'high_cpu_processes': list(snapshot.high_cpu_processes),  # 上位5件
+            'high_memory_processes': list(snapshot.high_memory_processes)  # 上位5件
+        }
 
-    def _get_system_load(self) -> Dict[str, Any]:
+    def _get_system_load(self, snapshot: HostSnapshot) -> Dict[str, Any]:
         """システムロード情報を取得"""
-        try:
-            load_avg = os.getloadavg()
-            return {
-                'load_1min': load_avg[0],
-                'load_5min': load_avg[1],
-                'load_15min': load_avg[2]
-            }
-        except Exception as e:
-            logger.debug(f"システムロード取得エラー: {e}")
-            return {'error': str(e)}
+        if snapshot.load is None:
+            return {'error': snapshot.errors.get('load', 'load average unavailable')}
+        return {
+            'load_1min': snapshot.load[0],
+            'load_5min': snapshot.load[1],
+            'load_15min': snapshot.load[2]
+        }
 
     def _get_security_health(self) -> Dict[str, Any]:
         """セキュリティ健全性を取得"""
@@ -2062,27 +1938,20 @@ class SystemMonitor:
             logger.debug(f"セキュリティ健全性取得エラー: {e}")
             return {'status': 'error', 'error': str(e)}
 
-    def _get_service_health(self) -> Dict[str, Any]:
+    def _get_service_health(self, snapshot: HostSnapshot) -> Dict[str, Any]:
         """サービス健全性を取得"""
-        try:
-            # 現在のプロセスがPythonプロセスかチェック
-            current_pid = os.getpid()
-            current_process = psutil.Process(current_pid)
-            
-            services = {
-                'main_process': {
-                    'pid': current_pid,
-                    'name': current_process.name(),
-                    'status': 'running',
-                    'cpu_percent': current_process.cpu_percent(),
-                    'memory_percent': current_process.memory_percent()
-                }
+        process = snapshot.current_process
+        if not process:
+            return {'error': snapshot.errors.get('current_process', 'process info unavailable')}
+        return {
+            'main_process': {
+                'pid': process['pid'],
+                'name': process['name'],
+                'status': 'running',
+                'cpu_percent': process['cpu_percent'],
+                'memory_percent': process['memory_percent']
             }
-            
-            return services
-        except Exception as e:
-            logger.debug(f"サービス健全性取得エラー: {e}")
-            return {'error': str(e)}
+        }
 
     def _calculate_health_score(self, cpu_percent: float, memory_percent: float, disk_percent: float) -> int:
         """健全性スコアを計算（0-100）"""
@@ -2117,22 +1986,6 @@ class SystemMonitor:
         except Exception:
             return 50  # エラーの場合は中間値
 
-    def _get_cpu_frequency(self) -> Dict[str, Any]:
-        """CPU周波数情報を安全に取得"""
-        try:
-            cpu_freq = psutil.cpu_freq()
-            if cpu_freq:
-                return {
-                    'current': cpu_freq.current,
-                    'min': cpu_freq.min,
-                    'max': cpu_freq.max
-                }
-            else:
-                return None
-        except Exception as e:
-            logger.debug(f"CPU周波数情報取得エラー（無視）: {e}")
-            return None
-
 # グローバルインスタンス（遅延初期化）
 _system_monitor = None
 